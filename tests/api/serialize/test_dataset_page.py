@@ -0,0 +1,110 @@
+"""Test the binary serialization for pages of dataset rows."""
+
+import unittest
+
+from datetime import date, datetime
+
+from vizier.api.serialize.binary import DATASET_PAGE, read_dataset_page
+from vizier.datastore.dataset import DatasetColumn, DatasetDescriptor
+from vizier.datastore.dataset import DatasetRow
+
+
+class TestDatasetPage(unittest.TestCase):
+
+    def test_dataset_page(self):
+        """Test serialization and deserialization of a dataset page."""
+        dataset = DatasetDescriptor(
+            identifier='DS1',
+            columns=[
+                DatasetColumn(identifier=0, name='Name'),
+                DatasetColumn(identifier=2, name='Age', data_type='int'),
+                DatasetColumn(identifier=3, name='Salary', data_type='real'),
+                DatasetColumn(identifier=4, name='Mixed')
+            ],
+            row_count=100
+        )
+        rows = [
+            DatasetRow(identifier=5, values=['Alice', 23, 35.5, 'A']),
+            DatasetRow(identifier=7, values=['Bob', None, None, 1]),
+            DatasetRow(identifier=9, values=[None, 2 ** 40, 1.0, None]),
+            DatasetRow(identifier=3, values=['Zoë', -1, float('inf'), [1]])
+        ]
+        data = DATASET_PAGE(dataset=dataset, rows=rows, offset=10)
+        header, row_ids, values, flags = read_dataset_page(data)
+        self.assertEqual(header['id'], 'DS1')
+        self.assertEqual(header['rowCount'], 100)
+        self.assertEqual(header['offset'], 10)
+        self.assertEqual(
+            [col['encoding'] for col in header['columns']],
+            ['utf8', 'int64', 'float64', 'json']
+        )
+        self.assertEqual([col['id'] for col in header['columns']], [0, 2, 3, 4])
+        self.assertEqual(row_ids, [5, 7, 9, 3])
+        self.assertEqual(values, [row.values for row in rows])
+        self.assertEqual(flags, [[False] * 4] * 4)
+        # All buffers are aligned at multiples of 8 bytes
+        for pos, _ in header['buffers']:
+            self.assertEqual(pos % 8, 0)
+        # Empty page
+        header, row_ids, values, flags = read_dataset_page(
+            DATASET_PAGE(dataset=dataset, rows=list())
+        )
+        self.assertEqual(header['rows'], 0)
+        self.assertEqual(row_ids, [])
+        self.assertEqual(values, [])
+        self.assertEqual(flags, [])
+        with self.assertRaises(ValueError):
+            read_dataset_page(b'NOTAPAGE' + data[8:])
+
+    def test_dates_and_annotations(self):
+        """Test serialization of dates and timestamps and of the annotation
+        flags of rows.
+        """
+        dataset = DatasetDescriptor(
+            identifier='DS1',
+            columns=[
+                DatasetColumn(identifier=0, name='Day', data_type='date'),
+                DatasetColumn(identifier=1, name='Time', data_type='datetime'),
+                DatasetColumn(identifier=2, name='Mixed')
+            ],
+            row_count=3
+        )
+        rows = [
+            DatasetRow(
+                identifier=0,
+                values=[date(2019, 1, 31), datetime(2019, 1, 31, 12, 30), 1],
+                annotations=[True, False, True]
+            ),
+            DatasetRow(
+                identifier=1,
+                values=[None, None, {'day': date(2019, 2, 1)}],
+                annotations=[False, True]
+            ),
+            DatasetRow(
+                identifier=2,
+                values=[date(2019, 2, 1), None, date(2019, 2, 2)]
+            )
+        ]
+        header, row_ids, values, flags = read_dataset_page(
+            DATASET_PAGE(dataset=dataset, rows=rows)
+        )
+        self.assertEqual(
+            [col['encoding'] for col in header['columns']],
+            ['utf8', 'utf8', 'json']
+        )
+        self.assertEqual(
+            values,
+            [
+                ['2019-01-31', '2019-01-31T12:30:00', 1],
+                [None, None, {'day': '2019-02-01'}],
+                ['2019-02-01', None, '2019-02-02']
+            ]
+        )
+        self.assertEqual(
+            flags,
+            [[True, False, True], [False, True, False], [False, False, False]]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""Test the cache for serialized dataset pages and the conditional responses
+for immutable dataset resources.
+"""
+
+import unittest
+
+from flask import Flask, request
+
+from vizier.api.webservice.cache import PageCache
+
+import vizier.api.base as srv
+
+
+class TestPageCache(unittest.TestCase):
+
+    def test_cache_eviction(self):
+        """Test evicting least recently used pages when the memory budget is
+        exceeded.
+        """
+        cache = PageCache(capacity=10)
+        cache.put(('P1', 'DS1', 0), b'1234')
+        cache.put(('P1', 'DS1', 1), b'5678')
+        self.assertEqual(cache.get(('P1', 'DS1', 0)), b'1234')
+        # Adding a third page evicts the least recently used page
+        cache.put(('P1', 'DS2', 0), b'abcd')
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(('P1', 'DS1', 1)))
+        self.assertEqual(cache.size, 8)
+        # Pages that exceed the capacity are ignored
+        cache.put(('P1', 'DS3', 0), b'0123456789A')
+        self.assertIsNone(cache.get(('P1', 'DS3', 0)))
+        self.assertEqual(len(cache), 2)
+        # Remove pages for a dataset and for a project
+        cache.put(('P2', 'DS1', 0), b'xy')
+        cache.remove('P1', dataset_id='DS2')
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.size, 6)
+        cache.remove('P1')
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.get(('P2', 'DS1', 0)), b'xy')
+        # Zero capacity disables the cache
+        cache = PageCache(capacity=0)
+        cache.put(('P1', 'DS1', 0), b'1234')
+        self.assertEqual(len(cache), 0)
+
+    def test_conditional_request(self):
+        """Test entity tags and conditional requests for cached resources."""
+        app = Flask(__name__)
+        cache = PageCache()
+        calls = list()
+        def serialize():
+            calls.append(1)
+            return b'{"rows": []}'
+        def get_page(dataset_id):
+            response = srv.cached_response(
+                request,
+                key=('P1', dataset_id, 0, 10),
+                serialize=serialize if dataset_id == 'DS1' else lambda: None,
+                mimetype='application/json',
+                cache=cache
+            )
+            if response is None:
+                return '', 404
+            return response
+        app.add_url_rule('/<dataset_id>', 'page', get_page)
+        client = app.test_client()
+        r = client.get('/DS1')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data, b'{"rows": []}')
+        self.assertIn('immutable', r.headers['Cache-Control'])
+        etag = r.headers['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        # The page is served from the cache
+        r = client.get('/DS1')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.headers['ETag'], etag)
+        self.assertEqual(len(calls), 1)
+        # Conditional request with matching entity tag
+        r = client.get('/DS1', headers={'If-None-Match': etag})
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(r.data, b'')
+        r = client.get('/DS1', headers={'If-None-Match': '"abc"'})
+        self.assertEqual(r.status_code, 200)
+        # Unknown resource
+        self.assertEqual(client.get('/DS2').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
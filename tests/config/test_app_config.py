@@ -23,14 +23,20 @@ class TestAppConfig(unittest.TestCase):
         delete_env(env.VIZIERSERVER_ROW_LIMIT)
         delete_env(env.VIZIERSERVER_MAX_ROW_LIMIT)
         delete_env(env.VIZIERSERVER_MAX_UPLOAD_SIZE)
+        delete_env(env.VIZIERSERVER_PAGE_CACHE_SIZE)
         delete_env(env.VIZIERSERVER_ENGINE)
         delete_env(env.VIZIERSERVER_PACKAGE_PATH)
         delete_env(env.VIZIERSERVER_PROCESSOR_PATH)
         delete_env(env.VIZIERENGINE_DATA_DIR)
         delete_env(env.VIZIERENGINE_USE_SHORT_IDENTIFIER)
+        delete_env(env.VIZIERENGINE_OBJECT_STORE)
+        delete_env(env.VIZIERENGINE_PROJECT_CACHE_SIZE)
+        delete_env(env.VIZIERENGINE_RESULT_CACHE_SIZE)
+        delete_env(env.VIZIERENGINE_RESULT_CACHE_EXCLUDE)
         delete_env(env.VIZIERENGINE_SYNCHRONOUS)
         delete_env(env.VIZIERENGINE_BACKEND)
         delete_env(env.VIZIERENGINE_CELERY_ROUTES)
+        delete_env(env.VIZIERENGINE_MULTIPROCESS_WORKERS)
         delete_env(env.VIZIERENGINE_CONTAINER_PORTS)
         delete_env(env.VIZIERENGINE_CONTAINER_IMAGE)
 
@@ -45,6 +51,7 @@ class TestAppConfig(unittest.TestCase):
         self.assertEqual(config.webservice.defaults.row_limit, env.DEFAULT_SETTINGS[env.VIZIERSERVER_ROW_LIMIT])
         self.assertEqual(config.webservice.defaults.max_row_limit, env.DEFAULT_SETTINGS[env.VIZIERSERVER_MAX_ROW_LIMIT])
         self.assertEqual(config.webservice.defaults.max_file_size, env.DEFAULT_SETTINGS[env.VIZIERSERVER_MAX_UPLOAD_SIZE])
+        self.assertEqual(config.webservice.defaults.page_cache_size, env.DEFAULT_SETTINGS[env.VIZIERSERVER_PAGE_CACHE_SIZE])
         self.assertEqual(config.run.debug, env.DEFAULT_SETTINGS[env.VIZIERSERVER_DEBUG])
         self.assertEqual(config.logs.server, env.DEFAULT_SETTINGS[env.VIZIERSERVER_LOG_DIR])
         self.assertEqual(config.engine.identifier, env.DEFAULT_SETTINGS[env.VIZIERSERVER_ENGINE])
@@ -52,9 +59,14 @@ class TestAppConfig(unittest.TestCase):
         self.assertEqual(config.engine.package_path, env.DEFAULT_SETTINGS[env.VIZIERSERVER_PACKAGE_PATH])
         self.assertEqual(config.engine.processor_path, env.DEFAULT_SETTINGS[env.VIZIERSERVER_PROCESSOR_PATH])
         self.assertEqual(config.engine.use_short_ids, env.DEFAULT_SETTINGS[env.VIZIERENGINE_USE_SHORT_IDENTIFIER])
+        self.assertEqual(config.engine.object_store, env.DEFAULT_SETTINGS[env.VIZIERENGINE_OBJECT_STORE])
+        self.assertEqual(config.engine.project_cache_size, env.DEFAULT_SETTINGS[env.VIZIERENGINE_PROJECT_CACHE_SIZE])
+        self.assertEqual(config.engine.result_cache_size, env.DEFAULT_SETTINGS[env.VIZIERENGINE_RESULT_CACHE_SIZE])
+        self.assertIsNone(config.engine.result_cache_exclude)
         self.assertEqual(config.engine.sync_commands, env.DEFAULT_SETTINGS[env.VIZIERENGINE_SYNCHRONOUS])
         self.assertEqual(config.engine.backend.identifier, env.DEFAULT_SETTINGS[env.VIZIERENGINE_BACKEND])
         self.assertEqual(config.engine.backend.celery.routes, env.DEFAULT_SETTINGS[env.VIZIERENGINE_CELERY_ROUTES])
+        self.assertIsNone(config.engine.backend.multiprocess.workers)
         self.assertEqual(config.engine.backend.container.ports, env.DEFAULT_SETTINGS[env.VIZIERENGINE_CONTAINER_PORTS])
         self.assertEqual(config.engine.backend.container.image, env.DEFAULT_SETTINGS[env.VIZIERENGINE_CONTAINER_IMAGE])
 
@@ -70,11 +82,17 @@ class TestAppConfig(unittest.TestCase):
         os.environ[env.VIZIERSERVER_ROW_LIMIT] = '111'
         os.environ[env.VIZIERSERVER_MAX_ROW_LIMIT] = '222'
         os.environ[env.VIZIERSERVER_MAX_UPLOAD_SIZE] = '333'
+        os.environ[env.VIZIERSERVER_PAGE_CACHE_SIZE] = '444'
         os.environ[env.VIZIERSERVER_ENGINE] = 'CELERY'
         os.environ[env.VIZIERENGINE_USE_SHORT_IDENTIFIER] = str(not env.DEFAULT_SETTINGS[env.VIZIERENGINE_USE_SHORT_IDENTIFIER])
+        os.environ[env.VIZIERENGINE_OBJECT_STORE] = 'SQLITE'
+        os.environ[env.VIZIERENGINE_PROJECT_CACHE_SIZE] = '8'
+        os.environ[env.VIZIERENGINE_RESULT_CACHE_SIZE] = '16'
+        os.environ[env.VIZIERENGINE_RESULT_CACHE_EXCLUDE] = 'python:vizual.load'
         os.environ[env.VIZIERENGINE_SYNCHRONOUS] = 'ABC'
         os.environ[env.VIZIERENGINE_BACKEND] = 'THE_BACKEND'
         os.environ[env.VIZIERENGINE_CELERY_ROUTES] = 'Some Routes'
+        os.environ[env.VIZIERENGINE_MULTIPROCESS_WORKERS] = '4'
         os.environ[env.VIZIERENGINE_CONTAINER_PORTS] = '8080-8084,9000,10001-10010'
         config = AppConfig()
         self.assertEqual(config.webservice.name, 'Some Name')
@@ -85,13 +103,19 @@ class TestAppConfig(unittest.TestCase):
         self.assertEqual(config.webservice.defaults.row_limit, 111)
         self.assertEqual(config.webservice.defaults.max_row_limit, 222)
         self.assertEqual(config.webservice.defaults.max_file_size, 333)
+        self.assertEqual(config.webservice.defaults.page_cache_size, 444)
         self.assertEqual(config.run.debug, False)
         self.assertEqual(config.logs.server, 'logdir')
         self.assertEqual(config.engine.identifier, 'CELERY')
         self.assertEqual(config.engine.use_short_ids, not env.DEFAULT_SETTINGS[env.VIZIERENGINE_USE_SHORT_IDENTIFIER])
+        self.assertEqual(config.engine.object_store, 'SQLITE')
+        self.assertEqual(config.engine.project_cache_size, 8)
+        self.assertEqual(config.engine.result_cache_size, 16)
+        self.assertEqual(config.engine.result_cache_exclude, 'python:vizual.load')
         self.assertEqual(config.engine.sync_commands, 'ABC')
         self.assertEqual(config.engine.backend.identifier, 'THE_BACKEND')
         self.assertEqual(config.engine.backend.celery.routes, 'Some Routes')
+        self.assertEqual(config.engine.backend.multiprocess.workers, 4)
         ports = list(range(8080, 8084)) + [9000] + list(range(10001,10010))
         self.assertEqual(config.engine.backend.container.ports, ports)
         self.assertEqual(config.engine.backend.container.image, env.DEFAULT_SETTINGS[env.VIZIERENGINE_CONTAINER_IMAGE])
@@ -0,0 +1,158 @@
+"""Test the functionality of the SQLite object store."""
+
+import os
+import shutil
+import unittest
+
+from vizier.core.io.base import DefaultObjectStore, copy_folder
+from vizier.core.io.sqlite import SQLiteObjectStore
+from vizier.core.timestamp import get_current_time
+from vizier.engine.packages.pycell.command import python_cell
+from vizier.viztrail.module.base import ModuleHandle, MODULE_SUCCESS
+from vizier.viztrail.module.output import ModuleOutputs, TextOutput
+from vizier.viztrail.module.provenance import ModuleProvenance
+from vizier.viztrail.module.timestamp import ModuleTimestamp
+from vizier.viztrail.objectstore.repository import OSViztrailRepository
+from vizier.viztrail.workflow import ACTION_INSERT
+
+
+"""Base directory for all resources."""
+BASE_DIRECTORY = './.files/'
+DATABASE_FILE = './.files/vt.db'
+REPO_DIR = './.files/vt'
+
+
+class TestSQLiteObjectStore(unittest.TestCase):
+
+    def setUp(self):
+        """Create an empty directory for the database file."""
+        if os.path.isdir(BASE_DIRECTORY):
+            shutil.rmtree(BASE_DIRECTORY)
+        os.makedirs(BASE_DIRECTORY)
+
+    def tearDown(self):
+        """Delete base directory."""
+        shutil.rmtree(BASE_DIRECTORY)
+
+    def append_modules(self, branch, count):
+        """Append workflows with the given number of pending modules to the
+        branch.
+        """
+        for i in range(count):
+            ts = get_current_time()
+            command = python_cell(source='print ' + str(i))
+            module = ModuleHandle(
+                command=command,
+                external_form='print ' + str(i),
+                state=MODULE_SUCCESS,
+                outputs=ModuleOutputs(stdout=[TextOutput(str(i))]),
+                provenance=ModuleProvenance(),
+                timestamp=ModuleTimestamp(
+                    created_at=ts,
+                    started_at=ts,
+                    finished_at=ts
+                )
+            )
+            modules = list()
+            if not branch.head is None:
+                modules = branch.head.modules
+            branch.append_workflow(
+                modules=modules,
+                action=ACTION_INSERT,
+                command=command,
+                pending_modules=[module]
+            )
+
+    def test_copy_repository(self):
+        """Test migrating a viztrails repository from the default object store
+        to the SQLite object store.
+        """
+        repo = OSViztrailRepository(base_path=REPO_DIR)
+        vt = repo.create_viztrail(properties={'name': 'My Project'})
+        self.append_modules(vt.get_default_branch(), 5)
+        store = SQLiteObjectStore(database=DATABASE_FILE)
+        count = copy_folder(
+            source=DefaultObjectStore(),
+            target=store,
+            folder_path=REPO_DIR
+        )
+        # Viztrails index, viztrail metadata and properties, branch index,
+        # branch metadata and properties, 5 workflows and 5 modules.
+        self.assertEqual(count, 16)
+        # Load the repository from the database. Remove all files first.
+        shutil.rmtree(REPO_DIR)
+        repo = OSViztrailRepository(base_path=REPO_DIR, object_store=store)
+        vt = repo.get_viztrail(vt.identifier)
+        self.assertEqual(vt.name, 'My Project')
+        branch = vt.get_default_branch()
+        self.assertEqual(len(branch.get_history()), 5)
+        modules = branch.get_head().modules
+        self.assertEqual(len(modules), 5)
+        for i in range(5):
+            self.assertEqual(modules[i].external_form, 'print ' + str(i))
+            self.assertEqual(modules[i].outputs.stdout[0].value, str(i))
+        self.assertTrue(branch.get_workflow('00000000').modules[0].is_success)
+
+    def test_objects_and_folders(self):
+        """Test creating, reading, and deleting objects and folders."""
+        store = SQLiteObjectStore(database=DATABASE_FILE)
+        folder = store.join(BASE_DIRECTORY, 'A')
+        self.assertEqual(store.list_folders(folder), [])
+        self.assertTrue(store.exists(folder))
+        self.assertEqual(store.create_folder(folder, identifier='B'), 'B')
+        subfolder = store.join(folder, 'B')
+        obj_id = store.create_object(subfolder, content={'id': 1})
+        store.create_object(folder, identifier='C', content=[1, 2])
+        store.create_object(folder, identifier='D')
+        with self.assertRaises(ValueError):
+            store.read_object(store.join(folder, 'D'))
+        with self.assertRaises(ValueError):
+            store.read_object(store.join(folder, 'E'))
+        # Resources are persistent and paths are independent of the format of
+        # the base directory.
+        store = SQLiteObjectStore(database=DATABASE_FILE)
+        folder = os.path.join(os.path.abspath(BASE_DIRECTORY), 'A')
+        self.assertEqual(store.list_folders(folder), ['B'])
+        self.assertEqual(sorted(store.list_objects(folder)), ['C', 'D'])
+        self.assertEqual(store.read_object(store.join(folder, 'C')), [1, 2])
+        store.write_object(store.join(folder, 'C'), {'id': 2})
+        objects = store.read_objects([
+            store.join(folder, 'C'),
+            store.join(folder, 'D'),
+            store.join(folder, 'E'),
+            store.join(subfolder, obj_id)
+        ])
+        self.assertEqual(len(objects), 2)
+        self.assertEqual(objects[store.join(folder, 'C')], {'id': 2})
+        self.assertEqual(objects[store.join(subfolder, obj_id)], {'id': 1})
+        # Delete objects and folders
+        store.delete_object(store.join(folder, 'D'))
+        self.assertFalse(store.exists(store.join(folder, 'D')))
+        store = SQLiteObjectStore(database=DATABASE_FILE, keep_deleted_files=True)
+        store.delete_folder(folder)
+        self.assertTrue(store.exists(store.join(subfolder, obj_id)))
+        store.delete_folder(folder, force_delete=True)
+        self.assertFalse(store.exists(folder))
+        self.assertFalse(store.exists(store.join(folder, 'C')))
+        self.assertFalse(store.exists(store.join(subfolder, obj_id)))
+
+    def test_transaction(self):
+        """Test that modifications in a transaction are committed atomically."""
+        store = SQLiteObjectStore(database=DATABASE_FILE)
+        with store.transaction():
+            store.create_object(BASE_DIRECTORY, identifier='A', content=1)
+            with store.transaction():
+                store.create_object(BASE_DIRECTORY, identifier='B', content=2)
+        with self.assertRaises(RuntimeError):
+            with store.transaction():
+                store.write_object(store.join(BASE_DIRECTORY, 'A'), 10)
+                store.create_object(BASE_DIRECTORY, identifier='C', content=3)
+                raise RuntimeError('abort')
+        store = SQLiteObjectStore(database=DATABASE_FILE)
+        self.assertEqual(store.read_object(store.join(BASE_DIRECTORY, 'A')), 1)
+        self.assertEqual(store.read_object(store.join(BASE_DIRECTORY, 'B')), 2)
+        self.assertFalse(store.exists(store.join(BASE_DIRECTORY, 'C')))
+
+
+if __name__ == '__main__':
+    unittest.main()
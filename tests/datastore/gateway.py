@@ -0,0 +1,86 @@
+"""Local stand-in for the Mimir gateway that is used by tests of the Mimir
+client and datastore. Tests define the answers of the gateway by implementing
+a request handler.
+"""
+
+import json
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import vizier.mimir as mimir
+
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    """Handler for POST requests to the stand-in gateway. Subclasses implement
+    the respond method that returns the response body for a request.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        body = self.respond(json.loads(self.rfile.read(length)))
+        if body is None:
+            self.send_response(500)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, request):
+        """Get the response body for a request to the gateway. The request
+        path is available in the path property. Returns None for requests
+        that fail.
+
+        Parameters
+        ----------
+        request: dict
+            Request body
+
+        Returns
+        -------
+        dict
+        """
+        raise NotImplementedError()
+
+
+class GatewayServer(ThreadingHTTPServer):
+    """Stand-in gateway server on a free local port. While the server is
+    running, the Mimir client sends all requests to the server.
+    """
+    def __init__(self, handler):
+        """Initialize the server.
+
+        Parameters
+        ----------
+        handler: class
+            Subclass of GatewayHandler that answers requests
+        """
+        super(GatewayServer, self).__init__(('127.0.0.1', 0), handler)
+        self.mimir_url = None
+
+    def start(self):
+        """Run the server in a background thread and point the Mimir client
+        at the server.
+        """
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.mimir_url = mimir._mimir_url
+        mimir._mimir_url = 'http://127.0.0.1:{}/api/v2/'.format(
+            self.server_address[1]
+        )
+
+    def stop(self):
+        """Stop the server and restore the URL of the Mimir gateway."""
+        mimir._mimir_url = self.mimir_url
+        self.shutdown()
+        self.server_close()
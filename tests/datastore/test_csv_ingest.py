@@ -0,0 +1,68 @@
+"""Test typed ingestion of delimited files."""
+
+import io
+import unittest
+
+from vizier.datastore.fs.ingest import TypedCSVReader
+
+
+CSV_FILE = '\n'.join([
+    'Name , Age, Height, Salary',
+    'Alice, 23, 1.7, 35K',
+    'Bob, 32, , 30K',
+    'Claudia, , 1.6, 40',
+    'Dave, 1.5, 2, ',
+    'Eileen, A',
+    'Frank, 34, 1.8, 50K, X'
+])
+
+
+class TestTypedCSVReader(unittest.TestCase):
+
+    def read(self, infer_types=True, chunk_size=2):
+        """Read all rows in the test file."""
+        reader = TypedCSVReader(
+            io.StringIO(CSV_FILE),
+            infer_types=infer_types,
+            chunk_size=chunk_size
+        )
+        rows = list(reader)
+        self.assertEqual(reader.row_count, 6)
+        self.assertEqual([row.identifier for row in rows], list(range(6)))
+        return reader.columns, [row.values for row in rows]
+
+    def test_infer_types(self):
+        """Test type inference and conversion of values in chunks."""
+        columns, rows = self.read()
+        self.assertEqual(
+            [col.name for col in columns],
+            ['Name', 'Age', 'Height', 'Salary']
+        )
+        # Types are inferred from the first chunk and widened by values in
+        # later chunks. Values do not depend on the chunk size.
+        self.assertEqual(
+            [col.data_type for col in columns],
+            ['varchar', 'varchar', 'real', 'varchar']
+        )
+        self.assertEqual(rows[0], ['Alice', 23, 1.7, '35K'])
+        self.assertEqual(rows[1], ['Bob', 32, None, '30K'])
+        self.assertEqual(rows[2], ['Claudia', None, 1.6, 40])
+        self.assertEqual(rows[3], ['Dave', 1.5, 2, None])
+        self.assertEqual(rows[4], ['Eileen', 'A'])
+        self.assertEqual(rows[5], ['Frank', 34, 1.8, '50K', 'X'])
+        types = [col.data_type for col in columns]
+        for chunk_size in [1, 3, 100]:
+            chunk_columns, chunk_rows = self.read(chunk_size=chunk_size)
+            self.assertEqual([col.data_type for col in chunk_columns], types)
+            self.assertEqual(chunk_rows, rows)
+        # No type inference
+        columns, rows = self.read(infer_types=False)
+        self.assertEqual(
+            [col.data_type for col in columns],
+            ['varchar', 'varchar', 'varchar', 'varchar']
+        )
+        self.assertEqual(rows[5], ['Frank', '34', '1.8', '50K', 'X'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,15 @@
+import io
+import json
 import os
+import shutil
 import tempfile
 import unittest
 
-from vizier.datastore.dataset import DatasetRow
+from vizier.datastore.dataset import DatasetColumn, DatasetRow
+from vizier.datastore.fs.columnar import ColumnarDatasetReader
 from vizier.datastore.reader import DelimitedFileReader, DefaultJsonDatasetReader
+from vizier.datastore.reader import JSON_READ_BUFFER_SIZE, RowIndex
+from vizier.datastore.reader import read_json_rows
 
 
 CSV_FILE = './.files/dataset.csv'
@@ -13,8 +19,87 @@ GZIP_TSV_FILE = './.files/dataset.tsv.gz'
 JSON_FILE = './.files/dataset.json'
 
 
+class RecordingStringIO(io.StringIO):
+    """In-memory text file that records the maximum size of a single read."""
+    max_read = 0
+
+    def read(self, size=-1):
+        data = super(RecordingStringIO, self).read(size)
+        self.max_read = max(self.max_read, len(data))
+        return data
+
+    def readline(self, size=-1):
+        data = super(RecordingStringIO, self).readline(size)
+        self.max_read = max(self.max_read, len(data))
+        return data
+
 class TestDatasetReader(unittest.TestCase):
 
+    def test_columnar_reader(self):
+        """Test writing and reading datasets in columnar format."""
+        tmp_dir = tempfile.mkdtemp()
+        data_dir = os.path.join(tmp_dir, 'columns')
+        columns = [
+            DatasetColumn(identifier=0, name='A'),
+            DatasetColumn(identifier=2, name='B'),
+            DatasetColumn(identifier=1, name='C'),
+            DatasetColumn(identifier=3, name='D')
+        ]
+        rows = list()
+        for i in range(25):
+            rows.append(
+                DatasetRow(
+                    identifier=i + 10,
+                    values=[
+                        'N' + str(i),
+                        i if i % 7 != 0 else None,
+                        i / 2,
+                        i if i % 2 == 0 else 'X'
+                    ]
+                )
+            )
+        ColumnarDatasetReader(data_dir, columns, chunk_size=10).write(rows)
+        self.assertTrue(os.path.isdir(os.path.join(data_dir, '2')))
+        self.assertFalse(os.path.isdir(os.path.join(data_dir, '3')))
+        # Read all rows
+        with ColumnarDatasetReader(data_dir, columns).open() as reader:
+            result = [row for row in reader]
+        self.assertEqual(len(result), len(rows))
+        for i in range(len(rows)):
+            self.assertEqual(result[i].identifier, rows[i].identifier)
+            self.assertEqual(result[i].values, rows[i].values)
+        self.assertIsInstance(result[1].values[1], int)
+        self.assertIsNone(result[7].values[1])
+        # Read row ranges that span chunks
+        for offset, limit in [(0, 5), (8, 5), (9, 12), (20, 10), (24, -1)]:
+            reader = ColumnarDatasetReader(
+                data_dir,
+                columns,
+                offset=offset,
+                limit=limit
+            )
+            with reader.open() as r:
+                result = [row.identifier for row in r]
+            end = offset + limit if limit > 0 else len(rows)
+            self.assertEqual(
+                result,
+                [row.identifier for row in rows[offset:end]]
+            )
+        # Read a subset of columns
+        reader = ColumnarDatasetReader(
+            data_dir,
+            columns,
+            offset=12,
+            limit=2,
+            column_ids=[3, 0]
+        )
+        with reader.open() as r:
+            result = [row.values for row in r]
+        self.assertEqual(result, [[12, 'N12'], ['X', 'N13']])
+        with self.assertRaises(StopIteration):
+            next(reader)
+        shutil.rmtree(tmp_dir)
+
     def test_delimited_file_reader(self):
         """Test functionality of the delimited file dataset reader."""
         reader = DelimitedFileReader(CSV_FILE)
@@ -71,6 +156,102 @@ class TestDatasetReader(unittest.TestCase):
         self.assertEqual(count, len(rows))
         os.remove(tmp_file)
 
+    def test_json_reader_pagination(self):
+        """Test reading row ranges from Json files in different layouts."""
+        # Pretty-printed file
+        reader = DefaultJsonDatasetReader(JSON_FILE, offset=1, limit=5)
+        with reader.open() as r:
+            rows = [row for row in r]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0].identifier, 1)
+        self.assertEqual(rows[0].values, ['Bob', 32, '30K'])
+        # File with one row per line. Values include strings with delimiters
+        # and line breaks.
+        tmp_file = tempfile.mkstemp()[1]
+        rows = [
+            DatasetRow(i, ['A,]' + str(i), 'x\ny', i, None])
+                for i in range(100)
+        ]
+        DefaultJsonDatasetReader(tmp_file).write(rows)
+        for offset, limit in [(0, -1), (0, 10), (95, 10), (42, 1), (100, 5)]:
+            reader = DefaultJsonDatasetReader(
+                tmp_file,
+                offset=offset,
+                limit=limit
+            )
+            with reader.open() as r:
+                result = [row for row in r]
+            end = offset + limit if limit > 0 else len(rows)
+            expected = rows[offset:end]
+            self.assertEqual(len(result), len(expected))
+            for i in range(len(result)):
+                self.assertEqual(result[i].identifier, expected[i].identifier)
+                self.assertEqual(result[i].values, expected[i].values)
+        # The same file in a single line is parsed by the incremental parser
+        with open(tmp_file, 'r') as f:
+            content = f.read()
+        with open(tmp_file, 'w') as f:
+            f.write(content.replace('\n', ' '))
+        reader = DefaultJsonDatasetReader(tmp_file, offset=50, limit=2)
+        with reader.open() as r:
+            result = [row for row in r]
+        self.assertEqual([row.identifier for row in result], [50, 51])
+        self.assertEqual(result[0].values, rows[50].values)
+        os.remove(tmp_file)
+        # Single line files are read in chunks of limited size
+        content = json.dumps({
+            'rows': [{'id': i, 'values': ['x' * 50, i]} for i in range(5000)]
+        })
+        self.assertTrue(len(content) > 2 * JSON_READ_BUFFER_SIZE)
+        fh = RecordingStringIO(content)
+        result = list(read_json_rows(fh, skip=4990))
+        self.assertEqual([row['id'] for row in result], list(range(4990, 5000)))
+        self.assertTrue(fh.max_read <= JSON_READ_BUFFER_SIZE)
+
+    def test_json_reader_row_index(self):
+        """Test reading row ranges from a Json file using a row index."""
+        tmp_dir = tempfile.mkdtemp()
+        data_file = os.path.join(tmp_dir, 'data.json')
+        index_file = os.path.join(tmp_dir, 'rowindex.bin')
+        rows = [
+            DatasetRow(100 - i, ['\u00e9' * (i % 3), i]) for i in range(25)
+        ]
+        row_index = RowIndex(interval=10)
+        DefaultJsonDatasetReader(data_file).write(rows, row_index=row_index)
+        row_index.to_file(index_file)
+        self.assertEqual(RowIndex.get_offset(index_file, 0)[1], 0)
+        self.assertEqual(RowIndex.get_offset(index_file, 13)[1], 3)
+        self.assertEqual(RowIndex.get_offset(index_file, 24)[1], 4)
+        self.assertEqual(RowIndex.get_position(index_file, 100), 0)
+        self.assertEqual(RowIndex.get_position(index_file, 80), 20)
+        self.assertIsNone(RowIndex.get_position(index_file, 0))
+        positions = RowIndex.read_positions(index_file)
+        self.assertEqual(positions[100], 0)
+        self.assertEqual(positions[80], 20)
+        for offset, limit in [(0, -1), (9, 3), (10, 10), (20, -1), (30, 5)]:
+            reader = DefaultJsonDatasetReader(
+                data_file,
+                offset=offset,
+                limit=limit,
+                row_index=index_file
+            )
+            with reader.open() as r:
+                result = [row for row in r]
+            end = offset + limit if limit > 0 else len(rows)
+            expected = rows[offset:end]
+            self.assertEqual(len(result), len(expected))
+            for i in range(len(result)):
+                self.assertEqual(result[i].identifier, expected[i].identifier)
+                self.assertEqual(result[i].values, expected[i].values)
+        # Empty data file
+        row_index = RowIndex()
+        DefaultJsonDatasetReader(data_file).write([], row_index=row_index)
+        row_index.to_file(index_file)
+        reader = DefaultJsonDatasetReader(data_file, row_index=index_file)
+        with reader.open() as r:
+            self.assertEqual(len([row for row in r]), 0)
+        shutil.rmtree(tmp_dir)
+
     def read_dataset(self, reader):
         """The reader should contain three rows with three values each."""
         count = 0
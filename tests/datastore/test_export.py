@@ -0,0 +1,70 @@
+"""Test exporting datasets as delimited files."""
+
+import gzip
+import os
+import shutil
+import unittest
+
+from vizier.datastore.dataset import DatasetColumn, DatasetRow
+from vizier.datastore.export import export_dataset
+from vizier.datastore.fs.base import FileSystemDatastore
+
+
+STORE_DIR = './.tmp/export'
+
+
+class TestExportDataset(unittest.TestCase):
+
+    def setUp(self):
+        """Create a datastore with a single dataset."""
+        if os.path.isdir(STORE_DIR):
+            shutil.rmtree(STORE_DIR)
+        store = FileSystemDatastore(STORE_DIR)
+        descriptor = store.create_dataset(
+            columns=[
+                DatasetColumn(identifier=3, name='Name'),
+                DatasetColumn(identifier=1, name='Age')
+            ],
+            rows=[
+                DatasetRow(identifier=i, values=['N' + str(i), i])
+                    for i in range(100)
+            ]
+        )
+        self.dataset = store.get_dataset(descriptor.identifier)
+
+    def tearDown(self):
+        """Remove the datastore directory."""
+        shutil.rmtree(STORE_DIR)
+
+    def test_export_dataset(self):
+        """Test exporting dataset rows in blocks."""
+        blocks = list(export_dataset(self.dataset, block_size=100))
+        self.assertTrue(len(blocks) > 5)
+        lines = b''.join(blocks).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 101)
+        self.assertEqual(lines[0], 'Name,Age')
+        self.assertEqual(lines[100], 'N99,99')
+        # Column subset and row range in TSV format
+        content = export_dataset(
+            self.dataset,
+            column_ids=[1],
+            offset=10,
+            limit=3,
+            delimiter='\t'
+        )
+        lines = b''.join(content).decode('utf-8').splitlines()
+        self.assertEqual(lines, ['Age', '10', '11', '12'])
+        content = export_dataset(self.dataset, column_ids=[1, 3], limit=0)
+        self.assertEqual(b''.join(content).decode('utf-8'), 'Age,Name\r\n')
+        # Compressed output
+        content = export_dataset(self.dataset, compressed=True, block_size=100)
+        lines = gzip.decompress(b''.join(content)).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 101)
+        self.assertEqual(lines[1], 'N0,0')
+        # Unknown column identifier
+        with self.assertRaises(ValueError):
+            export_dataset(self.dataset, column_ids=[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
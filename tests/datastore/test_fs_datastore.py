@@ -9,8 +9,13 @@ from vizier.datastore.annotation.dataset import DatasetMetadata
 from vizier.datastore.base import METADATA_FILE
 from vizier.datastore.dataset import DatasetColumn, DatasetRow
 from vizier.datastore.fs.base import FileSystemDatastore
-from vizier.datastore.fs.base import DATA_FILE, DESCRIPTOR_FILE
-from vizier.datastore.fs.base import validate_dataset
+from vizier.datastore.fs.base import COMPACT_DIR_PREFIX, DATA_FILE, DESCRIPTOR_FILE
+from vizier.datastore.fs.base import lock_dataset_dir, validate_dataset
+from vizier.datastore.fs.chunks import CHUNK_LIST_FILE, content_hash, read_chunk_list
+from vizier.datastore.fs.dataset import COLUMNAR_DATA_DIR, DATA_FORMAT_COLUMNAR
+from vizier.datastore.fs.dataset import DATA_FORMAT_DELTA, DATA_FORMAT_JSON
+
+import vizier.datastore.fs.delta as delta
 from vizier.filestore.fs.base import FileSystemFilestore
 from vizier.filestore.base import FileHandle, FORMAT_TSV
 
@@ -139,6 +144,42 @@ class TestFileSystemDatastore(unittest.TestCase):
         self.assertEqual(len(ds.annotations.columns), 0)
         self.assertEqual(len(ds.annotations.rows), 0)
 
+    def test_columnar_format(self):
+        """Test creating and reading datasets in columnar format."""
+        store = FileSystemDatastore(STORE_DIR, data_format=DATA_FORMAT_COLUMNAR)
+        ds = store.create_dataset(
+            columns=[
+                DatasetColumn(identifier=0, name='A'),
+                DatasetColumn(identifier=1, name='B')
+            ],
+            rows=[
+                DatasetRow(identifier=0, values=['a', 1]),
+                DatasetRow(identifier=1, values=['b', 2.5]),
+                DatasetRow(identifier=2, values=['c', None])
+            ]
+        )
+        dataset_dir = os.path.join(STORE_DIR, ds.identifier)
+        self.assertFalse(os.path.isfile(os.path.join(dataset_dir, DATA_FILE)))
+        self.assertTrue(os.path.isdir(os.path.join(dataset_dir, COLUMNAR_DATA_DIR)))
+        # Reading does not depend on the format of the datastore
+        store = FileSystemDatastore(STORE_DIR)
+        ds = store.get_dataset(ds.identifier)
+        rows = ds.fetch_rows()
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1].values, ['b', 2.5])
+        self.assertEqual(rows[2].values, ['c', None])
+        with ds.reader(offset=1, limit=1, column_ids=[1]) as reader:
+            rows = [row for row in reader]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0].identifier, 1)
+        self.assertEqual(rows[0].values, [2.5])
+        # Load dataset from file
+        store = FileSystemDatastore(STORE_DIR, data_format=DATA_FORMAT_COLUMNAR)
+        ds = store.load_dataset(f_handle=FILE)
+        self.validate_class_size_dataset(store.get_dataset(ds.identifier))
+        with self.assertRaises(ValueError):
+            FileSystemDatastore(STORE_DIR, data_format='unknown')
+
     def test_create_base(self):
         """Test that the datastore base directory is created if it does not
         exist.
@@ -149,6 +190,127 @@ class TestFileSystemDatastore(unittest.TestCase):
         store = FileSystemDatastore(STORE_DIR)
         self.assertTrue(os.path.isdir(STORE_DIR))
 
+    def test_delta_dataset(self):
+        """Test creating, reading, and compacting delta datasets."""
+        store = FileSystemDatastore(STORE_DIR)
+        columns = [
+            DatasetColumn(identifier=0, name='A'),
+            DatasetColumn(identifier=1, name='B')
+        ]
+        base_ds = store.create_dataset(
+            columns=columns,
+            rows=[
+                DatasetRow(identifier=0, values=['a', 1]),
+                DatasetRow(identifier=1, values=['b', 2]),
+                DatasetRow(identifier=2, values=['c', 3])
+            ]
+        )
+        ds = store.create_delta_dataset(
+            dataset=store.get_dataset(base_ds.identifier),
+            columns=columns,
+            operations=[
+                delta.update_cell_op(1, 0, 10),
+                delta.delete_row_op(1),
+                delta.insert_row_op(3, 0)
+            ],
+            row_count=3
+        )
+        ds = store.get_dataset(ds.identifier)
+        self.assertEqual(ds.data_format, DATA_FORMAT_DELTA)
+        self.assertEqual(ds.base.identifier, base_ds.identifier)
+        self.assertEqual(ds.max_row_id(), 3)
+        rows = ds.fetch_rows()
+        self.assertEqual([r.identifier for r in rows], [3, 0, 2])
+        self.assertEqual(rows[0].values, [None, None])
+        self.assertEqual(rows[1].values, ['a', 10])
+        rows = ds.fetch_rows(offset=1, limit=1)
+        self.assertEqual(rows[0].identifier, 0)
+        self.assertEqual(ds.get_row_index(2), 2)
+        # Deltas of delta datasets reference the materialized base dataset.
+        # Dropping a column does not require to rewrite the rows.
+        ds = store.create_delta_dataset(
+            dataset=ds,
+            columns=columns[1:],
+            operations=[delta.move_row_op(2, 0)],
+            row_count=3
+        )
+        ds = store.get_dataset(ds.identifier)
+        self.assertEqual(ds.base.identifier, base_ds.identifier)
+        rows = ds.fetch_rows()
+        self.assertEqual([r.identifier for r in rows], [2, 3, 0])
+        self.assertEqual([r.values for r in rows], [[3], [None], [10]])
+        # Deleting the base dataset materializes all delta datasets.
+        store.delete_dataset(base_ds.identifier)
+        ds = store.get_dataset(ds.identifier)
+        self.assertEqual(ds.data_format, DATA_FORMAT_JSON)
+        rows = ds.fetch_rows()
+        self.assertEqual([r.identifier for r in rows], [2, 3, 0])
+        self.assertEqual([r.values for r in rows], [[3], [None], [10]])
+        dataset_dir = os.path.join(STORE_DIR, ds.identifier)
+        self.assertEqual(
+            sorted(os.listdir(dataset_dir)),
+            sorted([DATA_FILE, DESCRIPTOR_FILE, 'rowindex.bin', CHUNK_LIST_FILE])
+        )
+        # Long change logs are compacted
+        store = FileSystemDatastore(STORE_DIR, max_delta_length=1)
+        ds = store.create_delta_dataset(
+            dataset=ds,
+            columns=ds.columns,
+            operations=[
+                delta.update_cell_op(1, 0, 11),
+                delta.update_cell_op(1, 2, 12)
+            ],
+            row_count=3
+        )
+        # Wait for the background compaction (if it has not finished yet)
+        store.compact_dataset(ds.identifier)
+        ds = store.get_dataset(ds.identifier)
+        self.assertEqual(ds.data_format, DATA_FORMAT_JSON)
+        self.assertEqual([r.values for r in ds.fetch_rows()], [[12], [None], [11]])
+        self.assertFalse(store.compact_dataset(ds.identifier))
+
+    def test_delta_dataset_compaction(self):
+        """Test reading delta datasets from handles that were read before the
+        dataset was materialized and removing temporary folders of
+        materializations that did not finish.
+        """
+        store = FileSystemDatastore(STORE_DIR)
+        columns = [DatasetColumn(identifier=0, name='A')]
+        base_ds = store.create_dataset(
+            columns=columns,
+            rows=[
+                DatasetRow(identifier=0, values=['a']),
+                DatasetRow(identifier=1, values=['b'])
+            ]
+        )
+        ds = store.create_delta_dataset(
+            dataset=store.get_dataset(base_ds.identifier),
+            columns=columns,
+            operations=[delta.delete_row_op(0)],
+            row_count=1
+        )
+        handle = store.get_dataset(ds.identifier)
+        self.assertEqual(handle.data_format, DATA_FORMAT_DELTA)
+        self.assertTrue(store.compact_dataset(ds.identifier))
+        self.assertEqual([r.values for r in handle.fetch_rows()], [['b']])
+        self.assertEqual(handle.get_row_index(1), 0)
+        self.assertIsNone(handle.get_row_index(0))
+        # Temporary folders are removed when the datastore is created unless
+        # the dataset folder is locked.
+        dataset_dir = os.path.join(STORE_DIR, ds.identifier)
+        tmp_dir = os.path.join(dataset_dir, COMPACT_DIR_PREFIX + 'abc')
+        os.makedirs(tmp_dir)
+        with lock_dataset_dir(dataset_dir) as is_locked:
+            self.assertTrue(is_locked)
+            FileSystemDatastore(STORE_DIR)
+            self.assertTrue(os.path.isdir(tmp_dir))
+        FileSystemDatastore(STORE_DIR)
+        self.assertFalse(os.path.isdir(tmp_dir))
+        self.assertEqual(
+            [r.values for r in store.get_dataset(ds.identifier).fetch_rows()],
+            [['b']]
+        )
+
     def test_delete_dataset(self):
         """Test deleting datasets."""
         # None for non-existing dataset
@@ -226,6 +388,58 @@ class TestFileSystemDatastore(unittest.TestCase):
         self.assertEqual(len(annotations.columns), 1)
         self.assertEqual(len(annotations.rows), 1)
 
+    def test_deduplicate_data(self):
+        """Test sharing data files between datasets with identical rows."""
+        columns = [
+            DatasetColumn(identifier=0, name='A'),
+            DatasetColumn(identifier=1, name='B')
+        ]
+        rows = [
+            DatasetRow(identifier=0, values=['a', 1]),
+            DatasetRow(identifier=1, values=['b', 2])
+        ]
+        store = FileSystemDatastore(STORE_DIR)
+        ds1 = store.create_dataset(columns=columns, rows=rows)
+        ds2 = store.create_dataset(columns=columns, rows=rows)
+        file1 = os.path.join(STORE_DIR, ds1.identifier, DATA_FILE)
+        file2 = os.path.join(STORE_DIR, ds2.identifier, DATA_FILE)
+        self.assertEqual(os.stat(file1).st_ino, os.stat(file2).st_ino)
+        chunk = content_hash(file1)
+        self.assertEqual(store.chunks.reference_count(chunk), 2)
+        # Referenced chunks are listed in the dataset folder
+        chunks = read_chunk_list(os.path.join(STORE_DIR, ds1.identifier))
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(chunk in chunks)
+        # Deleting one dataset does not affect the other
+        store.delete_dataset(ds1.identifier)
+        self.assertEqual(store.chunks.reference_count(chunk), 1)
+        ds2 = store.get_dataset(ds2.identifier)
+        self.assertEqual(ds2.fetch_rows()[1].values, ['b', 2])
+        # The chunk is removed with the last dataset that references it
+        store.delete_dataset(ds2.identifier)
+        self.assertIsNone(store.chunks.reference_count(chunk))
+        # Column files are shared between datasets in columnar format
+        store = FileSystemDatastore(STORE_DIR, data_format=DATA_FORMAT_COLUMNAR)
+        ds1 = store.create_dataset(columns=columns, rows=rows)
+        ds2 = store.create_dataset(columns=columns, rows=rows)
+        files = list()
+        for ds in [ds1, ds2]:
+            data_dir = os.path.join(STORE_DIR, ds.identifier, COLUMNAR_DATA_DIR)
+            inodes = set()
+            for root, _, filenames in os.walk(data_dir):
+                for filename in filenames:
+                    inodes.add(os.stat(os.path.join(root, filename)).st_ino)
+            files.append(inodes)
+        self.assertTrue(len(files[0]) > 0)
+        self.assertEqual(files[0], files[1])
+        # Datastore without deduplication
+        store = FileSystemDatastore(STORE_DIR, deduplicate=False)
+        ds1 = store.create_dataset(columns=columns, rows=rows)
+        ds2 = store.create_dataset(columns=columns, rows=rows)
+        file1 = os.path.join(STORE_DIR, ds1.identifier, DATA_FILE)
+        file2 = os.path.join(STORE_DIR, ds2.identifier, DATA_FILE)
+        self.assertNotEqual(os.stat(file1).st_ino, os.stat(file2).st_ino)
+
     def test_download_dataset(self):
         """Test loading a dataset from Url. Note that this test depends on the
         accessed web service to be running. It will fail otherwise."""
@@ -252,6 +466,25 @@ class TestFileSystemDatastore(unittest.TestCase):
         self.assertIsNotNone(fh)
         self.assertIsNotNone(fs.get_file(fh.identifier))
 
+    def test_get_row_index(self):
+        """Test getting the position of dataset rows by identifier."""
+        for data_format in [None, DATA_FORMAT_COLUMNAR]:
+            store = FileSystemDatastore(STORE_DIR, data_format=data_format)
+            ds = store.create_dataset(
+                columns=[DatasetColumn(identifier=0, name='A')],
+                rows=[
+                    DatasetRow(identifier=5, values=['a']),
+                    DatasetRow(identifier=3, values=['b']),
+                    DatasetRow(identifier=4, values=['c'])
+                ]
+            )
+            ds = store.get_dataset(ds.identifier)
+            self.assertEqual(ds.get_row_index(5), 0)
+            self.assertEqual(ds.get_row_index(4), 2)
+            self.assertIsNone(ds.get_row_index(0))
+            rows = ds.fetch_rows(offset=1, limit=1)
+            self.assertEqual(rows[0].identifier, 3)
+
     def test_get_dataset(self):
         """Test accessing dataset handle and descriptor."""
         # None for non-existing dataset
@@ -405,6 +638,34 @@ class TestFileSystemDatastore(unittest.TestCase):
         annos = store.get_annotations(ds.identifier, column_id=1, row_id=0)
         self.assertEqual(len(annos.cells), 0)
 
+    def test_schema_delta(self):
+        """Test delta datasets that only modify the dataset schema."""
+        store = FileSystemDatastore(STORE_DIR)
+        ds = store.load_dataset(f_handle=FILE)
+        ds = store.get_dataset(ds.identifier)
+        columns = [
+            DatasetColumn(identifier=col.identifier, name=col.name.lower())
+            for col in reversed(ds.columns)
+        ]
+        delta_ds = store.create_delta_dataset(
+            dataset=ds,
+            columns=columns,
+            operations=list(),
+            row_count=ds.row_count
+        )
+        dataset_dir = os.path.join(STORE_DIR, delta_ds.identifier)
+        self.assertFalse(os.path.isfile(os.path.join(dataset_dir, DATA_FILE)))
+        delta_ds = store.get_dataset(delta_ds.identifier)
+        self.assertEqual(delta_ds.columns[0].name, ds.columns[-1].name.lower())
+        base_rows = ds.fetch_rows()
+        rows = delta_ds.fetch_rows(offset=2, limit=3)
+        self.assertEqual(len(rows), 3)
+        for i in range(len(rows)):
+            self.assertEqual(rows[i].identifier, base_rows[i + 2].identifier)
+            self.assertEqual(rows[i].values, base_rows[i + 2].values[::-1])
+        row_id = base_rows[-1].identifier
+        self.assertEqual(delta_ds.get_row_index(row_id), len(base_rows) - 1)
+
     def test_validate_dataset(self):
         """Test the validate dataset function."""
         columns = []
@@ -458,6 +719,10 @@ class TestFileSystemDatastore(unittest.TestCase):
         row = ds.fetch_rows(offset=0, limit=1)[0]
         self.assertEqual(row.identifier, 0)
         self.assertTrue(isinstance(row.values[0], float))
+        # Inferred column types
+        self.assertEqual(ds.columns[0].data_type, 'real')
+        self.assertEqual(ds.columns[1].data_type, 'varchar')
+        self.assertEqual(ds.columns[2].data_type, 'varchar')
 
 
 if __name__ == '__main__':
@@ -1,12 +1,29 @@
 """Test functionality of the dataset metadata object."""
 
+import json
+import os
+import shutil
 import unittest
 
+from vizier.datastore.annotation.base import DatasetAnnotation
 from vizier.datastore.annotation.dataset import DatasetMetadata
 
 
+TMP_DIR = './.tmp/metadata'
+
+
 class TestDatasetMetadata(unittest.TestCase):
 
+    def setUp(self):
+        """Create an empty directory for metadata files."""
+        if os.path.isdir(TMP_DIR):
+            shutil.rmtree(TMP_DIR)
+        os.makedirs(TMP_DIR)
+
+    def tearDown(self):
+        """Remove the metadata files directory."""
+        shutil.rmtree(TMP_DIR)
+
     def test_add_and_delete_metadata(self):
         """Test functionality to add and delete annotations."""
         annotations = DatasetMetadata()
@@ -45,6 +62,73 @@ class TestDatasetMetadata(unittest.TestCase):
         annotations.remove(row_id=0, column_id=1)
         self.assertEqual(len(annotations.cells), 2)
 
+    def test_bulk_operations(self):
+        """Test adding and removing annotations in bulk."""
+        annotations = DatasetMetadata()
+        annotations.add_all([
+            DatasetAnnotation(column_id=0, key='A', value=0),
+            DatasetAnnotation(column_id=1, key='A', value=1),
+            DatasetAnnotation(row_id=0, key='B', value=0),
+            DatasetAnnotation(row_id=1, key='B', value=1),
+            DatasetAnnotation(column_id=0, row_id=0, key='C', value=0),
+            DatasetAnnotation(column_id=0, row_id=1, key='C', value=1),
+            DatasetAnnotation(column_id=1, row_id=0, key='C', value=2),
+            DatasetAnnotation(column_id=1, row_id=1, key='C', value=3),
+            DatasetAnnotation(key='D', value=0)
+        ])
+        self.assertEqual(len(annotations.columns), 2)
+        self.assertEqual(len(annotations.rows), 2)
+        self.assertEqual(len(annotations.cells), 4)
+        self.assertEqual(len(annotations.annotations), 1)
+        self.assertEqual(annotations.for_cell(1, 0)[0].value, 2)
+        filtered = annotations.filter(columns=[1], rows=[1])
+        self.assertEqual(len(filtered.columns), 1)
+        self.assertEqual(len(filtered.rows), 1)
+        self.assertEqual(filtered.cells[0].value, 3)
+        annotations.remove_all(columns=[0], rows=[1])
+        self.assertEqual(len(annotations.for_column(0)), 0)
+        self.assertEqual(len(annotations.for_column(1)), 1)
+        self.assertEqual(len(annotations.for_row(1)), 0)
+        self.assertEqual(len(annotations.for_row(0)), 1)
+        self.assertEqual([a.value for a in annotations.cells], [2])
+
+    def test_read_write(self):
+        """Test reading and writing annotations in the compact and in the
+        previous file format.
+        """
+        filename = os.path.join(TMP_DIR, 'annotations.json')
+        annotations = DatasetMetadata()
+        annotations.add(column_id=0, key='A', value='x')
+        annotations.add(column_id=0, key='A', value='x')
+        annotations.add(row_id=2, key='B', value=1.5)
+        annotations.add(column_id=1, row_id=2, key='C', value=None)
+        annotations.to_file(filename)
+        with open(filename, 'r') as f:
+            doc = json.load(f)
+        self.assertEqual(doc['columns'], [[0, 'A', 'x']])
+        self.assertEqual(doc['rows'], [[2, 'B', 1.5]])
+        self.assertEqual(doc['cells'], [[1, 2, 'C', None]])
+        annotations = DatasetMetadata.from_file(filename)
+        self.assertEqual(annotations.filename, filename)
+        self.assertEqual(annotations.for_column(0)[0].value, 'x')
+        self.assertIsNone(annotations.filename)
+        self.assertEqual(annotations.for_row(2)[0].value, 1.5)
+        self.assertEqual(annotations.for_cell(1, 2)[0].key, 'C')
+        # Previous file format
+        with open(filename, 'w') as f:
+            json.dump({
+                'columns': [
+                    {'columnId': 0, 'rowId': None, 'key': 'A', 'value': 'x'}
+                ],
+                'cells': [
+                    {'columnId': 1, 'rowId': 2, 'key': 'C', 'value': 1}
+                ]
+            }, f)
+        annotations = DatasetMetadata.from_file(filename)
+        self.assertEqual(annotations.for_column(0)[0].value, 'x')
+        self.assertEqual(len(annotations.rows), 0)
+        self.assertEqual(annotations.for_cell(1, 2)[0].value, 1)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,84 @@
+"""Test the pooled HTTP client for the Mimir gateway against a local stand-in
+server.
+"""
+
+import time
+import unittest
+
+import vizier.mimir as mimir
+
+from gateway import GatewayHandler, GatewayServer
+
+
+"""Time (in seconds) that the stand-in server waits before answering."""
+DELAY = 0.3
+
+
+class DelayedHandler(GatewayHandler):
+    """Answer schema and query requests. Records the client port of every
+    request to identify reused connections.
+    """
+    def respond(self, request):
+        self.server.ports.append(self.client_address[1])
+        if self.path.endswith('/schema'):
+            time.sleep(DELAY)
+            return {'schema': [{'name': 'A', 'baseType': 'int'}]}
+        elif self.path.endswith('/query/data'):
+            time.sleep(DELAY)
+            return {'data': [[42]]}
+
+
+class TestMimirGateway(unittest.TestCase):
+
+    def setUp(self):
+        """Start the stand-in server and point the client at it."""
+        self.server = GatewayServer(DelayedHandler)
+        self.server.ports = list()
+        self.server.start()
+        mimir.resetMetrics()
+
+    def tearDown(self):
+        """Stop the server and restore the gateway URL."""
+        mimir.getSession().close()
+        self.server.stop()
+
+    def test_concurrent_requests(self):
+        """Test running independent requests concurrently."""
+        start = time.perf_counter()
+        schema, row_count = mimir.runConcurrently(
+            lambda: mimir.getSchema('SELECT * FROM T'),
+            lambda: mimir.countRows('T')
+        )
+        elapsed = time.perf_counter() - start
+        self.assertEqual(schema, [{'name': 'A', 'baseType': 'int'}])
+        self.assertEqual(row_count, 42)
+        self.assertLess(elapsed, 2 * DELAY)
+        # Errors of individual calls are raised.
+        with self.assertRaises(Exception):
+            mimir.runConcurrently(
+                lambda: mimir.countRows('T'),
+                lambda: mimir.evalScala(dict(), 'x')
+            )
+        metrics = mimir.getMetrics()
+        self.assertEqual(metrics['eval/scala']['errors'], 1)
+        self.assertEqual(metrics['query/data']['count'], 2)
+        self.assertEqual(metrics['query/data']['errors'], 0)
+
+    def test_keep_alive(self):
+        """Test that sequential requests reuse the same connection and that
+        latency metrics are recorded.
+        """
+        for i in range(5):
+            self.assertEqual(mimir.countRows('T'), 42)
+        self.assertEqual(len(set(self.server.ports)), 1)
+        metrics = mimir.getMetrics()
+        self.assertEqual(list(metrics.keys()), ['query/data'])
+        self.assertEqual(metrics['query/data']['count'], 5)
+        self.assertGreaterEqual(metrics['query/data']['maxTime'], DELAY)
+        self.assertGreaterEqual(metrics['query/data']['totalTime'], 5 * DELAY)
+        mimir.resetMetrics()
+        self.assertEqual(mimir.getMetrics(), dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Test batched reading of Mimir datasets from a local stand-in gateway."""
+
+import re
+import unittest
+
+from datetime import date
+
+from vizier.datastore.dataset import DATATYPE_DATE, DATATYPE_INT
+from vizier.datastore.mimir.dataset import MimirDatasetColumn
+from vizier.datastore.mimir.reader import MimirDatasetReader
+
+from gateway import GatewayHandler, GatewayServer
+
+
+"""Number of rows in the table of the stand-in gateway."""
+ROW_COUNT = 25
+
+
+class TableHandler(GatewayHandler):
+    """Answer queries on a table with columns ID and DAY. Records the LIMIT
+    and OFFSET of all queries.
+    """
+    def respond(self, request):
+        query = request['query']
+        limit = re.search(r'LIMIT (\d+)', query)
+        limit = int(limit.group(1)) if limit else ROW_COUNT
+        offset = re.search(r'OFFSET (\d+)', query)
+        offset = int(offset.group(1)) if offset else 0
+        self.server.queries.append((offset, limit))
+        rows = list(range(ROW_COUNT))[offset:offset + limit]
+        return {
+            'schema': [{'name': 'DAY'}, {'name': 'ID'}],
+            'data': [[{'year': 2019, 'month': 1, 'date': i + 1}, i] for i in rows],
+            'prov': [i for i in rows],
+            'colTaint': [[False, i % 2 == 0] for i in rows]
+        }
+
+
+class TestMimirDatasetReader(unittest.TestCase):
+
+    def setUp(self):
+        """Start the stand-in server and point the client at it."""
+        self.server = GatewayServer(TableHandler)
+        self.server.queries = list()
+        self.server.start()
+
+    def tearDown(self):
+        """Stop the server and restore the gateway URL."""
+        self.server.stop()
+
+    def read(self, offset=0, limit=-1):
+        """Read rows using a reader with batch size 10."""
+        reader = MimirDatasetReader(
+            table_name='T',
+            columns=[
+                MimirDatasetColumn(0, 'id', 'ID', DATATYPE_INT),
+                MimirDatasetColumn(1, 'day', 'DAY', DATATYPE_DATE)
+            ],
+            offset=offset,
+            limit=limit,
+            batch_size=10
+        )
+        with reader.open() as r:
+            return [row for row in r]
+
+    def test_read_batches(self):
+        """Test reading rows in batches."""
+        rows = self.read()
+        self.assertEqual(len(rows), ROW_COUNT)
+        for i in range(ROW_COUNT):
+            self.assertEqual(rows[i].identifier, str(i))
+            self.assertEqual(rows[i].values, [i, date(2019, 1, i + 1)])
+            self.assertEqual(rows[i].annotations, [i % 2 == 0, False])
+        self.assertEqual(self.server.queries, [(0, 10), (10, 10), (20, 10)])
+        # Offset and limit
+        self.server.queries = list()
+        rows = self.read(offset=3, limit=12)
+        self.assertEqual([row.values[0] for row in rows], list(range(3, 15)))
+        self.assertEqual(self.server.queries, [(3, 10), (13, 2)])
+        # Reading stops when the limit is reached.
+        self.server.queries = list()
+        self.assertEqual(len(self.read(limit=20)), 20)
+        self.assertEqual(self.server.queries, [(0, 10), (10, 10)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Test caching of view schemas and row counts in the Mimir datastore."""
+
+import os
+import shutil
+import unittest
+
+from vizier.datastore.mimir.dataset import MimirDatasetColumn
+from vizier.datastore.mimir.store import MimirDatastore
+
+from gateway import GatewayHandler, GatewayServer
+
+
+STORE_DIR = './.tmp_views'
+
+
+class ViewHandler(GatewayHandler):
+    """Answer schema and row count queries for a view with a single integer
+    column. Records the path of every request.
+    """
+    def respond(self, request):
+        self.server.requests.append(self.path.split('/')[-1])
+        if self.path.endswith('/schema'):
+            return {'schema': [{'name': 'A', 'baseType': 'int'}]}
+        return {'data': [[7]]}
+
+
+class TestMimirViewCache(unittest.TestCase):
+
+    def setUp(self):
+        """Start the stand-in server and create an empty datastore directory."""
+        if os.path.isdir(STORE_DIR):
+            shutil.rmtree(STORE_DIR)
+        self.server = GatewayServer(ViewHandler)
+        self.server.requests = list()
+        self.server.start()
+
+    def tearDown(self):
+        """Stop the server and remove the datastore directory."""
+        self.server.stop()
+        shutil.rmtree(STORE_DIR)
+
+    def register(self, store, view_name, row_counter=None):
+        return store.register_dataset(
+            table_name=view_name,
+            columns=[MimirDatasetColumn(0, 'A', 'A')],
+            row_counter=row_counter
+        )
+
+    def test_view_cache(self):
+        """Test that schema and row count are queried once per view."""
+        store = MimirDatastore(STORE_DIR)
+        ds = self.register(store, 'V')
+        self.assertEqual(ds.row_count, 7)
+        self.assertEqual(ds.columns[0].data_type, 'int')
+        self.assertEqual(sorted(self.server.requests), ['data', 'schema'])
+        # Registering the view again does not query the backend.
+        self.server.requests = list()
+        self.assertEqual(store.get_view_info('V')[1], 7)
+        self.assertEqual(self.register(store, 'V').row_count, 7)
+        self.assertEqual(self.server.requests, [])
+        # The row count is not queried if a row counter is given.
+        self.assertEqual(self.register(store, 'W', row_counter=3).row_count, 3)
+        self.assertEqual(self.server.requests, ['schema'])
+        # View information is persisted with the datasets.
+        self.server.requests = list()
+        store = MimirDatastore(STORE_DIR)
+        self.assertEqual(store.get_view_info('V')[1], 7)
+        self.assertEqual(store.get_view_info('W', count_rows=False)[1], None)
+        ds = self.register(store, 'W')
+        self.assertEqual(ds.row_count, 7)
+        self.assertEqual(ds.columns[0].data_type, 'int')
+        self.assertEqual(self.server.requests, ['data'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""Test the external merge sort for dataset rows."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from vizier.datastore.dataset import DatasetRow
+from vizier.datastore.sort import sort_rows
+
+
+ROWS = [
+    DatasetRow(identifier=0, values=['Alice', 23, 35.32]),
+    DatasetRow(identifier=1, values=['Bob', 23, 45.4]),
+    DatasetRow(identifier=2, values=['Claudia', None, 'A']),
+    DatasetRow(identifier=3, values=['Dave', 33, 30.89]),
+    DatasetRow(identifier=4, values=['Eileen', '', 45.9]),
+    DatasetRow(identifier=5, values=['Frank', 34, 56.7]),
+    DatasetRow(identifier=6, values=['Gertrud', 34, 56.7])
+]
+
+
+class TestSortRows(unittest.TestCase):
+
+    def setUp(self):
+        """Create temporary directory for sorted runs."""
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove temporary directory."""
+        shutil.rmtree(self.tmp_dir)
+
+    def sort(self, sort_columns, reversed, buffer_size):
+        """Get list of row identifier in sort order."""
+        rows = sort_rows(
+            rows=iter(ROWS),
+            sort_columns=sort_columns,
+            reversed=reversed,
+            buffer_size=buffer_size,
+            tmp_dir=self.tmp_dir
+        )
+        return [row.identifier for row in rows]
+
+    def test_sort_rows(self):
+        """Test sorting rows in memory and with spilled runs."""
+        for buffer_size in [100, 3, 1]:
+            # Numbers before strings, null values last.
+            self.assertEqual(
+                self.sort([1, 2, 0], [False, False, True], buffer_size),
+                [0, 1, 3, 6, 5, 4, 2]
+            )
+            # Null values are last also in reverse order.
+            self.assertEqual(
+                self.sort([2, 1, 0], [True, False, True], buffer_size),
+                [2, 6, 5, 4, 1, 0, 3]
+            )
+            # Sort is stable
+            self.assertEqual(
+                self.sort([2], [False], buffer_size),
+                [3, 0, 1, 4, 5, 6, 2]
+            )
+        # Run files are removed
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -86,6 +86,7 @@ class TestMultiprocessBackend(unittest.TestCase):
     def tearDown(self):
         """Clean-up by dropping the server directory.
         """
+        self.backend.close()
         if os.path.isdir(SERVER_DIR):
             shutil.rmtree(SERVER_DIR)
 
@@ -0,0 +1,153 @@
+"""Test the worker pool of the multi-process backend."""
+
+import os
+import shutil
+import threading
+import time
+import unittest
+
+from vizier.datastore.fs.factory import FileSystemDatastoreFactory
+from vizier.engine.backend.multiprocess import MultiProcessBackend
+from vizier.engine.controller import WorkflowController
+from vizier.engine.packages.pycell.base import PACKAGE_PYTHON
+from vizier.engine.packages.pycell.processor import PyCellTaskProcessor
+from vizier.engine.project.cache.common import CommonProjectCache
+from vizier.engine.task.base import TaskHandle
+from vizier.filestore.fs.factory import FileSystemFilestoreFactory
+from vizier.viztrail.objectstore.repository import OSViztrailRepository
+
+import vizier.engine.packages.pycell.command as pycell
+
+
+SERVER_DIR = './.tmp'
+
+"""Maximum number of seconds that a test waits for tasks to finish."""
+TIMEOUT = 30
+
+
+class RecordingWorkflowController(WorkflowController):
+    """Controller that records the order in which tasks finished. The event
+    is set once the expected number of tasks has finished.
+    """
+    def __init__(self, expected):
+        self.expected = expected
+        self.finished = list()
+        self.done = threading.Event()
+
+    def set_error(self, task_id, finished_at=None, outputs=None):
+        self.finish(task_id)
+
+    def set_success(self, task_id, finished_at=None, datasets=None, outputs=None, provenance=None):
+        self.finish(task_id)
+
+    def finish(self, task_id):
+        self.finished.append(task_id)
+        if len(self.finished) >= self.expected:
+            self.done.set()
+
+
+class TestWorkerPool(unittest.TestCase):
+
+    def setUp(self):
+        """Create a project cache with two projects for an empty server
+        directory.
+        """
+        if os.path.isdir(SERVER_DIR):
+            shutil.rmtree(SERVER_DIR)
+        os.makedirs(SERVER_DIR)
+        self.projects = CommonProjectCache(
+            datastores=FileSystemDatastoreFactory(SERVER_DIR + '/ds'),
+            filestores=FileSystemFilestoreFactory(SERVER_DIR + '/fs'),
+            viztrails=OSViztrailRepository(base_path=SERVER_DIR + '/vt')
+        )
+        self.project_id = self.projects.create_project().identifier
+        self.other_project_id = self.projects.create_project().identifier
+        self.backend = None
+
+    def tearDown(self):
+        """Stop the workers and remove the server directory."""
+        if not self.backend is None:
+            self.backend.close()
+        if os.path.isdir(SERVER_DIR):
+            shutil.rmtree(SERVER_DIR)
+
+    def create_backend(self, properties=None):
+        """Create a backend with a single worker."""
+        self.backend = MultiProcessBackend(
+            processors={PACKAGE_PYTHON: PyCellTaskProcessor(properties=properties)},
+            projects=self.projects,
+            max_workers=1
+        )
+        return self.backend
+
+    def execute(self, task_id, project_id, source, controller):
+        """Submit a Python cell for execution."""
+        self.backend.execute_async(
+            task=TaskHandle(
+                task_id=task_id,
+                project_id=project_id,
+                controller=controller
+            ),
+            command=pycell.python_cell(source=source, validate=True),
+            context=dict()
+        )
+
+    def test_cancel_interpreter(self):
+        """Test that canceling a task also terminates the warm interpreter
+        that executes the Python cell.
+        """
+        self.create_backend(properties={'interpreters': 1})
+        started = os.path.abspath(os.path.join(SERVER_DIR, 'started.txt'))
+        canceled = os.path.abspath(os.path.join(SERVER_DIR, 'canceled.txt'))
+        controller = RecordingWorkflowController(expected=1)
+        self.execute(
+            task_id='000',
+            project_id=self.project_id,
+            source='\n'.join([
+                'import time',
+                'open(\'' + started + '\', \'w\').close()',
+                'time.sleep(1)',
+                'open(\'' + canceled + '\', \'w\').close()'
+            ]),
+            controller=controller
+        )
+        # Wait for the cell to start running before canceling the task
+        deadline = time.time() + TIMEOUT
+        while not os.path.isfile(started) and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertTrue(os.path.isfile(started))
+        self.backend.cancel_task('000')
+        # The next task runs longer than the remainder of the canceled cell.
+        self.execute(
+            task_id='001',
+            project_id=self.project_id,
+            source='import time\ntime.sleep(2)',
+            controller=controller
+        )
+        self.assertTrue(controller.done.wait(TIMEOUT))
+        self.assertEqual(controller.finished, ['001'])
+        self.assertFalse(os.path.isfile(canceled))
+
+    def test_fair_queue(self):
+        """Test that tasks are queued if all workers are busy and that queued
+        tasks of different projects are executed in round-robin order.
+        """
+        self.create_backend()
+        controller = RecordingWorkflowController(expected=3)
+        tasks = [
+            ('000', self.project_id, 'import time\ntime.sleep(0.5)'),
+            ('001', self.project_id, 'print(1)'),
+            ('002', self.project_id, 'print(2)'),
+            ('003', self.other_project_id, 'print(3)')
+        ]
+        for task_id, project_id, source in tasks:
+            self.execute(task_id, project_id, source, controller)
+        # Cancel a queued task
+        self.backend.cancel_task('002')
+        self.assertEqual(len(self.backend.workers), 1)
+        self.assertTrue(controller.done.wait(TIMEOUT))
+        self.assertEqual(controller.finished, ['000', '003', '001'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,11 +5,16 @@ import shutil
 import unittest
 
 from vizier.engine.packages.plot.command import create_plot
+from vizier.datastore.dataset import DatasetColumn, DatasetRow
 from vizier.datastore.fs.base import FileSystemDatastore
+from vizier.datastore.fs.dataset import DATA_FORMAT_COLUMNAR
 from vizier.engine.packages.plot.query import ChartQuery
+from vizier.view.cache import ChartCache
 from vizier.view.chart import ChartViewHandle
 from vizier.filestore.fs.base import FileSystemFilestore
 
+import vizier.view.chart as chart
+
 
 SERVER_DIR = './.tmp'
 FILESTORE_DIR = './.tmp/fs'
@@ -39,6 +44,28 @@ class TestDefaultVizualProcessor(unittest.TestCase):
         if os.path.isdir(SERVER_DIR):
             shutil.rmtree(SERVER_DIR)
 
+    def create_dataset(self, datastore):
+        """Create a dataset with 1000 rows. The x-axis column contains the row
+        position, the second column contains a single peak value and the third
+        column contains text values of which every tenth value is missing. The
+        fourth column contains real values of which every seventh value is
+        missing.
+        """
+        columns = [
+            DatasetColumn(identifier=0, name='X'),
+            DatasetColumn(identifier=1, name='Y'),
+            DatasetColumn(identifier=2, name='Z'),
+            DatasetColumn(identifier=3, name='R')
+        ]
+        rows = list()
+        for i in range(1000):
+            y = 1000 if i == 555 else i % 10
+            z = 'v' + str(i) if i % 10 != 0 else None
+            r = i / 4 if i % 7 != 0 else None
+            rows.append(DatasetRow(identifier=i, values=[i, y, z, r]))
+        descriptor = datastore.create_dataset(columns=columns, rows=rows)
+        return datastore.get_dataset(descriptor.identifier)
+
     def count_non_null_values(self, data, column_index):
         """Return the number of values in a column that are not None."""
         count = 0
@@ -47,6 +74,43 @@ class TestDefaultVizualProcessor(unittest.TestCase):
                 count += 1
         return count
 
+    def test_chart_cache(self):
+        """Test caching chart query results in the datastore."""
+        ds = self.datastore.load_dataset(self.filestore.upload_file(LOAD_FILE))
+        cache = self.datastore.get_chart_cache()
+        view = ChartViewHandle(dataset_name='ABC', x_axis=0)
+        view.add_series(1, range_start=25, range_end=30)
+        view.add_series(0, range_start=25, range_end=30)
+        self.assertIsNone(cache.get(ds.identifier, view))
+        data = ChartQuery().exec_query(dataset=ds, view=view, cache=cache)
+        self.assertEqual(cache.get(ds.identifier, view), data)
+        # Chart names and series labels do not affect the cache key
+        other = ChartViewHandle(dataset_name='XYZ', chart_name='Other', x_axis=0)
+        other.add_series(1, label='A', range_start=25, range_end=30)
+        other.add_series(0, label='B', range_start=25, range_end=30)
+        self.assertEqual(cache.get(ds.identifier, other), data)
+        other.data[0].range_end = 31
+        self.assertIsNone(cache.get(ds.identifier, other))
+        # Cached results are served without executing the query
+        filename = cache.get_filename(ds.identifier, view)
+        with open(filename, 'w') as f:
+            f.write('[[1, 2]]')
+        data = ChartQuery().exec_query(dataset=ds, view=view, cache=cache)
+        self.assertEqual(data, [[1, 2]])
+        # Deleting the dataset removes the cached results
+        self.datastore.delete_dataset(ds.identifier)
+        self.assertFalse(os.path.isfile(filename))
+        # Least recently used results are evicted if the cache size exceeds
+        # the capacity
+        cache = ChartCache(os.path.join(SERVER_DIR, 'charts'), capacity=20)
+        cache.put('DS1', view, [[1, 2]])
+        cache.put('DS2', view, [[3, 4]])
+        os.utime(cache.get_filename('DS1', view), (0, 0))
+        cache.put('DS3', view, [[5, 6]])
+        self.assertIsNone(cache.get('DS1', view))
+        self.assertEqual(cache.get('DS2', view), [[3, 4]])
+        self.assertEqual(cache.get('DS3', view), [[5, 6]])
+
     def test_query(self):
         """Test running a query for simple chart plots."""
         ds = self.datastore.load_dataset(self.filestore.upload_file(LOAD_FILE))
@@ -94,6 +158,104 @@ class TestDefaultVizualProcessor(unittest.TestCase):
         data = ChartQuery().exec_query(dataset=ds, view=view)
         self.assertEqual(len(data), 54)
 
+    def test_reduce_series(self):
+        """Test aggregating and downsampling data series that exceed the
+        maximum number of points of a chart.
+        """
+        ds = self.create_dataset(self.datastore)
+        def query(max_points, reduction):
+            view = ChartViewHandle(
+                dataset_name='ABC',
+                x_axis=0,
+                max_points=max_points,
+                reduction=reduction
+            )
+            view.add_series(0)
+            view.add_series(1)
+            view.add_series(2)
+            return ChartQuery().exec_query(dataset=ds, view=view)
+        # Series that do not exceed the maximum are not reduced
+        self.assertEqual(len(query(1000, chart.REDUCE_AVG)), 1000)
+        # Aggregate values in bins of 100 rows.
+        data = query(10, chart.REDUCE_SUM)
+        self.assertEqual(len(data), 10)
+        self.assertEqual([row[0] for row in data], list(range(0, 1000, 100)))
+        self.assertEqual(data[0][1], 450)
+        self.assertEqual(data[5][1], 1445)
+        # The first value in each bin is used for non-numeric series
+        self.assertIsNone(data[0][2])
+        data = query(10, chart.REDUCE_COUNT)
+        self.assertEqual(data[0][1:], [100, 90])
+        data = query(10, chart.REDUCE_AVG)
+        self.assertEqual(data[0][1], 4.5)
+        data = query(10, chart.REDUCE_MAX)
+        self.assertEqual([row[1] for row in data], [9] * 5 + [1000] + [9] * 4)
+        self.assertTrue(isinstance(data[0][1], int))
+        data = query(10, chart.REDUCE_MIN)
+        self.assertEqual(data[1][1:], [0, None])
+        # Downsampling keeps the first, last and the peak value
+        data = query(50, chart.REDUCE_LTTB)
+        self.assertTrue(len(data) <= 50)
+        self.assertEqual(data[0][0], 0)
+        self.assertEqual(data[-1][0], 999)
+        self.assertIn([555, 1000, 'v555'], data)
+        # Invalid chart view parameters
+        with self.assertRaises(ValueError):
+            query(0, chart.REDUCE_LTTB)
+        with self.assertRaises(ValueError):
+            query(10, 'median')
+        # Views without a point limit use the default limit
+        view = ChartViewHandle(dataset_name='ABC', x_axis=0)
+        view.add_series(0)
+        view.add_series(1)
+        default_max_points = chart.DEFAULT_MAX_POINTS
+        try:
+            chart.DEFAULT_MAX_POINTS = 50
+            data = ChartQuery().exec_query(dataset=ds, view=view)
+            self.assertTrue(len(data) <= 50)
+            self.assertIn([555, 1000], data)
+            chart.DEFAULT_MAX_POINTS = 0
+            data = ChartQuery().exec_query(dataset=ds, view=view)
+            self.assertEqual(len(data), 1000)
+        finally:
+            chart.DEFAULT_MAX_POINTS = default_max_points
+
+    def test_columnar_dataset(self):
+        """Test that queries over datasets in the columnar format, whose
+        numeric series are read as arrays, return the same results as
+        queries over datasets in the default format.
+        """
+        ds = self.create_dataset(self.datastore)
+        columnar_ds = self.create_dataset(
+            FileSystemDatastore(
+                os.path.join(SERVER_DIR, 'columnar'),
+                data_format=DATA_FORMAT_COLUMNAR
+            )
+        )
+        for max_points in [None, 10, 50]:
+            for reduction in chart.REDUCTIONS:
+                view = ChartViewHandle(
+                    dataset_name='ABC',
+                    x_axis=0,
+                    max_points=max_points,
+                    reduction=reduction
+                )
+                view.add_series(0, range_start=5)
+                view.add_series(1, range_start=5, range_end=900)
+                view.add_series(2)
+                view.add_series(3)
+                data = ChartQuery().exec_query(dataset=ds, view=view)
+                columnar_data = ChartQuery().exec_query(
+                    dataset=columnar_ds,
+                    view=view
+                )
+                self.assertEqual(columnar_data, data)
+                for row, columnar_row in zip(data, columnar_data):
+                    self.assertEqual(
+                        [type(val) for val in columnar_row],
+                        [type(val) for val in row]
+                    )
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,35 @@
+"""Test the pool of warm interpreter processes."""
+
+import os
+import time
+import unittest
+
+from vizier.engine.packages.pycell.interpreter import InterpreterPool
+
+
+class TestInterpreterPool(unittest.TestCase):
+
+    def test_idle_interpreters(self):
+        """Test that an idle interpreter terminates when the connection to
+        the owning process is closed, i.e., sibling interpreters that were
+        forked later do not keep the connection open.
+        """
+        pool = InterpreterPool(size=3, preload=[])
+        pids = set([pool.execute(os.getpid) for i in range(2)])
+        self.assertEqual(len(pids), 2)
+        self.assertFalse(os.getpid() in pids)
+        self.assertEqual(len(pool.interpreters), 3)
+        interpreter = pool.interpreters.pop(0)
+        interpreter.conn.close()
+        terminated = False
+        for i in range(50):
+            if os.waitpid(interpreter.pid, os.WNOHANG)[0] == interpreter.pid:
+                terminated = True
+                break
+            time.sleep(0.1)
+        pool.close()
+        self.assertTrue(terminated)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -51,6 +51,19 @@ except ValueError as ex:
     print str(ex)
 """
 
+SET_MODULE_STATE_PY = """
+import json
+json.vizier_test = 1
+print(json.vizier_test)
+"""
+
+GET_MODULE_STATE_PY = """
+import json
+print(hasattr(json, 'vizier_test'))
+print(vizierdb.get_dataset('people').rows[0].get_value('Name'))
+"""
+
+
 class TestDefaultPyCellProcessor(unittest.TestCase):
 
     def setUp(self):
@@ -93,6 +106,29 @@ class TestDefaultPyCellProcessor(unittest.TestCase):
         self.assertEqual(len(result.outputs.stderr), 0)
         self.assertEqual(result.outputs.stdout[0].value, 'Alice\nBob')
 
+    def test_interpreter_pool(self):
+        """Test running scripts in warm interpreters. Changes to the state of
+        imported modules are not visible to the following scripts.
+        """
+        fh = self.filestore.upload_file(CSV_FILE)
+        ds = self.datastore.load_dataset(fh)
+        processor = PyCellTaskProcessor(properties={'interpreters': 1})
+        for source in [SET_MODULE_STATE_PY, GET_MODULE_STATE_PY]:
+            cmd = python_cell(source=source, validate=True)
+            result = processor.compute(
+                command_id=cmd.command_id,
+                arguments=cmd.arguments,
+                context=TaskContext(
+                    project_id='111',
+                    datastore=self.datastore,
+                    filestore=self.filestore,
+                    datasets={'people': ds.identifier}
+                )
+            )
+            self.assertTrue(result.is_success)
+        processor.pool.close()
+        self.assertEqual(result.outputs.stdout[0].value, 'False\nAlice')
+
     def test_print_dataset_script(self):
         """Test running a script that prints rows in an existing datasets."""
         fh = self.filestore.upload_file(CSV_FILE)
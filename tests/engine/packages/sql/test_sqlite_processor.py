@@ -0,0 +1,133 @@
+"""Test the SQL processor that uses an embedded SQLite database."""
+
+import os
+import shutil
+import unittest
+
+from vizier.datastore.dataset import DatasetColumn, DatasetRow
+from vizier.datastore.fs.base import FileSystemDatastore
+from vizier.engine.packages.sql.command import sql_cell
+from vizier.engine.packages.sql.sqlite import SQLiteTaskProcessor
+from vizier.engine.task.base import TaskContext
+from vizier.filestore.fs.base import FileSystemFilestore
+
+
+SERVER_DIR = './.tmp'
+FILESTORE_DIR = './.tmp/fs'
+DATASTORE_DIR = './.tmp/ds'
+
+
+class TestSQLiteProcessor(unittest.TestCase):
+
+    def setUp(self):
+        """Create datastore with datasets for people and cities."""
+        if os.path.isdir(SERVER_DIR):
+            shutil.rmtree(SERVER_DIR)
+        os.makedirs(SERVER_DIR)
+        self.datastore = FileSystemDatastore(DATASTORE_DIR)
+        self.filestore = FileSystemFilestore(FILESTORE_DIR)
+        people = self.datastore.create_dataset(
+            columns=[
+                DatasetColumn(identifier=0, name='Name', data_type='varchar'),
+                DatasetColumn(identifier=1, name='Age', data_type='int'),
+                DatasetColumn(identifier=2, name='City', data_type='varchar')
+            ],
+            rows=[
+                DatasetRow(identifier=0, values=['Alice', '23', 'NYC']),
+                DatasetRow(identifier=1, values=['Bob', 32, 'Buffalo']),
+                DatasetRow(identifier=5, values=['Claudia', None, 'NYC'])
+            ]
+        )
+        cities = self.datastore.create_dataset(
+            columns=[
+                DatasetColumn(identifier=0, name='City', data_type='varchar'),
+                DatasetColumn(identifier=1, name='State', data_type='varchar')
+            ],
+            rows=[
+                DatasetRow(identifier=0, values=['NYC', 'NY']),
+                DatasetRow(identifier=1, values=['Buffalo', 'NY'])
+            ]
+        )
+        self.datasets = {
+            'people': people.identifier,
+            'cities': cities.identifier,
+            'other': cities.identifier
+        }
+
+    def tearDown(self):
+        """Clean-up by dropping the server directory."""
+        if os.path.isdir(SERVER_DIR):
+            shutil.rmtree(SERVER_DIR)
+
+    def run_query(self, source, output_dataset=None):
+        """Run the given query in a context that contains all datasets."""
+        cmd = sql_cell(
+            source=source,
+            output_dataset=output_dataset,
+            validate=True
+        )
+        return SQLiteTaskProcessor().compute(
+            command_id=cmd.command_id,
+            arguments=cmd.arguments,
+            context=TaskContext(
+                project_id='0000',
+                datastore=self.datastore,
+                filestore=self.filestore,
+                datasets=self.datasets
+            )
+        )
+
+    def test_errors(self):
+        """Test queries that reference unknown tables or are invalid."""
+        result = self.run_query('SELECT * FROM unknown')
+        self.assertFalse(result.is_success)
+        self.assertIsNone(result.provenance.read)
+        self.assertIsNone(result.provenance.write)
+        result = self.run_query('SELECT FROM people')
+        self.assertFalse(result.is_success)
+
+    def test_run_query(self):
+        """Test running a join query and materializing the result."""
+        result = self.run_query(
+            'SELECT p.ROWID AS id, p.name, p.age + 1 AS next_age, c.state ' +
+            'FROM People p, cities c WHERE p.city = c.city ORDER BY p.name;',
+            output_dataset='result'
+        )
+        self.assertTrue(result.is_success)
+        self.assertEqual(
+            result.provenance.read,
+            {
+                'people': self.datasets['people'],
+                'cities': self.datasets['cities']
+            }
+        )
+        ds = self.datastore.get_dataset(
+            result.provenance.write['result'].identifier
+        )
+        self.assertEqual(
+            [col.name for col in ds.columns],
+            ['id', 'Name', 'next_age', 'State']
+        )
+        self.assertEqual(
+            [col.data_type for col in ds.columns],
+            ['int', 'varchar', 'int', 'varchar']
+        )
+        self.assertEqual(ds.row_count, 3)
+        rows = ds.fetch_rows()
+        self.assertEqual([row.identifier for row in rows], [0, 1, 2])
+        self.assertEqual(rows[0].values, [0, 'Alice', 24, 'NY'])
+        self.assertEqual(rows[1].values, [1, 'Bob', 33, 'NY'])
+        self.assertEqual(rows[2].values, [5, 'Claudia', None, 'NY'])
+        # Default name for the query result
+        result = self.run_query('SELECT COUNT(*) AS cnt FROM people')
+        self.assertTrue(result.is_success)
+        self.assertEqual(
+            result.provenance.read,
+            {'people': self.datasets['people']}
+        )
+        self.assertEqual(list(result.provenance.write.keys()), ['TEMPORARY_RESULT'])
+        self.assertEqual(result.provenance.write['TEMPORARY_RESULT'].row_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
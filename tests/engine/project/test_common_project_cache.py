@@ -6,10 +6,14 @@ import shutil
 import unittest
 
 from vizier.datastore.fs.factory import FileSystemDatastoreFactory
+from vizier.engine.packages.pycell.command import python_cell
 from vizier.engine.project.cache.common import CommonProjectCache
 from vizier.filestore.fs.factory import FileSystemFilestoreFactory
+from vizier.viztrail.module.base import ModuleHandle
+from vizier.viztrail.module.base import MODULE_RUNNING, MODULE_SUCCESS
 from vizier.viztrail.objectstore.repository import OSViztrailRepository
 from vizier.viztrail.base import PROPERTY_NAME
+from vizier.viztrail.workflow import ACTION_INSERT
 
 
 SERVER_DIR = './.tmp'
@@ -33,12 +37,13 @@ class TestCommonProjectCache(unittest.TestCase):
         if os.path.isdir(SERVER_DIR):
             shutil.rmtree(SERVER_DIR)
 
-    def create_cache(self):
+    def create_cache(self, cache_size=None):
         """Create instance of the project cache."""
         return CommonProjectCache(
             datastores=FileSystemDatastoreFactory(DATASTORES_DIR),
             filestores=FileSystemFilestoreFactory(FILESTORES_DIR),
-            viztrails=OSViztrailRepository(base_path=VIZTRAILS_DIR)
+            viztrails=OSViztrailRepository(base_path=VIZTRAILS_DIR),
+            cache_size=cache_size
         )
 
     def test_empty_repository(self):
@@ -47,6 +52,55 @@ class TestCommonProjectCache(unittest.TestCase):
         self.assertIsNone(self.cache.get_project('000'))
         self.assertFalse(self.cache.delete_project('000'))
 
+    def test_lazy_loading(self):
+        """Test loading project workflows on first access and unloading the
+        least recently used projects.
+        """
+        project_ids = list()
+        for state in [MODULE_RUNNING, MODULE_SUCCESS, MODULE_SUCCESS]:
+            project = self.cache.create_project()
+            command = python_cell('print 1')
+            project.get_default_branch().append_workflow(
+                modules=list(),
+                action=ACTION_INSERT,
+                command=command,
+                pending_modules=[
+                    ModuleHandle(
+                        command=command,
+                        external_form='print 1',
+                        state=state
+                    )
+                ]
+            )
+            project_ids.append(project.identifier)
+        # Workflows are not loaded when the cache is created.
+        self.cache = self.create_cache(cache_size=1)
+        for project in self.cache.list_projects():
+            self.assertFalse(project.viztrail.is_loaded)
+            self.assertIsNotNone(project.last_modified_at)
+            self.assertFalse(project.viztrail.is_loaded)
+        # Workflows of the least recently used project are unloaded.
+        id1, id2, id3 = project_ids[1], project_ids[2], project_ids[0]
+        pj1 = self.cache.get_project(id1)
+        head = pj1.get_default_branch().get_head()
+        self.assertTrue(head.modules[0].is_success)
+        self.assertTrue(pj1.viztrail.is_loaded)
+        pj2 = self.cache.get_project(id2)
+        branch_id = pj2.get_default_branch().identifier
+        self.cache.get_branch(id2, branch_id).get_head()
+        self.assertFalse(pj1.viztrail.is_loaded)
+        self.assertTrue(pj2.viztrail.is_loaded)
+        pj1 = self.cache.get_project(id1)
+        self.assertEqual(pj1.get_default_branch().get_head().identifier, head.identifier)
+        self.assertFalse(pj2.viztrail.is_loaded)
+        # Projects with active workflows are not unloaded.
+        pj1.get_default_branch().get_head().modules[0].state = MODULE_RUNNING
+        self.cache.get_project(id2)
+        self.assertTrue(pj1.viztrail.is_loaded)
+        # Active modules from before the restart are canceled on load.
+        pj3 = self.cache.get_project(id3)
+        self.assertTrue(pj3.get_default_branch().get_head().modules[0].is_canceled)
+
     def test_project_life_cycle(self):
         """Test creating, accessing, and deleting projects."""
         pj1 = self.cache.create_project({PROPERTY_NAME: 'My First Project'})
@@ -0,0 +1,264 @@
+"""Test exporting and importing project data archives."""
+
+import io
+import os
+import shutil
+import tarfile
+import unittest
+
+from vizier.core.io.sqlite import SQLiteObjectStore
+from vizier.datastore.dataset import DatasetColumn, DatasetRow
+from vizier.datastore.fs.factory import FileSystemDatastoreFactory
+from vizier.engine.project.cache.common import CommonProjectCache
+from vizier.filestore.fs.factory import FileSystemFilestoreFactory
+from vizier.viztrail.objectstore.repository import OSViztrailRepository
+
+import vizier.engine.project.archive as archive
+
+
+SERVER_DIR = './.tmp'
+SOURCE_DIR = SERVER_DIR + '/source'
+TARGET_DIR = SERVER_DIR + '/target'
+
+
+def list_files(base_dir, project_id):
+    """Get the relative paths and content of all project files that are
+    exported.
+    """
+    files = dict()
+    for dir_name in archive.ARCHIVE_DIRS:
+        project_dir = os.path.join(base_dir, dir_name, project_id)
+        for root, dirs, filenames in os.walk(project_dir):
+            if root == project_dir:
+                dirs[:] = [d for d in dirs if not d in archive.EXCLUDED_DIRS]
+            for name in filenames:
+                filename = os.path.join(root, name)
+                with open(filename, 'rb') as f:
+                    files[os.path.relpath(filename, base_dir)] = f.read()
+    return files
+
+
+class TestProjectArchive(unittest.TestCase):
+
+    def setUp(self):
+        """Create a project with a single dataset and file."""
+        if os.path.isdir(SERVER_DIR):
+            shutil.rmtree(SERVER_DIR)
+        os.makedirs(TARGET_DIR)
+        cache = CommonProjectCache(
+            datastores=FileSystemDatastoreFactory(SOURCE_DIR + '/ds'),
+            filestores=FileSystemFilestoreFactory(SOURCE_DIR + '/fs'),
+            viztrails=OSViztrailRepository(base_path=SOURCE_DIR + '/vt')
+        )
+        self.project = cache.create_project()
+        self.create_dataset()
+
+    def tearDown(self):
+        """Remove the server directory."""
+        if os.path.isdir(SERVER_DIR):
+            shutil.rmtree(SERVER_DIR)
+
+    def create_dataset(self):
+        """Create a new dataset in the project datastore."""
+        return self.project.datastore.create_dataset(
+            columns=[DatasetColumn(identifier=0, name='A')],
+            rows=[DatasetRow(identifier=i, values=[i]) for i in range(10)]
+        )
+
+    def export(self, base_snapshot=None):
+        """Export the project into an in-memory buffer."""
+        snapshot_id, content = archive.export_project(
+            SOURCE_DIR,
+            self.project.identifier,
+            base_snapshot=base_snapshot
+        )
+        return snapshot_id, io.BytesIO(b''.join(content))
+
+    def test_export_import(self):
+        """Test full and incremental export and import of a project."""
+        project_id = self.project.identifier
+        # Add a cached chart result
+        charts_dir = self.project.datastore.charts.base_path
+        os.makedirs(charts_dir)
+        with open(os.path.join(charts_dir, 'chart.json'), 'w') as f:
+            f.write('[]')
+        snapshot_id, buf = self.export()
+        # Data files are exported as regular files. The chunk store and the
+        # chart cache of the datastore are not exported.
+        with tarfile.open(fileobj=buf, mode='r:gz') as tar:
+            for member in tar.getmembers():
+                self.assertTrue(member.isfile() or member.isdir())
+                self.assertFalse('.chunks' in member.name)
+                self.assertFalse('.charts' in member.name)
+        buf.seek(0)
+        self.assertEqual(archive.import_project(TARGET_DIR, buf), project_id)
+        self.assertEqual(
+            list_files(TARGET_DIR, project_id),
+            list_files(SOURCE_DIR, project_id)
+        )
+        # The project cannot be imported twice
+        buf.seek(0)
+        with self.assertRaises(ValueError):
+            archive.import_project(TARGET_DIR, buf)
+        # Incremental export only contains the new dataset
+        ds = self.create_dataset()
+        base_snapshot = snapshot_id
+        snapshot_id, buf = self.export(base_snapshot=base_snapshot)
+        with tarfile.open(fileobj=buf, mode='r:gz') as tar:
+            files = [m.name for m in tar.getmembers() if m.isfile()]
+        self.assertTrue(len(files) > 1)
+        for name in files[1:]:
+            self.assertTrue(ds.identifier in name)
+        buf.seek(0)
+        self.assertEqual(archive.import_project(TARGET_DIR, buf), project_id)
+        self.assertEqual(
+            list_files(TARGET_DIR, project_id),
+            list_files(SOURCE_DIR, project_id)
+        )
+        # Deleted datasets are removed by an incremental import
+        self.project.datastore.delete_dataset(ds.identifier)
+        _, buf = self.export(base_snapshot=snapshot_id)
+        self.assertEqual(archive.import_project(TARGET_DIR, buf), project_id)
+        self.assertEqual(
+            list_files(TARGET_DIR, project_id),
+            list_files(SOURCE_DIR, project_id)
+        )
+        self.assertFalse(
+            os.path.isdir(
+                os.path.join(TARGET_DIR, 'ds', project_id, ds.identifier)
+            )
+        )
+        with self.assertRaises(ValueError):
+            self.export(base_snapshot='unknown')
+        self.assertIsNone(archive.export_project(SOURCE_DIR, 'unknown'))
+        # Only the most recent snapshot manifests are kept
+        for i in range(archive.MAX_SNAPSHOTS):
+            self.export()
+        snapshots_dir = os.path.join(SOURCE_DIR, archive.SNAPSHOTS_DIR, project_id)
+        self.assertEqual(len(os.listdir(snapshots_dir)), archive.MAX_SNAPSHOTS)
+        with self.assertRaises(ValueError):
+            self.export(base_snapshot=base_snapshot)
+        archive.delete_snapshots(SOURCE_DIR, project_id)
+        self.assertFalse(os.path.isdir(snapshots_dir))
+
+    def test_failed_import(self):
+        """Test that a failed import of a full archive leaves no project
+        data behind.
+        """
+        project_id = self.project.identifier
+        _, buf = self.export()
+        # Copy the archive and append an invalid member
+        invalid = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode='r:gz') as tar_in:
+            with tarfile.open(fileobj=invalid, mode='w:gz') as tar_out:
+                for member in tar_in.getmembers():
+                    if member.isfile():
+                        tar_out.addfile(member, tar_in.extractfile(member))
+                    else:
+                        tar_out.addfile(member)
+                tar_out.addfile(tarfile.TarInfo('../evil'), io.BytesIO())
+        invalid.seek(0)
+        with self.assertRaises(ValueError):
+            archive.import_project(TARGET_DIR, invalid)
+        self.assertEqual(list_files(TARGET_DIR, project_id), dict())
+        self.assertEqual(os.listdir(TARGET_DIR), [])
+        # The project can be imported from a valid archive
+        buf.seek(0)
+        self.assertEqual(archive.import_project(TARGET_DIR, buf), project_id)
+        self.assertEqual(
+            list_files(TARGET_DIR, project_id),
+            list_files(SOURCE_DIR, project_id)
+        )
+
+    def test_import_archive_without_snapshot(self):
+        """Test importing archives that do not contain a snapshot descriptor
+        and archives with invalid members.
+        """
+        project_id = self.project.identifier
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode='w:gz') as tar:
+            for dir_name in archive.ARCHIVE_DIRS:
+                tar.add(
+                    os.path.join(SOURCE_DIR, dir_name, project_id),
+                    arcname='/' + dir_name + '/' + project_id + '/'
+                )
+        buf.seek(0)
+        self.assertEqual(archive.import_project(TARGET_DIR, buf), project_id)
+        self.assertEqual(
+            list_files(TARGET_DIR, project_id),
+            list_files(SOURCE_DIR, project_id)
+        )
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode='w:gz') as tar:
+            info = tarfile.TarInfo('ds/../../x')
+            tar.addfile(info, io.BytesIO())
+        buf.seek(0)
+        with self.assertRaises(ValueError):
+            archive.import_project(TARGET_DIR, buf)
+        with self.assertRaises(ValueError):
+            archive.import_project(TARGET_DIR, io.BytesIO(b'not an archive'))
+
+    def test_sqlite_object_store(self):
+        """Test export and import of a project whose viztrail is maintained
+        by a SQLite object store.
+        """
+        cache = CommonProjectCache(
+            datastores=FileSystemDatastoreFactory(SOURCE_DIR + '/ds'),
+            filestores=FileSystemFilestoreFactory(SOURCE_DIR + '/fs'),
+            viztrails=OSViztrailRepository(
+                base_path=SOURCE_DIR + '/vt',
+                object_store=SQLiteObjectStore(SOURCE_DIR + '/vt.db')
+            )
+        )
+        project = cache.create_project(properties={'name': 'SQLite'})
+        project_id = project.identifier
+        self.assertFalse(os.path.isdir(os.path.join(SOURCE_DIR, 'vt', project_id)))
+        source_store = cache.viztrails.object_store
+        target_store = SQLiteObjectStore(TARGET_DIR + '/vt.db')
+        snapshot_id, content = archive.export_project(
+            SOURCE_DIR,
+            project_id,
+            object_store=source_store
+        )
+        buf = io.BytesIO(b''.join(content))
+        self.assertEqual(
+            archive.import_project(TARGET_DIR, buf, object_store=target_store),
+            project_id
+        )
+        repo = OSViztrailRepository(
+            base_path=TARGET_DIR + '/vt',
+            object_store=target_store
+        )
+        viztrail = repo.get_viztrail(project_id)
+        self.assertEqual(viztrail.name, 'SQLite')
+        self.assertEqual(len(viztrail.branches), 1)
+        # The project cannot be imported twice. The failed import does not
+        # modify the object store.
+        buf.seek(0)
+        with self.assertRaises(ValueError):
+            archive.import_project(TARGET_DIR, buf, object_store=target_store)
+        # Incremental export with a new branch
+        project.viztrail.create_branch(properties={'name': 'B'})
+        _, content = archive.export_project(
+            SOURCE_DIR,
+            project_id,
+            base_snapshot=snapshot_id,
+            object_store=source_store
+        )
+        buf = io.BytesIO(b''.join(content))
+        archive.import_project(TARGET_DIR, buf, object_store=target_store)
+        repo = OSViztrailRepository(
+            base_path=TARGET_DIR + '/vt',
+            object_store=target_store
+        )
+        self.assertEqual(
+            sorted([b.name for b in repo.get_viztrail(project_id).branches.values()]),
+            sorted([b.name for b in project.viztrail.branches.values()])
+        )
+        self.assertIsNone(
+            archive.export_project(SOURCE_DIR, 'unknown', object_store=source_store)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
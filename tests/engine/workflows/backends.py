@@ -0,0 +1,70 @@
+"""Backends for tests of the vizier engine that do not execute any code. The
+tests control when (and with which result) submitted tasks finish.
+"""
+
+from vizier.datastore.dataset import DatasetDescriptor
+from vizier.engine.backend.base import VizierBackend
+from vizier.viztrail.module.output import ModuleOutputs
+from vizier.viztrail.module.provenance import ModuleProvenance
+
+import vizier.viztrail.module.base as mstate
+
+
+class RecordingBackend(VizierBackend):
+    """Backend that records submitted tasks without executing them. Each
+    submitted task is recorded as a tuple of task handle, cell source, and
+    task context.
+    """
+    def __init__(self):
+        super(RecordingBackend, self).__init__(synchronous=None)
+        self.submitted = list()
+        self.canceled = list()
+
+    def cancel_task(self, task_id):
+        self.canceled.append(task_id)
+
+    def execute_async(self, task, command, context, resources=None):
+        self.submitted.append((task, command.arguments.get_value('source'), context))
+
+    def next_task_state(self):
+        return mstate.MODULE_RUNNING
+
+    def task_finished(self, task_id):
+        pass
+
+
+class SynchronousBackend(RecordingBackend):
+    """Backend that finishes tasks before execute_async returns. Every cell
+    reads dataset A and writes a new version of A. Records the maximum
+    nesting depth of task executions.
+    """
+    def __init__(self):
+        super(SynchronousBackend, self).__init__()
+        self.depth = 0
+        self.max_depth = 0
+        self.version = 0
+
+    def execute_async(self, task, command, context, resources=None):
+        super(SynchronousBackend, self).execute_async(
+            task=task,
+            command=command,
+            context=context,
+            resources=resources
+        )
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        self.version += 1
+        try:
+            task.controller.set_success(
+                task_id=task.task_id,
+                outputs=ModuleOutputs(),
+                provenance=ModuleProvenance(
+                    read={'A': context['A']} if 'A' in context else dict(),
+                    write={
+                        'A': DatasetDescriptor(identifier=str(self.version))
+                    },
+                    delete=list()
+                )
+            )
+        finally:
+            self.depth -= 1
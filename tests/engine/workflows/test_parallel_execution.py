@@ -0,0 +1,181 @@
+"""Test concurrent re-execution of independent workflow modules by the vizier
+engine.
+"""
+
+import os
+import shutil
+import unittest
+
+from vizier.datastore.dataset import DatasetDescriptor
+from vizier.datastore.fs.factory import FileSystemDatastoreFactory
+from vizier.engine.base import VizierEngine
+from vizier.engine.packages.load import load_packages
+from vizier.engine.project.cache.common import CommonProjectCache
+from vizier.filestore.fs.factory import FileSystemFilestoreFactory
+from vizier.viztrail.module.output import ModuleOutputs
+from vizier.viztrail.module.provenance import ModuleProvenance
+from vizier.viztrail.objectstore.repository import OSViztrailRepository
+
+import vizier.engine.packages.pycell.command as pycell
+
+from backends import RecordingBackend
+
+
+SERVER_DIR = './.tmp'
+PACKAGES_DIR = './.files/packages'
+
+
+def provenance(read, write):
+    """Create provenance object for read dataset identifier and descriptors
+    of written datasets.
+    """
+    return ModuleProvenance(
+        read=read,
+        write={name: DatasetDescriptor(identifier=write[name]) for name in write},
+        delete=list()
+    )
+
+
+class TestParallelExecution(unittest.TestCase):
+
+    def setUp(self):
+        """Create engine with a recording backend."""
+        if os.path.isdir(SERVER_DIR):
+            shutil.rmtree(SERVER_DIR)
+        os.makedirs(SERVER_DIR)
+        self.backend = RecordingBackend()
+        self.engine = VizierEngine(
+            name='Test',
+            projects=CommonProjectCache(
+                datastores=FileSystemDatastoreFactory(SERVER_DIR + '/ds'),
+                filestores=FileSystemFilestoreFactory(SERVER_DIR + '/fs'),
+                viztrails=OSViztrailRepository(base_path=SERVER_DIR + '/vt')
+            ),
+            backend=self.backend,
+            packages=load_packages(PACKAGES_DIR)
+        )
+
+    def tearDown(self):
+        """Remove the server directory."""
+        if os.path.isdir(SERVER_DIR):
+            shutil.rmtree(SERVER_DIR)
+
+    def finish(self, source, read, write):
+        """Set the submitted task for the cell with the given source to
+        success.
+        """
+        for task, src, _ in self.backend.submitted:
+            if src == source:
+                self.backend.submitted.remove((task, src, _))
+                return self.engine.set_success(
+                    task_id=task.task_id,
+                    outputs=ModuleOutputs(),
+                    provenance=provenance(read, write)
+                )
+
+    def submitted(self):
+        return sorted([src for _, src, _ in self.backend.submitted])
+
+    def test_parallel_execution(self):
+        """Test that independent modules are executed concurrently after an
+        upstream module was replaced and that results are applied in
+        workflow order.
+        """
+        project = self.engine.projects.create_project()
+        branch_id = project.get_default_branch().identifier
+        # Create workflow where M1 creates A and B, M2 and M3 update A and B
+        # and M4 reads A.
+        steps = [
+            ('M1', dict(), {'A': 'a1', 'B': 'b1'}),
+            ('M2', {'A': 'a1'}, {'A': 'a2'}),
+            ('M3', {'B': 'b1'}, {'B': 'b2'}),
+            ('M4', {'A': 'a2'}, {'C': 'c1'})
+        ]
+        for source, read, write in steps:
+            self.engine.append_workflow_module(
+                project_id=project.identifier,
+                branch_id=branch_id,
+                command=pycell.python_cell(source)
+            )
+            self.assertTrue(self.finish(source, read, write))
+        modules = project.viztrail.get_branch(branch_id).get_head().modules
+        first_module_id = modules[0].identifier
+        # Replace the first module. Only the replaced module is executed.
+        self.engine.replace_workflow_module(
+            project_id=project.identifier,
+            branch_id=branch_id,
+            module_id=first_module_id,
+            command=pycell.python_cell('M1')
+        )
+        self.assertEqual(self.submitted(), ['M1'])
+        self.finish('M1', dict(), {'A': 'x1', 'B': 'y1'})
+        # M2 and M3 are independent and run concurrently. M4 depends on M2.
+        self.assertEqual(self.submitted(), ['M2', 'M3'])
+        # Finishing M3 first does not change the state of M3 until M2 is done.
+        self.finish('M3', {'B': 'y1'}, {'B': 'y2'})
+        modules = project.viztrail.get_branch(branch_id).get_head().modules
+        self.assertTrue(modules[1].is_running)
+        self.assertTrue(modules[2].is_running)
+        self.assertEqual(self.submitted(), ['M2'])
+        self.finish('M2', {'A': 'x1'}, {'A': 'x2'})
+        modules = project.viztrail.get_branch(branch_id).get_head().modules
+        self.assertTrue(modules[1].is_success)
+        self.assertTrue(modules[2].is_success)
+        self.assertEqual(modules[2].datasets['A'].identifier, 'x2')
+        self.assertEqual(modules[2].datasets['B'].identifier, 'y2')
+        self.assertEqual(self.submitted(), ['M4'])
+        self.assertEqual(self.backend.submitted[0][2], {'A': 'x2', 'B': 'y2'})
+        self.finish('M4', {'A': 'x2'}, {'C': 'c2'})
+        modules = project.viztrail.get_branch(branch_id).get_head().modules
+        for m in modules:
+            self.assertTrue(m.is_success)
+        datasets = modules[-1].datasets
+        self.assertEqual(
+            {name: datasets[name].identifier for name in datasets},
+            {'A': 'x2', 'B': 'y2', 'C': 'c2'}
+        )
+
+    def test_reexecute_on_conflict(self):
+        """Test that a module is re-executed if a preceding module modified a
+        dataset that the module read during concurrent execution.
+        """
+        project = self.engine.projects.create_project()
+        branch_id = project.get_default_branch().identifier
+        steps = [
+            ('M1', dict(), {'A': 'a1', 'B': 'b1'}),
+            ('M2', {'A': 'a1'}, {'A': 'a2'}),
+            ('M3', {'B': 'b1'}, {'C': 'c1'})
+        ]
+        for source, read, write in steps:
+            self.engine.append_workflow_module(
+                project_id=project.identifier,
+                branch_id=branch_id,
+                command=pycell.python_cell(source)
+            )
+            self.finish(source, read, write)
+        modules = project.viztrail.get_branch(branch_id).get_head().modules
+        self.engine.replace_workflow_module(
+            project_id=project.identifier,
+            branch_id=branch_id,
+            module_id=modules[0].identifier,
+            command=pycell.python_cell('M1')
+        )
+        self.finish('M1', dict(), {'A': 'x1', 'B': 'y1'})
+        self.assertEqual(self.submitted(), ['M2', 'M3'])
+        self.finish('M3', {'B': 'y1'}, {'C': 'z1'})
+        # Unlike in the previous execution, M2 now also modifies B. M3 has to
+        # be executed again.
+        self.finish('M2', {'A': 'x1'}, {'A': 'x2', 'B': 'y2'})
+        self.assertEqual(self.submitted(), ['M3'])
+        self.assertEqual(self.backend.submitted[0][2], {'A': 'x2', 'B': 'y2'})
+        self.finish('M3', {'B': 'y2'}, {'C': 'z2'})
+        modules = project.viztrail.get_branch(branch_id).get_head().modules
+        datasets = modules[-1].datasets
+        self.assertEqual(
+            {name: datasets[name].identifier for name in datasets},
+            {'A': 'x2', 'B': 'y2', 'C': 'z2'}
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
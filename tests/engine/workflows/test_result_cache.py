@@ -0,0 +1,216 @@
+"""Test the use of cached module execution results by the vizier engine."""
+
+import os
+import shutil
+import unittest
+
+from vizier.datastore.dataset import DatasetDescriptor
+from vizier.datastore.fs.factory import FileSystemDatastoreFactory
+from vizier.engine.base import VizierEngine
+from vizier.engine.cache import ExecResultCache
+from vizier.engine.packages.load import load_packages
+from vizier.engine.packages.vizual.base import PACKAGE_VIZUAL
+from vizier.engine.packages.vizual.base import VIZUAL_LOAD, VIZUAL_UNLOAD
+from vizier.engine.project.cache.common import CommonProjectCache
+from vizier.filestore.fs.factory import FileSystemFilestoreFactory
+from vizier.viztrail.command import ModuleCommand
+from vizier.viztrail.module.output import ModuleOutputs
+from vizier.viztrail.module.provenance import ModuleProvenance
+from vizier.viztrail.objectstore.repository import OSViztrailRepository
+
+import vizier.engine.packages.pycell.command as pycell
+
+from backends import RecordingBackend
+
+
+SERVER_DIR = './.tmp'
+PACKAGES_DIR = './.files/packages'
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        """Create engine with a recording backend and a result cache that
+        caches results for all packages.
+        """
+        if os.path.isdir(SERVER_DIR):
+            shutil.rmtree(SERVER_DIR)
+        os.makedirs(SERVER_DIR)
+        self.backend = RecordingBackend()
+        self.engine = VizierEngine(
+            name='Test',
+            projects=CommonProjectCache(
+                datastores=FileSystemDatastoreFactory(SERVER_DIR + '/ds'),
+                filestores=FileSystemFilestoreFactory(SERVER_DIR + '/fs'),
+                viztrails=OSViztrailRepository(base_path=SERVER_DIR + '/vt')
+            ),
+            backend=self.backend,
+            packages=load_packages(PACKAGES_DIR),
+            cache=ExecResultCache(excluded_packages=[])
+        )
+
+    def tearDown(self):
+        """Remove the server directory."""
+        if os.path.isdir(SERVER_DIR):
+            shutil.rmtree(SERVER_DIR)
+
+    def finish(self, source, read, write):
+        """Set the submitted task for the cell with the given source to
+        success.
+        """
+        for task, src, context in self.backend.submitted:
+            if src == source:
+                self.backend.submitted.remove((task, src, context))
+                return self.engine.set_success(
+                    task_id=task.task_id,
+                    outputs=ModuleOutputs(),
+                    provenance=ModuleProvenance(
+                        read=read,
+                        write={
+                            name: DatasetDescriptor(identifier=write[name])
+                                for name in write
+                        },
+                        delete=list()
+                    )
+                )
+
+    def replace_first(self, project, branch_id, source):
+        """Replace the first module in the branch head with a cell that has
+        the given source.
+        """
+        modules = project.viztrail.get_branch(branch_id).get_head().modules
+        self.engine.replace_workflow_module(
+            project_id=project.identifier,
+            branch_id=branch_id,
+            module_id=modules[0].identifier,
+            command=pycell.python_cell(source)
+        )
+
+    def datasets(self, project, branch_id):
+        """Get the dataset identifier in the final database state."""
+        modules = project.viztrail.get_branch(branch_id).get_head().modules
+        for m in modules:
+            self.assertTrue(m.is_success)
+        datasets = modules[-1].datasets
+        return {name: datasets[name].identifier for name in datasets}
+
+    def test_cached_results(self):
+        """Test that modules are not executed if a result for the command and
+        the read datasets is in the cache.
+        """
+        project = self.engine.projects.create_project()
+        branch_id = project.get_default_branch().identifier
+        for source, read, write in [
+            ('M1', dict(), {'A': 'a1'}),
+            ('M2', {'A': 'a1'}, {'B': 'b1'})
+        ]:
+            self.engine.append_workflow_module(
+                project_id=project.identifier,
+                branch_id=branch_id,
+                command=pycell.python_cell(source)
+            )
+            self.assertTrue(self.finish(source, read, write))
+        # Replace M1 with a different command. The new command and M2 are
+        # executed.
+        self.replace_first(project, branch_id, 'X1')
+        self.assertEqual(len(self.backend.submitted), 1)
+        self.finish('X1', dict(), {'A': 'x1'})
+        self.assertEqual(len(self.backend.submitted), 1)
+        self.finish('M2', {'A': 'x1'}, {'B': 'b2'})
+        self.assertEqual(self.datasets(project, branch_id), {'A': 'x1', 'B': 'b2'})
+        # Replace X1 with M1. The results for M1 and for M2 (against A=a1) are
+        # taken from the cache.
+        self.replace_first(project, branch_id, 'M1')
+        self.assertEqual(len(self.backend.submitted), 0)
+        self.assertEqual(self.datasets(project, branch_id), {'A': 'a1', 'B': 'b1'})
+        # The cache is per project.
+        other = self.engine.projects.create_project()
+        self.engine.append_workflow_module(
+            project_id=other.identifier,
+            branch_id=other.get_default_branch().identifier,
+            command=pycell.python_cell('M1')
+        )
+        self.assertEqual(len(self.backend.submitted), 1)
+        # Results are removed when the project is deleted.
+        self.assertTrue(self.engine.delete_project(project.identifier))
+        self.assertFalse(project.identifier in self.engine.cache.projects)
+        self.assertFalse(self.engine.delete_project(project.identifier))
+
+    def test_excluded_commands(self):
+        """Test that commands which depend on external resources are not
+        cached.
+        """
+        cache = ExecResultCache()
+        file_arg = {'id': 'file', 'value': {'url': 'http://some.url'}}
+        self.assertFalse(
+            cache.is_cacheable(
+                ModuleCommand(PACKAGE_VIZUAL, VIZUAL_LOAD, [file_arg])
+            )
+        )
+        self.assertFalse(
+            cache.is_cacheable(ModuleCommand(PACKAGE_VIZUAL, VIZUAL_UNLOAD))
+        )
+        self.assertTrue(
+            cache.is_cacheable(ModuleCommand('other', 'load', [file_arg]))
+        )
+        file_arg['value']['reload'] = True
+        self.assertFalse(
+            cache.is_cacheable(ModuleCommand('other', 'load', [file_arg]))
+        )
+        nested_arg = {'id': 'files', 'value': [[file_arg]]}
+        self.assertFalse(
+            cache.is_cacheable(ModuleCommand('other', 'load', [nested_arg]))
+        )
+        # Configured exclusions replace the default exclusions.
+        cache = ExecResultCache(
+            excluded_packages=['other'],
+            excluded_commands=[]
+        )
+        self.assertTrue(
+            cache.is_cacheable(ModuleCommand(PACKAGE_VIZUAL, VIZUAL_UNLOAD))
+        )
+        self.assertFalse(cache.is_cacheable(ModuleCommand('other', 'copy')))
+
+    def test_cache_eviction(self):
+        """Test cache capacity and excluded packages."""
+        cache = ExecResultCache(capacity=2)
+        self.assertFalse(cache.is_cacheable(pycell.python_cell('M1')))
+        cache = ExecResultCache(capacity=2, excluded_packages=[])
+        for source in ['M1', 'M2', 'M3']:
+            cache.put(
+                project_id='P',
+                command=pycell.python_cell(source),
+                datasets={'A': source, 'B': 'b'},
+                outputs=ModuleOutputs(),
+                provenance=ModuleProvenance(read={'A': source})
+            )
+        self.assertIsNone(cache.get('P', pycell.python_cell('M1'), {'A': 'M1'}))
+        self.assertIsNotNone(cache.get('P', pycell.python_cell('M2'), {'A': 'M2'}))
+        self.assertIsNone(cache.get('P', pycell.python_cell('M2'), {'A': 'M3'}))
+        self.assertIsNone(cache.get('Q', pycell.python_cell('M2'), {'A': 'M2'}))
+        # Results with unknown provenance are not cached
+        cache.put(
+            project_id='P',
+            command=pycell.python_cell('M4'),
+            datasets=dict(),
+            outputs=ModuleOutputs(),
+            provenance=ModuleProvenance()
+        )
+        self.assertIsNone(cache.get('P', pycell.python_cell('M4'), dict()))
+        # The state of written datasets is part of the key
+        cache.put(
+            project_id='P',
+            command=pycell.python_cell('M5'),
+            datasets=dict(),
+            outputs=ModuleOutputs(),
+            provenance=ModuleProvenance(
+                read=dict(),
+                write={'C': DatasetDescriptor(identifier='c1')}
+            )
+        )
+        self.assertIsNone(cache.get('P', pycell.python_cell('M5'), {'C': 'c0'}))
+        self.assertIsNotNone(cache.get('P', pycell.python_cell('M5'), {'A': 'a'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""Test workflow updates for backends that execute tasks synchronously, i.e.,
+tasks that finish while the engine is still scheduling modules.
+"""
+
+import os
+import shutil
+import unittest
+
+from vizier.datastore.fs.factory import FileSystemDatastoreFactory
+from vizier.engine.base import VizierEngine
+from vizier.engine.packages.load import load_packages
+from vizier.engine.project.cache.common import CommonProjectCache
+from vizier.filestore.fs.factory import FileSystemFilestoreFactory
+from vizier.viztrail.objectstore.repository import OSViztrailRepository
+
+import vizier.engine.packages.pycell.command as pycell
+
+from backends import SynchronousBackend
+
+
+SERVER_DIR = './.tmp'
+PACKAGES_DIR = './.files/packages'
+
+"""Number of modules in the test workflow."""
+MODULE_COUNT = 100
+
+
+class TestSynchronousUpdate(unittest.TestCase):
+
+    def setUp(self):
+        """Create engine with a synchronous backend."""
+        if os.path.isdir(SERVER_DIR):
+            shutil.rmtree(SERVER_DIR)
+        os.makedirs(SERVER_DIR)
+        self.backend = SynchronousBackend()
+        self.engine = VizierEngine(
+            name='Test',
+            projects=CommonProjectCache(
+                datastores=FileSystemDatastoreFactory(SERVER_DIR + '/ds'),
+                filestores=FileSystemFilestoreFactory(SERVER_DIR + '/fs'),
+                viztrails=OSViztrailRepository(base_path=SERVER_DIR + '/vt')
+            ),
+            backend=self.backend,
+            packages=load_packages(PACKAGES_DIR)
+        )
+
+    def tearDown(self):
+        """Remove the server directory."""
+        if os.path.isdir(SERVER_DIR):
+            shutil.rmtree(SERVER_DIR)
+
+    def test_rerun_workflow(self):
+        """Test re-running a workflow where every module finishes while the
+        engine schedules the workflow modules. Follow-up updates are not
+        nested.
+        """
+        project = self.engine.projects.create_project()
+        branch_id = project.get_default_branch().identifier
+        for i in range(MODULE_COUNT):
+            self.engine.append_workflow_module(
+                project_id=project.identifier,
+                branch_id=branch_id,
+                command=pycell.python_cell('M' + str(i))
+            )
+        self.assertEqual(self.backend.max_depth, 1)
+        # Replacing the first module re-runs all modules
+        modules = project.viztrail.get_branch(branch_id).get_head().modules
+        self.engine.replace_workflow_module(
+            project_id=project.identifier,
+            branch_id=branch_id,
+            module_id=modules[0].identifier,
+            command=pycell.python_cell('X')
+        )
+        self.assertEqual(self.backend.max_depth, 1)
+        self.assertEqual(self.backend.version, 2 * MODULE_COUNT)
+        modules = project.viztrail.get_branch(branch_id).get_head().modules
+        for i in range(MODULE_COUNT):
+            self.assertTrue(modules[i].is_success)
+            self.assertEqual(
+                modules[i].datasets['A'].identifier,
+                str(MODULE_COUNT + i + 1)
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -37,6 +37,30 @@ class TestModuleProvenance(unittest.TestCase):
         self.assertEqual(state['B'].identifier, '666')
         self.assertEqual(state['D'].identifier, '999')
 
+    def test_dependencies(self):
+        """Test dependencies and equivalence of database states."""
+        self.assertIsNone(ModuleProvenance().get_dependencies())
+        prov = ModuleProvenance(
+            read={'A':'123'},
+            write={'B': DatasetDescriptor(identifier='666')},
+            delete=['C']
+        )
+        read, modified = prov.get_dependencies()
+        self.assertEqual(read, set(['A']))
+        self.assertEqual(modified, set(['B', 'C']))
+        datasets = {
+            'A': DatasetDescriptor(identifier='123'),
+            'C': DatasetDescriptor(identifier='567'),
+            'D': DatasetDescriptor(identifier='789')
+        }
+        # Datasets that the module does not access are ignored
+        other = dict(datasets)
+        other['D'] = DatasetDescriptor(identifier='000')
+        self.assertTrue(prov.is_equivalent_state(datasets, other))
+        self.assertFalse(ModuleProvenance().is_equivalent_state(datasets, other))
+        del other['C']
+        self.assertFalse(prov.is_equivalent_state(datasets, other))
+
     def test_requires_exec(self):
         """Test .requires_exec() method for the module provenance object."""
         # Current database state
@@ -0,0 +1,100 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compare the cost of serializing pages of dataset rows in the Json format
+and in the compact binary format. For each format the script reports the time
+that it takes to serialize 10,000 rows and the size of the payload.
+
+Usage: [<rows> [<columns> [<repetitions>]]]
+
+The default is a page of 10,000 rows with 20 columns. Columns contain integer,
+float, and string values in rotation. The reported time is the minimum over
+all repetitions (default 5).
+"""
+
+import json
+import sys
+import time
+
+from vizier.api.serialize.binary import DATASET_PAGE
+from vizier.api.serialize.dataset import DATASET_ROW
+from vizier.datastore.dataset import DatasetColumn, DatasetDescriptor
+from vizier.datastore.dataset import DatasetRow
+
+
+def create_page(row_count, column_count):
+    """Create a dataset descriptor and a list of rows for the benchmark."""
+    columns = [
+        DatasetColumn(identifier=i, name='COL' + str(i))
+            for i in range(column_count)
+    ]
+    rows = list()
+    for row_id in range(row_count):
+        values = list()
+        for col_id in range(column_count):
+            if col_id % 3 == 0:
+                values.append(row_id * col_id)
+            elif col_id % 3 == 1:
+                values.append(row_id / (col_id + 1))
+            else:
+                values.append('value ' + str(row_id + col_id))
+        rows.append(DatasetRow(identifier=row_id, values=values))
+    dataset = DatasetDescriptor(
+        identifier='BENCHMARK',
+        columns=columns,
+        row_count=row_count
+    )
+    return dataset, rows
+
+
+def serialize_json(dataset, rows):
+    """Serialize a dataset page in the default Json format."""
+    return json.dumps({
+        'id': dataset.identifier,
+        'rows': [DATASET_ROW(row) for row in rows],
+        'rowCount': dataset.row_count,
+        'offset': 0
+    }).encode('utf-8')
+
+
+def serialize_binary(dataset, rows):
+    """Serialize a dataset page in the binary format."""
+    return DATASET_PAGE(dataset=dataset, rows=rows, offset=0)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    row_count = int(args[0]) if len(args) > 0 else 10000
+    column_count = int(args[1]) if len(args) > 1 else 20
+    repetitions = int(args[2]) if len(args) > 2 else 5
+    dataset, rows = create_page(row_count, column_count)
+    print('Page with ' + str(row_count) + ' rows and ' + str(column_count) + ' columns')
+    for name, func in [('json', serialize_json), ('binary', serialize_binary)]:
+        elapsed = None
+        for i in range(repetitions):
+            start = time.perf_counter()
+            payload = func(dataset, rows)
+            duration = time.perf_counter() - start
+            if elapsed is None or duration < elapsed:
+                elapsed = duration
+        per_10k = elapsed * 10000 / max(row_count, 1) * 1000
+        print(
+            '{:8s} {:10.2f} ms per 10k rows {:12d} bytes'.format(
+                name,
+                per_10k,
+                len(payload)
+            )
+        )
@@ -0,0 +1,142 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Measure the time from server startup to the first request for repositories
+with an increasing number of projects. For each project count the script
+creates a viztrails repository in a temporary directory and reports the time
+that it takes to create the project cache (startup), to list all projects
+(as in the project listing request), and to read the head workflow of one
+project (first request for a notebook).
+
+Usage: [<object-store> [<modules> [<project-count> ...]]]
+
+The object store is either FS (default) or SQLITE. Each project has one
+branch with one workflow for each module, i.e., the head workflow contains
+all modules (default 20). The default project counts are 10, 100, and 500.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from vizier.core.io.base import DefaultObjectStore
+from vizier.core.io.sqlite import SQLiteObjectStore
+from vizier.datastore.fs.factory import FileSystemDatastoreFactory
+from vizier.engine.packages.pycell.command import python_cell
+from vizier.engine.project.cache.common import CommonProjectCache
+from vizier.filestore.fs.factory import FileSystemFilestoreFactory
+from vizier.viztrail.module.base import ModuleHandle, MODULE_SUCCESS
+from vizier.viztrail.module.output import ModuleOutputs, TextOutput
+from vizier.viztrail.objectstore.repository import OSViztrailRepository
+from vizier.viztrail.workflow import ACTION_INSERT
+
+import vizier.config.base as base
+
+
+def create_cache(base_dir, object_store):
+    """Create the project cache in the same way as the web service."""
+    if object_store == base.OBJECT_STORE_SQLITE:
+        store = SQLiteObjectStore(database=os.path.join(base_dir, 'vt.db'))
+    else:
+        store = DefaultObjectStore()
+    return CommonProjectCache(
+        datastores=FileSystemDatastoreFactory(os.path.join(base_dir, 'ds')),
+        filestores=FileSystemFilestoreFactory(os.path.join(base_dir, 'fs')),
+        viztrails=OSViztrailRepository(
+            base_path=os.path.join(base_dir, 'vt'),
+            object_store=store
+        )
+    )
+
+
+def create_projects(base_dir, object_store, project_count, module_count):
+    """Create the given number of projects. Returns the project identifier."""
+    cache = create_cache(base_dir, object_store)
+    project_ids = list()
+    for i in range(project_count):
+        project = cache.create_project(properties={'name': 'Project ' + str(i)})
+        branch = project.get_default_branch()
+        for j in range(module_count):
+            command = python_cell('print(' + str(j) + ')')
+            module = ModuleHandle(
+                command=command,
+                external_form='print(' + str(j) + ')',
+                state=MODULE_SUCCESS,
+                outputs=ModuleOutputs(stdout=[TextOutput(str(j))])
+            )
+            modules = branch.head.modules if not branch.head is None else list()
+            branch.append_workflow(
+                modules=modules,
+                action=ACTION_INSERT,
+                command=command,
+                pending_modules=[module]
+            )
+        project_ids.append(project.identifier)
+    return project_ids
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    object_store = args[0].upper() if len(args) > 0 else base.OBJECT_STORE_FS
+    if not object_store in base.OBJECT_STORES:
+        print('Usage: [<object-store> [<modules> [<project-count> ...]]]')
+        sys.exit(-1)
+    module_count = int(args[1]) if len(args) > 1 else 20
+    project_counts = [int(a) for a in args[2:]] if len(args) > 2 else [10, 100, 500]
+    print(
+        '{:>8s} {:>12s} {:>12s} {:>12s} {:>12s}'.format(
+            'projects',
+            'startup (s)',
+            'list (s)',
+            'open (s)',
+            'total (s)'
+        )
+    )
+    for project_count in project_counts:
+        base_dir = tempfile.mkdtemp()
+        try:
+            project_ids = create_projects(
+                base_dir=base_dir,
+                object_store=object_store,
+                project_count=project_count,
+                module_count=module_count
+            )
+            start = time.perf_counter()
+            cache = create_cache(base_dir, object_store)
+            startup = time.perf_counter() - start
+            start = time.perf_counter()
+            for project in cache.list_projects():
+                project.last_modified_at
+                project.viztrail.default_branch.identifier
+            listing = time.perf_counter() - start
+            start = time.perf_counter()
+            project = cache.get_project(project_ids[-1])
+            project.get_default_branch().get_head().modules
+            first_open = time.perf_counter() - start
+            print(
+                '{:8d} {:12.3f} {:12.3f} {:12.3f} {:12.3f}'.format(
+                    project_count,
+                    startup,
+                    listing,
+                    first_open,
+                    startup + listing + first_open
+                )
+            )
+        finally:
+            shutil.rmtree(base_dir)
@@ -0,0 +1,63 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Copy the viztrails repository in a vizier data directory from the default
+file-based object store into a SQLite object store. The original files are
+not modified. After the migration the server can be started with
+VIZIERENGINE_OBJECT_STORE=SQLITE.
+
+Usage: <data-dir> [<database-file>]
+
+The data directory is the value of VIZIERENGINE_DATA_DIR (e.g., ./.vizierdb).
+The database file defaults to the database file that is used by the server
+(vt.db in the data directory). The migration fails if the database file
+exists.
+"""
+
+import os
+import sys
+import time
+
+from vizier.config.app import DEFAULT_VIZTRAILS_DB, DEFAULT_VIZTRAILS_DIR
+from vizier.core.io.base import DefaultObjectStore, copy_folder
+from vizier.core.io.sqlite import SQLiteObjectStore
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if len(args) < 1 or len(args) > 2:
+        print('Usage: <data-dir> [<database-file>]')
+        sys.exit(-1)
+    data_dir = args[0]
+    if len(args) == 2:
+        database = args[1]
+    else:
+        database = os.path.join(data_dir, DEFAULT_VIZTRAILS_DB)
+    viztrails_dir = os.path.join(data_dir, DEFAULT_VIZTRAILS_DIR)
+    if not os.path.isdir(viztrails_dir):
+        print('Directory \'' + viztrails_dir + '\' does not exist')
+        sys.exit(-1)
+    if os.path.exists(database):
+        print('Database \'' + database + '\' exists')
+        sys.exit(-1)
+    start = time.time()
+    count = copy_folder(
+        source=DefaultObjectStore(),
+        target=SQLiteObjectStore(database=database, base_path=data_dir),
+        folder_path=viztrails_dir
+    )
+    print('Copied ' + str(count) + ' objects to \'' + database + '\' in ' + '{:.2f}'.format(time.time() - start) + 's')
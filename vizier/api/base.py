@@ -18,9 +18,34 @@
 server instances.
 """
 
+from flask import Response, stream_with_context
+
+import hashlib
+
+from vizier.api.serialize.binary import MIMETYPE_DATASET_PAGE
+from vizier.datastore.export import export_dataset
+from vizier.filestore.base import FORMAT_CSV, FORMAT_TSV
 from vizier.viztrail.base import PROPERTY_NAME
 
 
+"""Cache control directive for dataset resources. Datasets are never modified
+after they have been created. The representation of a dataset resource is
+therefore never stale.
+"""
+CACHE_CONTROL_IMMUTABLE = 'public, max-age=31536000, immutable'
+
+"""Query parameters and supported formats for dataset downloads."""
+DOWNLOAD_COLUMNS = 'columns'
+DOWNLOAD_FORMAT = 'format'
+DOWNLOAD_LIMIT = 'limit'
+DOWNLOAD_OFFSET = 'offset'
+
+DOWNLOAD_FORMATS = {
+    'csv': (',', FORMAT_CSV),
+    'tsv': ('\t', FORMAT_TSV)
+}
+
+
 # ------------------------------------------------------------------------------
 #
 # Exceptions
@@ -136,6 +161,169 @@ def validate_json_request(request, required=None, optional=None):
     return obj
 
 
+def accepts_dataset_page(request):
+    """Test if the client prefers the binary format for dataset pages over
+    Json. Json is the default if the client accepts both formats with the
+    same preference.
+
+    Parameters
+    ----------
+    request: Http request
+        The Http request object
+
+    Returns
+    -------
+    bool
+    """
+    best_match = request.accept_mimetypes.best_match(
+        ['application/json', MIMETYPE_DATASET_PAGE]
+    )
+    return best_match == MIMETYPE_DATASET_PAGE
+
+
+def cached_response(request, key, serialize, mimetype, cache=None):
+    """Get response for an immutable dataset resource. The response has a
+    strong entity tag that is derived from the resource key. If the entity tag
+    matches the If-None-Match header of the request an empty response with
+    status code 304 is returned. Otherwise, the serialized resource is read
+    from the cache. If the resource is not cached, it is serialized using the
+    given function and added to the cache.
+
+    Returns None if the serialization function returns None, i.e., if the
+    resource does not exist.
+
+    Parameters
+    ----------
+    request: Http request
+        The Http request object
+    key: tuple
+        Unique resource key. The first two elements are the project and the
+        dataset identifier
+    serialize: func
+        Function that returns the serialized resource as bytes (or None)
+    mimetype: string
+        Mime type of the serialized resource
+    cache: vizier.api.webservice.cache.PageCache, optional
+        Cache for serialized resources
+
+    Returns
+    -------
+    flask.Response
+    """
+    etag = resource_etag(key)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        content = cache.get(key) if not cache is None else None
+        if content is None:
+            content = serialize()
+            if content is None:
+                return None
+            if not cache is None:
+                cache.put(key, content)
+        response = Response(content, mimetype=mimetype)
+    set_immutable(response, etag)
+    response.headers['Vary'] = 'Accept'
+    return response
+
+
+def resource_etag(key):
+    """Get a strong entity tag for an immutable resource with the given key.
+
+    Parameters
+    ----------
+    key: tuple
+        Unique resource key
+
+    Returns
+    -------
+    string
+    """
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+
+def set_immutable(response, etag):
+    """Set the entity tag and the cache control header for a response that
+    contains an immutable resource.
+
+    Parameters
+    ----------
+    response: flask.Response
+        Response object
+    etag: string
+        Unquoted entity tag
+    """
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL_IMMUTABLE
+
+
+def stream_dataset(request, dataset):
+    """Get a streamed response that contains the dataset rows as a delimited
+    file. The optional request arguments 'format' (csv or tsv), 'columns'
+    (comma-separated list of column identifier), 'offset', and 'limit' define
+    the file format and the exported columns and rows. The response content is
+    gzip compressed if the client accepts the gzip encoding.
+
+    Raises InvalidRequest exception if any of the request arguments is
+    invalid.
+
+    Parameters
+    ----------
+    request: Http request
+        The Http request object
+    dataset: vizier.datastore.dataset.DatasetHandle
+        Handle for the downloaded dataset
+
+    Returns
+    -------
+    flask.Response
+    """
+    file_format = request.args.get(DOWNLOAD_FORMAT, 'csv').lower()
+    if not file_format in DOWNLOAD_FORMATS:
+        raise InvalidRequest('unknown format \'' + file_format + '\'')
+    delimiter, mimetype = DOWNLOAD_FORMATS[file_format]
+    column_ids = None
+    try:
+        if DOWNLOAD_COLUMNS in request.args:
+            column_ids = [
+                int(col_id)
+                    for col_id in request.args[DOWNLOAD_COLUMNS].split(',')
+            ]
+        offset = int(request.args.get(DOWNLOAD_OFFSET, 0))
+        limit = int(request.args.get(DOWNLOAD_LIMIT, -1))
+        compressed = 'gzip' in request.accept_encodings
+        content = export_dataset(
+            dataset=dataset,
+            column_ids=column_ids,
+            offset=offset,
+            limit=limit,
+            delimiter=delimiter,
+            compressed=compressed
+        )
+    except ValueError as ex:
+        raise InvalidRequest(str(ex))
+    # The export is identified by the dataset and the request arguments. The
+    # entity tag has to differ for compressed and uncompressed content.
+    etag = resource_etag((
+        dataset.identifier,
+        file_format,
+        column_ids,
+        offset,
+        limit,
+        compressed
+    ))
+    if request.if_none_match.contains_weak(etag):
+        content.close()
+        response = Response(status=304)
+    else:
+        response = Response(stream_with_context(content), mimetype=mimetype)
+        response.headers['Content-Disposition'] = 'attachment; filename=export.' + file_format
+        if compressed:
+            response.headers['Content-Encoding'] = 'gzip'
+    set_immutable(response, etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 
 def validate_name(properties, message='not a valid name'):
     """Ensure that a name property (if given) is not None or the empty string.
@@ -0,0 +1,352 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compact columnar binary serialization for pages of dataset rows.
+
+The binary format is an alternative to the Json serialization of dataset
+handles. Clients select the format via the Accept header of a dataset
+request. The payload has the following layout (all numbers in little-endian
+byte order):
+
+    4 bytes  magic number 'VZDP'
+    4 bytes  length of the header (uint32)
+    header   Json object (utf-8)
+    padding  null bytes up to the next multiple of 8
+    buffers  data buffers, each padded to a multiple of 8 bytes
+
+The header contains the dataset descriptor (identifier, columns, row count),
+the page offset, the number of rows in the page, and the list of buffers as
+pairs of position (relative to the start of the buffer section) and length.
+The row identifier are stored as an int64 buffer. The annotation flags of the
+rows (one uint8 per row and column, in row-major order) are stored in a
+separate buffer. A flag is 1 if the respective cell has annotations (rows
+without annotation information have all flags set to 0). For every column the
+header contains the value encoding and the index positions of the column
+buffers:
+
+    int64, float64: validity buffer (one uint8 per row) and data buffer
+    utf8, json:     validity buffer, offsets buffer (n + 1 uint32 values),
+                    and buffer of utf-8 encoded (Json) values
+
+Columns are encoded as int64 (or float64) if all values that are not null are
+integers (or floats), as utf8 if all values are strings, and as json
+otherwise. Dates, times, and timestamps are serialized as ISO 8601 strings.
+The 8-byte alignment allows clients to create typed array views on the
+buffers without copying.
+"""
+
+import datetime
+import itertools
+import json
+import struct
+
+import numpy as np
+
+
+"""Mime type for binary dataset pages."""
+MIMETYPE_DATASET_PAGE = 'application/vnd.vizier.dataset-page'
+
+"""Magic number and header length for binary dataset pages."""
+MAGIC_NUMBER = b'VZDP'
+PREFIX = struct.Struct('<4sI')
+
+"""Value encodings for columns."""
+ENCODING_FLOAT = 'float64'
+ENCODING_INT = 'int64'
+ENCODING_JSON = 'json'
+ENCODING_STRING = 'utf8'
+
+"""Type of null values."""
+NONE_TYPE = type(None)
+
+"""Types of values that are serialized as ISO 8601 strings. Includes
+datetime.datetime which is a subclass of datetime.date.
+"""
+TEMPORAL_TYPES = (datetime.date, datetime.time)
+
+"""Value range for integers that can be encoded as int64."""
+INT64_MIN = -(2 ** 63)
+INT64_MAX = 2 ** 63 - 1
+
+
+def DATASET_PAGE(dataset, rows, offset=0):
+    """Binary serialization for a page of rows in a dataset.
+
+    Parameters
+    ----------
+    dataset : vizier.datastore.dataset.DatasetDescriptor
+        Dataset descriptor
+    rows: list(vizier.datastore.dataset.DatasetRow)
+        List of rows from the dataset
+    offset: int, optional
+        Index position of the first row in the page
+
+    Returns
+    -------
+    bytes
+    """
+    buffers = list()
+    def add_buffer(data):
+        buffers.append(data)
+        return len(buffers) - 1
+    row_count = len(rows)
+    row_ids = add_buffer(
+        np.array([row.identifier for row in rows], dtype='<i8').tobytes()
+    )
+    # Annotation flags for all cells. Flags for rows without annotation
+    # information (or for columns that are missing in the annotation list)
+    # are 0.
+    column_count = len(dataset.columns)
+    flags = np.zeros((row_count, column_count), dtype=np.uint8)
+    for row_idx, row in enumerate(rows):
+        if row.annotations:
+            row_flags = row.annotations[:column_count]
+            flags[row_idx, :len(row_flags)] = row_flags
+    row_flags = add_buffer(flags.tobytes())
+    # Transpose the rows into columns. Missing values in short rows are null.
+    values = list(
+        itertools.zip_longest(*[row.values for row in rows], fillvalue=None)
+    )
+    columns = list()
+    for col_idx, col in enumerate(dataset.columns):
+        if col_idx < len(values):
+            col_values = values[col_idx]
+        else:
+            col_values = [None] * row_count
+        col_values = temporal_to_iso(col_values)
+        encoding, has_nulls = get_encoding(col_values)
+        if has_nulls:
+            validity = np.fromiter(
+                (val is not None for val in col_values),
+                dtype=np.uint8,
+                count=row_count
+            )
+        else:
+            validity = np.ones(row_count, dtype=np.uint8)
+        obj = {
+            'id': col.identifier,
+            'name': col.name,
+            'type': col.data_type,
+            'encoding': encoding,
+            'validity': add_buffer(validity.tobytes())
+        }
+        if has_nulls and encoding != ENCODING_JSON:
+            default = '' if encoding == ENCODING_STRING else 0
+            col_values = [
+                default if val is None else val for val in col_values
+            ]
+        if encoding in [ENCODING_INT, ENCODING_FLOAT]:
+            dtype = '<i8' if encoding == ENCODING_INT else '<f8'
+            data = np.array(col_values, dtype=dtype)
+            obj['data'] = add_buffer(data.tobytes())
+        else:
+            if encoding == ENCODING_JSON:
+                col_values = [
+                    '' if val is None else json.dumps(val, default=json_value)
+                        for val in col_values
+                ]
+            text = ''.join(col_values)
+            if text.isascii():
+                # The length of each encoded value is the string length. Avoid
+                # encoding every value individually.
+                data = text.encode('ascii')
+                encoded = col_values
+            else:
+                encoded = [val.encode('utf-8') for val in col_values]
+                data = b''.join(encoded)
+            offsets = np.zeros(row_count + 1, dtype='<u4')
+            np.cumsum(
+                np.fromiter(map(len, encoded), dtype='<u4', count=row_count),
+                out=offsets[1:]
+            )
+            obj['offsets'] = add_buffer(offsets.tobytes())
+            obj['data'] = add_buffer(data)
+        columns.append(obj)
+    # Compute buffer positions
+    positions = list()
+    pos = 0
+    for data in buffers:
+        positions.append([pos, len(data)])
+        pos += len(data) + padding(len(data))
+    header = json.dumps({
+        'id': dataset.identifier,
+        'columns': columns,
+        'rowCount': dataset.row_count,
+        'offset': offset,
+        'rows': row_count,
+        'rowIds': row_ids,
+        'rowAnnotationFlags': row_flags,
+        'buffers': positions
+    }).encode('utf-8')
+    # The buffer section starts at a multiple of 8 bytes
+    prefix_size = PREFIX.size + len(header)
+    parts = [
+        PREFIX.pack(MAGIC_NUMBER, len(header)),
+        header,
+        b'\0' * padding(prefix_size)
+    ]
+    for data in buffers:
+        parts.append(data)
+        parts.append(b'\0' * padding(len(data)))
+    return b''.join(parts)
+
+
+def read_dataset_page(data):
+    """Read a binary dataset page. Returns the page header, the list of row
+    identifier, the row values, and the annotation flags of the rows.
+
+    Raises ValueError if the data is not a binary dataset page.
+
+    Parameters
+    ----------
+    data: bytes
+        Binary dataset page
+
+    Returns
+    -------
+    dict, list(int), list(list), list(list(bool))
+    """
+    magic, header_size = PREFIX.unpack_from(data, 0)
+    if magic != MAGIC_NUMBER:
+        raise ValueError('invalid dataset page')
+    start = PREFIX.size + header_size
+    header = json.loads(bytes(data[PREFIX.size:start]).decode('utf-8'))
+    start += padding(start)
+    def get_buffer(index):
+        pos, length = header['buffers'][index]
+        return memoryview(data)[start + pos:start + pos + length]
+    row_ids = np.frombuffer(get_buffer(header['rowIds']), dtype='<i8').tolist()
+    flags = np.frombuffer(
+        get_buffer(header['rowAnnotationFlags']),
+        dtype=np.uint8
+    ).reshape((len(row_ids), len(header['columns'])))
+    columns = list()
+    for col in header['columns']:
+        validity = np.frombuffer(get_buffer(col['validity']), dtype=np.uint8)
+        encoding = col['encoding']
+        if encoding in [ENCODING_INT, ENCODING_FLOAT]:
+            dtype = '<i8' if encoding == ENCODING_INT else '<f8'
+            values = np.frombuffer(get_buffer(col['data']), dtype=dtype).tolist()
+        else:
+            offsets = np.frombuffer(get_buffer(col['offsets']), dtype='<u4').tolist()
+            buf = bytes(get_buffer(col['data']))
+            values = [
+                buf[offsets[i]:offsets[i + 1]].decode('utf-8')
+                    for i in range(len(row_ids))
+            ]
+            if encoding == ENCODING_JSON:
+                values = [json.loads(val) if val != '' else None for val in values]
+        columns.append(
+            [val if valid else None for val, valid in zip(values, validity)]
+        )
+    rows = [list(values) for values in zip(*columns)]
+    return header, row_ids, rows, flags.astype(bool).tolist()
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def get_encoding(values):
+    """Get the encoding for a list of column values. Returns the encoding and
+    a flag indicating whether the list contains null values.
+
+    Parameters
+    ----------
+    values: list
+        List of column values
+
+    Returns
+    -------
+    string, bool
+    """
+    types = set(map(type, values))
+    has_nulls = NONE_TYPE in types
+    types.discard(NONE_TYPE)
+    if len(types) == 0:
+        return ENCODING_STRING, has_nulls
+    elif len(types) > 1:
+        return ENCODING_JSON, has_nulls
+    value_type = types.pop()
+    if value_type is str:
+        return ENCODING_STRING, has_nulls
+    elif value_type is float:
+        return ENCODING_FLOAT, has_nulls
+    elif value_type is int:
+        numbers = [val for val in values if not val is None]
+        if min(numbers) >= INT64_MIN and max(numbers) <= INT64_MAX:
+            return ENCODING_INT, has_nulls
+    return ENCODING_JSON, has_nulls
+
+
+def json_value(value):
+    """Default conversion for values that are not serializable by the Json
+    encoder. Dates and times are converted to ISO 8601 strings and numpy
+    scalars to the respective Python value. All other values are converted to
+    strings.
+
+    Parameters
+    ----------
+    value: any
+        Value that is not Json serializable
+
+    Returns
+    -------
+    any
+    """
+    if isinstance(value, TEMPORAL_TYPES):
+        return value.isoformat()
+    elif isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def padding(size):
+    """Get number of bytes that are required to pad data of the given size to
+    a multiple of 8 bytes.
+
+    Parameters
+    ----------
+    size: int
+        Data size
+
+    Returns
+    -------
+    int
+    """
+    return (8 - size % 8) % 8
+
+
+def temporal_to_iso(values):
+    """Convert dates, times, and timestamps in a list of column values to
+    ISO 8601 strings. Returns the given list if it does not contain any such
+    values.
+
+    Parameters
+    ----------
+    values: list
+        List of column values
+
+    Returns
+    -------
+    list
+    """
+    if not any(issubclass(t, TEMPORAL_TYPES) for t in set(map(type, values))):
+        return values
+    return [
+        val.isoformat() if isinstance(val, TEMPORAL_TYPES) else val
+            for val in values
+    ]
@@ -41,6 +41,7 @@ from vizier.api.routes.container import ContainerEngineUrlFactory
 from vizier.config.celery import config_routes
 from vizier.core import VERSION_INFO
 from vizier.core.io.base import DefaultObjectStore
+from vizier.core.io.sqlite import SQLiteObjectStore
 from vizier.core.timestamp import get_current_time
 from vizier.core.util import get_short_identifier, get_unique_identifier
 from vizier.datastore.fs.factory import FileSystemDatastoreFactory
@@ -50,6 +51,7 @@ from vizier.engine.backend.remote.celery.base import CeleryBackend
 from vizier.engine.backend.remote.container import ContainerBackend
 from vizier.engine.backend.synchron import SynchronousTaskEngine
 from vizier.engine.base import VizierEngine
+from vizier.engine.cache import ExecResultCache
 from vizier.engine.packages.load import load_packages
 from vizier.engine.project.cache.common import CommonProjectCache
 from vizier.engine.project.cache.container import ContainerProjectCache
@@ -127,7 +129,8 @@ class VizierApi(object):
         )
         self.projects = VizierProjectApi(
             projects=self.engine.projects,
-            urls=self.urls
+            urls=self.urls,
+            engine=self.engine
         )
         self.tasks = VizierTaskApi(engine=self.engine)
         self.workflows = VizierWorkflowApi(engine=self.engine, urls=self.urls)
@@ -205,16 +208,26 @@ def get_engine(config):
     if not backend_id in base.BACKENDS:
         raise ValueError('unknown backend \'' + str(backend_id) + '\'')
     # Get the identifier factory for the viztrails repository and create
-    # the object store. At this point we use the default object store only.
-    # We could add another environment variable to use different object
-    # stores (once implemented).
+    # the object store. Raise ValueError if the value does not identify a
+    # valid object store.
     if config.engine.use_short_ids:
         id_factory = get_short_identifier
     else:
         id_factory = get_unique_identifier
-    object_store = DefaultObjectStore(
-        identifier_factory=id_factory
-    )
+    if config.engine.object_store == base.OBJECT_STORE_SQLITE:
+        object_store = SQLiteObjectStore(
+            database=os.path.join(
+                config.engine.data_dir,
+                app.DEFAULT_VIZTRAILS_DB
+            ),
+            identifier_factory=id_factory
+        )
+    elif config.engine.object_store == base.OBJECT_STORE_FS:
+        object_store = DefaultObjectStore(
+            identifier_factory=id_factory
+        )
+    else:
+        raise ValueError('unknown object store \'' + str(config.engine.object_store) + '\'')
     # Create index of supported packages
     packages = load_packages(config.engine.package_path)
     # By default the vizier engine uses the objectstore implementation for
@@ -238,7 +251,8 @@ def get_engine(config):
         projects = CommonProjectCache(
             datastores=datastore_factory,
             filestores=filestore_factory,
-            viztrails=viztrails
+            viztrails=viztrails,
+            cache_size=config.engine.project_cache_size
         )
         # Get set of task processors for supported packages
         processors = load_processors(config.engine.processor_path)
@@ -261,7 +275,8 @@ def get_engine(config):
             backend = MultiProcessBackend(
                 processors=processors,
                 projects=projects,
-                synchronous=synchronous
+                synchronous=synchronous,
+                max_workers=config.engine.backend.multiprocess.workers
             )
         elif backend_id == base.BACKEND_CELERY:
             # Create and configure routing information (if given)
@@ -290,7 +305,44 @@ def get_engine(config):
         name=config.engine.identifier + ' (' + backend_id + ')',
         projects=projects,
         backend=backend,
-        packages=packages
+        packages=packages,
+        cache=get_result_cache(config)
+    )
+
+
+def get_result_cache(config):
+    """Get the cache for module execution results for a given configuration.
+    The list of excluded packages and commands is a colon separated list of
+    package identifiers and package.command strings. If the list is not given
+    the default exclusions are used.
+
+    Parameters
+    ----------
+    config: vizier.config.app.AppConfig
+        Application configuration object
+
+    Returns
+    -------
+    vizier.engine.cache.ExecResultCache
+    """
+    excluded_packages = None
+    excluded_commands = None
+    exclude_list = config.engine.result_cache_exclude
+    if not exclude_list is None:
+        excluded_packages = list()
+        excluded_commands = list()
+        for el in exclude_list.split(':'):
+            el = el.strip()
+            if el == '':
+                continue
+            elif '.' in el:
+                excluded_commands.append(el)
+            else:
+                excluded_packages.append(el)
+    return ExecResultCache(
+        capacity=config.engine.result_cache_size,
+        excluded_packages=excluded_packages,
+        excluded_commands=excluded_commands
     )
 
 
@@ -0,0 +1,127 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Cache for serialized dataset resources.
+
+Datasets are never modified after they have been created. A dataset that is
+updated by a workflow module is stored as a new dataset with a new identifier.
+The serialization of a page of dataset rows (or of a dataset descriptor)
+therefore never changes and can be reused for all requests for the same page.
+
+The page cache keeps serialized resources in memory up to a given memory
+budget. Entries are keyed by a tuple whose first two elements are the project
+and the dataset identifier. The least recently used entries are evicted first.
+"""
+
+from collections import OrderedDict
+
+import threading
+
+
+"""Default memory budget for cached pages (in byte)."""
+DEFAULT_PAGE_CACHE_SIZE = 64 * 1024 * 1024
+
+
+class PageCache(object):
+    """Least-recently-used cache for serialized dataset pages. The size of the
+    cache is limited by the total number of bytes in all cached pages. The
+    cache is thread-safe.
+    """
+    def __init__(self, capacity=DEFAULT_PAGE_CACHE_SIZE):
+        """Initialize the memory budget. A capacity that is zero or negative
+        disables the cache.
+
+        Parameters
+        ----------
+        capacity: int, optional
+            Maximum number of bytes in cached pages
+        """
+        self.capacity = capacity
+        self.size = 0
+        self.pages = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        """Number of pages in the cache.
+
+        Returns
+        -------
+        int
+        """
+        return len(self.pages)
+
+    def get(self, key):
+        """Get the cached page with the given key. The result is None if the
+        page is not in the cache.
+
+        Parameters
+        ----------
+        key: tuple
+            Unique page key
+
+        Returns
+        -------
+        bytes
+        """
+        with self.lock:
+            page = self.pages.get(key)
+            if not page is None:
+                self.pages.move_to_end(key)
+            return page
+
+    def put(self, key, page):
+        """Add a serialized page to the cache. Pages that are larger than the
+        cache capacity are ignored. Evicts the least recently used pages until
+        the cache size is within the memory budget.
+
+        Parameters
+        ----------
+        key: tuple
+            Unique page key
+        page: bytes
+            Serialized page
+        """
+        if len(page) > self.capacity:
+            return
+        with self.lock:
+            if key in self.pages:
+                self.size -= len(self.pages[key])
+            self.pages[key] = page
+            self.pages.move_to_end(key)
+            self.size += len(page)
+            while self.size > self.capacity:
+                _, evicted = self.pages.popitem(last=False)
+                self.size -= len(evicted)
+
+    def remove(self, project_id, dataset_id=None):
+        """Remove all cached pages for the given project. If a dataset is given
+        only the pages for that dataset are removed.
+
+        Parameters
+        ----------
+        project_id: string
+            Unique project identifier
+        dataset_id: string, optional
+            Unique dataset identifier
+        """
+        with self.lock:
+            for key in list(self.pages.keys()):
+                if key[0] != project_id:
+                    continue
+                if not dataset_id is None and key[1] != dataset_id:
+                    continue
+                self.size -= len(self.pages.pop(key))
@@ -24,6 +24,7 @@ from vizier.api.webservice.filestore import VizierFilestoreApi
 from vizier.api.webservice.view import VizierDatasetViewApi
 from vizier.core import VERSION_INFO
 from vizier.core.io.base import DefaultObjectStore
+from vizier.core.io.sqlite import SQLiteObjectStore
 from vizier.core.timestamp import get_current_time
 from vizier.core.util import get_short_identifier, get_unique_identifier
 from vizier.datastore.fs.factory import FileSystemDatastoreFactory
@@ -139,16 +140,26 @@ def get_engine(config):
     if not backend_id in base.BACKENDS:
         raise ValueError('unknown backend \'' + str(backend_id) + '\'')
     # Get the identifier factory for the viztrails repository and create
-    # the object store. At this point we use the default object store only.
-    # We could add another environment variable to use different object
-    # stores (once implemented).
+    # the object store. Raise ValueError if the value does not identify a
+    # valid object store.
     if config.engine.use_short_ids:
         id_factory = get_short_identifier
     else:
         id_factory = get_unique_identifier
-    object_store = DefaultObjectStore(
-        identifier_factory=id_factory
-    )
+    if config.engine.object_store == base.OBJECT_STORE_SQLITE:
+        object_store = SQLiteObjectStore(
+            database=os.path.join(
+                config.engine.data_dir,
+                app.DEFAULT_VIZTRAILS_DB
+            ),
+            identifier_factory=id_factory
+        )
+    elif config.engine.object_store == base.OBJECT_STORE_FS:
+        object_store = DefaultObjectStore(
+            identifier_factory=id_factory
+        )
+    else:
+        raise ValueError('unknown object store \'' + str(config.engine.object_store) + '\'')
     # By default the vizier engine uses the objectstore implementation for
     # the viztrails repository. The datastore and filestore factories depend
     # on the values of engine identifier (DEV or MIMIR).
@@ -21,15 +21,14 @@ the Vizier Container Web API that are documented in
 http://cds-swg1.cims.nyu.edu/doc/vizier-db-container/.
 """
 
-import csv
 import os
-import io
 
 from flask import Flask, jsonify, make_response, request, send_file
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 
 from vizier.api.routes.base import PAGE_LIMIT, PAGE_OFFSET
+from vizier.api.serialize.binary import MIMETYPE_DATASET_PAGE
 from vizier.api.webservice.container.base import VizierContainerApi
 from vizier.config.container import ContainerConfig
 from vizier.datastore.annotation.dataset import DatasetMetadata
@@ -204,14 +203,9 @@ def create_dataset():
     annotations = None
     if labels.ANNOTATIONS in obj:
         annotations = DatasetMetadata()
-        for anno in obj[labels.ANNOTATIONS]:
-            a = deserialize.ANNOTATION(anno)
-            if a.column_id is None:
-                annotations.rows.append(a)
-            elif a.row_id is None:
-                annotations.columns.append(a)
-            else:
-                annotations.cells.append(a)
+        annotations.add_all(
+            [deserialize.ANNOTATION(anno) for anno in obj[labels.ANNOTATIONS]]
+        )
     try:
         dataset = api.datasets.create_dataset(
             project_id=config.project_id,
@@ -227,18 +221,46 @@ def create_dataset():
 @app.route('/datasets/<string:dataset_id>')
 def get_dataset(dataset_id):
     """Get the dataset with given identifier that has been generated by a
-    curation workflow.
+    curation workflow. The dataset rows are returned in a compact binary
+    format if the client prefers it (via the Accept header) over Json.
+
+    Datasets are immutable. Serialized pages are cached and the response
+    supports conditional requests via the entity tag.
     """
-    # Get dataset rows with offset and limit parameters
+    # Get dataset rows with offset and limit parameters. Return the rows in
+    # the binary format if requested by the client.
+    offset = request.args.get(PAGE_OFFSET)
+    limit = request.args.get(PAGE_LIMIT)
     try:
-        dataset = api.datasets.get_dataset(
-            project_id=config.project_id,
-            dataset_id=dataset_id,
-            offset=request.args.get(PAGE_OFFSET),
-            limit=request.args.get(PAGE_LIMIT)
+        if srv.accepts_dataset_page(request):
+            mimetype = MIMETYPE_DATASET_PAGE
+            def serialize():
+                return api.datasets.get_dataset_page(
+                    project_id=config.project_id,
+                    dataset_id=dataset_id,
+                    offset=offset,
+                    limit=limit
+                )
+        else:
+            mimetype = 'application/json'
+            def serialize():
+                dataset = api.datasets.get_dataset(
+                    project_id=config.project_id,
+                    dataset_id=dataset_id,
+                    offset=offset,
+                    limit=limit
+                )
+                if not dataset is None:
+                    return jsonify(dataset).get_data()
+        response = srv.cached_response(
+            request,
+            key=(config.project_id, dataset_id, mimetype, offset, limit),
+            serialize=serialize,
+            mimetype=mimetype,
+            cache=api.datasets.pages
         )
-        if not dataset is None:
-            return jsonify(dataset)
+        if not response is None:
+            return response
     except ValueError as ex:
         raise srv.InvalidRequest(str(ex))
     raise srv.ResourceNotFound('unknown dataset \'' + dataset_id + '\'')
@@ -267,13 +289,23 @@ def get_dataset_annotations(dataset_id):
 @app.route('/datasets/<string:dataset_id>/descriptor')
 def get_dataset_descriptor(dataset_id):
     """Get the descriptor for the dataset with given identifier."""
-    try:
+    def serialize():
         dataset = api.datasets.get_dataset_descriptor(
             project_id=config.project_id,
             dataset_id=dataset_id
         )
         if not dataset is None:
-            return jsonify(dataset)
+            return jsonify(dataset).get_data()
+    try:
+        response = srv.cached_response(
+            request,
+            key=(config.project_id, dataset_id, 'descriptor'),
+            serialize=serialize,
+            mimetype='application/json',
+            cache=api.datasets.pages
+        )
+        if not response is None:
+            return response
     except ValueError as ex:
         raise srv.InvalidRequest(str(ex))
     raise srv.ResourceNotFound('unknown dataset \'' + dataset_id + '\'')
@@ -326,25 +358,17 @@ def update_dataset_annotation(dataset_id):
 
 @app.route('/datasets/<string:dataset_id>/csv')
 def download_dataset(dataset_id):
-    """Get the dataset with given identifier in CSV format.
+    """Get the dataset with given identifier in CSV (or TSV) format. The
+    response is streamed. Optional request arguments select the file format,
+    a subset of columns, and a range of rows.
     """
     # Get the handle for the dataset with given identifier. The result is None
     # if no dataset with given identifier exists.
     _, dataset = api.datasets.get_dataset_handle(config.project_id, dataset_id)
     if dataset is None:
         raise srv.ResourceNotFound('unknown dataset \'' + dataset_id + '\'')
-    # Read the dataset into a string buffer in memory
-    si = io.StringIO()
-    cw = csv.writer(si)
-    cw.writerow([col.name for col in dataset.columns])
-    with dataset.reader() as reader:
-        for row in reader:
-            cw.writerow(row.values)
-    # Return the CSV file file
-    output = make_response(si.getvalue())
-    output.headers["Content-Disposition"] = "attachment; filename=export.csv"
-    output.headers["Content-type"] = "text/csv"
-    return output
+    # Stream the dataset rows in the requested format
+    return srv.stream_dataset(request, dataset)
 
 
 # ------------------------------------------------------------------------------
@@ -18,15 +18,20 @@
 the datastores that are associated with vizier projects.
 """
 
+from vizier.api.webservice.cache import PageCache
 from vizier.core.util import is_scalar
 from vizier.datastore.annotation.dataset import DatasetMetadata
 
+import vizier.api.serialize.binary as binary
 import vizier.api.serialize.dataset as serialize
 
 
 class VizierDatastoreApi(object):
     """The Vizier datastore API implements the methods that correspond to
     requests that access and manipulate datasets and their annotations.
+
+    Serialized dataset pages and descriptors are kept in a page cache. Dataset
+    annotations are not cached since they may be updated.
     """
     def __init__(self, projects, urls, defaults):
         """Initialize the API components.
@@ -43,6 +48,8 @@ class VizierDatastoreApi(object):
         self.projects = projects
         self.urls = urls
         self.defaults = defaults
+        # Cache for serialized dataset pages and descriptors
+        self.pages = PageCache(capacity=defaults.page_cache_size)
 
     def create_dataset(self, project_id, columns, rows, annotations=None):
         """Create a new dataset in the datastore for the given project. Expects
@@ -157,19 +164,7 @@ class VizierDatastoreApi(object):
         project, dataset = self.get_dataset_handle(project_id, dataset_id)
         if dataset is None:
             return None
-        # Determine offset and limits
-        if not offset is None:
-            offset = max(0, int(offset))
-        else:
-            offset = 0
-        if not limit is None:
-            result_size = int(limit)
-        else:
-            result_size = self.defaults.row_limit
-        if result_size < 0 and self.defaults.max_row_limit > 0:
-            result_size = self.defaults.max_row_limit
-        elif self.defaults.max_row_limit >= 0:
-            result_size = min(result_size, self.defaults.max_row_limit)
+        offset, result_size = self.get_page_range(offset=offset, limit=limit)
         # Serialize the dataset schema and cells
         return serialize.DATASET_HANDLE(
             project=project,
@@ -235,6 +230,65 @@ class VizierDatastoreApi(object):
             return None, None
         return project, project.datastore.get_dataset(dataset_id)
 
+    def get_dataset_page(self, project_id, dataset_id, offset=None, limit=None):
+        """Get a page of rows for the dataset with given identifier in the
+        compact binary format. The result is None if no dataset with the given
+        identifier exists.
+
+        Parameters
+        ----------
+        project_id : string
+            Unique project identifier
+        dataset_id : string
+            Unique dataset identifier
+        offset: int, optional
+            Number of rows at the beginning of the list that are skipped.
+        limit: int, optional
+            Limits the number of rows that are returned.
+
+        Returns
+        -------
+        bytes
+        """
+        _, dataset = self.get_dataset_handle(project_id, dataset_id)
+        if dataset is None:
+            return None
+        offset, result_size = self.get_page_range(offset=offset, limit=limit)
+        return binary.DATASET_PAGE(
+            dataset=dataset,
+            rows=dataset.fetch_rows(offset=offset, limit=result_size),
+            offset=offset
+        )
+
+    def get_page_range(self, offset=None, limit=None):
+        """Get the offset and the number of rows for a requested page of
+        dataset rows. Applies the web service defaults for the row limit.
+
+        Parameters
+        ----------
+        offset: int, optional
+            Number of rows at the beginning of the list that are skipped.
+        limit: int, optional
+            Limits the number of rows that are returned.
+
+        Returns
+        -------
+        int, int
+        """
+        if not offset is None:
+            offset = max(0, int(offset))
+        else:
+            offset = 0
+        if not limit is None:
+            result_size = int(limit)
+        else:
+            result_size = self.defaults.row_limit
+        if result_size < 0 and self.defaults.max_row_limit > 0:
+            result_size = self.defaults.max_row_limit
+        elif self.defaults.max_row_limit >= 0:
+            result_size = min(result_size, self.defaults.max_row_limit)
+        return offset, result_size
+
     def update_annotation(
         self, project_id, dataset_id, column_id=None, row_id=None, key=None,
         old_value=None, new_value=None
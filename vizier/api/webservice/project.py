@@ -30,8 +30,10 @@ class VizierProjectApi(object):
     """The Vizier project API implements the methods that correspond to
     requests that access and manipulate projects.
     """
-    def __init__(self, projects, urls):
-        """Initialize the API components.
+    def __init__(self, projects, urls, engine=None):
+        """Initialize the API components. If the vizier engine is given,
+        projects are deleted via the engine so that the engine can release
+        resources that it maintains for the project.
 
         Parameters
         ----------
@@ -39,9 +41,12 @@ class VizierProjectApi(object):
             Cache for project handles
         urls: vizier.api.routes.base.UrlFactory
             Factory for resource urls
+        engine: vizier.engine.base.VizierEngine, optional
+            Vizier engine that executes project workflows
         """
         self.projects = projects
         self.urls = urls
+        self.engine = engine
 
     def create_project(self, properties):
         """Create a new project. All the information about a project is
@@ -76,6 +81,8 @@ class VizierProjectApi(object):
         """
         # Delete entry in repository. The result indicates whether the project
         # existed or not.
+        if not self.engine is None:
+            return self.engine.delete_project(project_id)
         return self.projects.delete_project(project_id)
 
     def get_project(self, project_id):
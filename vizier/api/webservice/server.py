@@ -20,15 +20,15 @@ for the Vizier Web API as documented in:
     http://cds-swg1.cims.nyu.edu/vizier/api/v1/doc/
 """
 
-import csv
 import os
-import io
-import tarfile
+import tempfile
 
-from flask import Blueprint, jsonify, make_response, request, send_file, send_from_directory
+from flask import Blueprint, Response, jsonify, request, send_file, send_from_directory
+from flask import stream_with_context
 from werkzeug.utils import secure_filename
 
 from vizier.api.routes.base import PAGE_LIMIT, PAGE_OFFSET
+from vizier.api.serialize.binary import MIMETYPE_DATASET_PAGE
 from vizier.api.webservice.base import VizierApi
 from vizier.config.app import AppConfig
 from vizier.datastore.annotation.dataset import DatasetMetadata
@@ -37,8 +37,8 @@ import vizier.api.base as srv
 import vizier.api.serialize.deserialize as deserialize
 import vizier.api.serialize.labels as labels
 import vizier.config.app as app
+import vizier.engine.project.archive as archive
 import pkg_resources
-import json
 
 # -----------------------------------------------------------------------------
 #
@@ -48,6 +48,9 @@ import json
 """Get application configuration parameters from environment variables."""
 config = AppConfig()
 
+"""Maximum size of uploaded project archives that are kept in memory."""
+UPLOAD_SPOOL_SIZE = 16 * 1024 * 1024
+
 webui_file_dir = os.getenv('WEB_UI_STATIC_FILES', "./web-ui/build/")#pkg_resources.resource_filename(__name__, os.getenv('WEB_UI_STATIC_FILES', "./web-ui/build/"))
 print(webui_file_dir)
 
@@ -125,30 +128,36 @@ def static_files(path):
 
 @bp.route('/projects/<string:project_id>/export')
 def export_project(project_id):
-    """Export the project data files as tar.gz.
+    """Export the project data files as tar.gz. The archive is streamed. If
+    the optional request argument 'base' contains the identifier of a
+    previous export snapshot, only files that are not part of the snapshot
+    (or that have been modified since) are exported. The snapshot identifier
+    for the export is returned in the response header.
     """
-    # Get the handle for the dataset with given identifier. The result is None
-    # if no dataset with given identifier exists.
-    base_dir = config.engine.data_dir
-    vistrails_dir  = os.path.join(base_dir, app.DEFAULT_VIZTRAILS_DIR)
-    filestores_dir = os.path.join(base_dir, app.DEFAULT_FILESTORES_DIR)
-    datastores_dir = os.path.join(base_dir, app.DEFAULT_DATASTORES_DIR)
-    si = io.BytesIO()
-    with tarfile.open(fileobj=si, mode="w:gz") as tar:
-        tar.add(datastores_dir+os.path.sep+project_id, arcname=os.path.sep+"ds"+os.path.sep+project_id+os.path.sep)
-        tar.add(filestores_dir+os.path.sep+project_id, arcname=os.path.sep+"fs"+os.path.sep+project_id+os.path.sep)
-        tar.add(vistrails_dir+os.path.sep+project_id, arcname=os.path.sep+"vt"+os.path.sep+project_id+os.path.sep)
-    
-    # Return the tar file 
-    output = make_response(si.getvalue())
+    try:
+        result = archive.export_project(
+            base_dir=config.engine.data_dir,
+            project_id=project_id,
+            base_snapshot=request.args.get(archive.KEY_BASE),
+            object_store=api.engine.projects.viztrails.object_store
+        )
+    except ValueError as ex:
+        raise srv.InvalidRequest(str(ex))
+    if result is None:
+        raise srv.ResourceNotFound('unknown project \'' + project_id + '\'')
+    snapshot_id, content = result
+    # Return the tar file
+    output = Response(stream_with_context(content), mimetype='application/x-gzip')
     output.headers["Content-Disposition"] = "attachment; filename="+project_id+".tar.gz"
-    output.headers["Content-type"] = "application/x-gzip"
+    output.headers["X-Vizier-Snapshot"] = snapshot_id
     return output
 
 @bp.route('/projects/import', methods=['POST'])
 def import_project():
-    """Upload file (POST) - Upload a data files for a project.
+    """Upload file (POST) - Upload a data files for a project. The archive is
+    spooled to disk and extracted in a single pass.
     """
+    global api
     # The upload request may contain a file object or an Url from where to
     # download the data.
     if request.files and 'file' in request.files:
@@ -156,53 +165,16 @@ def import_project():
         # A browser may submit a empty part without filename
         if file.filename == '':
             raise srv.InvalidRequest('empty file name')
-        # Save uploaded file to temp directory
-        filename = secure_filename(file.filename)
         try:
             base_dir = config.engine.data_dir
-            vistrails_dir  = os.path.join(base_dir, app.DEFAULT_VIZTRAILS_DIR)
-            filestores_dir = os.path.join(base_dir, app.DEFAULT_FILESTORES_DIR)
-            datastores_dir = os.path.join(base_dir, app.DEFAULT_DATASTORES_DIR)
-            si = io.BytesIO()
-            file.save(dst=si)
-            si.seek(0)
-            project_id = ""
-            with tarfile.open(fileobj=si, mode="r:gz") as tar:
-                for tarinfo in tar:
-                    if tarinfo.name.startswith("ds/"):
-                        project_id = tarinfo.name.split('/')[1]
-                        break
-
-                vtfpath = base_dir+os.path.sep+"vt"+os.path.sep+"viztrails"
-                with open(vtfpath, "r") as vtf:
-                    vt_index_js = json.load(vtf)
-                if project_id in vt_index_js:
-                    raise srv.InvalidRequest("This project already exists.")
-            
-                def ds_files(members):
-                    for tarinfo in members:
-                        if tarinfo.name.startswith("ds/"):
-                            yield tarinfo
-                
-                def fs_files(members):
-                    for tarinfo in tar:
-                        if tarinfo.name.startswith("fs/"):
-                            yield tarinfo
-                
-                def vt_files(members):
-                    for tarinfo in tar:
-                        if tarinfo.name.startswith("vt/"):
-                            yield tarinfo
-                
-                
-                tar.extractall(path=base_dir,members=ds_files(tar))
-                tar.extractall(path=base_dir,members=fs_files(tar))
-                tar.extractall(path=base_dir,members=vt_files(tar))
-
-            with open(vtfpath, "w") as vtf:
-                json.dump(vt_index_js + [project_id], vtf)
-
-            global api
+            with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE) as si:
+                file.save(dst=si)
+                si.seek(0)
+                project_id = archive.import_project(
+                    base_dir,
+                    si,
+                    object_store=api.engine.projects.viztrails.object_store
+                )
             api = VizierApi(config, init=True)
             pj = api.projects.get_project(project_id)
             if not pj is None:
@@ -234,6 +206,8 @@ def get_project(project_id):
 def delete_project(project_id):
     """Delete an existing project."""
     if api.projects.delete_project(project_id):
+        api.datasets.pages.remove(project_id)
+        archive.delete_snapshots(config.engine.data_dir, project_id)
         return '', 204
     raise srv.ResourceNotFound('unknown project \'' + project_id + '\'')
 
@@ -667,14 +641,9 @@ def create_dataset(project_id):
     annotations = None
     if labels.ANNOTATIONS in obj:
         annotations = DatasetMetadata()
-        for anno in obj[labels.ANNOTATIONS]:
-            a = deserialize.ANNOTATION(anno)
-            if a.column_id is None:
-                annotations.rows.append(a)
-            elif a.row_id is None:
-                annotations.columns.append(a)
-            else:
-                annotations.cells.append(a)
+        annotations.add_all(
+            [deserialize.ANNOTATION(anno) for anno in obj[labels.ANNOTATIONS]]
+        )
     try:
         dataset = api.datasets.create_dataset(
             project_id=project_id,
@@ -692,18 +661,46 @@ def create_dataset(project_id):
 @bp.route('/projects/<string:project_id>/datasets/<string:dataset_id>')
 def get_dataset(project_id, dataset_id):
     """Get the dataset with given identifier that has been generated by a
-    curation workflow.
+    curation workflow. The dataset rows are returned in a compact binary
+    format if the client prefers it (via the Accept header) over Json.
+
+    Datasets are immutable. Serialized pages are cached and the response
+    supports conditional requests via the entity tag.
     """
-    # Get dataset rows with offset and limit parameters
+    # Get dataset rows with offset and limit parameters. Return the rows in
+    # the binary format if requested by the client.
+    offset = request.args.get(PAGE_OFFSET)
+    limit = request.args.get(PAGE_LIMIT)
     try:
-        dataset = api.datasets.get_dataset(
-            project_id=project_id,
-            dataset_id=dataset_id,
-            offset=request.args.get(PAGE_OFFSET),
-            limit=request.args.get(PAGE_LIMIT)
+        if srv.accepts_dataset_page(request):
+            mimetype = MIMETYPE_DATASET_PAGE
+            def serialize():
+                return api.datasets.get_dataset_page(
+                    project_id=project_id,
+                    dataset_id=dataset_id,
+                    offset=offset,
+                    limit=limit
+                )
+        else:
+            mimetype = 'application/json'
+            def serialize():
+                dataset = api.datasets.get_dataset(
+                    project_id=project_id,
+                    dataset_id=dataset_id,
+                    offset=offset,
+                    limit=limit
+                )
+                if not dataset is None:
+                    return jsonify(dataset).get_data()
+        response = srv.cached_response(
+            request,
+            key=(project_id, dataset_id, mimetype, offset, limit),
+            serialize=serialize,
+            mimetype=mimetype,
+            cache=api.datasets.pages
         )
-        if not dataset is None:
-            return jsonify(dataset)
+        if not response is None:
+            return response
     except ValueError as ex:
         raise srv.InvalidRequest(str(ex))
     raise srv.ResourceNotFound('unknown project \'' + project_id + '\' or dataset \'' + dataset_id + '\'')
@@ -732,13 +729,23 @@ def get_dataset_annotations(project_id, dataset_id):
 @bp.route('/projects/<string:project_id>/datasets/<string:dataset_id>/descriptor')
 def get_dataset_descriptor(project_id, dataset_id):
     """Get the descriptor for the dataset with given identifier."""
-    try:
+    def serialize():
         dataset = api.datasets.get_dataset_descriptor(
             project_id=project_id,
             dataset_id=dataset_id
         )
         if not dataset is None:
-            return jsonify(dataset)
+            return jsonify(dataset).get_data()
+    try:
+        response = srv.cached_response(
+            request,
+            key=(project_id, dataset_id, 'descriptor'),
+            serialize=serialize,
+            mimetype='application/json',
+            cache=api.datasets.pages
+        )
+        if not response is None:
+            return response
     except ValueError as ex:
         raise srv.InvalidRequest(str(ex))
     raise srv.ResourceNotFound('unknown project \'' + project_id + '\' or dataset \'' + dataset_id + '\'')
@@ -791,25 +798,17 @@ def update_dataset_annotation(project_id, dataset_id):
 
 @bp.route('/projects/<string:project_id>/datasets/<string:dataset_id>/csv')
 def download_dataset(project_id, dataset_id):
-    """Get the dataset with given identifier in CSV format.
+    """Get the dataset with given identifier in CSV (or TSV) format. The
+    response is streamed. Optional request arguments select the file format,
+    a subset of columns, and a range of rows.
     """
     # Get the handle for the dataset with given identifier. The result is None
     # if no dataset with given identifier exists.
     _, dataset = api.datasets.get_dataset_handle(project_id, dataset_id)
     if dataset is None:
         raise srv.ResourceNotFound('unknown project \'' + project_id + '\' or dataset \'' + dataset_id + '\'')
-    # Read the dataset into a string buffer in memory
-    si = io.StringIO()
-    cw = csv.writer(si)
-    cw.writerow([col.name for col in dataset.columns])
-    with dataset.reader() as reader:
-        for row in reader:
-            cw.writerow(row.values)
-    # Return the CSV file file
-    output = make_response(si.getvalue())
-    output.headers["Content-Disposition"] = "attachment; filename=export.csv"
-    output.headers["Content-type"] = "text/csv"
-    return output
+    # Stream the dataset rows in the requested format
+    return srv.stream_dataset(request, dataset)
 
 
 # ------------------------------------------------------------------------------
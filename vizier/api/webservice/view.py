@@ -106,7 +106,11 @@ class VizierDatasetViewApi(object):
         else:
             dataset_id = module.datasets[chart.dataset_name].identifier
             dataset = project.datastore.get_dataset(dataset_id)
-            rows = ChartQuery.exec_query(dataset=dataset, view=chart)
+            rows = ChartQuery.exec_query(
+                dataset=dataset,
+                view=chart,
+                cache=project.datastore.get_chart_cache()
+            )
             data = CHART_VIEW_DATA(view=chart, rows=rows)
         return serialize.CHART_VIEW(
             project_id=project_id,
@@ -33,6 +33,7 @@ webservice:
         row_limit: Default row limit for requests that read datasets
         max_row_limit: Maximum row limit for requests that read datasets (-1 = all)
         max_file_size: Maximum size for file uploads (in byte)
+        page_cache_size: Memory budget for cached dataset pages (in byte)
 engine:
     identifier: Unique engine configuration identifier
     data_dir
@@ -40,10 +41,16 @@ engine:
     processor_path: Path to folders containing processor definitions
     sync_commands
     use_short_ids
+    object_store: Object store for viztrail resources (FS or SQLITE)
+    project_cache_size: Maximum number of projects with loaded workflows
+    result_cache_size: Maximum number of cached module results per project
+    result_cache_exclude: Packages and commands whose results are not cached
     backend:
         identifier: Unique backend identifier
         celery:
             routes: Optional routing infformation for celery workers
+        multiprocess:
+            workers: Maximum number of worker processes (default: number of CPUs)
         container:
             ports: First port number for new project containers
             image: Identifier of the project container docker image
@@ -86,6 +93,9 @@ VIZIERSERVER_ROW_LIMIT = 'VIZIERSERVER_ROW_LIMIT'
 VIZIERSERVER_MAX_ROW_LIMIT = 'VIZIERSERVER_MAX_ROW_LIMIT'
 # Maximum size for file uploads in byte (DEFAULT: 16777216)
 VIZIERSERVER_MAX_UPLOAD_SIZE = 'VIZIERSERVER_MAX_UPLOAD_SIZE'
+# Memory budget in byte for the cache of serialized dataset pages (0 disables
+# the cache) (DEFAULT: 67108864)
+VIZIERSERVER_PAGE_CACHE_SIZE = 'VIZIERSERVER_PAGE_CACHE_SIZE'
 
 """Workflow Execution Engine"""
 # Name of the workflow execution engine (DEFAULT: DEV_LOCAL)
@@ -107,12 +117,30 @@ VIZIERENGINE_BACKEND = "VIZIERENGINE_BACKEND"
 VIZIERENGINE_SYNCHRONOUS = 'VIZIERENGINE_SYNCHRONOUS'
 # Flag indicationg whether short identifier are used by the viztrail repository
 VIZIERENGINE_USE_SHORT_IDENTIFIER = 'VIZIERENGINE_USE_SHORT_IDENTIFIER'
+# Object store for viztrail resources. FS maintains every resource as a
+# separate file, SQLITE maintains all resources in a single database file
+# (DEFAULT: FS)
+VIZIERENGINE_OBJECT_STORE = 'VIZIERENGINE_OBJECT_STORE'
+# Maximum number of projects whose workflows are kept in memory. Workflows of
+# the least recently used projects are released (0 = no limit) (DEFAULT: 64)
+VIZIERENGINE_PROJECT_CACHE_SIZE = 'VIZIERENGINE_PROJECT_CACHE_SIZE'
+# Maximum number of cached module execution results per project (0 disables
+# the cache) (DEFAULT: 1000)
+VIZIERENGINE_RESULT_CACHE_SIZE = 'VIZIERENGINE_RESULT_CACHE_SIZE'
+# Colon separated list of package identifiers and package.command strings that
+# identify commands whose results are not cached. Replaces the default list
+# of non-deterministic packages and commands if given.
+VIZIERENGINE_RESULT_CACHE_EXCLUDE = 'VIZIERENGINE_RESULT_CACHE_EXCLUDE'
 
 """Celery backend"""
 # Colon separated list of package.command=queue strings that define routing
 # information for individual commands
 VIZIERENGINE_CELERY_ROUTES = 'VIZIERENGINE_CELERY_ROUTES'
 
+"""Multi-process backend"""
+# Maximum number of worker processes (DEFAULT: number of CPUs)
+VIZIERENGINE_MULTIPROCESS_WORKERS = 'VIZIERENGINE_MULTIPROCESS_WORKERS'
+
 """Container backend"""
 # First port number for new project containers. All following containers will
 # have higher port numbers
@@ -134,14 +162,20 @@ DEFAULT_SETTINGS = {
     VIZIERSERVER_ROW_LIMIT: 25,
     VIZIERSERVER_MAX_ROW_LIMIT: base.DEFAULT_MAX_ROW_LIMIT,
     VIZIERSERVER_MAX_UPLOAD_SIZE: 16 * 1024 * 1024,
+    VIZIERSERVER_PAGE_CACHE_SIZE: 64 * 1024 * 1024,
     VIZIERSERVER_ENGINE: base.MIMIR_ENGINE,
     VIZIERSERVER_PACKAGE_PATH: './resources/packages/common:./resources/packages/mimir',
     VIZIERSERVER_PROCESSOR_PATH: './resources/processors/common:./resources/processors/mimir',
     VIZIERENGINE_DATA_DIR: base.ENV_DIRECTORY,
     VIZIERENGINE_BACKEND: base.BACKEND_MULTIPROCESS,
     VIZIERENGINE_USE_SHORT_IDENTIFIER: True,
+    VIZIERENGINE_OBJECT_STORE: base.OBJECT_STORE_FS,
+    VIZIERENGINE_PROJECT_CACHE_SIZE: 64,
+    VIZIERENGINE_RESULT_CACHE_SIZE: 1000,
+    VIZIERENGINE_RESULT_CACHE_EXCLUDE: None,
     VIZIERENGINE_SYNCHRONOUS: None,
     VIZIERENGINE_CELERY_ROUTES: None,
+    VIZIERENGINE_MULTIPROCESS_WORKERS: None,
     VIZIERENGINE_CONTAINER_PORTS: list(range(20171, 20271)),
     VIZIERENGINE_CONTAINER_IMAGE: 'heikomueller/vizierapi:container',
     'doc_url': 'http://cds-swg1.cims.nyu.edu/doc/vizier-db/'
@@ -154,6 +188,7 @@ data directory.
 DEFAULT_DATASTORES_DIR = 'ds'
 DEFAULT_FILESTORES_DIR = 'fs'
 DEFAULT_VIZTRAILS_DIR = 'vt'
+DEFAULT_VIZTRAILS_DB = 'vt.db'
 
 DEFAULT_CONTAINER_FILE = 'containers'
 
@@ -179,6 +214,7 @@ class AppConfig(object):
                 row_limit
                 max_row_limit
                 max_file_size
+                page_cache_size
         engine:
             identifier
             data_dir
@@ -186,10 +222,16 @@ class AppConfig(object):
             processor_path
             sync_commands
             use_short_ids
+            object_store
+            project_cache_size
+            result_cache_size
+            result_cache_exclude
             backend:
                 identifier
                 celery:
                     routes
+                multiprocess:
+                    workers
                 container:
                     ports
                     image
@@ -221,7 +263,8 @@ class AppConfig(object):
             attributes=[
                 ('row_limit', VIZIERSERVER_ROW_LIMIT, base.INTEGER),
                 ('max_row_limit', VIZIERSERVER_MAX_ROW_LIMIT, base.INTEGER),
-                ('max_file_size', VIZIERSERVER_MAX_UPLOAD_SIZE, base.INTEGER)
+                ('max_file_size', VIZIERSERVER_MAX_UPLOAD_SIZE, base.INTEGER),
+                ('page_cache_size', VIZIERSERVER_PAGE_CACHE_SIZE, base.INTEGER)
             ],
             default_values=default_values
         )
@@ -234,6 +277,10 @@ class AppConfig(object):
                 ('package_path', VIZIERSERVER_PACKAGE_PATH, base.STRING),
                 ('processor_path', VIZIERSERVER_PROCESSOR_PATH, base.STRING),
                 ('use_short_ids', VIZIERENGINE_USE_SHORT_IDENTIFIER, base.BOOL),
+                ('object_store', VIZIERENGINE_OBJECT_STORE, base.STRING),
+                ('project_cache_size', VIZIERENGINE_PROJECT_CACHE_SIZE, base.INTEGER),
+                ('result_cache_size', VIZIERENGINE_RESULT_CACHE_SIZE, base.INTEGER),
+                ('result_cache_exclude', VIZIERENGINE_RESULT_CACHE_EXCLUDE, base.STRING),
                 ('sync_commands', VIZIERENGINE_SYNCHRONOUS, base.STRING)
             ],
             default_values=default_values
@@ -249,6 +296,14 @@ class AppConfig(object):
             default_values=default_values
         )
         setattr(backend, 'celery', celery)
+        # engine.backend.multiprocess
+        multiprocess = base.ConfigObject(
+            attributes=[
+                ('workers', VIZIERENGINE_MULTIPROCESS_WORKERS, base.INTEGER)
+            ],
+            default_values=default_values
+        )
+        setattr(backend, 'multiprocess', multiprocess)
         # engine.backend.container
         container = base.ConfigObject(
             attributes=[
@@ -31,6 +31,13 @@ BACKEND_MULTIPROCESS = 'MULTIPROCESS'
 BACKENDS = [BACKEND_CELERY, BACKEND_CONTAINER, BACKEND_MULTIPROCESS]
 
 
+"""Identifier for supported object stores of the viztrails repository."""
+OBJECT_STORE_FS = 'FS'
+OBJECT_STORE_SQLITE = 'SQLITE'
+
+OBJECT_STORES = [OBJECT_STORE_FS, OBJECT_STORE_SQLITE]
+
+
 """Default engines."""
 CONTAINER_ENGINE = 'CLUSTER'
 DEV_ENGINE = 'DEV'
@@ -31,6 +31,7 @@ webservice:
         row_limit
         max_row_limit
         max_file_size
+        page_cache_size
 engine:
     identifier
     package_path
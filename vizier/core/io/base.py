@@ -19,6 +19,7 @@ write resources as Json objects.
 """
 
 from abc import abstractmethod
+from contextlib import contextmanager
 
 import json
 import os
@@ -197,6 +198,42 @@ class ObjectStore(object):
         """
         raise NotImplementedError
 
+    def read_objects(self, object_paths):
+        """Read a batch of Json documents. Returns a dictionary that maps the
+        given object paths to the document content. Objects that do not exist
+        or that cannot be read are not included in the result.
+
+        The default implementation reads one object at a time. Stores that
+        support batched reads should override this method.
+
+        Parameters
+        ----------
+        object_paths: list(string)
+            Path identifier for resource objects
+
+        Returns
+        -------
+        dict
+        """
+        result = dict()
+        for object_path in object_paths:
+            try:
+                result[object_path] = self.read_object(object_path)
+            except ValueError:
+                pass
+        return result
+
+    @contextmanager
+    def transaction(self):
+        """Context manager for a group of modifications that are committed
+        atomically. Transactions may be nested. Only the outermost transaction
+        commits the modifications.
+
+        The default implementation does not provide atomicity, i.e., every
+        modification takes effect immediately.
+        """
+        yield self
+
     @abstractmethod
     def write_object(self, object_path, content):
         """Write content as Json document to given path.
@@ -453,6 +490,50 @@ class DefaultObjectStore(ObjectStore):
 # Helper Methods
 # ------------------------------------------------------------------------------
 
+def copy_folder(source, target, folder_path):
+    """Copy all objects and subfolders in the given folder from the source
+    object store to the target object store. The copy is executed as a single
+    transaction in the target store. Returns the number of copied objects.
+
+    Objects that exist but cannot be read from the source (e.g., empty
+    objects) are created without content.
+
+    Parameters
+    ----------
+    source: vizier.core.io.base.ObjectStore
+        Object store that is read
+    target: vizier.core.io.base.ObjectStore
+        Object store that is written
+    folder_path: string
+        Path to the copied folder. The path is the same in both stores
+
+    Returns
+    -------
+    int
+    """
+    count = 0
+    with target.transaction():
+        folders = [folder_path]
+        while len(folders) > 0:
+            folder = folders.pop()
+            target.list_folders(folder, create=True)
+            object_ids = source.list_objects(folder)
+            objects = source.read_objects(
+                [source.join(folder, obj_id) for obj_id in object_ids]
+            )
+            for obj_id in object_ids:
+                target.create_object(
+                    parent_folder=folder,
+                    identifier=obj_id,
+                    content=objects.get(source.join(folder, obj_id))
+                )
+                count += 1
+            for folder_id in source.list_folders(folder, create=False):
+                target.create_folder(folder, identifier=folder_id)
+                folders.append(source.join(folder, folder_id))
+    return count
+
+
 def read_object_from_file(filename):
     """Read dictionary serialization from file. The file format is expected to
     by Yaml unless the filename ends with .json.
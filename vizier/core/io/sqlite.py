@@ -0,0 +1,450 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Object store that maintains all objects and folders in a single SQLite
+database file.
+
+Compared to the default object store, which keeps every object in a separate
+file, the SQLite store avoids a file open for each object that is read or
+written. Batches of objects are read using a single query and groups of
+modifications can be committed atomically as a single transaction.
+
+Resource paths are stored relative to the base path of the store. The
+database therefore remains valid if the data directory is moved.
+"""
+
+from contextlib import contextmanager
+
+import json
+import os
+import sqlite3
+import threading
+
+from vizier.core.io.base import ObjectStore, MAX_ATTEMPS
+from vizier.core.io.base import PARA_KEEP_DELETED, PARA_LONG_IDENTIFIER
+from vizier.core.util import get_short_identifier, get_unique_identifier
+
+
+"""Maximum number of objects that are read by a single query."""
+READ_BATCH_SIZE = 500
+
+"""Database schema."""
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS folders('
+    'path TEXT PRIMARY KEY, parent TEXT NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS objects('
+    'path TEXT PRIMARY KEY, parent TEXT NOT NULL, content TEXT)',
+    'CREATE INDEX IF NOT EXISTS folders_parent ON folders(parent)',
+    'CREATE INDEX IF NOT EXISTS objects_parent ON objects(parent)'
+]
+
+
+class SQLiteObjectStore(ObjectStore):
+    """Object store that maintains objects as Json documents in a SQLite
+    database. Folders are maintained as rows in a separate table. The same
+    connection is shared by all threads. Access to the connection is
+    synchronized.
+    """
+    def __init__(
+        self, database, base_path=None, properties=None,
+        identifier_factory=None, keep_deleted_files=False
+    ):
+        """Initialize the database connection, the identifier_factory, and the
+        keep_deleted_files flag. The database is created if it does not exist.
+        By default the get_unique_identifier function is used to generate new
+        folder and resource identifier.
+
+        Parameters
+        ----------
+        database: string
+            Path to the database file
+        base_path: string, optional
+            Directory that resource paths are relative to. By default, the
+            directory that contains the database file is used.
+        properties: dict
+            Dictionary for object properties. Overwrites the default values.
+        identifier_factory: func, optional
+            Function to create a new unique identifier
+        keep_deleted_files: bool, optional
+            Flag indicating whether objects and folders are actually deleted
+            or not
+        """
+        self.database = os.path.abspath(database)
+        if base_path is None:
+            base_path = os.path.dirname(self.database)
+        self.base_path = os.path.abspath(base_path)
+        self.identifier_factory = identifier_factory if not identifier_factory is None else get_unique_identifier
+        self.keep_deleted_files = keep_deleted_files
+        if not properties is None:
+            if PARA_KEEP_DELETED in properties:
+                self.keep_deleted_files = properties[PARA_KEEP_DELETED]
+            if PARA_LONG_IDENTIFIER in properties and not properties[PARA_LONG_IDENTIFIER]:
+                self.identifier_factory = get_short_identifier
+        db_dir = os.path.dirname(self.database)
+        if not os.path.isdir(db_dir):
+            os.makedirs(db_dir)
+        # Transactions are controlled explicitly. Outside of a transaction
+        # every statement is committed immediately.
+        self.con = sqlite3.connect(
+            self.database,
+            check_same_thread=False,
+            isolation_level=None
+        )
+        self.con.execute('PRAGMA journal_mode=WAL')
+        self.con.execute('PRAGMA synchronous=NORMAL')
+        for stmt in SCHEMA:
+            self.con.execute(stmt)
+        self.lock = threading.RLock()
+        self.tx_depth = 0
+
+    def create_folder(self, parent_folder, identifier=None):
+        """Create a new folder in the given parent folder. The folder name is
+        either given as the identifier argument or a new unique identifier is
+        created if the argument is None. Returns the identifier for the created
+        folder.
+
+        Parameters
+        ----------
+        parent_folder: string
+            Path to parent folder
+        identifier: string, optional
+            Folder identifier
+
+        Returns
+        -------
+        string
+        """
+        with self.lock:
+            count = 0
+            while identifier is None:
+                # Allow repeated calls to the identifier factory until an
+                # identifier is returned that does not reference an existing
+                # folder. The max. attemps counter is used to avoid an endless
+                # loop.
+                candidate = self.identifier_factory()
+                if not self.exists(self.join(parent_folder, candidate)):
+                    identifier = candidate
+                else:
+                    count += 1
+                    if count >= MAX_ATTEMPS:
+                        raise RuntimeError('could not generate unique identifier')
+            self.con.execute(
+                'INSERT OR IGNORE INTO folders(path, parent) VALUES(?, ?)',
+                (
+                    self.get_key(self.join(parent_folder, identifier)),
+                    self.get_key(parent_folder)
+                )
+            )
+        return identifier
+
+    def create_object(self, parent_folder, identifier=None, content=None):
+        """Create a new object in the given parent folder. The object path is
+        either given as the identifier argument or a new unique identifier is
+        created if the argument is None. Returns the path for the created
+        object.
+
+        Parameters
+        ----------
+        parent_folder: string
+            Path to parent folder
+        identifier: string, optional
+            Folder identifier
+        content: list or dict, optional
+            Default content for the new resource
+
+        Returns
+        -------
+        string
+        """
+        with self.lock:
+            count = 0
+            while identifier is None:
+                # Allow repeated calls to the identifier factory until an
+                # identifier is returned that does not reference an existing
+                # object. The max. attemps counter is used to avoid an endless
+                # loop.
+                candidate = self.identifier_factory()
+                if not self.exists(self.join(parent_folder, candidate)):
+                    identifier = candidate
+                else:
+                    count += 1
+                    if count >= MAX_ATTEMPS:
+                        raise RuntimeError('could not generate unique identifier')
+            # Objects that are created without content cannot be read (same
+            # as an empty file in the default object store).
+            if not content is None:
+                content = json.dumps(content)
+            self.con.execute(
+                'INSERT OR REPLACE INTO objects(path, parent, content) '
+                'VALUES(?, ?, ?)',
+                (
+                    self.get_key(self.join(parent_folder, identifier)),
+                    self.get_key(parent_folder),
+                    content
+                )
+            )
+        return identifier
+
+    def delete_folder(self, folder_path, force_delete=False):
+        """Delete the folder with the given path and all of its objects and
+        subfolders.
+
+        Parameters
+        ----------
+        folder_path: string
+            Path to the folder that is being deleted
+        force_delete: bool, optional
+            Force deletion of the resource
+        """
+        if force_delete or not self.keep_deleted_files:
+            key = self.get_key(folder_path)
+            prefix = key + '/'
+            with self.transaction():
+                for table in ['folders', 'objects']:
+                    self.con.execute(
+                        'DELETE FROM ' + table + ' '
+                        'WHERE path = ? OR substr(path, 1, ?) = ?',
+                        (key, len(prefix), prefix)
+                    )
+
+    def delete_object(self, object_path, force_delete=False):
+        """Delete the object with the given path.
+
+        Parameters
+        ----------
+        object_path: string
+            Path to the object that is being deleted
+        force_delete: bool, optional
+            Force deletion of the resource
+        """
+        if force_delete or not self.keep_deleted_files:
+            with self.lock:
+                self.con.execute(
+                    'DELETE FROM objects WHERE path = ?',
+                    (self.get_key(object_path),)
+                )
+
+    def exists(self, resource_path):
+        """Returns True if a resource at the given path exists.
+
+        Parameters
+        ----------
+        resource_path: string
+            Path to resource
+
+        Returns
+        -------
+        bool
+        """
+        key = self.get_key(resource_path)
+        with self.lock:
+            for table in ['objects', 'folders']:
+                cur = self.con.execute(
+                    'SELECT 1 FROM ' + table + ' WHERE path = ?',
+                    (key,)
+                )
+                if not cur.fetchone() is None:
+                    return True
+        return False
+
+    def get_key(self, resource_path):
+        """Get the database key for a resource path. Keys are normalized paths
+        relative to the base path of the store that use '/' as separator.
+
+        Parameters
+        ----------
+        resource_path: string
+            Path to resource
+
+        Returns
+        -------
+        string
+        """
+        key = os.path.relpath(os.path.abspath(resource_path), self.base_path)
+        return key.replace(os.sep, '/')
+
+    def join(self, parent_folder, identifier):
+        """Concatenate the identifier for a given folder and a folder resource.
+
+        Parameters
+        ----------
+        parent_folder: string
+            Path to the parent folder
+        identifier: string
+            Identifier for resource in the parent folder
+
+        Returns
+        -------
+        string
+        """
+        return os.path.join(parent_folder, identifier)
+
+    def list_folders(self, parent_folder, create=True):
+        """Get a list of all subfolders in the given folder. If the folder does
+        not exist it is created if the create flag is True.
+
+        Parameters
+        ----------
+        parent_folder: string
+            Path to the parent folder
+        create: bool, optional
+            Flag indicating that the parent folder should be created if it does
+            not exist
+
+        Returns
+        -------
+        list(string)
+        """
+        key = self.get_key(parent_folder)
+        with self.lock:
+            if create and not self.exists(parent_folder):
+                grand_parent = os.path.dirname(os.path.abspath(parent_folder))
+                self.con.execute(
+                    'INSERT INTO folders(path, parent) VALUES(?, ?)',
+                    (key, self.get_key(grand_parent))
+                )
+                return list()
+            cur = self.con.execute(
+                'SELECT path FROM folders WHERE parent = ?',
+                (key,)
+            )
+            return [row[0].split('/')[-1] for row in cur.fetchall()]
+
+    def list_objects(self, folder_path):
+        """Get a list of all objects in the given folder. Returns a list of
+        resource names.
+
+        Parameters
+        ----------
+        folder_path: string
+            Path to the resource folder
+
+        Returns
+        -------
+        list(string)
+        """
+        with self.lock:
+            cur = self.con.execute(
+                'SELECT path FROM objects WHERE parent = ?',
+                (self.get_key(folder_path),)
+            )
+            return [row[0].split('/')[-1] for row in cur.fetchall()]
+
+    def read_object(self, object_path):
+        """Read Json document from given path.
+
+        Raises ValueError if no object with given path exists.
+
+        Parameters
+        ----------
+        object_path: string
+            Path identifier for a resource object
+
+        Returns
+        -------
+        dict or list
+        """
+        with self.lock:
+            cur = self.con.execute(
+                'SELECT content FROM objects WHERE path = ?',
+                (self.get_key(object_path),)
+            )
+            row = cur.fetchone()
+        if row is None:
+            raise ValueError('unknown object \'' + str(object_path) + '\'')
+        elif row[0] is None:
+            raise ValueError('empty object \'' + str(object_path) + '\'')
+        return json.loads(row[0])
+
+    def read_objects(self, object_paths):
+        """Read a batch of Json documents. Returns a dictionary that maps the
+        given object paths to the document content. Objects that do not exist
+        or that cannot be read are not included in the result.
+
+        Parameters
+        ----------
+        object_paths: list(string)
+            Path identifier for resource objects
+
+        Returns
+        -------
+        dict
+        """
+        paths = dict()
+        for object_path in object_paths:
+            paths[self.get_key(object_path)] = object_path
+        keys = list(paths.keys())
+        result = dict()
+        with self.lock:
+            for i in range(0, len(keys), READ_BATCH_SIZE):
+                batch = keys[i:i+READ_BATCH_SIZE]
+                cur = self.con.execute(
+                    'SELECT path, content FROM objects '
+                    'WHERE path IN (' + ','.join(['?'] * len(batch)) + ')',
+                    batch
+                )
+                for key, content in cur.fetchall():
+                    if not content is None:
+                        result[paths[key]] = json.loads(content)
+        return result
+
+    @contextmanager
+    def transaction(self):
+        """Context manager for a group of modifications that are committed
+        atomically. Transactions may be nested. Only the outermost transaction
+        commits the modifications. All modifications of the outermost
+        transaction are rolled back if an exception occurs.
+
+        Other threads are blocked from accessing the store while the
+        transaction is active.
+        """
+        with self.lock:
+            if self.tx_depth == 0:
+                self.con.execute('BEGIN IMMEDIATE')
+            self.tx_depth += 1
+            try:
+                yield self
+            except Exception:
+                self.tx_depth -= 1
+                if self.tx_depth == 0:
+                    self.con.execute('ROLLBACK')
+                raise
+            self.tx_depth -= 1
+            if self.tx_depth == 0:
+                self.con.execute('COMMIT')
+
+    def write_object(self, object_path, content):
+        """Write content as Json document to given path.
+
+        Parameters
+        ----------
+        object_path: string
+            Path identifier for a resource object
+        content: dict or list
+            Json object or array
+        """
+        parent_folder = os.path.dirname(os.path.abspath(object_path))
+        with self.lock:
+            self.con.execute(
+                'INSERT OR REPLACE INTO objects(path, parent, content) '
+                'VALUES(?, ?, ?)',
+                (
+                    self.get_key(object_path),
+                    self.get_key(parent_folder),
+                    json.dumps(content)
+                )
+            )
@@ -17,21 +17,40 @@
 """Dataset maintain annotations for three type of resources: columns, rows, and
 cells. Vizier does not reason about annotations at this point and therefore
 there is only limited functionality provided to query annotations. The dataset
-metadata object is barely a wrapper around three lists of resource annotations.
+metadata object maintains an index for each of the three resource types that
+maps the resource identifier to the list of annotations for the resource.
+
+Annotations are serialized in a compact Json format where each annotation is
+represented as a list of resource identifier, key, and value. Files that were
+written using the previous format (one dictionary per annotation) can still be
+read.
 """
 
 import json
 import os
 
+from vizier.core.util import is_scalar
 from vizier.datastore.annotation.base import DatasetAnnotation
 
 
 class DatasetMetadata(object):
     """Collection of annotations for a dataset object. For each of the three
-    resource types a list of annotations is maintained.
+    resource types an index of annotations is maintained. Column annotations
+    are keyed by the column identifier, row annotations by the row identifier,
+    and cell annotations by the pair of column and row identifier.
+
+    The lists of column, row, and cell annotations are available as read-only
+    properties. Annotations should only be modified using the methods of the
+    metadata object.
+
+    Metadata objects that are read from file are loaded lazily, i.e., the file
+    is not read until annotations are accessed for the first time.
     """
-    def __init__(self, columns=None, rows=None, cells=None, annotations=None):
-        """Initialize the metadata lists for the three different types of
+    def __init__(
+        self, columns=None, rows=None, cells=None, annotations=None,
+        filename=None
+    ):
+        """Initialize the metadata indexes for the three different types of
         dataset resources that can be annotated.
 
         Parameters
@@ -42,11 +61,26 @@ class DatasetMetadata(object):
             Annotations for dataset rows
         cells: list(vizier.datastpre.annotation.base.CellAnnotation), optional
             Annotations for dataset cells
+        annotations: list(vizier.datastpre.annotation.base.DatasetAnnotation), optional
+            Annotations for the dataset
+        filename: string, optional
+            File containing additional annotations that are loaded on first
+            access
         """
         self.annotations = annotations if not annotations is None else list()
-        self.columns = columns if not columns is None else list()
-        self.rows = rows if not rows is None else list()
-        self.cells = cells if not cells is None else list()
+        self.column_index = dict()
+        self.row_index = dict()
+        self.cell_index = dict()
+        self.filename = filename
+        if not columns is None:
+            for anno in columns:
+                add_to_index(self.column_index, anno.column_id, anno)
+        if not rows is None:
+            for anno in rows:
+                add_to_index(self.row_index, anno.row_id, anno)
+        if not cells is None:
+            for anno in cells:
+                add_to_index(self.cell_index, (anno.column_id, anno.row_id), anno)
 
     def add(self, key, value, column_id=None, row_id=None):
         """Add a new annotation for a dataset resource. The resource type is
@@ -64,6 +98,7 @@ class DatasetMetadata(object):
         row_id: int, optional
             Unique row identifier
         """
+        self.load()
         # Create the annotation object. This will raise an exception if the
         # resource identifier is invalid.
         annotation = DatasetAnnotation(
@@ -73,13 +108,48 @@ class DatasetMetadata(object):
             row_id=row_id
         )
         if row_id is None and column_id is None:
-            self.annotations.append(annotation) 
+            self.annotations.append(annotation)
         if row_id is None:
-            self.columns.append(annotation)
+            add_to_index(self.column_index, column_id, annotation)
         elif column_id is None:
-            self.rows.append(annotation)
+            add_to_index(self.row_index, row_id, annotation)
         else:
-            self.cells.append(annotation)
+            add_to_index(self.cell_index, (column_id, row_id), annotation)
+
+    def add_all(self, values):
+        """Add a list of annotations. The resource type for each annotation is
+        determined based on the column and row identifier.
+
+        Parameters
+        ----------
+        values: list(vizier.datastore.annotation.base.DatasetAnnotation)
+            List of dataset annotations
+        """
+        self.load()
+        for anno in values:
+            if anno.column_id is None and anno.row_id is None:
+                self.annotations.append(anno)
+            elif anno.row_id is None:
+                add_to_index(self.column_index, anno.column_id, anno)
+            elif anno.column_id is None:
+                add_to_index(self.row_index, anno.row_id, anno)
+            else:
+                add_to_index(
+                    self.cell_index,
+                    (anno.column_id, anno.row_id),
+                    anno
+                )
+
+    @property
+    def cells(self):
+        """List of all cell annotations.
+
+        Returns
+        -------
+        list(vizier.datastore.annotation.base.DatasetAnnotation)
+        """
+        self.load()
+        return index_values(self.cell_index)
 
     def clear_cell(self, column_id, row_id):
         """Remove all annotations for a given cell.
@@ -91,13 +161,19 @@ class DatasetMetadata(object):
         row_id: int
             Unique row identifier
         """
-        # Delete by making a copy of the cells list containing the remaining
-        # annotations
-        annotations = list()
-        for anno in self.cells:
-            if anno.column_id != column_id or anno.row_id != row_id:
-                annotations.append(anno)
-        self.cells = annotations
+        self.load()
+        self.cell_index.pop((column_id, row_id), None)
+
+    @property
+    def columns(self):
+        """List of all column annotations.
+
+        Returns
+        -------
+        list(vizier.datastore.annotation.base.DatasetAnnotation)
+        """
+        self.load()
+        return index_values(self.column_index)
 
     def find_all(self, values, key):
         """Get the list of annotations that are associated with the given key.
@@ -135,26 +211,24 @@ class DatasetMetadata(object):
         -------
         vizier.datastore.annotation.dataset.DatasetMetadata
         """
-        result = DatasetMetadata(
-            columns=self.columns if columns is None else list(),
-            rows=self.rows if rows is None else list(),
-            cells=self.cells if columns is None and rows is None else list()
-        )
+        self.load()
         if not columns is None:
-            for anno in self.columns:
-                if anno.column_id in columns:
-                    result.columns.append(anno)
+            columns = set(columns)
         if not rows is None:
-            for anno in self.rows:
-                if anno.row_id in rows:
-                    result.rows.append(anno)
-        if not columns is None or not rows is None:
-            for anno in self.cells:
-                if not columns is None and not anno.column_id in columns:
-                    continue
-                elif not rows is None and not anno.row_id in rows:
-                    continue
-                result.cells.append(anno)
+            rows = set(rows)
+        result = DatasetMetadata()
+        for column_id, values in self.column_index.items():
+            if columns is None or column_id in columns:
+                result.column_index[column_id] = list(values)
+        for row_id, values in self.row_index.items():
+            if rows is None or row_id in rows:
+                result.row_index[row_id] = list(values)
+        for cell, values in self.cell_index.items():
+            if not columns is None and not cell[0] in columns:
+                continue
+            elif not rows is None and not cell[1] in rows:
+                continue
+            result.cell_index[cell] = list(values)
         return result
 
     def find_one(self, values, key, raise_error_on_multi_value=True):
@@ -200,11 +274,8 @@ class DatasetMetadata(object):
         -------
         list(vizier.datastpre.annotation.base.DatasetAnnotation)
         """
-        result = list()
-        for anno in self.cells:
-            if anno.column_id == column_id and anno.row_id == row_id:
-                result.append(anno)
-        return result
+        self.load()
+        return list(self.cell_index.get((column_id, row_id), list()))
 
     def for_column(self, column_id):
         """Get object metadata set for a dataset column.
@@ -218,11 +289,8 @@ class DatasetMetadata(object):
         -------
         list(vizier.datastpre.annotation.base.DatasetAnnotation)
         """
-        result = list()
-        for anno in self.columns:
-            if anno.column_id == column_id:
-                result.append(anno)
-        return result
+        self.load()
+        return list(self.column_index.get(column_id, list()))
 
     def for_row(self, row_id):
         """Get object metadata set for a dataset row.
@@ -236,17 +304,15 @@ class DatasetMetadata(object):
         -------
         list(vizier.datastpre.annotation.base.DatasetAnnotation)
         """
-        result = list()
-        for anno in self.rows:
-            if anno.row_id == row_id:
-                result.append(anno)
-        return result
+        self.load()
+        return list(self.row_index.get(row_id, list()))
 
     @staticmethod
     def from_file(filename):
         """Read dataset annotations from file. Assumes that the file has been
         created using the default serialization (to_file), i.e., is in Json
-        format.
+        format. The file is read when the annotations are accessed for the
+        first time.
 
         Parameters
         ----------
@@ -260,22 +326,7 @@ class DatasetMetadata(object):
         # Return an empty annotation set if the file does not exist
         if not os.path.isfile(filename):
             return DatasetMetadata()
-        with open(filename, 'r') as f:
-            doc = json.loads(f.read())
-        cells = None
-        columns = None
-        rows = None
-        if 'cells' in doc:
-            cells = [DatasetAnnotation.from_dict(a) for a in doc['cells']]
-        if 'columns' in doc:
-            columns = [DatasetAnnotation.from_dict(a) for a in doc['columns']]
-        if 'rows' in doc:
-            rows = [DatasetAnnotation.from_dict(a) for a in doc['rows']]
-        return DatasetMetadata(
-            cells=cells,
-            columns=columns,
-            rows=rows
-        )
+        return DatasetMetadata(filename=filename)
 
     @staticmethod
     def from_list(values):
@@ -290,27 +341,39 @@ class DatasetMetadata(object):
         -------
         vizier.database.annotation.dataset.DatsetMetadata
         """
-        cells = list()
-        columns = list()
-        rows = list()
-        annotations = list()
         for anno in values:
             if anno.column_id is None and anno.row_id is None and anno.value is None:
                 raise ValueError('invalid dataset annotaiton')
-            elif anno.column_id is None and anno.row_id is None:
-                annotations.append(anno)
-            elif anno.row_id is None:
-                columns.append(anno)
-            elif anno.column_id is None:
-                rows.append(anno)
-            else:
-                cells.append(anno)
-        return DatasetMetadata(
-            cells=cells,
-            columns=columns,
-            rows=rows,
-            annotations=annotations 
-        )
+        result = DatasetMetadata()
+        result.add_all(values)
+        return result
+
+    def load(self):
+        """Read annotations from the associated file (if the metadata object
+        has been created from a file that has not been read yet).
+        """
+        if self.filename is None:
+            return
+        filename = self.filename
+        self.filename = None
+        with open(filename, 'r') as f:
+            doc = json.loads(f.read())
+        if 'columns' in doc:
+            for obj in doc['columns']:
+                anno = annotation_from_json(obj, row_id=None)
+                add_to_index(self.column_index, anno.column_id, anno)
+        if 'rows' in doc:
+            for obj in doc['rows']:
+                anno = annotation_from_json(obj, column_id=None)
+                add_to_index(self.row_index, anno.row_id, anno)
+        if 'cells' in doc:
+            for obj in doc['cells']:
+                anno = annotation_from_json(obj)
+                add_to_index(
+                    self.cell_index,
+                    (anno.column_id, anno.row_id),
+                    anno
+                )
 
     def remove(self, key=None, value=None, column_id=None, row_id=None):
         """Remove annotations for a dataset resource. The resource type is
@@ -331,61 +394,91 @@ class DatasetMetadata(object):
         row_id: int, optional
             Unique row identifier
         """
-        # Get the resource annotations list and the indices of the candidates
-        # that match the resource identifier.
+        # Get the resource annotations index and the key for the resource.
         if column_id is None and row_id is None:
             raise ValueError('must specify at least one dataset resource identifier')
         elif column_id is None:
-            elements = self.rows
+            index, resource = self.row_index, row_id
         elif row_id is None:
-            elements = self.columns
+            index, resource = self.column_index, column_id
         else:
-            elements = self.cells
-        candidates = list()
-        for i in range(len(elements)):
-            anno = elements[i]
-            if anno.column_id == column_id and anno.row_id == row_id:
-                candidates.append(i)
-        # Get indices of all annotations that are being deleted. Use key and
-        # value as filter if given. Otherwise, remove all elements in the list
-        del_idx_list = list()
-        if key is None and value is None:
-            del_idx_list = candidates
-        elif key is None:
-            for i in candidates:
-                if elements[i].value == value:
-                    del_idx_list.append(i)
-        elif value is None:
-            for i in candidates:
-                if elements[i].key == key:
-                    del_idx_list.append(i)
+            index, resource = self.cell_index, (column_id, row_id)
+        self.load()
+        if not resource in index:
+            return
+        # Keep all annotations that do not match the key and value filter.
+        elements = list()
+        for anno in index[resource]:
+            if not key is None and anno.key != key:
+                elements.append(anno)
+            elif not value is None and anno.value != value:
+                elements.append(anno)
+        if len(elements) > 0:
+            index[resource] = elements
         else:
-            for i in candidates:
-                el = elements[i]
-                if el.key == key and el.value == value:
-                    del_idx_list.append(i)
-        # Remove all elements at the given index positions. Make sure to adjust
-        # indices as elements are deleted.
-        for j in range(len(del_idx_list)):
-            i = del_idx_list[j] - j
-            del elements[i]
+            del index[resource]
+
+    def remove_all(self, columns=None, rows=None):
+        """Remove all annotations for the given lists of columns and rows. For
+        columns the column annotations and the annotations of all cells in the
+        columns are removed. For rows the row annotations and the annotations
+        of all cells in the rows are removed.
+
+        Parameters
+        ----------
+        columns: list(int), optional
+            List of dataset column identifier
+        rows: list(int), optional
+            List of dataset row identifier
+        """
+        self.load()
+        columns = set(columns) if not columns is None else set()
+        rows = set(rows) if not rows is None else set()
+        for column_id in columns:
+            self.column_index.pop(column_id, None)
+        for row_id in rows:
+            self.row_index.pop(row_id, None)
+        for cell in list(self.cell_index.keys()):
+            if cell[0] in columns or cell[1] in rows:
+                del self.cell_index[cell]
+
+    @property
+    def rows(self):
+        """List of all row annotations.
+
+        Returns
+        -------
+        list(vizier.datastore.annotation.base.DatasetAnnotation)
+        """
+        self.load()
+        return index_values(self.row_index)
 
     def to_file(self, filename):
         """Write current annotations to file in default file format. The default
-        serializartion format is Json.
+        serializartion format is Json. Each annotation is serialized as a list
+        of resource identifier (column identifier, row identifier, or both),
+        key, and value.
 
         Parameters
         ----------
         filename: string
             Name of the file to write
         """
+        self.load()
         doc = dict()
-        if len(self.cells) > 0:
-            doc['cells'] = [a.to_dict() for a in deduplicate(self.cells)]
-        if len(self.columns) > 0:
-            doc['columns'] = [a.to_dict() for a in deduplicate(self.columns)]
-        if len(self.rows) > 0:
-            doc['rows'] = [a.to_dict() for a in deduplicate(self.rows)]
+        cells = deduplicate(self.cells)
+        if len(cells) > 0:
+            doc['cells'] = [
+                [a.column_id, a.row_id, a.key, scalar_value(a)] for a in cells
+            ]
+        columns = deduplicate(self.columns)
+        if len(columns) > 0:
+            doc['columns'] = [
+                [a.column_id, a.key, scalar_value(a)] for a in columns
+            ]
+        rows = deduplicate(self.rows)
+        if len(rows) > 0:
+            doc['rows'] = [[a.row_id, a.key, scalar_value(a)] for a in rows]
         with open(filename, 'w') as f:
             json.dump(doc, f)
 
@@ -425,3 +518,90 @@ def deduplicate(elements):
         if a.column_id != l.column_id or a.row_id != l.row_id or a.key != l.key or a.value != l.value:
             result.append(a)
     return result
+
+
+def add_to_index(index, resource, annotation):
+    """Add an annotation to the list of annotations for a resource in an
+    annotation index.
+
+    Parameters
+    ----------
+    index: dict
+        Annotation index
+    resource: int or tuple
+        Resource identifier
+    annotation: vizier.datastore.annotation.base.DatasetAnnotation
+        Dataset annotation
+    """
+    if resource in index:
+        index[resource].append(annotation)
+    else:
+        index[resource] = [annotation]
+
+
+def annotation_from_json(obj, column_id=0, row_id=0):
+    """Create dataset annotation from its Json serialization. The object is
+    either a dictionary (default serialization of the annotation object) or a
+    list in the compact serialization format. In the latter case, the given
+    column or row identifier is None if the list does not contain the
+    respective identifier.
+
+    Parameters
+    ----------
+    obj: dict or list
+        Json serialization of the annotation
+    column_id: int, optional
+        None if the list does not contain a column identifier
+    row_id: int, optional
+        None if the list does not contain a row identifier
+
+    Returns
+    -------
+    vizier.datastore.annotation.base.DatasetAnnotation
+    """
+    if isinstance(obj, dict):
+        return DatasetAnnotation.from_dict(obj)
+    values = list(obj)
+    if not column_id is None:
+        column_id = values.pop(0)
+    if not row_id is None:
+        row_id = values.pop(0)
+    return DatasetAnnotation(
+        key=values[0],
+        value=values[1],
+        column_id=column_id,
+        row_id=row_id
+    )
+
+
+def index_values(index):
+    """Get list of all annotations in an annotation index.
+
+    Parameters
+    ----------
+    index: dict
+        Annotation index
+
+    Returns
+    -------
+    list(vizier.datastore.annotation.base.DatasetAnnotation)
+    """
+    return [anno for values in index.values() for anno in values]
+
+
+def scalar_value(annotation):
+    """Get the value of an annotation. Raises a ValueError if the annotation
+    value is not a scalar value.
+
+    Parameters
+    ----------
+    annotation: vizier.datastore.annotation.base.DatasetAnnotation
+        Dataset annotation
+
+    Returns
+    -------
+    scalar
+    """
+    if not is_scalar(annotation.value):
+        raise ValueError('invalid annotation value')
+    return annotation.value
@@ -23,10 +23,13 @@ from abc import abstractmethod
 
 import os
 
-from vizier.datastore.annotation.base import DatasetAnnotation
 from vizier.datastore.annotation.dataset import DatasetMetadata
+from vizier.view.cache import ChartCache
 
 
+"""Name of the chart cache directory in the default datastore."""
+CHARTS_DIR = '.charts'
+
 """Metadata file name for datasets in the the default datastore."""
 METADATA_FILE = 'annotations.json'
 
@@ -82,6 +85,16 @@ class Datastore(object):
         """
         raise NotImplementedError
 
+    def get_chart_cache(self):
+        """Get the cache for chart query results on datasets in the datastore.
+        The result is None if the datastore does not cache chart results.
+
+        Returns
+        -------
+        vizier.view.cache.ChartCache
+        """
+        return None
+
     @abstractmethod
     def get_dataset(self, identifier):
         """Get the handle for the dataset with given identifier from the data
@@ -188,6 +201,9 @@ class DefaultDatastore(Datastore):
     datasets. For each dataset a new subfolder is created. Within the folder the
     dataset information is split across three files containing the descriptor,
     annotation, and the dataset rows.
+
+    Results of chart queries on datasets in the datastore are cached in a
+    separate subfolder of the base directory.
     """
     def __init__(self, base_path):
         """Initialize the base directory that contains datasets. Each dataset is
@@ -202,6 +218,7 @@ class DefaultDatastore(Datastore):
         self.base_path = os.path.abspath(base_path)
         if not os.path.isdir(self.base_path):
             os.makedirs(self.base_path)
+        self.charts = ChartCache(os.path.join(self.base_path, CHARTS_DIR))
 
     def get_annotations(self, identifier, column_id=None, row_id=None):
         """Get list of annotations for a resources of a given dataset. If only
@@ -233,17 +250,23 @@ class DefaultDatastore(Datastore):
         if column_id is None and row_id is None:
             return annotations
         elif column_id is None:
-            return DatasetMetadata(rows=annotations.rows).filter(rows=[row_id])
+            return DatasetMetadata(rows=annotations.for_row(row_id))
         elif row_id is None:
-            return DatasetMetadata(columns=annotations.columns).filter(
-                columns=[column_id]
-            )
+            return DatasetMetadata(columns=annotations.for_column(column_id))
         else:
-            return DatasetMetadata(cells=annotations.cells).filter(
-                columns=[column_id],
-                rows=[row_id]
+            return DatasetMetadata(
+                cells=annotations.for_cell(column_id=column_id, row_id=row_id)
             )
 
+    def get_chart_cache(self):
+        """Get the cache for chart query results on datasets in the datastore.
+
+        Returns
+        -------
+        vizier.view.cache.ChartCache
+        """
+        return self.charts
+
     def get_dataset_dir(self, identifier):
         """Get the base directory for a dataset with given identifier. Having a
         separate method makes it easier to change the folder structure used to
@@ -330,39 +353,36 @@ class DefaultDatastore(Datastore):
         annotations = DatasetMetadata.from_file(metadata_filename)
         # Get object annotations
         if column_id is None:
-            elements = annotations.rows
+            elements = annotations.for_row(row_id)
         elif row_id is None:
-            elements = annotations.columns
+            elements = annotations.for_column(column_id)
         else:
-            elements = annotations.cells
+            elements = annotations.for_cell(column_id=column_id, row_id=row_id)
+        # Find the annotation that is being modified (if any)
+        anno = None
+        if not old_value is None:
+            for a in elements:
+                if a.key == key and a.value == old_value:
+                    anno = a
+                    break
         # Identify the type of operation: INSERT, DELETE or UPDATE
         if old_value is None and not new_value is None:
-            elements.append(
-                DatasetAnnotation(
-                    key=key,
-                    value=new_value,
-                    column_id=column_id,
-                    row_id=row_id
-                )
+            annotations.add(
+                key=key,
+                value=new_value,
+                column_id=column_id,
+                row_id=row_id
             )
         elif not old_value is None and new_value is None:
-            del_index = None
-            for i in range(len(elements)):
-                a = elements[i]
-                if a.column_id == column_id and a.row_id == row_id:
-                    if a.key == key and a.value == old_value:
-                        del_index = i
-                        break
-            if del_index is None:
+            if anno is None:
                 return False
-            del elements[del_index]
+            annotations.remove(
+                key=key,
+                value=old_value,
+                column_id=column_id,
+                row_id=row_id
+            )
         elif not old_value is None and not new_value is None:
-            anno = None
-            for a in elements:
-                if a.column_id == column_id and a.row_id == row_id:
-                    if a.key == key and a.value == old_value:
-                        anno = a
-                        break
             if anno is None:
                 return False
             anno.value = new_value
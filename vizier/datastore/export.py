@@ -0,0 +1,155 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Export datasets as delimited text files. The dataset rows are serialized
+incrementally. The export is a generator of encoded data blocks that can be
+used as the body of a streamed response without holding the whole dataset in
+memory.
+"""
+
+import csv
+import io
+import zlib
+
+
+"""Default minimal size (in characters) for data blocks that are returned by
+the export generator.
+"""
+DEFAULT_BLOCK_SIZE = 65536
+
+"""Window size for zlib compression objects that produce gzip output."""
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def export_dataset(
+    dataset, column_ids=None, offset=0, limit=-1, delimiter=',',
+    compressed=False, block_size=DEFAULT_BLOCK_SIZE
+):
+    """Generator for the encoded content of a delimited file that contains
+    the dataset rows. The first line contains the column names. The optional
+    list of column identifier restricts the exported columns. The optional
+    offset and limit restrict the exported rows. If the compressed flag is
+    True the returned data is gzip compressed.
+
+    Raises ValueError if any of the given column identifier is unknown. The
+    column identifier are validated before the generator is returned.
+
+    Parameters
+    ----------
+    dataset: vizier.datastore.dataset.DatasetHandle
+        Handle for the exported dataset
+    column_ids: list(int), optional
+        Identifier of the exported columns
+    offset: int, optional
+        Number of rows at the beginning of the dataset that are skipped
+    limit: int, optional
+        Maximum number of exported rows
+    delimiter: string, optional
+        Column delimiter
+    compressed: bool, optional
+        Compress the output using gzip if True
+    block_size: int, optional
+        Minimal size of returned data blocks
+
+    Returns
+    -------
+    iterator(bytes)
+    """
+    columns = dataset.columns
+    if not column_ids is None:
+        col_index = {col.identifier: idx for idx, col in enumerate(columns)}
+        positions = list()
+        for col_id in column_ids:
+            if not col_id in col_index:
+                raise ValueError('unknown column \'' + str(col_id) + '\'')
+            positions.append(col_index[col_id])
+        columns = [columns[idx] for idx in positions]
+    else:
+        positions = None
+    return export_rows(
+        dataset=dataset,
+        header=[col.name for col in columns],
+        positions=positions,
+        offset=offset,
+        limit=limit,
+        delimiter=delimiter,
+        compressed=compressed,
+        block_size=block_size
+    )
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def export_rows(
+    dataset, header, positions, offset, limit, delimiter, compressed,
+    block_size
+):
+    """Generator for the encoded content of an exported dataset. Rows are
+    written to a text buffer that is encoded (and compressed) whenever the
+    buffer size exceeds the block size.
+
+    Parameters
+    ----------
+    dataset: vizier.datastore.dataset.DatasetHandle
+        Handle for the exported dataset
+    header: list(string)
+        Names of the exported columns
+    positions: list(int)
+        Index positions of exported column values. All values are exported
+        if None.
+    offset: int
+        Number of rows at the beginning of the dataset that are skipped
+    limit: int
+        Maximum number of exported rows
+    delimiter: string
+        Column delimiter
+    compressed: bool
+        Compress the output using gzip if True
+    block_size: int
+        Minimal size of returned data blocks
+
+    Returns
+    -------
+    iterator(bytes)
+    """
+    compressor = zlib.compressobj(wbits=GZIP_WBITS) if compressed else None
+    def encode(text, flush=False):
+        data = text.encode('utf-8')
+        if compressor is None:
+            return data
+        data = compressor.compress(data)
+        if flush:
+            data += compressor.flush()
+        return data
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter)
+    writer.writerow(header)
+    if limit != 0:
+        with dataset.reader(offset=offset, limit=limit) as reader:
+            for row in reader:
+                values = row.values
+                if not positions is None:
+                    values = [values[idx] for idx in positions]
+                writer.writerow(values)
+                if buffer.tell() >= block_size:
+                    data = encode(buffer.getvalue())
+                    buffer.seek(0)
+                    buffer.truncate()
+                    if len(data) > 0:
+                        yield data
+    yield encode(buffer.getvalue(), flush=True)
@@ -19,29 +19,54 @@ maintains datasets information in separate file within a dataset-specific
 subfolder of a given base directory.
 """
 
-import csv
 import json
 import os
 import shutil
 import tempfile
+import threading
 import urllib.request, urllib.error, urllib.parse
 
-from vizier.core.util import cast, get_unique_identifier
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from vizier.core.util import get_unique_identifier
 from vizier.datastore.base import DefaultDatastore
-from vizier.datastore.dataset import DatasetColumn, DatasetDescriptor
-from vizier.datastore.dataset import DatasetHandle, DatasetRow
+from vizier.datastore.dataset import DatasetDescriptor
+from vizier.datastore.dataset import DatasetHandle
+from vizier.datastore.fs.chunks import CHUNKS_DIR, CHUNK_LIST_FILE, ChunkStore
+from vizier.datastore.fs.chunks import read_chunk_list, write_chunk_list
+from vizier.datastore.fs.columnar import ColumnarDatasetReader
 from vizier.datastore.fs.dataset import FileSystemDatasetHandle
-from vizier.datastore.reader import DefaultJsonDatasetReader
+from vizier.datastore.fs.dataset import COLUMNAR_DATA_DIR, DELTA_FILE
+from vizier.datastore.fs.dataset import DATA_FILE, DESCRIPTOR_FILE
+from vizier.datastore.fs.dataset import DATA_FORMAT_COLUMNAR, DATA_FORMAT_JSON
+from vizier.datastore.fs.dataset import DATA_FORMAT_DELTA
+from vizier.datastore.fs.dataset import DATA_FORMATS, ROW_INDEX_FILE
+from vizier.datastore.fs.ingest import TypedCSVReader
+from vizier.datastore.reader import DefaultJsonDatasetReader, RowIndex
 from vizier.datastore.annotation.dataset import DatasetMetadata
 from vizier.filestore.base import FileHandle
 from vizier.filestore.base import get_download_filename
 
 import vizier.datastore.base as base
+import vizier.datastore.fs.delta as delta
+
 
+"""Prefix for temporary folders that contain the files of a dataset while it
+is being materialized."""
+COMPACT_DIR_PREFIX = '.compact-'
 
-"""Constants for data file names."""
-DATA_FILE = 'data.json'
-DESCRIPTOR_FILE = 'descriptor.json'
+"""Name of the folder that contains references to delta datasets that use a
+dataset as their base."""
+REFS_DIR = 'refs'
+
+"""Default maximum number of operations in the change log of a delta dataset
+before the dataset is materialized."""
+DEFAULT_MAX_DELTA_LENGTH = 64
 
 
 class FileSystemDatastore(DefaultDatastore):
@@ -49,17 +74,193 @@ class FileSystemDatastore(DefaultDatastore):
     datasets. For each dataset a new subfolder is created. Within the folder the
     dataset information is split across three files containing the descriptor,
     annotation, and the dataset rows.
+
+    The format in which dataset rows are stored is selected per datastore. The
+    default is a single Json file. The columnar format stores rows in chunks
+    with a separate file for each column. The format is recorded in the dataset
+    descriptor. Datasets that were created using a different format therefore
+    remain readable.
+
+    Datasets that are derived from an existing dataset by a small number of
+    changes can be stored as delta datasets (see create_delta_dataset). Delta
+    datasets reference a materialized base dataset and only contain a log of
+    the changes. Once the change log exceeds a given length the dataset is
+    materialized in a background thread. Materialization holds a file lock on
+    the dataset folder so that datastores in different processes do not
+    materialize the same dataset concurrently.
+
+    Data files of datasets with identical rows are only stored once. Data
+    files are added to a content-addressed chunk store and the files in the
+    dataset folders are replaced by links to the stored chunks (see
+    vizier.datastore.fs.chunks).
     """
-    def __init__(self, base_path):
+    def __init__(
+        self, base_path, data_format=None,
+        max_delta_length=DEFAULT_MAX_DELTA_LENGTH, deduplicate=True
+    ):
         """Initialize the base directory that contains datasets. Each dataset is
         maintained in a separate subfolder.
 
+        Raises ValueError if the given data format is unknown.
+
         Parameters
         ---------
         base_path : string
             Path to base directory for the datastore
+        data_format: string, optional
+            Format for storing rows of new datasets (default: Json)
+        max_delta_length: int, optional
+            Maximum length of the change log for delta datasets before they
+            are materialized
+        deduplicate: bool, optional
+            Share identical data files between datasets if True
         """
         super(FileSystemDatastore, self).__init__(base_path)
+        if data_format is None:
+            data_format = DATA_FORMAT_JSON
+        elif not data_format in DATA_FORMATS or data_format == DATA_FORMAT_DELTA:
+            raise ValueError('unknown data format \'' + str(data_format) + '\'')
+        self.data_format = data_format
+        self.max_delta_length = max_delta_length
+        self.chunks = None
+        if deduplicate:
+            self.chunks = ChunkStore(os.path.join(self.base_path, CHUNKS_DIR))
+        # Lock to avoid concurrent materialization of the same dataset by
+        # background threads.
+        self.compact_lock = threading.Lock()
+        self.remove_temporary_dirs()
+
+    def __getstate__(self):
+        """Exclude the compaction lock when the datastore is pickled (e.g.,
+        when it is sent to a worker process as part of a task context).
+
+        Returns
+        -------
+        dict
+        """
+        state = dict(self.__dict__)
+        del state['compact_lock']
+        return state
+
+    def __setstate__(self, state):
+        """Restore the datastore state and create a new compaction lock.
+
+        Parameters
+        ----------
+        state: dict
+            Pickled object state
+        """
+        self.__dict__.update(state)
+        self.compact_lock = threading.Lock()
+
+    def compact_dataset(self, identifier):
+        """Materialize the rows of a delta dataset. The rows are written in the
+        data format of the datastore and the dataset descriptor is replaced.
+        Returns True if the dataset was a delta dataset and False otherwise.
+
+        Parameters
+        ----------
+        identifier : string
+            Unique dataset identifier.
+
+        Returns
+        -------
+        bool
+        """
+        dataset_dir = self.get_dataset_dir(identifier)
+        with self.compact_lock:
+            if not os.path.isdir(dataset_dir):
+                return False
+            with lock_dataset_dir(dataset_dir):
+                return self.materialize_dataset(identifier)
+
+    def create_delta_dataset(
+        self, dataset, columns, operations, row_count, annotations=None
+    ):
+        """Create a new dataset that is derived from the given dataset by
+        applying a list of changes. The new dataset is stored as a delta
+        dataset that references the materialized base dataset instead of
+        containing a copy of the dataset rows.
+
+        If the given dataset is itself a delta dataset, the new change log is
+        appended to the change log of the given dataset, i.e., delta datasets
+        always reference a materialized base dataset. If the length of the
+        resulting change log exceeds the maximum delta length the new dataset
+        is materialized in the background.
+
+        Parameters
+        ----------
+        dataset: vizier.datastore.fs.dataset.FileSystemDatasetHandle
+            Handle for the modified dataset
+        columns: list(vizier.datastore.dataset.DatasetColumn)
+            List of columns in the new dataset
+        operations: list(dict)
+            Change log (see vizier.datastore.fs.delta)
+        row_count: int
+            Number of rows in the new dataset
+        annotations: vizier.datastore.annotation.dataset.DatasetMetadata, optional
+            Annotations for dataset components
+
+        Returns
+        -------
+        vizier.datastore.dataset.DatasetDescriptor
+        """
+        # Validate the column identifier
+        validate_dataset(columns=columns, rows=list())
+        # Get the materialized base dataset and the full change log
+        if dataset.data_format == DATA_FORMAT_DELTA:
+            base = dataset.base
+            operations = delta.read_operations(dataset.data_file) + operations
+        else:
+            base = dataset
+        # Row identifier are never re-used. The maximum row identifier
+        # therefore only increases when rows are inserted.
+        max_row_id = dataset.max_row_id()
+        for op in operations:
+            if op[delta.KEY_OPERATION] == delta.OP_INSERT:
+                max_row_id = max(max_row_id, op[delta.KEY_ROW])
+        # Get new identifier and create directory for new dataset
+        identifier = get_unique_identifier()
+        dataset_dir = self.get_dataset_dir(identifier)
+        os.makedirs(dataset_dir)
+        data_file = os.path.join(dataset_dir, DELTA_FILE)
+        delta.write_operations(operations, data_file)
+        self.add_reference(base.identifier, identifier)
+        # Filter annotations for non-existing columns
+        if not annotations is None:
+            annotations = annotations.filter(
+                columns=[c.identifier for c in columns]
+            )
+        # Create dataset an write dataset file
+        ds = FileSystemDatasetHandle(
+            identifier=identifier,
+            columns=columns,
+            data_file=data_file,
+            row_count=row_count,
+            max_row_id=max_row_id,
+            annotations=annotations,
+            data_format=DATA_FORMAT_DELTA,
+            base=base
+        )
+        ds.to_file(
+            descriptor_file=os.path.join(dataset_dir, DESCRIPTOR_FILE)
+        )
+        # Write metadata file if annotations are given
+        if not annotations is None:
+            ds.annotations.to_file(self.get_metadata_filename(identifier))
+        # Materialize the dataset if the change log is too long
+        if len(operations) > self.max_delta_length:
+            threading.Thread(
+                target=self.compact_dataset,
+                args=(identifier,),
+                daemon=True
+            ).start()
+        # Return handle for new dataset
+        return DatasetDescriptor(
+            identifier=ds.identifier,
+            columns=ds.columns,
+            row_count=ds.row_count
+        )
 
     def create_dataset(self, columns, rows, annotations=None):
         """Create a new dataset in the datastore. Expects at least the list of
@@ -89,42 +290,19 @@ class FileSystemDatastore(DefaultDatastore):
         # has a unique identifier, and (iii) that every row has exactly one
         # value per column.
         _, max_row_id = validate_dataset(columns=columns, rows=rows)
-        # Get new identifier and create directory for new dataset
-        identifier = get_unique_identifier()
-        dataset_dir = self.get_dataset_dir(identifier)
-        os.makedirs(dataset_dir)
-        # Write rows to data file
-        data_file = os.path.join(dataset_dir, DATA_FILE)
-        DefaultJsonDatasetReader(data_file).write(rows)
         # Filter annotations for non-existing resources
         if not annotations is None:
             annotations = annotations.filter(
                 columns=[c.identifier for c in columns],
                 rows=[r.identifier for r in rows]
             )
-        # Create dataset an write dataset file
-        dataset = FileSystemDatasetHandle(
-            identifier=identifier,
+        return self.write_dataset(
             columns=columns,
-            data_file=data_file,
+            rows=rows,
             row_count=len(rows),
             max_row_id=max_row_id,
             annotations=annotations
         )
-        dataset.to_file(
-            descriptor_file=os.path.join(dataset_dir, DESCRIPTOR_FILE)
-        )
-        # Write metadata file if annotations are given
-        if not annotations is None:
-            dataset.annotations.to_file(
-                self.get_metadata_filename(identifier)
-            )
-        # Return handle for new dataset
-        return DatasetDescriptor(
-            identifier=dataset.identifier,
-            columns=dataset.columns,
-            row_count=dataset.row_count
-        )
 
     def delete_dataset(self, identifier):
         """Delete dataset with given identifier. Returns True if dataset existed
@@ -143,10 +321,30 @@ class FileSystemDatastore(DefaultDatastore):
         dataset_dir = self.get_dataset_dir(identifier)
         if not os.path.isdir(dataset_dir):
             return False
+        # Materialize all delta datasets that use this dataset as their base.
+        # If the deleted dataset is a delta dataset, remove the reference in
+        # its base dataset.
+        refs_dir = os.path.join(dataset_dir, REFS_DIR)
+        if os.path.isdir(refs_dir):
+            for ref in os.listdir(refs_dir):
+                self.compact_dataset(ref)
+        dataset = self.get_dataset(identifier)
+        if dataset.data_format == DATA_FORMAT_DELTA:
+            self.remove_reference(dataset.base.identifier, identifier)
+        chunks = read_chunk_list(dataset_dir)
         shutil.rmtree(dataset_dir)
+        self.charts.remove(identifier)
+        # Remove data file chunks of the dataset that are no longer referenced
+        # by any other dataset
+        if not self.chunks is None:
+            self.chunks.release(chunks)
         return True
 
-    def download_dataset(self, url, username=None, password=None, filestore=None):
+    def download_dataset(
+        self, url, username=None, password=None, filestore=None,
+        detect_headers=True, infer_types=True, load_format='csv', options=[],
+        human_readable_name=None
+    ):
         """Create a new dataset from a given file. Returns the handle for the
         downloaded file only if the filestore has been provided as an argument
         in which case the file handle is meaningful file handle.
@@ -163,6 +361,16 @@ class FileSystemDatastore(DefaultDatastore):
             Optional password for authentication
         filestore: vizier.filestore.base.Filestore, optional
             Optional filestore to save a local copy of the downloaded resource
+        detect_headers: bool, optional
+            Detect column names in loaded file if True
+        infer_types: bool, optional
+            Infer column types for loaded dataset if True
+        load_format: string, optional
+            Format identifier
+        options: list, optional
+            Additional options for Mimirs load command
+        human_readable_name: string, optional
+            Optional human readable name for the resulting table
 
         Returns
         -------
@@ -232,15 +440,34 @@ class FileSystemDatastore(DefaultDatastore):
             )
         )
 
-    def load_dataset(self, f_handle):
+    def load_dataset(
+        self, f_handle, detect_headers=True, infer_types=True,
+        load_format='csv', options=[], human_readable_name=None
+    ):
         """Create a new dataset from a given file.
 
         Raises ValueError if the given file could not be loaded as a dataset.
 
+        The file system datastore always expects the column names in the first
+        row of the file. Column types are inferred from the first chunk of rows
+        unless infer_types is False. In the latter case all values are loaded
+        as strings. The remaining load arguments are accepted for compatibility
+        with the Mimir datastore but they are currently ignored.
+
         Parameters
         ----------
         f_handle : vizier.filestore.base.FileHandle
             Handle for an uploaded file
+        detect_headers: bool, optional
+            Detect column names in loaded file if True
+        infer_types: bool, optional
+            Infer column types for loaded dataset if True
+        load_format: string, optional
+            Format identifier
+        options: list, optional
+            Additional options for Mimirs load command
+        human_readable_name: string, optional
+            Optional human readable name for the resulting table
 
         Returns
         -------
@@ -252,48 +479,309 @@ class FileSystemDatastore(DefaultDatastore):
         # Expects a file in a supported tabular data format.
         if not f_handle.is_tabular:
             raise ValueError('cannot create dataset from file \'' + f_handle.name + '\'')
+        # Get unique identifier and create subfolder for the new dataset
+        identifier = get_unique_identifier()
+        dataset_dir = self.get_dataset_dir(identifier)
+        os.makedirs(dataset_dir)
         # Open the file as a csv file. Expects that the first row contains the
-        # column names. Read dataset schema and dataset rows into two separate
-        # lists.
-        columns = []
-        rows = []
-        with f_handle.open() as csvfile:
-            reader = csv.reader(csvfile, delimiter=f_handle.delimiter)
-            for col_name in next(reader):
-                columns.append(
-                    DatasetColumn(
-                        identifier=len(columns),
-                        name=col_name.strip()
-                    )
+        # column names. Rows are parsed in chunks and written directly to the
+        # data file. Column types are known after all rows have been written.
+        try:
+            with f_handle.open() as csvfile:
+                reader = TypedCSVReader(
+                    csvfile,
+                    delimiter=f_handle.delimiter,
+                    infer_types=infer_types
                 )
-            for row in reader:
-                values = [cast(v.strip()) for v in row]
-                rows.append(DatasetRow(identifier=len(rows), values=values))
-        # Get unique identifier and create subfolder for the new dataset
+                data_file, row_index_file = self.write_rows(
+                    dataset_dir,
+                    reader.columns,
+                    reader
+                )
+        except Exception as ex:
+            shutil.rmtree(dataset_dir)
+            raise ex
+        # Create dataset an write descriptor to file
+        dataset = FileSystemDatasetHandle(
+            identifier=identifier,
+            columns=reader.columns,
+            data_file=data_file,
+            row_count=reader.row_count,
+            max_row_id=reader.row_count - 1,
+            data_format=self.data_format,
+            row_index_file=row_index_file
+        )
+        dataset.to_file(
+            descriptor_file=os.path.join(dataset_dir, DESCRIPTOR_FILE)
+        )
+        return dataset
+
+    def add_reference(self, identifier, delta_identifier):
+        """Record that a delta dataset uses the dataset with the given
+        identifier as its base.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique identifier of the base dataset
+        delta_identifier: string
+            Unique identifier of the delta dataset
+        """
+        refs_dir = os.path.join(self.get_dataset_dir(identifier), REFS_DIR)
+        if not os.path.isdir(refs_dir):
+            os.makedirs(refs_dir)
+        open(os.path.join(refs_dir, delta_identifier), 'w').close()
+
+    def materialize_dataset(self, identifier):
+        """Write the rows of a delta dataset in the data format of the
+        datastore. Returns False if the dataset does not exist or if it is not
+        a delta dataset. Callers are expected to hold the compaction lock and
+        the file lock on the dataset folder.
+
+        Parameters
+        ----------
+        identifier : string
+            Unique dataset identifier.
+
+        Returns
+        -------
+        bool
+        """
+        dataset = self.get_dataset(identifier)
+        if dataset is None or dataset.data_format != DATA_FORMAT_DELTA:
+            return False
+        dataset_dir = self.get_dataset_dir(identifier)
+        # Write the materialized rows and the new descriptor to a temporary
+        # folder first. Then move the files into the dataset folder.
+        tmp_dir = tempfile.mkdtemp(prefix=COMPACT_DIR_PREFIX, dir=dataset_dir)
+        try:
+            with dataset.reader() as reader:
+                data_file, row_index_file = self.write_rows(
+                    tmp_dir,
+                    dataset.columns,
+                    reader
+                )
+            files = [data_file, row_index_file]
+            chunk_list_file = os.path.join(tmp_dir, CHUNK_LIST_FILE)
+            if os.path.isfile(chunk_list_file):
+                os.replace(
+                    chunk_list_file,
+                    os.path.join(dataset_dir, CHUNK_LIST_FILE)
+                )
+            for i in range(len(files)):
+                if not files[i] is None:
+                    target = os.path.join(
+                        dataset_dir,
+                        os.path.basename(files[i])
+                    )
+                    os.replace(files[i], target)
+                    files[i] = target
+            compacted = FileSystemDatasetHandle(
+                identifier=identifier,
+                columns=dataset.columns,
+                data_file=files[0],
+                row_count=dataset.row_count,
+                max_row_id=dataset.max_row_id(),
+                data_format=self.data_format,
+                row_index_file=files[1]
+            )
+            descriptor_file = os.path.join(tmp_dir, DESCRIPTOR_FILE)
+            compacted.to_file(descriptor_file=descriptor_file)
+            os.replace(
+                descriptor_file,
+                os.path.join(dataset_dir, DESCRIPTOR_FILE)
+            )
+        finally:
+            shutil.rmtree(tmp_dir)
+        os.remove(dataset.data_file)
+        self.remove_reference(dataset.base.identifier, identifier)
+        return True
+
+    def remove_reference(self, identifier, delta_identifier):
+        """Remove the reference from a base dataset to a delta dataset.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique identifier of the base dataset
+        delta_identifier: string
+            Unique identifier of the delta dataset
+        """
+        ref_file = os.path.join(
+            self.get_dataset_dir(identifier),
+            REFS_DIR,
+            delta_identifier
+        )
+        if os.path.isfile(ref_file):
+            os.remove(ref_file)
+
+    def remove_temporary_dirs(self):
+        """Remove temporary folders of materializations that did not finish,
+        e.g., because the process was terminated. Dataset folders that are
+        locked by a running materialization are skipped.
+        """
+        for identifier in os.listdir(self.base_path):
+            dataset_dir = os.path.join(self.base_path, identifier)
+            if not os.path.isdir(dataset_dir):
+                continue
+            tmp_dirs = [
+                name for name in os.listdir(dataset_dir)
+                    if name.startswith(COMPACT_DIR_PREFIX)
+            ]
+            if len(tmp_dirs) == 0:
+                continue
+            with lock_dataset_dir(dataset_dir, blocking=False) as is_locked:
+                if is_locked:
+                    for name in tmp_dirs:
+                        shutil.rmtree(
+                            os.path.join(dataset_dir, name),
+                            ignore_errors=True
+                        )
+
+    def write_dataset(
+        self, columns, rows, row_count, max_row_id, annotations=None
+    ):
+        """Create a new dataset from a stream of rows. Rows are written to disk
+        as they are read from the stream. In contrast to create_dataset the
+        rows are not validated. The stream is expected to contain the (possibly
+        re-ordered) rows of an existing dataset.
+
+        Parameters
+        ----------
+        columns: list(vizier.datastore.dataset.DatasetColumn)
+            List of columns. It is expected that each column has a unique
+            identifier.
+        rows: iterable(vizier.datastore.dataset.DatasetRow)
+            Stream of dataset rows.
+        row_count: int
+            Number of rows in the stream
+        max_row_id: int
+            Maximum row identifier in the stream
+        annotations: vizier.datastore.annotation.dataset.DatasetMetadata, optional
+            Annotations for dataset components
+
+        Returns
+        -------
+        vizier.datastore.dataset.DatasetDescriptor
+        """
+        # Get new identifier and create directory for new dataset
         identifier = get_unique_identifier()
         dataset_dir = self.get_dataset_dir(identifier)
         os.makedirs(dataset_dir)
         # Write rows to data file
-        data_file = os.path.join(dataset_dir, DATA_FILE)
-        DefaultJsonDatasetReader(data_file).write(rows)
-        # Create dataset an write descriptor to file
+        data_file, row_index_file = self.write_rows(dataset_dir, columns, rows)
+        # Create dataset an write dataset file
         dataset = FileSystemDatasetHandle(
             identifier=identifier,
             columns=columns,
             data_file=data_file,
-            row_count=len(rows),
-            max_row_id=len(rows) - 1
+            row_count=row_count,
+            max_row_id=max_row_id,
+            annotations=annotations,
+            data_format=self.data_format,
+            row_index_file=row_index_file
         )
         dataset.to_file(
             descriptor_file=os.path.join(dataset_dir, DESCRIPTOR_FILE)
         )
-        return dataset
+        # Write metadata file if annotations are given
+        if not annotations is None:
+            dataset.annotations.to_file(
+                self.get_metadata_filename(identifier)
+            )
+        # Return handle for new dataset
+        return DatasetDescriptor(
+            identifier=dataset.identifier,
+            columns=dataset.columns,
+            row_count=dataset.row_count
+        )
+
+    def write_rows(self, dataset_dir, columns, rows):
+        """Write the rows of a new dataset in the data format of the datastore.
+        Returns the path to the data file (or data directory for datasets in
+        columnar format) and the path to the row index file. Datasets in Json
+        format have a row index file next to the data file. The row index is
+        None for datasets in columnar format.
+
+        All written files are added to the chunk store if deduplication is
+        enabled for the datastore. The referenced chunks are listed in the
+        chunk list file in the dataset directory.
+
+        Parameters
+        ----------
+        dataset_dir: string
+            Base directory for the new dataset
+        columns: list(vizier.datastore.dataset.DatasetColumn)
+            List of columns in the dataset schema
+        rows: iterable(vizier.datastore.dataset.DatasetRow)
+            List of dataset rows
+
+        Returns
+        -------
+        string, string
+        """
+        if self.data_format == DATA_FORMAT_COLUMNAR:
+            data_file = os.path.join(dataset_dir, COLUMNAR_DATA_DIR)
+            ColumnarDatasetReader(data_file, columns=columns).write(rows)
+            row_index_file = None
+        else:
+            data_file = os.path.join(dataset_dir, DATA_FILE)
+            row_index = RowIndex()
+            DefaultJsonDatasetReader(data_file).write(rows, row_index=row_index)
+            row_index_file = os.path.join(dataset_dir, ROW_INDEX_FILE)
+            row_index.to_file(row_index_file)
+        if not self.chunks is None:
+            chunks = self.chunks.add_all(data_file)
+            if not row_index_file is None:
+                chunk = self.chunks.add(row_index_file)
+                if not chunk is None:
+                    chunks.append(chunk)
+            write_chunk_list(dataset_dir, chunks)
+        return data_file, row_index_file
 
 
 # ------------------------------------------------------------------------------
 # Helper Methods
 # ------------------------------------------------------------------------------
 
+@contextmanager
+def lock_dataset_dir(dataset_dir, blocking=True):
+    """Context manager that holds an exclusive file lock on the given dataset
+    folder. The lock is shared by all processes that access the datastore.
+    Yields True if the lock was acquired. If blocking is False, the result is
+    False if the folder is locked by someone else. On platforms that do not
+    support file locks the result is always True.
+
+    Parameters
+    ----------
+    dataset_dir: string
+        Path to the dataset folder
+    blocking: bool, optional
+        Wait for the lock if True
+
+    Returns
+    -------
+    bool
+    """
+    if fcntl is None:
+        yield True
+        return
+    fd = os.open(dataset_dir, os.O_RDONLY)
+    try:
+        flags = fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+            is_locked = True
+        except BlockingIOError:
+            is_locked = False
+        yield is_locked
+    finally:
+        # Closing the file descriptor releases the lock
+        os.close(fd)
+
+
 def validate_dataset(columns, rows):
     """Validate that (i) each column has a unique identifier, (ii) each row has
     a unique identifier, and (iii) each row has exactly one value per column.
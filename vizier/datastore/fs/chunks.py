@@ -0,0 +1,302 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Content-addressed store for the data files of datasets in the file system
+datastore.
+
+Many datasets contain the same rows as the dataset they were derived from
+(e.g., after annotation changes or when a module is re-run). The chunk store
+keeps a single copy of every distinct data file. Data files are addressed by
+the hash of their content. Json data files and row index files are stored as
+a single chunk each. For datasets in columnar format every column file of a
+chunk is stored separately, i.e., chunks that did not change are shared
+between datasets.
+
+Data files in the dataset folders are hard links to the files in the chunk
+store. Readers therefore access the data files in the dataset folder as
+before. The number of links to a chunk file is the reference count for the
+chunk. The content hashes of the chunks that a dataset references are listed
+in a chunk list file in the dataset folder. When a dataset is deleted, the
+chunks in its list are released, i.e., they are removed if they are no longer
+referenced by any dataset folder (the link count is one). A full scan of the
+store is only necessary to collect chunks of datasets without a chunk list.
+If the file system does not support hard links the data files remain in the
+dataset folders.
+
+The layout of the store directory is as follows:
+
+    <hash-prefix>/<hash>
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+
+"""Name of the chunk store directory in the datastore base directory."""
+CHUNKS_DIR = '.chunks'
+
+"""Name of the file in a dataset folder that lists the referenced chunks."""
+CHUNK_LIST_FILE = 'chunks.json'
+
+"""Number of hash characters that are used as the name of the subfolder that
+contains a chunk file."""
+PREFIX_LENGTH = 2
+
+"""Size of blocks that are read when computing the content hash."""
+READ_BLOCK_SIZE = 65536
+
+
+class ChunkStore(object):
+    """Store for data file chunks. Files that are added to the store are
+    replaced by hard links to the stored chunk with the same content.
+    """
+    def __init__(self, base_path):
+        """Initialize the store directory. The directory is created when the
+        first chunk is added.
+
+        Parameters
+        ----------
+        base_path: string
+            Path to the chunk store directory
+        """
+        self.base_path = os.path.abspath(base_path)
+
+    def add(self, filename):
+        """Add the given data file to the store. If a chunk with the same
+        content exists, the file is replaced by a hard link to the existing
+        chunk. Otherwise, the file becomes the new chunk. Returns the content
+        hash of the file or None if the file could not be linked to the store.
+
+        Parameters
+        ----------
+        filename: string
+            Path to a data file
+
+        Returns
+        -------
+        string
+        """
+        chunk = content_hash(filename)
+        chunk_file = self.get_chunk_file(chunk)
+        chunk_dir = os.path.dirname(chunk_file)
+        if not os.path.isdir(chunk_dir):
+            os.makedirs(chunk_dir, exist_ok=True)
+        try:
+            # Link the existing chunk into the dataset folder. Use a temporary
+            # name in the folder of the data file first and then replace the
+            # data file to ensure that the data file always exists.
+            fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(filename))
+            os.close(fd)
+            os.remove(tmp_file)
+            os.link(chunk_file, tmp_file)
+            os.replace(tmp_file, filename)
+            return chunk
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return None
+        # The data file becomes the new chunk. The chunk may have been added
+        # by a concurrent writer in the meantime. This case is ignored, i.e.,
+        # the data file is not shared.
+        try:
+            os.link(filename, chunk_file)
+        except OSError:
+            return None
+        return chunk
+
+    def add_all(self, path):
+        """Add all data files in the given directory (and its subfolders) to
+        the store. If the path references a file only that file is added.
+        Returns the list of content hashes for the files that were linked to
+        the store.
+
+        Parameters
+        ----------
+        path: string
+            Path to a data file or directory
+
+        Returns
+        -------
+        list(string)
+        """
+        if os.path.isfile(path):
+            filenames = [path]
+        else:
+            filenames = list()
+            for root, _, files in os.walk(path):
+                for filename in files:
+                    filenames.append(os.path.join(root, filename))
+        chunks = list()
+        for filename in filenames:
+            chunk = self.add(filename)
+            if not chunk is None:
+                chunks.append(chunk)
+        return chunks
+
+    def collect(self):
+        """Remove all chunks that are not referenced by any dataset. Returns
+        the number of removed chunks. Scans the whole store.
+
+        Returns
+        -------
+        int
+        """
+        count = 0
+        if not os.path.isdir(self.base_path):
+            return count
+        for prefix in os.listdir(self.base_path):
+            chunk_dir = os.path.join(self.base_path, prefix)
+            if not os.path.isdir(chunk_dir):
+                continue
+            for chunk in os.listdir(chunk_dir):
+                if self.reference_count(chunk) == 0:
+                    try:
+                        os.remove(os.path.join(chunk_dir, chunk))
+                        count += 1
+                    except OSError:
+                        pass
+            if len(os.listdir(chunk_dir)) == 0:
+                try:
+                    os.rmdir(chunk_dir)
+                except OSError:
+                    pass
+        return count
+
+    def get_chunk_file(self, chunk):
+        """Get the path to the file for the chunk with the given content hash.
+
+        Parameters
+        ----------
+        chunk: string
+            Content hash
+
+        Returns
+        -------
+        string
+        """
+        return os.path.join(self.base_path, chunk[:PREFIX_LENGTH], chunk)
+
+    def release(self, chunks):
+        """Remove the given chunks if they are no longer referenced by any
+        dataset. Returns the number of removed chunks.
+
+        Parameters
+        ----------
+        chunks: list(string)
+            Content hashes of chunks that were referenced by a deleted dataset
+
+        Returns
+        -------
+        int
+        """
+        count = 0
+        for chunk in set(chunks):
+            if self.reference_count(chunk) != 0:
+                continue
+            chunk_file = self.get_chunk_file(chunk)
+            try:
+                os.remove(chunk_file)
+                count += 1
+            except OSError:
+                continue
+            try:
+                os.rmdir(os.path.dirname(chunk_file))
+            except OSError:
+                # The folder contains other chunks
+                pass
+        return count
+
+    def reference_count(self, chunk):
+        """Get the number of data files that reference the chunk with the given
+        content hash. The result is None if the chunk does not exist.
+
+        Parameters
+        ----------
+        chunk: string
+            Content hash
+
+        Returns
+        -------
+        int
+        """
+        try:
+            return os.stat(self.get_chunk_file(chunk)).st_nlink - 1
+        except OSError:
+            return None
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def content_hash(filename):
+    """Get the SHA-256 hash of the content of the given file.
+
+    Parameters
+    ----------
+    filename: string
+        Path to a file
+
+    Returns
+    -------
+    string
+    """
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        while True:
+            block = f.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_chunk_list(dataset_dir):
+    """Read the list of chunks that are referenced by the dataset in the given
+    folder. The result is empty if the dataset has no chunk list.
+
+    Parameters
+    ----------
+    dataset_dir: string
+        Path to the dataset folder
+
+    Returns
+    -------
+    list(string)
+    """
+    try:
+        with open(os.path.join(dataset_dir, CHUNK_LIST_FILE), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return list()
+
+
+def write_chunk_list(dataset_dir, chunks):
+    """Write the list of chunks that are referenced by the dataset in the
+    given folder.
+
+    Parameters
+    ----------
+    dataset_dir: string
+        Path to the dataset folder
+    chunks: list(string)
+        Content hashes of the referenced chunks
+    """
+    with open(os.path.join(dataset_dir, CHUNK_LIST_FILE), 'w') as f:
+        json.dump(chunks, f)
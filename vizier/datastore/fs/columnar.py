@@ -0,0 +1,466 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Columnar storage format for datasets in the file system datastore.
+
+Dataset rows are split horizontally into chunks of a fixed number of rows.
+Within each chunk the values of every column are stored in a separate file.
+This allows readers to access only the chunks that overlap the requested row
+range and only the files for the requested columns. The layout of a dataset
+data directory is as follows:
+
+    index.json
+    <chunk>/rowid.npy
+    <chunk>/<column-id>.npy
+    <chunk>/<column-id>.null.npy
+    <chunk>/<column-id>.json
+
+The index file contains the chunk size and the number of rows in each chunk.
+Columns where all values in a chunk are integers or all values are floats are
+stored as typed NumPy arrays (with an optional mask for null values). All other
+columns are stored as a Json array of values.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from vizier.datastore.dataset import DatasetRow
+from vizier.datastore.reader import DatasetReader
+
+
+"""Default number of rows in each chunk."""
+DEFAULT_CHUNK_SIZE = 10000
+
+"""File names and Json element names for the columnar data directory."""
+INDEX_FILE = 'index.json'
+ROWID_FILE = 'rowid.npy'
+
+KEY_CHUNK_SIZE = 'chunkSize'
+KEY_CHUNKS = 'chunks'
+KEY_CHUNK_ROWS = 'rows'
+KEY_CHUNK_TYPES = 'types'
+KEY_ROWCOUNT = 'rowCount'
+
+"""Storage types for column values in a chunk."""
+CHUNK_INT = 'int'
+CHUNK_JSON = 'json'
+CHUNK_REAL = 'real'
+
+"""Value range for integers that can be stored in 64-bit arrays."""
+INT64_MIN = -(2 ** 63)
+INT64_MAX = 2 ** 63 - 1
+
+
+class ColumnarDatasetReader(DatasetReader):
+    """Dataset reader for datasets stored in the columnar format. The reader
+    only loads the chunks that contain rows in the requested range. Numeric
+    column files are memory mapped so that only the requested slice of each
+    chunk is read from disk.
+
+    If a list of column identifier is given the values in the returned rows
+    are restricted to those columns (in the order of the given list).
+    """
+    def __init__(
+        self, data_dir, columns, offset=0, limit=-1, column_ids=None,
+        chunk_size=DEFAULT_CHUNK_SIZE
+    ):
+        """Initialize information about the data directory.
+
+        Parameters
+        ----------
+        data_dir: string
+            Path to the directory that contains the column chunk files
+        columns: list(vizier.datastore.dataset.DatasetColumn)
+            List of columns in the dataset schema.
+        offset: int, optional
+            Number of rows at the beginning of the list that are skipped.
+        limit: int, optional
+            Limits the number of rows that are returned.
+        column_ids: list(int), optional
+            Identifier of columns whose values are returned. Values for all
+            columns are returned if None.
+        chunk_size: int, optional
+            Number of rows per chunk when writing a dataset
+        """
+        self.data_dir = data_dir
+        self.columns = columns
+        self.offset = offset
+        self.limit = limit
+        self.column_ids = column_ids
+        self.chunk_size = chunk_size
+        # Variables that maintain the internal state of the reader. The list
+        # of pending chunks contains (chunk index, start, end) triples for the
+        # chunks that overlap the requested row range. Rows are decoded one
+        # chunk at a time.
+        self.is_open = False
+        self.chunks = None
+        self.types = None
+        self.row_ids = None
+        self.values = None
+        self.read_index = None
+
+    def close(self):
+        """Release the decoded chunk data and set the is_open flag to False."""
+        self.chunks = None
+        self.types = None
+        self.row_ids = None
+        self.values = None
+        self.read_index = None
+        self.is_open = False
+
+    def __next__(self):
+        """Return the next row in the dataset iterator. Raises StopIteration if
+        the end of the requested range is reached or the reader has been
+        closed.
+
+        Returns
+        -------
+        vizier.datastore.base.DatasetRow
+        """
+        if self.is_open:
+            while self.read_index >= len(self.row_ids):
+                if len(self.chunks) == 0:
+                    self.close()
+                    raise StopIteration
+                self.load_chunk(*self.chunks.pop(0))
+            i = self.read_index
+            self.read_index += 1
+            return DatasetRow(
+                identifier=self.row_ids[i],
+                values=[col[i] for col in self.values]
+            )
+        raise StopIteration
+
+    def load_chunk(self, chunk, start, end):
+        """Decode the row identifier and the values for all selected columns in
+        the given row range of a chunk.
+
+        Parameters
+        ----------
+        chunk: int
+            Chunk index
+        start: int
+            Index of the first row in the chunk that is read
+        end: int
+            Index after the last row in the chunk that is read
+        """
+        chunk_dir = os.path.join(self.data_dir, str(chunk))
+        types = self.types[chunk]
+        row_ids = np.load(os.path.join(chunk_dir, ROWID_FILE), mmap_mode='r')
+        self.row_ids = row_ids[start:end].tolist()
+        self.values = list()
+        for col_id in self.column_ids:
+            self.values.append(
+                read_column(
+                    chunk_dir=chunk_dir,
+                    column_id=col_id,
+                    data_type=types[str(col_id)],
+                    start=start,
+                    end=end
+                )
+            )
+        self.read_index = 0
+
+    def open(self):
+        """Setup the reader by reading the chunk index and identifying the
+        chunks that overlap the requested row range.
+
+        Returns
+        -------
+        vizier.datastore.fs.columnar.ColumnarDatasetReader
+        """
+        # Only open if flag is false. Otherwise, return immediately
+        if not self.is_open:
+            with open(os.path.join(self.data_dir, INDEX_FILE), 'r') as f:
+                doc = json.load(f)
+            if self.column_ids is None:
+                self.column_ids = [col.identifier for col in self.columns]
+            self.types = [c[KEY_CHUNK_TYPES] for c in doc[KEY_CHUNKS]]
+            self.chunks = list()
+            first = self.offset
+            last = doc[KEY_ROWCOUNT]
+            if self.limit > 0:
+                last = min(last, first + self.limit)
+            chunk_start = 0
+            for chunk, c in enumerate(doc[KEY_CHUNKS]):
+                chunk_end = chunk_start + c[KEY_CHUNK_ROWS]
+                if chunk_end > first and chunk_start < last:
+                    self.chunks.append((
+                        chunk,
+                        max(first, chunk_start) - chunk_start,
+                        min(last, chunk_end) - chunk_start
+                    ))
+                chunk_start = chunk_end
+            self.row_ids = list()
+            self.values = list()
+            self.read_index = 0
+            self.is_open = True
+        return self
+
+    def write(self, rows):
+        """Write the given rows to the data directory in columnar format. Rows
+        are consumed in chunks, i.e., the given rows may be any iterable
+        (e.g., another dataset reader).
+
+        Parameters
+        ----------
+        rows: iterable(vizier.datastore.dataset.DatasetRow)
+            Dataset rows
+        """
+        if not os.path.isdir(self.data_dir):
+            os.makedirs(self.data_dir)
+        chunks = list()
+        row_count = 0
+        buffer = list()
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) == self.chunk_size:
+                chunks.append(self.write_chunk(len(chunks), buffer))
+                row_count += len(buffer)
+                buffer = list()
+        if len(buffer) > 0:
+            chunks.append(self.write_chunk(len(chunks), buffer))
+            row_count += len(buffer)
+        with open(os.path.join(self.data_dir, INDEX_FILE), 'w') as f:
+            json.dump({
+                    KEY_CHUNK_SIZE: self.chunk_size,
+                    KEY_ROWCOUNT: row_count,
+                    KEY_CHUNKS: chunks
+                },
+                f
+            )
+
+    def write_chunk(self, chunk, rows):
+        """Write a single chunk of rows. Returns the index entry for the
+        chunk.
+
+        Parameters
+        ----------
+        chunk: int
+            Chunk index
+        rows: list(vizier.datastore.dataset.DatasetRow)
+            Rows in the chunk
+
+        Returns
+        -------
+        dict
+        """
+        chunk_dir = os.path.join(self.data_dir, str(chunk))
+        os.makedirs(chunk_dir)
+        np.save(
+            os.path.join(chunk_dir, ROWID_FILE),
+            np.array([row.identifier for row in rows], dtype=np.int64)
+        )
+        types = dict()
+        for col_idx, col in enumerate(self.columns):
+            types[str(col.identifier)] = write_column(
+                chunk_dir=chunk_dir,
+                column_id=col.identifier,
+                values=[row.values[col_idx] for row in rows]
+            )
+        return {KEY_CHUNK_ROWS: len(rows), KEY_CHUNK_TYPES: types}
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def get_chunk_type(values):
+    """Get the storage type for a list of column values. Integer (or float)
+    arrays are used if all values that are not None are integers (or floats).
+    Boolean values are not considered as integers to preserve their type.
+
+    Parameters
+    ----------
+    values: list
+        List of column values in a chunk
+
+    Returns
+    -------
+    string
+    """
+    data_type = None
+    for val in values:
+        if val is None:
+            continue
+        if isinstance(val, int) and not isinstance(val, bool):
+            if val < INT64_MIN or val > INT64_MAX:
+                return CHUNK_JSON
+            val_type = CHUNK_INT
+        elif isinstance(val, float):
+            val_type = CHUNK_REAL
+        else:
+            return CHUNK_JSON
+        if data_type is None:
+            data_type = val_type
+        elif data_type != val_type:
+            return CHUNK_JSON
+    return data_type if not data_type is None else CHUNK_JSON
+
+
+def get_row_position(data_dir, row_id):
+    """Get the position of the row with the given identifier in a dataset
+    that is stored in columnar format. Returns None if no row with the given
+    identifier exists. Only the row identifier files are read.
+
+    Parameters
+    ----------
+    data_dir: string
+        Path to the directory that contains the column chunk files
+    row_id: int
+        Unique row identifier
+
+    Returns
+    -------
+    int
+    """
+    with open(os.path.join(data_dir, INDEX_FILE), 'r') as f:
+        doc = json.load(f)
+    chunk_start = 0
+    for chunk, c in enumerate(doc[KEY_CHUNKS]):
+        row_ids = np.load(
+            os.path.join(data_dir, str(chunk), ROWID_FILE),
+            mmap_mode='r'
+        )
+        match = np.flatnonzero(row_ids == row_id)
+        if len(match) > 0:
+            return chunk_start + int(match[0])
+        chunk_start += c[KEY_CHUNK_ROWS]
+    return None
+
+
+def read_column(chunk_dir, column_id, data_type, start, end):
+    """Read the values in the given row range for a column in a chunk.
+
+    Parameters
+    ----------
+    chunk_dir: string
+        Path to the chunk directory
+    column_id: int
+        Unique column identifier
+    data_type: string
+        Storage type for the column values in the chunk
+    start: int
+        Index of the first row that is read
+    end: int
+        Index after the last row that is read
+
+    Returns
+    -------
+    list
+    """
+    prefix = os.path.join(chunk_dir, str(column_id))
+    if data_type == CHUNK_JSON:
+        with open(prefix + '.json', 'r') as f:
+            return json.load(f)[start:end]
+    values = np.load(prefix + '.npy', mmap_mode='r')[start:end].tolist()
+    null_file = prefix + '.null.npy'
+    if os.path.isfile(null_file):
+        nulls = np.load(null_file, mmap_mode='r')[start:end]
+        for i in np.flatnonzero(nulls):
+            values[i] = None
+    return values
+
+
+def read_numeric_column(data_dir, column_id, offset=0, limit=-1):
+    """Read the values of a numeric column in the given row range as a masked
+    NumPy array. Null values are masked. The array is of type float if any of
+    the chunks stores the column as floats. Returns None if the column is not
+    stored as a numeric array in all chunks that overlap the row range.
+
+    Parameters
+    ----------
+    data_dir: string
+        Path to the directory that contains the column chunk files
+    column_id: int
+        Unique column identifier
+    offset: int, optional
+        Number of rows at the beginning of the list that are skipped.
+    limit: int, optional
+        Limits the number of rows that are returned.
+
+    Returns
+    -------
+    numpy.ma.MaskedArray
+    """
+    with open(os.path.join(data_dir, INDEX_FILE), 'r') as f:
+        doc = json.load(f)
+    last = doc[KEY_ROWCOUNT]
+    if limit > 0:
+        last = min(last, offset + limit)
+    arrays = list()
+    masks = list()
+    chunk_start = 0
+    for chunk, c in enumerate(doc[KEY_CHUNKS]):
+        chunk_end = chunk_start + c[KEY_CHUNK_ROWS]
+        if chunk_end > offset and chunk_start < last:
+            if c[KEY_CHUNK_TYPES][str(column_id)] == CHUNK_JSON:
+                return None
+            start = max(offset, chunk_start) - chunk_start
+            end = min(last, chunk_end) - chunk_start
+            prefix = os.path.join(data_dir, str(chunk), str(column_id))
+            arrays.append(np.load(prefix + '.npy', mmap_mode='r')[start:end])
+            null_file = prefix + '.null.npy'
+            if os.path.isfile(null_file):
+                masks.append(np.load(null_file, mmap_mode='r')[start:end])
+            else:
+                masks.append(np.zeros(end - start, dtype=bool))
+        chunk_start = chunk_end
+    if len(arrays) == 0:
+        return None
+    return np.ma.masked_array(np.concatenate(arrays), mask=np.concatenate(masks))
+
+
+def write_column(chunk_dir, column_id, values):
+    """Write the values of a column in a chunk. Returns the storage type for
+    the column values.
+
+    Parameters
+    ----------
+    chunk_dir: string
+        Path to the chunk directory
+    column_id: int
+        Unique column identifier
+    values: list
+        Column values
+
+    Returns
+    -------
+    string
+    """
+    prefix = os.path.join(chunk_dir, str(column_id))
+    data_type = get_chunk_type(values)
+    if data_type == CHUNK_JSON:
+        with open(prefix + '.json', 'w') as f:
+            json.dump(values, f)
+        return data_type
+    if data_type == CHUNK_INT:
+        dtype, null_value = np.int64, 0
+    else:
+        dtype, null_value = np.float64, np.nan
+    nulls = [val is None for val in values]
+    np.save(
+        prefix + '.npy',
+        np.array(
+            [null_value if val is None else val for val in values],
+            dtype=dtype
+        )
+    )
+    if any(nulls):
+        np.save(prefix + '.null.npy', np.array(nulls, dtype=bool))
+    return data_type
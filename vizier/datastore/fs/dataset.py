@@ -21,16 +21,46 @@ two files: the dataset descriptor and the data itself.
 The dataset descriptor is stored in a file in Json format that contains the
 schema, row count, and the counters for column and row identifier.
 
-The data file is also in Json format containing one an array of rows where each
-row is an object with id and an array of values, one for each of the columns in
-the dataset schema.
+The data file is either in Json format containing one an array of rows where
+each row is an object with id and an array of values, one for each of the
+columns in the dataset schema, or a directory containing the dataset rows in
+columnar format (see vizier.datastore.fs.columnar). Delta datasets do not have
+a data file. They reference a base dataset and contain a change log instead
+(see vizier.datastore.fs.delta).
 """
 
 import json
+import os
 
 from vizier.datastore.annotation.dataset import DatasetMetadata
 from vizier.datastore.dataset import DatasetColumn, DatasetHandle
-from vizier.datastore.reader import DefaultJsonDatasetReader
+from vizier.datastore.fs.columnar import ColumnarDatasetReader
+from vizier.datastore.fs.delta import DeltaDatasetReader
+from vizier.datastore.reader import DefaultJsonDatasetReader, RowIndex
+
+import vizier.datastore.fs.columnar as columnar
+import vizier.datastore.fs.delta as delta
+
+
+"""Identifier for supported data storage formats."""
+DATA_FORMAT_COLUMNAR = 'columnar'
+DATA_FORMAT_DELTA = 'delta'
+DATA_FORMAT_JSON = 'json'
+
+DATA_FORMATS = [DATA_FORMAT_COLUMNAR, DATA_FORMAT_DELTA, DATA_FORMAT_JSON]
+
+"""Constants for data file names."""
+DATA_FILE = 'data.json'
+DESCRIPTOR_FILE = 'descriptor.json'
+
+"""Name of the data directory for datasets in columnar format."""
+COLUMNAR_DATA_DIR = 'columns'
+
+"""Name of the row index file for datasets in Json format."""
+ROW_INDEX_FILE = 'rowindex.bin'
+
+"""Name of the change log file for delta datasets."""
+DELTA_FILE = 'delta.json'
 
 
 """Json element labels for dataset serialization."""
@@ -38,7 +68,9 @@ KEY_IDENTIFIER = 'id'
 KEY_COLUMN_ID = 'id'
 KEY_COLUMN_NAME = 'name'
 KEY_COLUMN_TYPE = 'type'
+KEY_BASE = 'base'
 KEY_COLUMNS = 'columns'
+KEY_DATAFORMAT = 'dataFormat'
 KEY_ROWCOUNT = 'rowCount'
 KEY_MAXROWID = 'maxRowId'
 
@@ -49,17 +81,21 @@ class FileSystemDatasetHandle(DatasetHandle):
     The dataset handle keeps counters for columns and rows id's to generate
     unique unique identifier.
 
-    The dataset rows are stored in a separate file. The file format is JSON with
-    the following structure:
+    The dataset rows are stored in a separate file. The default file format is
+    JSON with the following structure:
         {
             'rows': [
                 {'id': int, 'values': [...]}
             ]
         }
+    Alternatively, the rows are stored in columnar format in a separate
+    directory. For delta datasets the rows are derived from the rows of a base
+    dataset and a change log.
     """
     def __init__(
         self, identifier, columns, max_row_id, data_file, row_count=0,
-        annotations=None
+        annotations=None, data_format=DATA_FORMAT_JSON, row_index_file=None,
+        base=None
     ):
         """Initialize the dataset handle.
 
@@ -71,13 +107,24 @@ class FileSystemDatasetHandle(DatasetHandle):
             List of columns. It is expected that each column has a unique
             identifier.
         data_file: string
-            Path to the file that contains the dataset rows. The data is stored
-            in Json format.
+            Path to the file that contains the dataset rows. For datasets in
+            columnar format this is the path to the data directory. For delta
+            datasets this is the path to the change log file.
         rows: int, optional
             Number of rows in the dataset
         annotations: vizier.datastore.annotation.dataset.DatasetMetadata, optional
             Annotations for dataset components
+        data_format: string, optional
+            Format of the stored dataset rows
+        row_index_file: string, optional
+            Path to the row index for datasets in Json format
+        base: vizier.datastore.fs.dataset.FileSystemDatasetHandle, optional
+            Handle for the base dataset of a delta dataset
         """
+        if not data_format in DATA_FORMATS:
+            raise ValueError('unknown data format \'' + str(data_format) + '\'')
+        elif data_format == DATA_FORMAT_DELTA and base is None:
+            raise ValueError('missing base dataset')
         super(FileSystemDatasetHandle, self).__init__(
             identifier=identifier,
             columns=columns,
@@ -85,6 +132,12 @@ class FileSystemDatasetHandle(DatasetHandle):
             annotations=annotations
         )
         self.data_file = data_file
+        self.data_format = data_format
+        self.row_index_file = row_index_file
+        self.base = base
+        # Mapping of row identifier to row positions. The mapping is read from
+        # the row index file on first access.
+        self.row_positions = None
         if max_row_id is None:
             raise ValueError('invalid max')
         self._max_row_id = max_row_id
@@ -99,7 +152,9 @@ class FileSystemDatasetHandle(DatasetHandle):
         descriptor_file: string
             Path to the file containing the dataset descriptor
         data_file: string
-            Path to the file that contains the dataset rows.
+            Path to the file that contains the dataset rows in default Json
+            format. Datasets in columnar format maintain their rows in a
+            directory next to the descriptor file instead.
         annotations: vizier.datastore.annotation.dataset.DatasetMetadata, optional
             Annotations for dataset components
 
@@ -109,6 +164,28 @@ class FileSystemDatasetHandle(DatasetHandle):
         """
         with open(descriptor_file, 'r') as f:
             doc = json.loads(f.read())
+        data_format = doc.get(KEY_DATAFORMAT, DATA_FORMAT_JSON)
+        dataset_dir = os.path.dirname(descriptor_file)
+        row_index_file = None
+        base = None
+        if data_format == DATA_FORMAT_COLUMNAR:
+            data_file = os.path.join(dataset_dir, COLUMNAR_DATA_DIR)
+        elif data_format == DATA_FORMAT_DELTA:
+            # The base dataset is maintained in a sibling folder of the delta
+            # dataset folder.
+            base_dir = os.path.join(os.path.dirname(dataset_dir), doc[KEY_BASE])
+            base = FileSystemDatasetHandle.from_file(
+                descriptor_file=os.path.join(
+                    base_dir,
+                    os.path.basename(descriptor_file)
+                ),
+                data_file=os.path.join(base_dir, os.path.basename(data_file))
+            )
+            data_file = os.path.join(dataset_dir, DELTA_FILE)
+        elif os.path.isfile(os.path.join(dataset_dir, ROW_INDEX_FILE)):
+            # Datasets that were created before row indexes were introduced
+            # do not have an index file.
+            row_index_file = os.path.join(dataset_dir, ROW_INDEX_FILE)
         return FileSystemDatasetHandle(
             identifier=doc[KEY_IDENTIFIER],
             columns=[
@@ -121,7 +198,10 @@ class FileSystemDatasetHandle(DatasetHandle):
             data_file=data_file,
             row_count=doc[KEY_ROWCOUNT],
             max_row_id=doc[KEY_MAXROWID],
-            annotations=annotations
+            annotations=annotations,
+            data_format=data_format,
+            row_index_file=row_index_file,
+            base=base
         )
 
     def get_annotations(self, column_id=None, row_id=None):
@@ -148,6 +228,62 @@ class FileSystemDatasetHandle(DatasetHandle):
         else:
             return self.annotations.for_cell(column_id=column_id, row_id=row_id)
 
+    def get_row_index(self, row_id):
+        """Get index position for the row with the given identifier. Returns
+        None if no row with row_id exists. Uses the row index (or the row
+        identifier files for datasets in columnar format) to avoid reading the
+        dataset rows.
+
+        Parameters
+        ----------
+        row_id: int
+            Unique row identifier
+
+        Returns
+        -------
+        int
+        """
+        if self.data_format == DATA_FORMAT_COLUMNAR:
+            return columnar.get_row_position(self.data_file, row_id)
+        elif not self.row_index_file is None:
+            if self.row_positions is None:
+                self.row_positions = RowIndex.read_positions(
+                    self.row_index_file
+                )
+            return self.row_positions.get(row_id)
+        elif self.data_format == DATA_FORMAT_DELTA:
+            try:
+                operations = delta.read_operations(self.data_file)
+            except FileNotFoundError:
+                return self.get_materialized().get_row_index(row_id)
+            # Rows in delta datasets that only contain schema changes and
+            # cell updates have the same position as in the base dataset.
+            if delta.preserves_positions(operations):
+                return self.base.get_row_index(row_id)
+        with self.reader(column_ids=list()) as reader:
+            for pos, row in enumerate(reader):
+                if row.identifier == row_id:
+                    return pos
+        return None
+
+    def get_materialized(self):
+        """Get a handle for the materialized version of a delta dataset.
+        Delta datasets are materialized in the background. The change log is
+        removed after the dataset descriptor has been replaced. Handles that
+        were read before use this method to access the materialized rows once
+        their change log no longer exists.
+
+        Returns
+        -------
+        vizier.datastore.fs.dataset.FileSystemDatasetHandle
+        """
+        dataset_dir = os.path.dirname(self.data_file)
+        return FileSystemDatasetHandle.from_file(
+            descriptor_file=os.path.join(dataset_dir, DESCRIPTOR_FILE),
+            data_file=os.path.join(dataset_dir, DATA_FILE),
+            annotations=self.annotations
+        )
+
     def max_row_id(self):
         """Get maximum identifier for all rows in the dataset. If the dataset
         is empty the result is -1.
@@ -158,10 +294,11 @@ class FileSystemDatasetHandle(DatasetHandle):
         """
         return self._max_row_id
 
-    def reader(self, offset=0, limit=-1):
+    def reader(self, offset=0, limit=-1, column_ids=None):
         """Get reader for the dataset to access the dataset rows. The optional
         offset amd limit parameters are used to retrieve only a subset of
-        rows.
+        rows. The optional list of column identifier restricts the values in
+        the returned rows to the given columns.
 
         Parameters
         ----------
@@ -169,16 +306,46 @@ class FileSystemDatasetHandle(DatasetHandle):
             Number of rows at the beginning of the list that are skipped.
         limit: int, optional
             Limits the number of rows that are returned.
+        column_ids: list(int), optional
+            Identifier of columns whose values are returned.
 
         Returns
         -------
-        vizier.datastore.reader.DefaultJsonDatasetReader
+        vizier.datastore.reader.DatasetReader
         """
+        if self.data_format == DATA_FORMAT_COLUMNAR:
+            return ColumnarDatasetReader(
+                self.data_file,
+                columns=self.columns,
+                offset=offset,
+                limit=limit,
+                column_ids=column_ids
+            )
+        elif self.data_format == DATA_FORMAT_DELTA:
+            try:
+                operations = delta.read_operations(self.data_file)
+            except FileNotFoundError:
+                # The dataset was materialized after the handle was read.
+                return self.get_materialized().reader(
+                    offset=offset,
+                    limit=limit,
+                    column_ids=column_ids
+                )
+            return DeltaDatasetReader(
+                base=self.base,
+                columns=self.columns,
+                operations=operations,
+                offset=offset,
+                limit=limit,
+                column_ids=column_ids
+            )
         return DefaultJsonDatasetReader(
             self.data_file,
             columns=self.columns,
             offset=offset,
-            limit=limit
+            limit=limit,
+            column_ids=column_ids,
+            row_index=self.row_index_file
         )
 
     def to_file(self, descriptor_file):
@@ -198,7 +365,10 @@ class FileSystemDatasetHandle(DatasetHandle):
                     KEY_COLUMN_TYPE: col.data_type
                 } for col in self.columns],
             KEY_ROWCOUNT: self.row_count,
-            KEY_MAXROWID: self._max_row_id
+            KEY_MAXROWID: self._max_row_id,
+            KEY_DATAFORMAT: self.data_format
         }
+        if not self.base is None:
+            doc[KEY_BASE] = self.base.identifier
         with open(descriptor_file, 'w') as f:
             json.dump(doc, f)
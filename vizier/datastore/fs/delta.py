@@ -0,0 +1,503 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Delta datasets in the file system datastore. A delta dataset does not
+contain a copy of the dataset rows. Instead, it references a materialized base
+dataset and contains a log of changes that were applied to the base dataset.
+The rows of the delta dataset are materialized while reading by applying the
+logged changes to the stream of rows in the base dataset.
+
+The change log is a list of operations. Each operation is a dictionary with an
+operation type and the type-specific arguments:
+
+    {'op': 'update', 'row': int, 'column': int, 'value': scalar}
+    {'op': 'delete', 'row': int}
+    {'op': 'insert', 'row': int, 'position': int}
+    {'op': 'move', 'row': int, 'position': int}
+    {'op': 'resetColumn', 'column': int}
+
+Positions refer to the dataset state after all previous operations in the log
+have been applied. Columns are identified by their unique identifier. The
+values of a row are mapped to the schema of the delta dataset using the column
+identifier. Renaming, moving, or removing columns therefore does not require an
+entry in the change log. The reset column operation is used when columns are
+inserted or deleted to ensure that a (re-used) column identifier does not
+expose values from the base dataset.
+"""
+
+import json
+
+from vizier.datastore.dataset import DatasetRow
+from vizier.datastore.reader import DatasetReader
+
+
+"""Json element names for change log operations."""
+KEY_OPERATION = 'op'
+KEY_COLUMN = 'column'
+KEY_POSITION = 'position'
+KEY_ROW = 'row'
+KEY_VALUE = 'value'
+
+"""Operation types."""
+OP_DELETE = 'delete'
+OP_INSERT = 'insert'
+OP_MOVE = 'move'
+OP_RESET_COLUMN = 'resetColumn'
+OP_UPDATE = 'update'
+
+"""Operations that change the position of rows in the dataset."""
+POSITIONAL_OPERATIONS = [OP_INSERT, OP_MOVE]
+
+
+class DeltaDatasetReader(DatasetReader):
+    """Dataset reader for delta datasets. Applies the operations in a change
+    log to the rows that are returned by a reader for the base dataset.
+
+    Operations that do not change the position of rows (cell updates and column
+    resets) are evaluated in a single pass using dictionaries that are keyed by
+    the row identifier. If the change log only contains these operations the
+    offset and limit are passed on to the base dataset reader. Otherwise, the
+    rows before the offset are read and skipped.
+    """
+    def __init__(
+        self, base, columns, operations, offset=0, limit=-1, column_ids=None
+    ):
+        """Initialize the base dataset and the change log.
+
+        Parameters
+        ----------
+        base: vizier.datastore.fs.dataset.FileSystemDatasetHandle
+            Handle for the materialized base dataset
+        columns: list(vizier.datastore.dataset.DatasetColumn)
+            List of columns in the schema of the delta dataset
+        operations: list(dict)
+            Change log
+        offset: int, optional
+            Number of rows at the beginning of the list that are skipped.
+        limit: int, optional
+            Limits the number of rows that are returned.
+        column_ids: list(int), optional
+            Identifier of columns whose values are returned. Values for all
+            columns are returned if None.
+        """
+        self.base = base
+        self.columns = columns
+        self.operations = operations
+        self.offset = offset
+        self.limit = limit
+        self.column_ids = column_ids
+        if self.column_ids is None:
+            self.column_ids = [col.identifier for col in columns]
+        # Variables that maintain the internal state of the reader, i.e., the
+        # reader for the base dataset and the stream of rows after applying
+        # the change log.
+        self.is_open = False
+        self.reader = None
+        self.rows = None
+
+    def close(self):
+        """Close the base dataset reader and set the is_open flag to False."""
+        if self.is_open:
+            self.reader.close()
+        self.reader = None
+        self.rows = None
+        self.is_open = False
+
+    def __next__(self):
+        """Return the next row in the dataset iterator. Raises StopIteration if
+        end of the dataset is reached or the reader has been closed.
+
+        Returns
+        -------
+        vizier.datastore.base.DatasetRow
+        """
+        if self.is_open:
+            try:
+                row_id, values = next(self.rows)
+            except StopIteration as ex:
+                self.close()
+                raise ex
+            return DatasetRow(
+                identifier=row_id,
+                values=[values.get(col_id) for col_id in self.column_ids]
+            )
+        raise StopIteration
+
+    def open(self):
+        """Setup the reader by opening the base dataset reader and chaining the
+        transformations for the operations in the change log.
+
+        Returns
+        -------
+        vizier.datastore.fs.delta.DeltaDatasetReader
+        """
+        # Only open if flag is false. Otherwise, return immediately
+        if not self.is_open:
+            has_positional_ops = not preserves_positions(self.operations)
+            # Only read values for base columns that are in the result
+            base_columns = set([col.identifier for col in self.base.columns])
+            base_ids = [c for c in self.column_ids if c in base_columns]
+            if has_positional_ops:
+                self.reader = self.base.reader(column_ids=base_ids).open()
+            else:
+                self.reader = self.base.reader(
+                    offset=self.offset,
+                    limit=self.limit,
+                    column_ids=base_ids
+                ).open()
+            rows = ((row.identifier, dict(zip(base_ids, row.values)))
+                for row in self.reader
+            )
+            # Split the change log into groups of operations that are applied
+            # in a single pass. Inserts and moves are applied individually.
+            group = list()
+            for op in self.operations:
+                if op[KEY_OPERATION] in POSITIONAL_OPERATIONS:
+                    rows = apply_operations(rows, group)
+                    group = list()
+                    if op[KEY_OPERATION] == OP_INSERT:
+                        rows = insert_row(rows, op[KEY_ROW], op[KEY_POSITION])
+                    else:
+                        rows = move_row(rows, op[KEY_ROW], op[KEY_POSITION])
+                else:
+                    group.append(op)
+            rows = apply_operations(rows, group)
+            if has_positional_ops:
+                rows = slice_rows(rows, self.offset, self.limit)
+            self.rows = rows
+            self.is_open = True
+        return self
+
+
+# ------------------------------------------------------------------------------
+# Operations
+# ------------------------------------------------------------------------------
+
+def delete_row_op(row_id):
+    """Get change log entry for deleting a row.
+
+    Parameters
+    ----------
+    row_id: int
+        Unique row identifier
+
+    Returns
+    -------
+    dict
+    """
+    return {KEY_OPERATION: OP_DELETE, KEY_ROW: row_id}
+
+
+def insert_row_op(row_id, position):
+    """Get change log entry for inserting an empty row at the given position.
+
+    Parameters
+    ----------
+    row_id: int
+        Unique identifier for the new row
+    position: int
+        Index position of the new row
+
+    Returns
+    -------
+    dict
+    """
+    return {KEY_OPERATION: OP_INSERT, KEY_ROW: row_id, KEY_POSITION: position}
+
+
+def move_row_op(row_id, position):
+    """Get change log entry for moving a row to the given position.
+
+    Parameters
+    ----------
+    row_id: int
+        Unique row identifier
+    position: int
+        Target position of the row (after removing it from its source
+        position)
+
+    Returns
+    -------
+    dict
+    """
+    return {KEY_OPERATION: OP_MOVE, KEY_ROW: row_id, KEY_POSITION: position}
+
+
+def reset_column_op(column_id):
+    """Get change log entry for setting all values of a column to None.
+
+    Parameters
+    ----------
+    column_id: int
+        Unique column identifier
+
+    Returns
+    -------
+    dict
+    """
+    return {KEY_OPERATION: OP_RESET_COLUMN, KEY_COLUMN: column_id}
+
+
+def update_cell_op(column_id, row_id, value):
+    """Get change log entry for updating the value of a dataset cell.
+
+    Parameters
+    ----------
+    column_id: int
+        Unique column identifier
+    row_id: int
+        Unique row identifier
+    value: scalar
+        New cell value
+
+    Returns
+    -------
+    dict
+    """
+    return {
+        KEY_OPERATION: OP_UPDATE,
+        KEY_COLUMN: column_id,
+        KEY_ROW: row_id,
+        KEY_VALUE: value
+    }
+
+
+def preserves_positions(operations):
+    """Test if a change log contains only operations that do not change the
+    position of rows in the dataset (i.e., cell updates and column resets).
+
+    Parameters
+    ----------
+    operations: list(dict)
+        Change log
+
+    Returns
+    -------
+    bool
+    """
+    for op in operations:
+        if op[KEY_OPERATION] in POSITIONAL_OPERATIONS + [OP_DELETE]:
+            return False
+    return True
+
+
+def read_operations(filename):
+    """Read change log from file.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the change log file
+
+    Returns
+    -------
+    list(dict)
+    """
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def write_operations(operations, filename):
+    """Write change log to file.
+
+    Parameters
+    ----------
+    operations: list(dict)
+        Change log
+    filename: string
+        Path to the change log file
+    """
+    with open(filename, 'w') as f:
+        json.dump(operations, f)
+
+
+# ------------------------------------------------------------------------------
+# Row stream transformations
+# ------------------------------------------------------------------------------
+
+def apply_operations(rows, operations):
+    """Apply a list of cell updates, row deletions, and column resets to a
+    stream of (row identifier, values) pairs. The values of each row are a
+    dictionary that maps column identifier to cell values.
+
+    Column resets apply to all rows. For each cell the last operation in the
+    list (reset or update) determines the cell value.
+
+    Parameters
+    ----------
+    rows: iterator((int, dict))
+        Stream of dataset rows
+    operations: list(dict)
+        List of position-preserving operations (and row deletions)
+
+    Returns
+    -------
+    iterator((int, dict))
+    """
+    if len(operations) == 0:
+        return rows
+    deleted = set()
+    resets = dict()
+    updates = dict()
+    for index, op in enumerate(operations):
+        op_type = op[KEY_OPERATION]
+        if op_type == OP_DELETE:
+            deleted.add(op[KEY_ROW])
+        elif op_type == OP_RESET_COLUMN:
+            resets[op[KEY_COLUMN]] = index
+        elif op_type == OP_UPDATE:
+            row_updates = updates.setdefault(op[KEY_ROW], list())
+            row_updates.append((index, op[KEY_COLUMN], op[KEY_VALUE]))
+        else:
+            raise ValueError('unexpected operation \'' + str(op_type) + '\'')
+    return transform_rows(rows, deleted, resets, updates)
+
+
+def insert_row(rows, row_id, position):
+    """Insert an empty row at the given position into a stream of rows.
+
+    Parameters
+    ----------
+    rows: iterator((int, dict))
+        Stream of dataset rows
+    row_id: int
+        Unique identifier of the new row
+    position: int
+        Index position of the new row
+
+    Returns
+    -------
+    iterator((int, dict))
+    """
+    index = 0
+    for row in rows:
+        if index == position:
+            yield row_id, dict()
+        yield row
+        index += 1
+    if index <= position:
+        yield row_id, dict()
+
+
+def move_row(rows, row_id, position):
+    """Move a row in a stream of rows to the given position. The position
+    refers to the stream without the moved row. If the row is moved towards
+    the beginning of the stream, the rows between the target position and the
+    current row position are buffered until the moved row is found.
+
+    Parameters
+    ----------
+    rows: iterator((int, dict))
+        Stream of dataset rows
+    row_id: int
+        Unique identifier of the moved row
+    position: int
+        Target position for the row
+
+    Returns
+    -------
+    iterator((int, dict))
+    """
+    moved = None
+    buffer = None
+    index = 0
+    for row in rows:
+        if row[0] == row_id:
+            moved = row
+            if not buffer is None:
+                # Found the row while buffering. Output the moved row followed
+                # by the buffered rows.
+                yield moved
+                for r in buffer:
+                    yield r
+                buffer = None
+                moved = False
+            continue
+        if not buffer is None:
+            buffer.append(row)
+            continue
+        if index == position and moved is None:
+            # Reached the target position before the moved row.
+            buffer = [row]
+            continue
+        if index == position and moved:
+            yield moved
+            moved = False
+        yield row
+        index += 1
+    if moved:
+        yield moved
+    elif not buffer is None:
+        for r in buffer:
+            yield r
+
+
+def slice_rows(rows, offset, limit):
+    """Skip the first rows in a stream and limit the number of returned rows.
+
+    Parameters
+    ----------
+    rows: iterator((int, dict))
+        Stream of dataset rows
+    offset: int
+        Number of rows at the beginning of the stream that are skipped.
+    limit: int
+        Limits the number of rows that are returned.
+
+    Returns
+    -------
+    iterator((int, dict))
+    """
+    count = 0
+    for row in rows:
+        if offset > 0:
+            offset -= 1
+            continue
+        if limit > 0 and count >= limit:
+            return
+        yield row
+        count += 1
+
+
+def transform_rows(rows, deleted, resets, updates):
+    """Generator that applies the (pre-processed) position-preserving
+    operations to each row in a stream.
+
+    Parameters
+    ----------
+    rows: iterator((int, dict))
+        Stream of dataset rows
+    deleted: set(int)
+        Identifier of deleted rows
+    resets: dict
+        Index of the last reset operation for each column
+    updates: dict
+        List of (index, column, value) tuples for updated rows
+
+    Returns
+    -------
+    iterator((int, dict))
+    """
+    for row_id, values in rows:
+        if row_id in deleted:
+            continue
+        for col_id in resets:
+            values[col_id] = None
+        if row_id in updates:
+            for index, col_id, value in updates[row_id]:
+                if index > resets.get(col_id, -1):
+                    values[col_id] = value
+        yield row_id, values
@@ -25,17 +25,19 @@ from vizier.datastore.fs.base import FileSystemDatastore
 
 """Configuration parameter."""
 PARA_DIRECTORY = 'directory'
+PARA_FORMAT = 'format'
 
 
 class FileSystemDatastoreFactory(DatastoreFactory):
     """Datastore factory for file system based datastores."""
-    def __init__(self, base_path=None, properties=None):
+    def __init__(self, base_path=None, properties=None, data_format=None):
         """Initialize the reference to the base directory that contains all
         datastore folders.
 
-        Expects a base path or a dictionary with a single entry that contains
-        the base path for all created datastores. Raises ValueError if no base
-        path is given.
+        Expects a base path or a dictionary with an entry that contains the
+        base path for all created datastores. The dictionary may contain an
+        optional entry for the data format of the created datastores. Raises
+        ValueError if no base path is given.
 
         Parameters
         ----------
@@ -43,10 +45,15 @@ class FileSystemDatastoreFactory(DatastoreFactory):
             Datastore base path
         properties: dict, optional
             Dictionary of configuration properties
+        data_format: string, optional
+            Format for storing dataset rows in the created datastores
         """
         self.base_path = base_path
+        self.data_format = data_format
         if not properties is None:
             self.base_path = os.path.abspath(properties[PARA_DIRECTORY])
+            if PARA_FORMAT in properties:
+                self.data_format = properties[PARA_FORMAT]
         if self.base_path is None:
             raise ValueError('no base path given')
 
@@ -79,4 +86,7 @@ class FileSystemDatastoreFactory(DatastoreFactory):
         vizier.datastore.base.Datastore
         """
         datastore_dir = os.path.join(self.base_path, identifier)
-        return FileSystemDatastore(datastore_dir)
+        return FileSystemDatastore(
+            datastore_dir,
+            data_format=self.data_format
+        )
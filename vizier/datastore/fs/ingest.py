@@ -0,0 +1,340 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Typed ingestion of delimited files into the file system datastore.
+
+Rows of a CSV (or TSV) file are read in chunks. The column types are inferred
+once from the first chunk. For every chunk the values of each column are then
+parsed as a whole into a typed array. Only columns in chunks that contain
+values that do not match the inferred type are converted value by value. The
+inferred column types are widened if necessary (e.g., from int to real) while
+the file is read.
+
+The value that is loaded for a cell does not depend on the column type or on
+the chunk that contains the cell. Each value is converted as if by
+vizier.core.util.cast, i.e., to an integer, a float, or a string. Parsing a
+whole column is only a faster way to compute the same values. Empty values
+are loaded as null values.
+"""
+
+import csv
+
+import numpy as np
+
+from vizier.core.util import cast
+from vizier.datastore.dataset import DatasetColumn, DatasetRow
+from vizier.datastore.dataset import DATATYPE_INT, DATATYPE_REAL
+from vizier.datastore.dataset import DATATYPE_VARCHAR
+from vizier.datastore.fs.columnar import DEFAULT_CHUNK_SIZE
+
+
+class TypedCSVReader(object):
+    """Reader for delimited files that returns dataset rows with typed values.
+    The reader expects the column names in the first row of the file. The
+    dataset columns are available after the reader has been created. Column
+    types are final once all rows have been read. The number of rows that
+    have been read is maintained in the row_count property.
+    """
+    def __init__(
+        self, fh, delimiter=',', infer_types=True, chunk_size=DEFAULT_CHUNK_SIZE
+    ):
+        """Initialize the reader and read the column names from the first row
+        of the file.
+
+        Parameters
+        ----------
+        fh: FileObject
+            Open file object
+        delimiter: string, optional
+            The column delimiter used by the file
+        infer_types: bool, optional
+            Load all values as strings if False
+        chunk_size: int, optional
+            Number of rows that are parsed together
+        """
+        self.reader = csv.reader(fh, delimiter=delimiter)
+        self.infer_types = infer_types
+        self.chunk_size = chunk_size
+        self.columns = list()
+        for col_name in next(self.reader):
+            self.columns.append(
+                DatasetColumn(
+                    identifier=len(self.columns),
+                    name=col_name.strip(),
+                    data_type=DATATYPE_VARCHAR
+                )
+            )
+        self.row_count = 0
+
+    def __iter__(self):
+        """Read rows from file chunk by chunk.
+
+        Returns
+        -------
+        iterator(vizier.datastore.dataset.DatasetRow)
+        """
+        types = None
+        chunk = list()
+        for row in self.reader:
+            chunk.append([v.strip() for v in row])
+            if len(chunk) == self.chunk_size:
+                if types is None:
+                    types = self.get_types(chunk)
+                for row in self.parse_chunk(chunk, types):
+                    yield row
+                chunk = list()
+        if len(chunk) > 0:
+            if types is None:
+                types = self.get_types(chunk)
+            for row in self.parse_chunk(chunk, types):
+                yield row
+
+    def get_types(self, chunk):
+        """Infer the column types from the rows in the first chunk. All columns
+        are of type varchar if type inference is disabled.
+
+        Parameters
+        ----------
+        chunk: list(list(string))
+            Values for rows in the first chunk
+
+        Returns
+        -------
+        list(string)
+        """
+        for col_idx, col in enumerate(self.columns):
+            if self.infer_types:
+                col.data_type = infer_column_type(column_values(chunk, col_idx))
+        return [col.data_type for col in self.columns]
+
+    def parse_chunk(self, chunk, types):
+        """Convert the values in a chunk of rows. Returns the list of dataset
+        rows for the chunk. Rows that have less (or more) values than there
+        are columns in the dataset schema keep their number of values.
+
+        Parameters
+        ----------
+        chunk: list(list(string))
+            Values for rows in the chunk
+        types: list(string)
+            Inferred column types
+
+        Returns
+        -------
+        list(vizier.datastore.dataset.DatasetRow)
+        """
+        values = list()
+        for col_idx, col in enumerate(self.columns):
+            if not self.infer_types:
+                values.append(column_values(chunk, col_idx))
+                continue
+            col_values, data_type = convert_column(
+                column_values(chunk, col_idx),
+                types[col_idx]
+            )
+            col.data_type = widen_type(col.data_type, data_type)
+            values.append(col_values)
+        rows = list()
+        col_count = len(self.columns)
+        for row, row_values in zip(chunk, zip(*values)):
+            row_values = list(row_values)
+            if len(row) < col_count:
+                row_values = row_values[:len(row)]
+            elif len(row) > col_count:
+                row_values.extend(
+                    [
+                        convert_value(v) if self.infer_types else v
+                        for v in row[col_count:]
+                    ]
+                )
+            rows.append(DatasetRow(identifier=self.row_count, values=row_values))
+            self.row_count += 1
+        return rows
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def column_values(chunk, col_idx):
+    """Get the values of a column for a chunk of rows. Missing values in short
+    rows are returned as empty strings.
+
+    Parameters
+    ----------
+    chunk: list(list(string))
+        Values for rows in a chunk
+    col_idx: int
+        Index position of the column
+
+    Returns
+    -------
+    list(string)
+    """
+    return [row[col_idx] if col_idx < len(row) else '' for row in chunk]
+
+
+def convert_column(values, data_type):
+    """Convert the values of a column in a chunk. Values in numeric columns
+    are parsed as a whole. If any of the values cannot be parsed as the given
+    type, or if the column is of type varchar, each value is converted
+    individually. Both ways yield the same values. Returns the list of
+    converted values and the type of the column in the chunk.
+
+    Parameters
+    ----------
+    values: list(string)
+        Column values
+    data_type: string
+        Inferred column type
+
+    Returns
+    -------
+    list, string
+    """
+    if data_type != DATATYPE_VARCHAR:
+        result = parse_numbers(values, data_type)
+        if not result is None:
+            return result, data_type
+    # Convert values individually. The type of the chunk is determined by the
+    # converted values.
+    result = [convert_value(v) for v in values]
+    chunk_type = None
+    for val in result:
+        if isinstance(val, int):
+            chunk_type = widen_type(chunk_type, DATATYPE_INT)
+        elif isinstance(val, float):
+            chunk_type = widen_type(chunk_type, DATATYPE_REAL)
+        elif not val is None:
+            return result, DATATYPE_VARCHAR
+    return result, chunk_type if not chunk_type is None else data_type
+
+
+def convert_value(value):
+    """Convert a single value from the file. Empty values are converted to
+    None. All other values are converted to integer or float if possible.
+
+    Parameters
+    ----------
+    value: string
+        Value in the file
+
+    Returns
+    -------
+    int, float, or string
+    """
+    return None if value == '' else cast(value)
+
+
+def infer_column_type(values):
+    """Infer the type for a column from a sample of column values. Empty
+    values are ignored. The result is varchar if all values are empty.
+
+    Parameters
+    ----------
+    values: list(string)
+        Sample of column values
+
+    Returns
+    -------
+    string
+    """
+    if all([v == '' for v in values]):
+        return DATATYPE_VARCHAR
+    for data_type in [DATATYPE_INT, DATATYPE_REAL]:
+        if not parse_numbers(values, data_type) is None:
+            return data_type
+    return DATATYPE_VARCHAR
+
+
+def parse_numbers(values, data_type):
+    """Parse a list of strings into a list of integers or floats. Empty values
+    are returned as None. The result is None if any of the values cannot be
+    parsed. Values in real columns that are integers (e.g., '2') are returned
+    as integers, the same as convert_value does.
+
+    Parameters
+    ----------
+    values: list(string)
+        Column values
+    data_type: string
+        Numeric data type (int or real)
+
+    Returns
+    -------
+    list
+    """
+    dtype = np.int64 if data_type == DATATYPE_INT else np.float64
+    strings = np.array(values, dtype=str)
+    blanks = strings == ''
+    try:
+        if not blanks.any():
+            numbers = strings.astype(dtype)
+        else:
+            numbers = np.zeros(len(values), dtype=dtype)
+            numbers[~blanks] = strings[~blanks].astype(dtype)
+    except (ValueError, OverflowError):
+        return None
+    result = numbers.tolist()
+    if data_type == DATATYPE_REAL:
+        result = integers_to_int(strings, result)
+    for i in np.flatnonzero(blanks):
+        result[i] = None
+    return result
+
+
+def integers_to_int(strings, numbers):
+    """Replace the parsed floats for strings that are integers by integers.
+
+    Parameters
+    ----------
+    strings: numpy.array
+        Column values
+    numbers: list
+        Parsed column values
+
+    Returns
+    -------
+    list
+    """
+    digits = np.char.isdigit(np.char.lstrip(strings, '+-'))
+    for i in np.flatnonzero(digits):
+        numbers[i] = int(strings[i])
+    return numbers
+
+
+def widen_type(type_1, type_2):
+    """Get the most specific type that covers the values of both given types.
+    Either of the types may be None.
+
+    Parameters
+    ----------
+    type_1: string
+        Column data type
+    type_2: string
+        Column data type
+
+    Returns
+    -------
+    string
+    """
+    if type_1 is None or type_1 == type_2:
+        return type_2
+    elif type_2 is None:
+        return type_1
+    elif type_1 in [DATATYPE_INT, DATATYPE_REAL] and type_2 in [DATATYPE_INT, DATATYPE_REAL]:
+        return DATATYPE_REAL
+    return DATATYPE_VARCHAR
@@ -0,0 +1,152 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Cache for the schema and row count of views in the Mimir backend.
+
+Every dataset in the Mimir datastore is a table or view in the Mimir backend.
+Views are never modified after they have been created. The schema and number
+of rows that the backend reports for a view therefore never change. The cache
+keeps this information in memory, keyed by the view name, to avoid repeated
+round-trips to the Mimir gateway. When a dataset is registered for a view the
+information is persisted in a file next to the dataset descriptor. The
+in-memory cache is initialized from these files on first access.
+"""
+
+import os
+import threading
+
+from vizier.core.util import dump_json, load_json
+
+
+"""Name of the file that stores view information for a dataset."""
+VIEW_FILE = 'view.json'
+
+"""Json element names for view information."""
+KEY_ROW_COUNT = 'rowCount'
+KEY_SCHEMA = 'schema'
+KEY_VIEW_NAME = 'viewName'
+
+
+class ViewCache(object):
+    """Cache for the schema and row count of views in the Mimir backend."""
+    def __init__(self, base_path):
+        """Initialize the base directory of the datastore that contains the
+        dataset subfolders.
+
+        Parameters
+        ----------
+        base_path: string
+            Path to base directory for the datastore
+        """
+        self.base_path = os.path.abspath(base_path)
+        self.views = None
+        self.lock = threading.Lock()
+
+    def get(self, view_name):
+        """Get the cached information for the given view. The result is a
+        dictionary with elements for the schema and the row count. Elements
+        are None if the respective information is not in the cache.
+
+        Parameters
+        ----------
+        view_name: string
+            Name of the view in the Mimir backend
+
+        Returns
+        -------
+        dict
+        """
+        with self.lock:
+            info = self.load().get(view_name, dict())
+            return {
+                KEY_SCHEMA: info.get(KEY_SCHEMA),
+                KEY_ROW_COUNT: info.get(KEY_ROW_COUNT)
+            }
+
+    def load(self):
+        """Read information for all views from the view files in the dataset
+        subfolders if the cache has not been initialized yet. Expects the
+        caller to hold the lock.
+
+        Returns
+        -------
+        dict
+        """
+        if self.views is None:
+            views = dict()
+            if os.path.isdir(self.base_path):
+                for name in os.listdir(self.base_path):
+                    filename = os.path.join(self.base_path, name, VIEW_FILE)
+                    if not os.path.isfile(filename):
+                        continue
+                    try:
+                        with open(filename, 'r') as f:
+                            doc = load_json(f.read())
+                    except (OSError, ValueError):
+                        continue
+                    views[doc[KEY_VIEW_NAME]] = {
+                        KEY_SCHEMA: doc.get(KEY_SCHEMA),
+                        KEY_ROW_COUNT: doc.get(KEY_ROW_COUNT)
+                    }
+            self.views = views
+        return self.views
+
+    def put(self, view_name, schema=None, row_count=None):
+        """Add information for the given view to the cache. Only elements that
+        are not None are updated.
+
+        Parameters
+        ----------
+        view_name: string
+            Name of the view in the Mimir backend
+        schema: list(dict), optional
+            View schema as returned by the Mimir gateway
+        row_count: int, optional
+            Number of rows in the view
+        """
+        with self.lock:
+            views = self.load()
+            info = views.get(view_name, dict())
+            if not schema is None:
+                info[KEY_SCHEMA] = schema
+            if not row_count is None:
+                info[KEY_ROW_COUNT] = row_count
+            views[view_name] = info
+
+    def write(self, view_name, dataset_dir):
+        """Write the cached information for the given view to the view file
+        in the given dataset folder. Nothing is written if the view is not in
+        the cache.
+
+        Parameters
+        ----------
+        view_name: string
+            Name of the view in the Mimir backend
+        dataset_dir: string
+            Path to the dataset folder
+        """
+        with self.lock:
+            info = self.load().get(view_name)
+            if info is None:
+                return
+            doc = {
+                KEY_VIEW_NAME: view_name,
+                KEY_SCHEMA: info.get(KEY_SCHEMA),
+                KEY_ROW_COUNT: info.get(KEY_ROW_COUNT)
+            }
+        with open(os.path.join(dataset_dir, VIEW_FILE), 'w') as f:
+            dump_json(doc, f)
@@ -16,20 +16,26 @@
 
 """Implements reader for datasets that are stored in the Mimir backend."""
 
-import json
-
 from vizier.datastore.dataset import DatasetRow
+from vizier.datastore.dataset import DATATYPE_DATE, DATATYPE_DATETIME
 from vizier.datastore.reader import DatasetReader
 
 import vizier.mimir as mimir
 import vizier.datastore.mimir.base as base
 
 
+"""Default number of rows that are fetched from the database in one query."""
+DEFAULT_BATCH_SIZE = 1000
+
+
 class MimirDatasetReader(DatasetReader):
-    """Dataset reader for Mimir datasets."""
+    """Dataset reader for Mimir datasets. Rows are fetched from the database in
+    batches of fixed size using LIMIT/OFFSET windows. The next batch is fetched
+    in the background while the rows of the current batch are consumed.
+    """
     def __init__(
         self, table_name, columns,
-        offset=0, limit=-1, rowid=None
+        offset=0, limit=-1, rowid=None, batch_size=DEFAULT_BATCH_SIZE
     ):
         """Initialize information about the delimited file and the file format.
 
@@ -43,35 +49,33 @@ class MimirDatasetReader(DatasetReader):
             Number of rows at the beginning of the list that are skipped.
         limit: int, optional
             Limits the number of rows that are returned.
-        annotations: vizier.datastore.metadata.DatasetMetadata, optional
-            Annotations for dataset components
+        rowid: int, optional
+            Identifier of a single row that is returned
+        batch_size: int, optional
+            Maximum number of rows that are fetched in one query
         """
         self.table_name = table_name
         self.columns = columns
         self.offset = offset
         self.limit = limit
         self.rowid = rowid
-        # Convert row id list into row position index. Depending on whether
-        # offset or limit parameters are given we also limit the entries in the
-        # dictionary. The internal flag .is_range_query keeps track of whether
-        # offset or limit where given (True) or not (False). This information is
-        # later used to generate the query for the database.
-        if offset > 0 or limit > 0:
-            self.is_range_query = True
-        else:
-            self.is_range_query = False
-        # Keep an in-memory copy of the dataset rows when open
+        self.batch_size = batch_size
+        # Only rows of the current batch are kept in memory when open. The
+        # next batch is a future for the result of the background query, or
+        # None if the current batch is the last one.
         self.is_open = False
         self.read_index = None
         self.rows = None
-        # Index position of columns in dataset rows
-        self.col_map = None
+        self.next_batch = None
+        # Number of rows that have been fetched so far
+        self.read_count = None
 
     def close(self):
         """Close any open files and set the is_open flag to False."""
         self.rows = None
         self.read_index = None
-        self.col_map = None
+        self.next_batch = None
+        self.read_count = None
         self.is_open = False
 
     def __next__(self):
@@ -85,17 +89,25 @@ class MimirDatasetReader(DatasetReader):
         -------
         vizier.datastore.base.DatasetRow
         """
-        if self.is_open:
+        while self.is_open:
             if self.read_index < len(self.rows):
                 row = self.rows[self.read_index]
                 self.read_index += 1
                 return row
-            self.close()
+            if self.next_batch is None:
+                self.close()
+            else:
+                try:
+                    batch = self.next_batch.result()
+                except Exception:
+                    self.close()
+                    raise
+                self.set_batch(batch)
         raise StopIteration
 
     def open(self):
-        """Setup the reader by querying the database and creating an in-memory
-        copy of the dataset rows.
+        """Setup the reader by querying the database for the first batch of
+        dataset rows.
 
         Returns
         -------
@@ -104,42 +116,127 @@ class MimirDatasetReader(DatasetReader):
         # Query the database to retrieve dataset rows if reader is not already
         # open
         if not self.is_open:
-            # Query the database to get the list of rows. Sort rows according to
-            # order in row_ids and return a InMemReader
-            sql = base.get_select_query(self.table_name, columns=self.columns)
+            self.read_count = 0
             if self.rowid != None:
+                sql = base.get_select_query(
+                    self.table_name,
+                    columns=self.columns
+                )
                 sql += ' WHERE ROWID() = ' + str(self.rowid)
-            if self.is_range_query:
-                if self.limit > 0:
-                    sql +=  ' LIMIT ' + str(self.limit)
-                if self.offset > 0:
-                    sql += ' OFFSET ' + str(self.offset) 
-            rs = mimir.vistrailsQueryMimirJson(sql+ ';', True, False)
-            #self.row_ids = rs['prov']
-            # Initialize mapping of column rdb names to index positions in
-            # dataset rows
-            self.col_map = dict()
-            for i in range(len(rs['schema'])):
-                col = rs['schema'][i]
-                self.col_map[base.sanitize_column_name(col['name'])] = i
-            rs_rows = rs['data']
-            row_ids = rs['prov']
-            annotation_flags = rs['colTaint']
-            self.rows = list()
-            for row_index in range(len(rs_rows)):
-                row = rs_rows[row_index]
-                row_annotation_flags = annotation_flags[row_index]  
-                row_id = str(row_ids[row_index])
-                values = [None] * len(self.columns)
-                annotation_flag_values = [None] * len(self.columns)
-                for i in range(len(self.columns)):
-                    col = self.columns[i]
-                    col_index = self.col_map[col.name_in_rdb]
-                    values[i] = base.mimir_value_to_python(row[col_index], col)
-                    annotation_flag_values[i] = row_annotation_flags[col_index]
-                self.rows.append(DatasetRow(row_id, values, annotation_flag_values))
-            self.read_index = 0
+                rows = self.decode(mimir.vistrailsQueryMimirJson(
+                    sql + ';',
+                    True,
+                    False
+                ))
+                self.rows = rows
+                self.read_index = 0
+                self.next_batch = None
+            else:
+                self.set_batch(self.fetch(
+                    offset=max(self.offset, 0),
+                    size=self.next_batch_size()
+                ))
             self.is_open = True
         return self
 
-    
+    # --------------------------------------------------------------------------
+    # Helper Methods
+    # --------------------------------------------------------------------------
+
+    def decode(self, rs):
+        """Convert the result of a database query into a list of dataset rows.
+        Values are decoded column by column.
+
+        Parameters
+        ----------
+        rs: dict
+            Query result returned by the Mimir gateway
+
+        Returns
+        -------
+        list(vizier.datastore.dataset.DatasetRow)
+        """
+        # Initialize mapping of column rdb names to index positions in
+        # dataset rows
+        col_map = dict()
+        for i in range(len(rs['schema'])):
+            col = rs['schema'][i]
+            col_map[base.sanitize_column_name(col['name'])] = i
+        rs_rows = rs['data']
+        annotation_flags = rs['colTaint']
+        values = list()
+        flags = list()
+        for col in self.columns:
+            col_index = col_map[col.name_in_rdb]
+            col_values = [row[col_index] for row in rs_rows]
+            if col.data_type in [DATATYPE_DATE, DATATYPE_DATETIME]:
+                col_values = [
+                    base.mimir_value_to_python(val, col) for val in col_values
+                ]
+            values.append(col_values)
+            flags.append([row_flags[col_index] for row_flags in annotation_flags])
+        row_ids = rs['prov']
+        rows = list()
+        for row_index in range(len(rs_rows)):
+            rows.append(DatasetRow(
+                str(row_ids[row_index]),
+                [col_values[row_index] for col_values in values],
+                [col_flags[row_index] for col_flags in flags]
+            ))
+        return rows
+
+    def fetch(self, offset, size):
+        """Query the database for a batch of rows. Returns a tuple of the
+        offset and size of the batch and the list of fetched rows.
+
+        Parameters
+        ----------
+        offset: int
+            Number of rows that are skipped
+        size: int
+            Number of rows that are requested
+
+        Returns
+        -------
+        (int, int, list(vizier.datastore.dataset.DatasetRow))
+        """
+        sql = base.get_select_query(self.table_name, columns=self.columns)
+        sql += ' LIMIT ' + str(size)
+        if offset > 0:
+            sql += ' OFFSET ' + str(offset)
+        rs = mimir.vistrailsQueryMimirJson(sql + ';', True, False)
+        return offset, size, self.decode(rs)
+
+    def next_batch_size(self):
+        """Get the number of rows for the next query. The result is zero if all
+        rows within the limit have been read.
+
+        Returns
+        -------
+        int
+        """
+        if self.limit > 0:
+            return min(self.batch_size, self.limit - self.read_count)
+        return self.batch_size
+
+    def set_batch(self, batch):
+        """Make the given batch the current batch and start fetching the next
+        batch in the background unless the given batch is the last one.
+
+        Parameters
+        ----------
+        batch: (int, int, list(vizier.datastore.dataset.DatasetRow))
+            Offset, requested size and rows of the batch
+        """
+        offset, size, rows = batch
+        self.rows = rows
+        self.read_index = 0
+        self.read_count += len(rows)
+        size = self.next_batch_size() if len(rows) == size else 0
+        if size > 0:
+            offset += len(rows)
+            self.next_batch = mimir.submitCall(
+                lambda: self.fetch(offset=offset, size=size)
+            )
+        else:
+            self.next_batch = None
@@ -32,6 +32,7 @@ from vizier.core.timestamp import  get_current_time
 from vizier.filestore.base import FileHandle
 from vizier.datastore.annotation.dataset import DatasetMetadata
 from vizier.datastore.base import DefaultDatastore
+from vizier.datastore.mimir.cache import ViewCache, KEY_ROW_COUNT, KEY_SCHEMA
 from vizier.datastore.mimir.dataset import MimirDatasetColumn, MimirDatasetHandle
 
 import vizier.mimir as mimir
@@ -54,7 +55,8 @@ class MimirDatastore(DefaultDatastore):
     in Yaml format.
 
     Note that every write_dataset call creates a new table in the underlying
-    Mimir database. Other datasets are views on these tables.
+    Mimir database. Other datasets are views on these tables. The schema and
+    row count of views are cached to avoid repeated queries to the backend.
     """
     def __init__(self, base_path):
         """Initialize the base directory that contains the dataset index and
@@ -66,6 +68,7 @@ class MimirDatastore(DefaultDatastore):
             Name of the directory where metadata is stored
         """
         super(MimirDatastore, self).__init__(base_path)
+        self.views = ViewCache(self.base_path)
 
     def create_dataset(self, columns, rows, human_readable_name = None, annotations=None,backend_options = [], dependencies = []):
         """Create a new dataset in the datastore. Expects at least the list of
@@ -118,8 +121,7 @@ class MimirDatastore(DefaultDatastore):
         sql = 'SELECT '+ colSql +' FROM {{input}};'
         view_name, dependencies = mimir.createView(table_name, sql)
         # Get number of rows in the view that was created in the backend
-        row_count = mimir.countRows(view_name)
-        
+        _, row_count = self.get_view_info(view_name)
         # Insert the new dataset metadata information into the datastore
         return self.register_dataset(
             table_name=view_name,
@@ -168,6 +170,39 @@ class MimirDatastore(DefaultDatastore):
             annotations=annotations
         )
 
+    def get_view_info(self, view_name, count_rows=True):
+        """Get the schema and the number of rows for a view in the Mimir
+        backend. Information that is not in the view cache is retrieved from
+        the backend. Schema and row count are queried concurrently. The row
+        count is None if count_rows is False and the row count is not cached.
+
+        Parameters
+        ----------
+        view_name: string
+            Name of the view in the Mimir backend
+        count_rows: bool, optional
+            Query the number of rows if it is not cached
+
+        Returns
+        -------
+        list(dict), int
+        """
+        info = self.views.get(view_name)
+        schema = info[KEY_SCHEMA]
+        row_count = info[KEY_ROW_COUNT]
+        sql = 'SELECT * FROM ' + view_name + ';'
+        if schema is None and row_count is None and count_rows:
+            schema, row_count = mimir.runConcurrently(
+                lambda: mimir.getSchema(sql),
+                lambda: mimir.countRows(view_name)
+            )
+        elif schema is None:
+            schema = mimir.getSchema(sql)
+        elif row_count is None and count_rows:
+            row_count = mimir.countRows(view_name)
+        self.views.put(view_name, schema=schema, row_count=row_count)
+        return schema, row_count
+
     def get_annotations(self, identifier, column_id=-1, row_id='-1'):
         """Get list of annotations for a dataset component. Expects at least one
         of the given identifier to be a valid identifier (>= 0).
@@ -354,8 +389,7 @@ class MimirDatastore(DefaultDatastore):
         # Thus, sorting not necessarily returns the smallest integer value
         # first.
         #
-        row_count = mimir.countRows(view_name)
-        
+        _, row_count = self.get_view_info(view_name)
         return self.register_dataset(
             table_name=view_name,
             columns=columns,
@@ -437,12 +471,14 @@ class MimirDatastore(DefaultDatastore):
         -------
         vizier.datastore.mimir.dataset.MimirDatasetHandle
         """
-        # Depending on whether we need to update row ids we either query the
-        # database or just get the schema. In either case mimir_schema will
-        # contain a the returned Mimir schema information.
-        sql = base.get_select_query(table_name, columns=columns) + ';'
-        mimir_schema = mimir.getSchema(sql)
-        
+        # Get the schema of the table or view. Set row counter to the number
+        # of rows if None. Both are taken from the view cache if possible.
+        mimir_schema, row_count = self.get_view_info(
+            table_name,
+            count_rows=row_counter is None
+        )
+        if row_counter is None:
+            row_counter = row_count
         # Create a mapping of column name (in database) to column type. This
         # mapping is then used to update the data type information for all
         # column descriptors.
@@ -451,9 +487,6 @@ class MimirDatastore(DefaultDatastore):
             col_types[base.sanitize_column_name(col['name'].upper())] = col['baseType']
         for col in columns:
             col.data_type = col_types[col.name_in_rdb]
-        # Set row counter to max. row id + 1 if None
-        if row_counter is None:
-            row_counter = mimir.countRows(table_name)
         dataset = MimirDatasetHandle(
             identifier=get_unique_identifier(),
             columns=list(map(base.sanitize_column_name, columns)),
@@ -470,6 +503,7 @@ class MimirDatastore(DefaultDatastore):
         dataset.annotations.to_file(
             self.get_metadata_filename(dataset.identifier)
         )
+        self.views.write(table_name, dataset_dir)
         return dataset
 
 
@@ -21,11 +21,13 @@ Dataset reader implement the context manager interface and the iterator
 interface.
 """
 from abc import abstractmethod
+from array import array
 import csv
 import gzip
 import json
+import struct
+import sys
 
-from vizier.core.util import encode_values
 from vizier.datastore.dataset import DatasetHandle, DatasetColumn, DatasetRow
 
 """Json element names for default dataset serialization."""
@@ -33,6 +35,17 @@ KEY_ROWS = 'rows'
 KEY_ROW_ID = 'id'
 KEY_ROW_VALUES = 'val'
 
+"""First and last line in Json files that contain one row per line."""
+JSON_ROWS_HEADER = '{"' + KEY_ROWS + '": ['
+JSON_ROWS_FOOTER = ']}'
+
+"""Number of characters that are read at a time by the incremental parser."""
+JSON_READ_BUFFER_SIZE = 65536
+
+"""Default number of rows between entries in the byte offset list of a row
+index."""
+DEFAULT_INDEX_INTERVAL = 1000
+
 
 class DatasetReader(object):
     """Reader for datasets. Allows to iterate over the the rows in a dataset.
@@ -193,8 +206,17 @@ class DefaultJsonDatasetReader(DatasetReader):
                 {'id': int, 'values': [...]}
             ]
         }
+
+    The reader parses the file incrementally. Rows are decoded one at a time
+    while iterating and reading stops once the limit is reached, i.e., memory
+    usage is independent of the size of the dataset. Files that are written
+    by the reader contain one row per line. For these files, rows that are
+    skipped because of the offset are not decoded at all.
     """
-    def __init__(self, filename, columns=None, compressed=False, offset=0, limit=-1):
+    def __init__(
+        self, filename, columns=None, compressed=False, offset=0, limit=-1,
+        column_ids=None, row_index=None
+    ):
         """Initialize information about the Json file.
 
         Parameters
@@ -210,20 +232,36 @@ class DefaultJsonDatasetReader(DatasetReader):
             Number of rows at the beginning of the list that are skipped.
         limit: int, optional
             Limits the number of rows that are returned.
+        column_ids: list(int), optional
+            Identifier of columns whose values are returned. Values for all
+            columns are returned if None. Requires the list of columns.
+        row_index: string, optional
+            Path to the row index file for the (uncompressed) data file. If
+            given, the reader seeks directly to the row at the offset.
         """
         self.filename = filename
         self.columns = columns
         self.compressed = compressed
         self.offset = offset
         self.limit = limit
+        self.column_ids = column_ids
+        self.row_index = row_index
+        # Index positions of the selected columns (None if all columns are
+        # returned)
+        self.col_index = None
+        if not column_ids is None:
+            col_pos = dict()
+            for i, col in enumerate(columns):
+                col_pos[col.identifier] = i
+            self.col_index = [col_pos[col_id] for col_id in column_ids]
         # Variables that maintain the internal state of the reader, i.e., the
-        # opened file and the list of rows (in original Json format). If the
-        # is_open flag is True the file handle (fd) and row list and read index
-        # should not be None.
+        # opened file, the iterator over the (Json) rows in the file, and the
+        # number of rows that have been returned. If the is_open flag is True
+        # the file handle (fd) and row iterator should not be None.
         self.is_open = False
         self.fh = None
-        self.read_index = None
         self.rows = None
+        self.read_count = None
 
     def close(self):
         """Close any open files and set the is_open flag to False."""
@@ -231,12 +269,13 @@ class DefaultJsonDatasetReader(DatasetReader):
             self.fh.close()
         self.fh = None
         self.rows = None
-        self.read_index = None
+        self.read_count = None
         self.is_open = False
 
     def __next__(self):
         """Return the next row in the dataset iterator. Raises StopIteration if
-        end of file is reached or file has been closed.
+        end of file is reached, the limit has been reached, or file has been
+        closed.
 
         Automatically closes any open file when end of iteration is reached for
         the first time.
@@ -246,19 +285,27 @@ class DefaultJsonDatasetReader(DatasetReader):
         vizier.datastore.base.DatasetRow
         """
         if self.is_open:
-            if self.read_index < len(self.rows):
-                r_dict = self.rows[self.read_index]
+            if self.limit <= 0 or self.read_count < self.limit:
+                try:
+                    r_dict = next(self.rows)
+                except StopIteration as ex:
+                    self.close()
+                    raise ex
+                values = r_dict[KEY_ROW_VALUES]
+                if not self.col_index is None:
+                    values = [values[i] for i in self.col_index]
                 row = DatasetRow(
                     identifier=r_dict[KEY_ROW_ID],
-                    values=r_dict[KEY_ROW_VALUES]
+                    values=values
                 )
-                self.read_index += 1
+                self.read_count += 1
                 return row
+            self.close()
         raise StopIteration
 
     def open(self):
-        """Setup the reader by opening the associacted file and instantiating
-        the csv reader.
+        """Setup the reader by opening the associacted file and positioning the
+        incremental Json parser at the first row after the offset.
 
         Returns
         -------
@@ -266,55 +313,199 @@ class DefaultJsonDatasetReader(DatasetReader):
         """
         # Only open if flag is false. Otherwise, return immediately
         if not self.is_open:
-            if self.compressed:
-                self.fh = gzip.open(self.filename, 'rb')
+            if not self.row_index is None and not self.compressed:
+                # Seek to the closest indexed row before the offset. The
+                # remaining rows up to the offset are skipped without being
+                # decoded.
+                pos, skip = RowIndex.get_offset(self.row_index, self.offset)
+                self.fh = open(self.filename, 'rb')
+                self.fh.seek(pos)
+                self.rows = read_indexed_json_rows(self.fh, skip=skip)
             else:
-                self.fh = open(self.filename, 'r')
-            # Read the Json file and get the array of rows. Depending on whether
-            # offset or limit arguments were given we may select only a subset
-            # of the rows in the file.
-            ds_rows = json.loads(self.fh.read())[KEY_ROWS]
-            if self.offset > 0 or self.limit > 0:
-                self.rows = list()
-                skip = self.offset
-                for row in ds_rows:
-                    if skip > 0:
-                        skip -= 1
-                    else:
-                        self.rows.append(row)
-                        if self.limit > 0 and len(self.rows) >= self.limit:
-                            break
-            else:
-                self.rows = ds_rows
-            self.read_index = 0
+                if self.compressed:
+                    self.fh = gzip.open(self.filename, 'rt')
+                else:
+                    self.fh = open(self.filename, 'r')
+                self.rows = read_json_rows(self.fh, skip=self.offset)
+            self.read_count = 0
             self.is_open = True
         return self
 
-    def write(self, rows):
+    def write(self, rows, row_index=None):
         """Write the given list of dataset rows to file in default Json format.
+        Each row is written on a separate line. Rows are serialized one at a
+        time, i.e., the given rows may be any iterable (e.g., another dataset
+        reader).
+
+        If the row index is given the byte offset and identifier of every
+        written row is added to the index. Note that byte offsets refer to the
+        uncompressed file.
 
         Parameters
         ----------
-        rows: list(vizier.datastore.base.DatasetRow)
+        rows: iterable(vizier.datastore.base.DatasetRow)
             List of dataset rows
+        row_index: vizier.datastore.reader.RowIndex, optional
+            Index for the written rows
         """
         # Open file handle
         if self.compressed:
             fh = gzip.open(self.filename, 'wb')
         else:
-            fh = open(self.filename, 'w')
-        # Write dataset rows
-        json.dump({
-                KEY_ROWS: [{
-                    KEY_ROW_ID: row.identifier,
-                    KEY_ROW_VALUES: encode_values(row.values)
-                } for row in rows]
-            },
-            fh
-        )
+            fh = open(self.filename, 'wb')
+        # Write dataset rows. Keep track of the byte offset for each row.
+        header = (JSON_ROWS_HEADER + '\n').encode('utf-8')
+        fh.write(header)
+        pos = len(header)
+        is_first = True
+        for row in rows:
+            if not is_first:
+                fh.write(b',\n')
+                pos += 2
+            if not row_index is None:
+                row_index.add(row_id=row.identifier, offset=pos)
+            line = json.dumps({
+                KEY_ROW_ID: row.identifier,
+                KEY_ROW_VALUES: row.values
+            }).encode('utf-8')
+            fh.write(line)
+            pos += len(line)
+            is_first = False
+        fh.write(('\n' + JSON_ROWS_FOOTER + '\n').encode('utf-8'))
         fh.close()
 
 
+class RowIndex(object):
+    """Index for the rows in a data file that contains one row per line. The
+    index contains the byte offsets for every n-th row (where n is the index
+    interval) and the list of row identifier in order of their position in
+    the data file.
+
+    The index is stored in binary format. The file starts with a header that
+    contains the index interval, the number of rows, and the number of byte
+    offsets. The header is followed by the list of byte offsets and the list of
+    row identifier. All values are 64-bit integers. The fixed size of index
+    entries allows to read the byte offset for a given row position without
+    reading the whole index file.
+    """
+    def __init__(self, interval=DEFAULT_INDEX_INTERVAL):
+        """Initialize the index interval and the empty lists of byte offsets
+        and row identifier.
+
+        Parameters
+        ----------
+        interval: int, optional
+            Number of rows between entries in the list of byte offsets
+        """
+        self.interval = interval
+        self.offsets = array('q')
+        self.row_ids = array('q')
+
+    def add(self, row_id, offset):
+        """Add row at the next position to the index.
+
+        Parameters
+        ----------
+        row_id: int
+            Unique row identifier
+        offset: int
+            Byte offset of the row in the data file
+        """
+        if len(self.row_ids) % self.interval == 0:
+            self.offsets.append(offset)
+        self.row_ids.append(row_id)
+
+    @staticmethod
+    def get_offset(filename, position):
+        """Get the byte offset of the closest indexed row at or before the
+        given row position. Returns the byte offset and the number of rows that
+        have to be skipped from there to reach the given position. Only the
+        header and a single offset entry are read from the index file.
+
+        Parameters
+        ----------
+        filename: string
+            Path to the index file
+        position: int
+            Row position
+
+        Returns
+        -------
+        int, int
+        """
+        with open(filename, 'rb') as f:
+            interval, row_count, offset_count = read_index_header(f)
+            if offset_count == 0:
+                # Empty dataset. Return the position of the file header.
+                return len(JSON_ROWS_HEADER) + 1, 0
+            entry = min(position // interval, offset_count - 1)
+            f.seek(INDEX_HEADER.size + entry * INDEX_ENTRY_SIZE)
+            pos = struct.unpack('<q', f.read(INDEX_ENTRY_SIZE))[0]
+        return pos, position - entry * interval
+
+    @staticmethod
+    def get_position(filename, row_id):
+        """Get the position of the row with the given identifier. Returns None
+        if no row with the given identifier exists. Reads the list of row
+        identifier from the index file. Use read_positions to look up the
+        positions of multiple rows.
+
+        Parameters
+        ----------
+        filename: string
+            Path to the index file
+        row_id: int
+            Unique row identifier
+
+        Returns
+        -------
+        int
+        """
+        return RowIndex.read_positions(filename).get(row_id)
+
+    @staticmethod
+    def read_positions(filename):
+        """Read the mapping of row identifier to row positions from the given
+        index file.
+
+        Parameters
+        ----------
+        filename: string
+            Path to the index file
+
+        Returns
+        -------
+        dict(int: int)
+        """
+        with open(filename, 'rb') as f:
+            interval, row_count, offset_count = read_index_header(f)
+            f.seek(INDEX_HEADER.size + offset_count * INDEX_ENTRY_SIZE)
+            row_ids = array('q')
+            row_ids.frombytes(f.read(row_count * INDEX_ENTRY_SIZE))
+        if sys.byteorder != 'little':
+            row_ids.byteswap()
+        return {row_id: pos for pos, row_id in enumerate(row_ids)}
+
+    def to_file(self, filename):
+        """Write the index to the given file.
+
+        Parameters
+        ----------
+        filename: string
+            Path to the index file
+        """
+        with open(filename, 'wb') as f:
+            f.write(
+                INDEX_HEADER.pack(
+                    self.interval,
+                    len(self.row_ids),
+                    len(self.offsets)
+                )
+            )
+            f.write(to_little_endian(self.offsets).tobytes())
+            f.write(to_little_endian(self.row_ids).tobytes())
+
+
 class InMemDatasetReader(DatasetReader):
     """Dataset reader for datasets stored in memory."""
     def __init__(self, rows):
@@ -369,3 +560,146 @@ class InMemDatasetReader(DatasetReader):
             self.read_index = 0
             self.is_open = True
         return self
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+"""Binary layout of the row index header and index entries."""
+INDEX_HEADER = struct.Struct('<qqq')
+INDEX_ENTRY_SIZE = 8
+
+
+def read_index_header(fh):
+    """Read the header of a row index file. Returns the index interval, the
+    number of rows, and the number of byte offsets in the index.
+
+    Parameters
+    ----------
+    fh: file object
+        Handle for the opened index file (in binary mode)
+
+    Returns
+    -------
+    int, int, int
+    """
+    return INDEX_HEADER.unpack(fh.read(INDEX_HEADER.size))
+
+
+def read_indexed_json_rows(fh, skip=0):
+    """Generator for the row objects in a data file that contains one row per
+    line, starting at the current position of the given file handle.
+
+    Parameters
+    ----------
+    fh: file object
+        Handle for the opened file (in binary mode)
+    skip: int, optional
+        Number of rows that are skipped (without decoding them)
+
+    Returns
+    -------
+    iterator(dict)
+    """
+    footer = JSON_ROWS_FOOTER.encode('utf-8')
+    for line in fh:
+        line = line.strip()
+        if line == footer:
+            return
+        elif len(line) == 0:
+            continue
+        if skip > 0:
+            skip -= 1
+            continue
+        yield json.loads(line.rstrip(b','))
+
+
+def read_json_rows(fh, skip=0):
+    """Generator for the row objects in a file that is in default Json format.
+    Rows are parsed incrementally. Only the current row and a read buffer are
+    kept in memory.
+
+    If the file contains one row per line the skipped rows are not decoded.
+    Files in any other layout are parsed using an incremental Json decoder.
+
+    Parameters
+    ----------
+    fh: file object
+        Handle for the opened file (in text mode)
+    skip: int, optional
+        Number of rows at the beginning of the file that are skipped
+
+    Returns
+    -------
+    iterator(dict)
+    """
+    # Files in other layouts (e.g., legacy files that contain all rows in a
+    # single line) may not contain a line break for a long time. Limit the
+    # size of the first line to the size of the read buffer.
+    line = fh.readline(JSON_READ_BUFFER_SIZE)
+    if line.strip() == JSON_ROWS_HEADER:
+        for line in fh:
+            line = line.strip()
+            if line == JSON_ROWS_FOOTER:
+                return
+            if skip > 0:
+                skip -= 1
+                continue
+            yield json.loads(line.rstrip(','))
+        return
+    # Use the incremental decoder. The buffer contains the unparsed remainder
+    # of the file content that has been read so far.
+    decoder = json.JSONDecoder()
+    buf = line
+    pos = buf.find('[')
+    while pos < 0:
+        chunk = fh.read(JSON_READ_BUFFER_SIZE)
+        if chunk == '':
+            raise ValueError('invalid dataset file')
+        buf += chunk
+        pos = buf.find('[')
+    pos += 1
+    while True:
+        # Skip whitespace and separators between row objects
+        while pos < len(buf) and buf[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buf) and buf[pos] == ']':
+            return
+        try:
+            if pos >= len(buf):
+                raise ValueError('buffer exhausted')
+            obj, end = decoder.raw_decode(buf, pos)
+        except ValueError as ex:
+            # The buffer may end within a row object. Read more data or fail
+            # if the end of the file has been reached.
+            chunk = fh.read(JSON_READ_BUFFER_SIZE)
+            if chunk == '':
+                raise ValueError('invalid dataset file')
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        pos = end
+        if skip > 0:
+            skip -= 1
+        else:
+            yield obj
+
+
+def to_little_endian(values):
+    """Get a copy of the given array of 64-bit integers in little-endian byte
+    order.
+
+    Parameters
+    ----------
+    values: array.array
+
+    Returns
+    -------
+    array.array
+    """
+    if sys.byteorder == 'little':
+        return values
+    values = array('q', values)
+    values.byteswap()
+    return values
@@ -0,0 +1,227 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""External merge sort for streams of dataset rows.
+
+Rows are sorted using a single composite key that contains one element for
+each sort column. Keys are type-aware, i.e., values of different types can be
+compared with each other. Numbers are sorted before strings and null values
+are sorted last (independently of the sort order).
+
+Rows are read into a buffer of limited size. If the buffer overflows, the
+sorted buffer content is written as a run to a temporary file. The sorted runs
+are merged when all rows have been read.
+"""
+
+import heapq
+import json
+import os
+import shutil
+import tempfile
+
+from vizier.datastore.dataset import DatasetRow
+
+
+"""Default maximum number of rows that are kept in memory while sorting."""
+DEFAULT_SORT_BUFFER_SIZE = 100000
+
+"""Rank of values of different types in the sort order."""
+RANK_NUMBER = 0
+RANK_STRING = 1
+RANK_OTHER = 2
+RANK_NULL = 3
+
+
+class ReverseKey(object):
+    """Wrapper for sort keys of columns that are sorted in descending order.
+    Inverts the comparison of the wrapped key. Null values remain at the end
+    of the sort order.
+    """
+    def __init__(self, key):
+        """Initialize the wrapped key.
+
+        Parameters
+        ----------
+        key: tuple
+            Type-aware key for a column value
+        """
+        self.key = key
+
+    def __eq__(self, other):
+        """Keys are equal if the wrapped keys are equal."""
+        return self.key == other.key
+
+    def __lt__(self, other):
+        """Invert the comparison for all values that are not null."""
+        if self.key[0] == RANK_NULL or other.key[0] == RANK_NULL:
+            return self.key[0] < other.key[0]
+        return other.key < self.key
+
+
+def sort_rows(
+    rows, sort_columns, reversed, buffer_size=DEFAULT_SORT_BUFFER_SIZE,
+    tmp_dir=None
+):
+    """Generator that returns the given rows in sort order. The sort order is
+    defined by a list of column index positions and a list of flags, one for
+    each sort column, that indicate whether the sort order for the column is
+    reversed.
+
+    At most buffer_size rows are kept in memory. Larger inputs are split into
+    sorted runs that are written to temporary files and merged afterwards. The
+    sort is stable.
+
+    Parameters
+    ----------
+    rows: iterable(vizier.datastore.dataset.DatasetRow)
+        Rows that are sorted
+    sort_columns: list(int)
+        Index positions of the sort columns in the row values
+    reversed: list(bool)
+        Flags indicating whether the sort order of the corresponding column
+        is reversed
+    buffer_size: int, optional
+        Maximum number of rows in the in-memory sort buffer
+    tmp_dir: string, optional
+        Directory for temporary run files
+
+    Returns
+    -------
+    iterator(vizier.datastore.dataset.DatasetRow)
+    """
+    def key(row):
+        return row_key(row, sort_columns, reversed)
+    buffer = list()
+    runs = list()
+    run_dir = None
+    try:
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= buffer_size:
+                if run_dir is None:
+                    run_dir = tempfile.mkdtemp(dir=tmp_dir)
+                buffer.sort(key=key)
+                runs.append(write_run(buffer, run_dir, len(runs)))
+                buffer = list()
+        buffer.sort(key=key)
+        if len(runs) == 0:
+            # All rows fit into memory.
+            for row in buffer:
+                yield row
+            return
+        # Merge the runs with the remaining rows in the buffer. The buffer is
+        # the last input to ensure that the merge is stable.
+        inputs = [read_run(filename) for filename in runs]
+        for row in heapq.merge(*(inputs + [iter(buffer)]), key=key):
+            yield row
+    finally:
+        if not run_dir is None:
+            shutil.rmtree(run_dir)
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def read_run(filename):
+    """Generator for rows in a sorted run file.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the run file
+
+    Returns
+    -------
+    iterator(vizier.datastore.dataset.DatasetRow)
+    """
+    with open(filename, 'r') as f:
+        for line in f:
+            row_id, values = json.loads(line)
+            yield DatasetRow(identifier=row_id, values=values)
+
+
+def row_key(row, sort_columns, reversed):
+    """Get the composite sort key for a dataset row.
+
+    Parameters
+    ----------
+    row: vizier.datastore.dataset.DatasetRow
+        Dataset row
+    sort_columns: list(int)
+        Index positions of the sort columns in the row values
+    reversed: list(bool)
+        Flags indicating whether the sort order of the corresponding column
+        is reversed
+
+    Returns
+    -------
+    tuple
+    """
+    key = list()
+    for col_idx, reverse in zip(sort_columns, reversed):
+        val_key = value_key(row.values[col_idx])
+        key.append(ReverseKey(val_key) if reverse else val_key)
+    return tuple(key)
+
+
+def value_key(value):
+    """Get a type-aware sort key for a single value. The key is a tuple of the
+    rank of the value type and a value that is comparable for all values with
+    the same rank. Boolean values are treated as numbers.
+
+    Parameters
+    ----------
+    value: scalar
+        Column value
+
+    Returns
+    -------
+    tuple
+    """
+    if value is None:
+        return (RANK_NULL, 0)
+    elif isinstance(value, (int, float)):
+        if value != value:
+            # NaN is not comparable to any number.
+            return (RANK_NULL, 0)
+        return (RANK_NUMBER, value)
+    elif isinstance(value, str):
+        return (RANK_STRING, value)
+    return (RANK_OTHER, json.dumps(value, sort_keys=True, default=str))
+
+
+def write_run(rows, run_dir, run):
+    """Write a sorted run to file. Returns the name of the run file.
+
+    Parameters
+    ----------
+    rows: list(vizier.datastore.dataset.DatasetRow)
+        Sorted list of rows
+    run_dir: string
+        Directory for run files
+    run: int
+        Run index
+
+    Returns
+    -------
+    string
+    """
+    filename = os.path.join(run_dir, str(run) + '.json')
+    with open(filename, 'w') as f:
+        for row in rows:
+            f.write(json.dumps([row.identifier, row.values]) + '\n')
+    return filename
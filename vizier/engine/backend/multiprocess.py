@@ -14,29 +14,50 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Default multi-process backend to execute vizier workflow tasks. The default
-backend starts a separate process for each task that is being executed. This
-backend is primarily intended for local installations of vizier with a single
-user or for installations where each project is running in a separate container
-or virtual environment.
+
+"""Default multi-process backend to execute vizier workflow tasks. The backend
+maintains a bounded pool of persistent worker processes. Workers are started
+when the first task is submitted and receive a copy of the package task
+processors when they start. They are re-used for all following tasks, i.e.,
+tasks do not pay the cost for starting a new process and importing the package
+processors.
+
+Tasks that are submitted while all workers are busy are queued. The queue
+contains a separate list of tasks for each project. When a worker becomes
+idle it executes the next task of the project with the fewest running tasks
+so that a project with a long list of pending tasks does not block other
+projects.
+
+This backend is primarily intended for local installations of vizier with a
+single user or for installations where each project is running in a separate
+container or virtual environment.
 """
 
-from functools import partial
-from multiprocessing import Lock, Pool
+from collections import OrderedDict, deque
+from multiprocessing import Lock, Pipe, Process
+from multiprocessing.connection import wait
+
+import atexit
+import os
+import signal
+import threading
 
-from vizier.core.loader import ClassLoader
-from vizier.core.timestamp import get_current_time
 from vizier.engine.backend.base import VizierBackend, exec_command
 from vizier.engine.task.base import TaskContext
+from vizier.engine.task.processor import ExecResult
 from vizier.viztrail.module.base import MODULE_RUNNING
+from vizier.viztrail.module.output import ModuleOutputs
 
 
 class MultiProcessBackend(VizierBackend):
-    """The multi-process backend lauches a single-process pool for each task
-    that is being executed. There is no limit on the number of tasks that are
-    executed in parallel.
+    """The multi-process backend executes tasks in a pool of persistent worker
+    processes. The number of workers (and therefore the number of tasks that
+    are executed in parallel) is limited. Canceling a running task terminates
+    only the worker that executes the task (together with all processes that
+    the worker started). The terminated worker is replaced by a new worker
+    process.
     """
-    def __init__(self, projects, processors, synchronous=None):
+    def __init__(self, projects, processors, synchronous=None, max_workers=None):
         """Initialize the index of package processors. Accepts an optional
         dictionary of commands that will be executed synchronously instead of
         forking a new process for execution. The optional properties dictionary
@@ -62,6 +83,8 @@ class MultiProcessBackend(VizierBackend):
             Task processors that are indexed by the package identifier
         synchronous: vizier.engine.backend.base.TaskExecEngine, optional
             Engine for synchronous task execution
+        max_workers: int, optional
+            Maximum number of worker processes. Defaults to the number of CPUs.
         """
         # Initialize the synchronous command execution engine and the
         # multi-process lock in the super class.
@@ -71,30 +94,121 @@ class MultiProcessBackend(VizierBackend):
         )
         self.processors = processors
         self.projects = projects
-        # Maintain tasks that are currently being executed and the associated
-        # multiplressing pool. Values are tuples of (task handle, pool) and
-        # the index is the unique task identifier. This dictionary is used to
-        # cancel tasks and to update the controller when task execution
-        # is complete.
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        self.max_workers = max_workers
+        # Maintain tasks that are currently being executed or that are waiting
+        # for execution. Values are tuples of (task handle, worker) where the
+        # worker is None for queued tasks. The index is the unique task
+        # identifier. This dictionary is used to cancel tasks and to update
+        # the controller when task execution is complete.
         self.tasks = dict()
+        # Queue of tasks that wait for a free worker. Tuples of (task id,
+        # command, context) are kept in separate lists for each project.
+        self.queue = OrderedDict()
+        # Sequence number of the last dispatched task for each project. Used
+        # to serve projects in round-robin order.
+        self.served = dict()
+        self.dispatch_count = 0
+        self.workers = list()
+        # Notifications for tasks that failed before they reached a worker.
+        # Notifications are delivered by the result listener thread.
+        self.notifications = deque()
+        # Lock for the task index, the queue and the list of workers. The
+        # result listener is woken up via the pipe when the list of workers
+        # changes.
+        self.pool_lock = threading.RLock()
+        self.listener = None
+        self.wakeup_recv, self.wakeup_send = Pipe(duplex=False)
 
     def cancel_task(self, task_id):
-        """Request to cancel execution of the given task.
+        """Request to cancel execution of the given task. Queued tasks are
+        removed from the queue. For running tasks the worker process is
+        terminated and replaced by a new worker.
 
         Parameters
         ----------
         task_id: string
             Unique task identifier
         """
-        # Catch errors in case the task has already been removed
-        try:
-            task, pool = self.tasks[task_id]
-            # Close the pool and terminate any running processes
-            pool.close()
-            pool.terminate()
+        with self.pool_lock:
+            # Ignore requests for tasks that have already been removed
+            if not task_id in self.tasks:
+                return
+            task, worker = self.tasks[task_id]
             del self.tasks[task_id]
-        except KeyError:
-            pass
+            if worker is None:
+                tasks = self.queue.get(task.project_id, deque())
+                for entry in list(tasks):
+                    if entry[0] == task_id:
+                        tasks.remove(entry)
+                if len(tasks) == 0 and task.project_id in self.queue:
+                    del self.queue[task.project_id]
+            else:
+                worker.terminate()
+                self.workers.remove(worker)
+                self.workers.append(WorkerProcess(self.processors))
+                self.dispatch_tasks()
+                self.wakeup_send.send(None)
+
+    def close(self):
+        """Stop all worker processes. Tasks that are still running or waiting
+        for execution are discarded.
+        """
+        with self.pool_lock:
+            for worker in self.workers:
+                worker.terminate()
+            self.workers = list()
+            self.tasks = dict()
+            self.queue = OrderedDict()
+            if not self.listener is None:
+                self.wakeup_send.send(None)
+
+    def dispatch_tasks(self):
+        """Assign queued tasks to idle workers. Projects with fewer running
+        tasks are served first. Projects with the same number of running tasks
+        are served in round-robin order. Expects the caller to hold the pool
+        lock.
+        """
+        for worker in self.workers:
+            if len(self.queue) == 0:
+                break
+            if not worker.task_id is None:
+                continue
+            # Get the first task of the project with the fewest running tasks.
+            # Ties are broken in favor of the project that has not been served
+            # for the longest time.
+            running = dict()
+            for task, w in self.tasks.values():
+                if not w is None:
+                    running[task.project_id] = running.get(task.project_id, 0) + 1
+            project_id = min(
+                self.queue,
+                key=lambda p: (running.get(p, 0), self.served.get(p, -1))
+            )
+            tasks = self.queue.pop(project_id)
+            self.served[project_id] = self.dispatch_count
+            self.dispatch_count += 1
+            task_id, command, context = tasks.popleft()
+            if len(tasks) > 0:
+                self.queue[project_id] = tasks
+            task, _ = self.tasks[task_id]
+            try:
+                worker.submit(task_id, command, context)
+                self.tasks[task_id] = (task, worker)
+            except Exception as ex:
+                # The task could not be sent to the worker (e.g., because the
+                # context cannot be serialized).
+                worker.task_id = None
+                del self.tasks[task_id]
+                self.notifications.append((
+                    task,
+                    ExecResult(
+                        is_success=False,
+                        outputs=ModuleOutputs().error(ex)
+                    )
+                ))
+                self.wakeup_send.send(None)
 
     def execute_async(self, task, command, context, resources=None):
         """Request execution of a given task. The task handle is used to
@@ -104,8 +218,8 @@ class MultiProcessBackend(VizierBackend):
         against which the task is executed.
 
         The multi-process backend first ensures that if has a processor for the
-        package of the given command. If True, the package-specific processor
-        will be used to run the command in a separate process.
+        package of the given command. If True, the task is executed by the next
+        idle worker process using the package-specific processor.
 
         Parameters
         ----------
@@ -124,44 +238,88 @@ class MultiProcessBackend(VizierBackend):
         # Ensure there is a processor for the package that contains the command
         if not command.package_id in self.processors:
             raise ValueError('unknown package \'' + str(command.package_id) + '\' not in: ' + str(self.processors))
-        processor = self.processors[command.package_id]
-        # Create a pool with a single process to execute the task. Maintain
-        # pair of task handle and pool in the internal task index.
-        pool = Pool(processes=1)
-        self.tasks[task.task_id] = (task, pool)
-        # Create a callback function that is called when the pool finishes
-        # execution. Use partial to create a function that receives the
-        # internal task index as parameter so we can remove the finished task
-        # from the dictionary
-        task_callback_function = partial(callback_function, tasks=self.tasks)
         # Get the project context from the cache
         project = self.projects.get_project(task.project_id)
-        # Execute task using execute command function
-        import time
-        time.sleep( 1 )
-        pool.apply_async(
-            exec_command,
-            args=(
-                task.task_id,
-                command,
-                TaskContext(
-                    project_id=task.project_id,
-                    datastore=project.datastore,
-                    filestore=project.filestore,
-                    datasets=context,
-                    resources=resources
-                ),
-                processor,
-            ),
-            callback=task_callback_function
+        task_context = TaskContext(
+            project_id=task.project_id,
+            datastore=project.datastore,
+            filestore=project.filestore,
+            datasets=context,
+            resources=resources
         )
+        with self.pool_lock:
+            # Start the worker processes and the result listener when the
+            # first task is submitted.
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen, daemon=True)
+                self.listener.start()
+                # Stop the workers on exit before they are terminated by the
+                # multiprocessing module. Otherwise, the listener would
+                # replace them.
+                atexit.register(self.close)
+            while len(self.workers) < self.max_workers:
+                self.workers.append(WorkerProcess(self.processors))
+                self.wakeup_send.send(None)
+            self.tasks[task.task_id] = (task, None)
+            if not task.project_id in self.queue:
+                self.queue[task.project_id] = deque()
+            self.queue[task.project_id].append(
+                (task.task_id, command, task_context)
+            )
+            self.dispatch_tasks()
+
+    def listen(self):
+        """Receive results from the worker processes and notify the workflow
+        controller. The controller is notified without holding the pool lock
+        since the controller may submit new tasks for execution.
+        """
+        while True:
+            with self.pool_lock:
+                connections = {w.result_conn: w for w in self.workers}
+            ready = wait(list(connections.keys()) + [self.wakeup_recv])
+            for conn in ready:
+                if conn is self.wakeup_recv:
+                    conn.recv()
+                    continue
+                worker = connections[conn]
+                try:
+                    task_id, exec_result = conn.recv()
+                except (EOFError, OSError):
+                    # The worker process terminated. If the worker was not
+                    # terminated because its task was canceled, the task
+                    # failed.
+                    task_id = worker.task_id
+                    exec_result = ExecResult(
+                        is_success=False,
+                        outputs=ModuleOutputs().error(
+                            RuntimeError('worker process terminated')
+                        )
+                    )
+                    with self.pool_lock:
+                        if worker in self.workers:
+                            self.workers.remove(worker)
+                            self.workers.append(WorkerProcess(self.processors))
+                    worker.close()
+                with self.pool_lock:
+                    task = None
+                    if task_id in self.tasks and self.tasks[task_id][1] is worker:
+                        task, _ = self.tasks[task_id]
+                        del self.tasks[task_id]
+                    if worker.task_id == task_id:
+                        worker.task_id = None
+                    self.dispatch_tasks()
+                if not task is None:
+                    self.notifications.append((task, exec_result))
+            while len(self.notifications) > 0:
+                task, exec_result = self.notifications.popleft()
+                notify_controller(task, exec_result)
 
     def next_task_state(self):
         """Get the module state of the next task that will be submitted for
         execution.
 
-        For the multi-process backend a process will start running immediately
-        in a separate process.
+        For the multi-process backend tasks are considered running as soon as
+        they are submitted (even if they have to wait for an idle worker).
 
         Returns
         -------
@@ -182,38 +340,147 @@ class MultiProcessBackend(VizierBackend):
         pass
 
 
+class WorkerProcess(object):
+    """Handle for a persistent worker process. Tasks are sent to the worker
+    and results are received from the worker via two separate pipes.
+
+    Each worker is the leader of its own process group. Processes that are
+    started by the worker (e.g., warm Python interpreters) belong to the same
+    group and are terminated together with the worker.
+    """
+    def __init__(self, processors):
+        """Start the worker process.
+
+        Parameters
+        ----------
+        processors: dict(vizier.engine.packages.task.processor.TaskProcessor)
+            Task processors that are indexed by the package identifier
+        """
+        task_recv, self.task_conn = Pipe(duplex=False)
+        self.result_conn, result_send = Pipe(duplex=False)
+        self.process = Process(
+            target=worker_loop,
+            args=(processors, task_recv, result_send),
+            daemon=True
+        )
+        self.process.start()
+        # The process group is set in both processes to avoid a race between
+        # the worker forking its first child and a request to terminate the
+        # worker.
+        try:
+            os.setpgid(self.process.pid, self.process.pid)
+        except OSError:
+            pass
+        # Close the worker ends of the pipes in this process so that the
+        # result pipe signals EOF when the worker terminates.
+        task_recv.close()
+        result_send.close()
+        # Identifier of the task that the worker is currently executing
+        self.task_id = None
+
+    def close(self):
+        """Close the pipes for the worker process."""
+        self.task_conn.close()
+        self.result_conn.close()
+
+    def submit(self, task_id, command, context):
+        """Send a task to the worker.
+
+        Parameters
+        ----------
+        task_id: string
+            Unique task identifier
+        command : vizier.viztrail.command.ModuleCommand
+            Specification of the command that is to be executed
+        context: vizier.engine.task.base.TaskContext
+            Context for the executed task
+        """
+        self.task_id = task_id
+        self.task_conn.send((task_id, command, context))
+
+    def terminate(self):
+        """Terminate the worker process and all processes in its process
+        group. The result pipe is closed by the result listener when it
+        receives the end of file signal.
+        """
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+        except OSError:
+            self.process.terminate()
+        self.process.join()
+        self.task_conn.close()
+
+
 # ------------------------------------------------------------------------------
 # Helper Methods
 # ------------------------------------------------------------------------------
 
-def callback_function(result, tasks):
-    """Callback function for executed tasks. Notifies the workflow controller
-    and removes the task from the task index.
+def notify_controller(task, exec_result):
+    """Notify the workflow controller that a task is finished.
 
     Parameters
     ----------
-    result: (string, vizier.engine.task.processor.ExecResult)
-        Tupe of task identifier and execution result
-    tasks: dict
-        Task index of the backend
+    task: vizier.engine.task.base.TaskHandle
+        Handle for the finished task
+    exec_result: vizier.engine.task.processor.ExecResult
+        Result of task execution
     """
-    task_id, exec_result = result
+    if exec_result.is_success:
+        task.controller.set_success(
+            task_id=task.task_id,
+            outputs=exec_result.outputs,
+            provenance=exec_result.provenance
+        )
+    else:
+        task.controller.set_error(
+            task_id=task.task_id,
+            outputs=exec_result.outputs
+        )
+
+
+def worker_loop(processors, tasks, results):
+    """Main loop of a worker process. Receives tasks, executes them using the
+    package processor for the task command, and sends the results back. The
+    loop terminates when the task pipe is closed.
+
+    Parameters
+    ----------
+    processors: dict(vizier.engine.packages.task.processor.TaskProcessor)
+        Task processors that are indexed by the package identifier
+    tasks: multiprocessing.connection.Connection
+        Pipe for receiving tasks
+    results: multiprocessing.connection.Connection
+        Pipe for sending results
+    """
+    # Start a new process group that contains the worker and all processes
+    # that are forked by task processors.
     try:
-        task, pool = tasks[task_id]
-        # Close the pool and remove the entry from the task index
-        pool.close()
-        del tasks[task_id]
-        # Notify the workflow controller that the task is finished
-        if exec_result.is_success:
-            task.controller.set_success(
-                task_id=task_id,
-                outputs=exec_result.outputs,
-                provenance=exec_result.provenance
-            )
-        else:
-            task.controller.set_error(
-                task_id=task_id,
-                outputs=exec_result.outputs
-            )
-    except KeyError:
+        os.setpgid(0, 0)
+    except OSError:
         pass
+    try:
+        while True:
+            try:
+                task_id, command, context = tasks.recv()
+            except EOFError:
+                break
+            result = exec_command(
+                task_id,
+                command,
+                context,
+                processors[command.package_id]
+            )
+            try:
+                results.send(result)
+            except Exception as ex:
+                # The execution result could not be serialized
+                results.send((
+                    task_id,
+                    ExecResult(
+                        is_success=False,
+                        outputs=ModuleOutputs().error(ex)
+                    )
+                ))
+    finally:
+        for processor in processors.values():
+            processor.close()
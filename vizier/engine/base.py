@@ -26,6 +26,8 @@ its own container, etc). The engine that is used by a vizier instance is
 specified in the configuration file and loaded when the instance is started.
 """
 
+from collections import deque
+
 from vizier.core.timestamp import get_current_time
 from vizier.core.util import get_unique_identifier
 from vizier.engine.controller import WorkflowController
@@ -44,9 +46,11 @@ class ExtendedTaskHandle(TaskHandle):
     when the state of the task changes.
 
     Adds branch and module identifier to the task handle as well as the
-    external representation of the executed command.
+    database state against which the task is executed.
     """
-    def __init__(self, project_id, branch_id, module_id, controller):
+    def __init__(
+        self, project_id, branch_id, module_id, controller, datasets=None
+    ):
         """Initialize the components of the extended task handle. Generates a
         unique identifier for the task.
 
@@ -60,6 +64,8 @@ class ExtendedTaskHandle(TaskHandle):
             Unique module identifier
         controller: vizier.engine.base.VizierEngine
             Reference to the vizier engine
+        datasets: dict(vizier.datastore.dataset.DatasetDescriptor), optional
+            Database state against which the task is executed
         """
         super(ExtendedTaskHandle, self).__init__(
             task_id=get_unique_identifier(),
@@ -68,6 +74,38 @@ class ExtendedTaskHandle(TaskHandle):
         )
         self.branch_id = branch_id
         self.module_id = module_id
+        self.datasets = datasets if not datasets is None else dict()
+
+
+class TaskResult(object):
+    """Result of a finished task whose module cannot be updated yet because
+    preceding modules in the workflow are still active. Results are applied
+    to the workflow modules in workflow order.
+    """
+    def __init__(
+        self, task, finished_at=None, outputs=None, provenance=None,
+        is_error=False
+    ):
+        """Initialize the components of the task result.
+
+        Parameters
+        ----------
+        task: vizier.engine.base.ExtendedTaskHandle
+            Handle for the finished task
+        finished_at: datetime.datetime, optional
+            Timestamp when module finished running
+        outputs: vizier.viztrail.module.output.ModuleOutputs, optional
+            Output streams for module
+        provenance: vizier.viztrail.module.provenance.ModuleProvenance, optional
+            Provenance information for successful tasks
+        is_error: bool, optional
+            Flag indicating whether the task execution failed
+        """
+        self.task = task
+        self.finished_at = finished_at
+        self.outputs = outputs
+        self.provenance = provenance
+        self.is_error = is_error
 
 
 class VizierEngine(WorkflowController):
@@ -79,8 +117,22 @@ class VizierEngine(WorkflowController):
     will use different classes for the wrapped objects. Each configuration
     should have a descriptive name and version information (for display purposes
     in the front-end).
+
+    When a workflow is re-executed, the engine uses the provenance information
+    from previous module executions to run independent modules concurrently.
+    A pending module is executed as soon as no active module that precedes it
+    in the workflow modifies a dataset that the module accesses (or accesses
+    a dataset that the module modifies). Results of finished modules are
+    applied in workflow order. A module is re-executed if the database state
+    against which it was executed differs from the final state of its
+    predecessor with respect to the datasets that the module accessed.
+
+    The engine has an optional cache for results of module executions. If a
+    module is executed with a command that has been executed before against
+    the same versions of the datasets that the command read, the cached
+    result is used instead of executing the module.
     """
-    def __init__(self, name, projects, backend, packages):
+    def __init__(self, name, projects, backend, packages, cache=None):
         """Initialize the engine components.
 
         Parameters
@@ -93,13 +145,25 @@ class VizierEngine(WorkflowController):
             Backend to execute workflow modules
         packages: dict(vizier.engine.package.base.PackageIndex)
             Dictionary of loaded packages
+        cache: vizier.engine.cache.ExecResultCache, optional
+            Cache for results of module executions
         """
         self.name = name
         self.projects = projects
         self.backend = backend
         self.packages = packages
-        # Maintain an internal dictionary of running tasks
+        self.cache = cache
+        # Maintain an internal dictionary of running tasks and of the results
+        # of finished tasks that have not been applied to their module yet.
+        # Results are keyed by the module identifier.
         self.tasks = dict()
+        self.results = dict()
+        # Workflows that wait for an update pass. Updates are not re-entrant.
+        # Tasks that finish while a pass is running (e.g., tasks that are
+        # executed synchronously by the backend) queue a follow-up update that
+        # is processed after the current pass.
+        self.updates = deque()
+        self.is_updating = False
 
     def append_workflow_module(self, project_id, branch_id, command):
         """Append module to the workflow at the head of the given viztrail
@@ -218,12 +282,14 @@ class VizierEngine(WorkflowController):
                     ]
                 )
                 if not is_active and not state == mstate.MODULE_CANCELED:
-                    self.execute_module(
+                    is_cached = self.execute_module(
                         project_id=project_id,
                         branch_id=branch_id,
                         module=workflow.modules[-1],
                         datasets=datasets
                     )
+                    if is_cached:
+                        self.update_workflow(workflow=workflow, project_id=project_id)
         return workflow.modules[-1]
 
     def cancel_exec(self, project_id, branch_id):
@@ -269,11 +335,34 @@ class VizierEngine(WorkflowController):
                 if task.project_id == project_id and task.branch_id == branch_id:
                     self.backend.cancel_task(task_id)
                     del self.tasks[task_id]
+            for module_id in list(self.results.keys()):
+                task = self.results[module_id].task
+                if task.project_id == project_id and task.branch_id == branch_id:
+                    del self.results[module_id]
             if not first_active_module_index is None:
                 return workflow.modules[first_active_module_index:]
             else:
                 return list()
 
+    def delete_project(self, project_id):
+        """Delete all resources that are associated with the given project
+        and remove the cached module execution results for the project.
+        Returns True if the project existed and False otherwise.
+
+        Parameters
+        ----------
+        project_id: string
+            Unique project identifier
+
+        Returns
+        -------
+        bool
+        """
+        with self.backend.lock:
+            if not self.cache is None:
+                self.cache.clear(project_id)
+            return self.projects.delete_project(project_id)
+
     def delete_workflow_module(self, project_id, branch_id, module_id):
         """Delete the module with the given identifier from the workflow at the
         head of the viztrail branch. The resulting workflow is executed and will
@@ -383,12 +472,14 @@ class VizierEngine(WorkflowController):
                         command=deleted_module.command,
                         pending_modules=pending_modules
                     )
-                    self.execute_module(
+                    is_cached = self.execute_module(
                         project_id=project_id,
                         branch_id=branch_id,
                         module=workflow.modules[module_index],
                         datasets=datasets
                     )
+                    if is_cached:
+                        self.update_workflow(workflow=workflow, project_id=project_id)
                     return workflow.modules[first_remaining_module:]
                 else:
                     # None of the module required execution and the workflow is
@@ -410,6 +501,11 @@ class VizierEngine(WorkflowController):
         """Create a new task for the given module and execute the module in
         asynchronous mode.
 
+        If the result cache contains a result for the module command and the
+        given database state the cached result is recorded as the result of
+        the module instead. The result is True if a cached result was used.
+        The caller is responsible for applying the result to the workflow.
+
         Parameters
         ----------
         project_id: string
@@ -420,20 +516,50 @@ class VizierEngine(WorkflowController):
             handle for executed module
         datasets: dict(vizier.datastore.dataset.DatasetDescriptor)
             Index of datasets in the a database state
+
+        Returns
+        -------
+        bool
         """
         task = ExtendedTaskHandle(
             project_id=project_id,
             branch_id=branch_id,
             module_id=module.identifier,
-            controller=self
+            controller=self,
+            datasets=datasets
         )
+        if not self.cache is None:
+            result = self.cache.get(
+                project_id=project_id,
+                command=module.command,
+                datasets=task_context(datasets)
+            )
+            if not result is None:
+                self.results[module.identifier] = TaskResult(
+                    task=task,
+                    finished_at=get_current_time(),
+                    outputs=result.outputs,
+                    provenance=result.provenance
+                )
+                return True
         self.tasks[task.task_id] = task
-        self.backend.execute_async(
-            task=task,
-            command=module.command,
-            context=task_context(datasets),
-            resources=module.provenance.resources
-        )
+        # Tasks that are executed synchronously by the backend finish before
+        # execute_async returns. The workflow updates that they trigger are
+        # queued until the task has been submitted.
+        is_updating = self.is_updating
+        self.is_updating = True
+        try:
+            self.backend.execute_async(
+                task=task,
+                command=module.command,
+                context=task_context(datasets),
+                resources=module.provenance.resources
+            )
+        finally:
+            self.is_updating = is_updating
+        if not is_updating:
+            self.process_updates()
+        return False
 
     def get_task_module(self, task):
         """Get the workflow and module index for the given task. Returns None
@@ -554,12 +680,14 @@ class VizierEngine(WorkflowController):
                 pending_modules=pending_modules
             )
             if not head.is_active:
-                self.execute_module(
+                is_cached = self.execute_module(
                     project_id=project_id,
                     branch_id=branch_id,
                     module=workflow.modules[module_index],
                     datasets=datasets
                 )
+                if is_cached:
+                    self.update_workflow(workflow=workflow, project_id=project_id)
             return workflow.modules[module_index:]
 
     def replace_workflow_module(self, project_id, branch_id, module_id, command):
@@ -642,12 +770,14 @@ class VizierEngine(WorkflowController):
                 command=replaced_module.command,
                 pending_modules=pending_modules
             )
-            self.execute_module(
+            is_cached = self.execute_module(
                 project_id=project_id,
                 branch_id=branch_id,
                 module=workflow.modules[module_index],
                 datasets=datasets
             )
+            if is_cached:
+                self.update_workflow(workflow=workflow, project_id=project_id)
             return workflow.modules[module_index:]
 
     def set_error(self, task_id, finished_at=None, outputs=None):
@@ -657,7 +787,10 @@ class VizierEngine(WorkflowController):
         are adjusted to the given value. The output streams are empty if no
         value is given for the outputs parameter.
 
-        Cancels all pending modules in the workflow.
+        Cancels all pending modules in the workflow. If any of the modules
+        that precede the module in the workflow are still active the error is
+        recorded and the module state is updated once all preceding modules
+        have finished.
 
         Returns True if the state of the workflow was changed and False
         otherwise. The result is None if the project or task did not exist.
@@ -690,9 +823,13 @@ class VizierEngine(WorkflowController):
             self.backend.task_finished(task_id)
             module = workflow.modules[module_index]
             if module.is_active:
-                module.set_error(finished_at=finished_at, outputs=outputs)
-                for m in workflow.modules[module_index+1:]:
-                    m.set_canceled()
+                self.results[module.identifier] = TaskResult(
+                    task=task,
+                    finished_at=finished_at,
+                    outputs=outputs,
+                    is_error=True
+                )
+                self.update_workflow(workflow=workflow, project_id=task.project_id)
                 return True
             else:
                 return False
@@ -744,8 +881,11 @@ class VizierEngine(WorkflowController):
 
         If case of a successful module execution the database state and module
         provenance information are also adjusted together with the module
-        output streams. If the workflow has pending modules the first pending
-        module will be executed next.
+        output streams. The module state is only updated if all preceding
+        modules in the workflow have finished. Otherwise, the result is
+        recorded until the preceding modules have finished. Pending modules
+        whose inputs are available are executed next. The result is added to
+        the result cache.
 
         Returns True if the state of the workflow was changed and False
         otherwise. The result is None if the project or task did not exist.
@@ -780,65 +920,286 @@ class VizierEngine(WorkflowController):
             # Notify the backend that the task is finished
             self.backend.task_finished(task_id)
             module = workflow.modules[module_index]
+            if not self.cache is None:
+                self.cache.put(
+                    project_id=task.project_id,
+                    command=module.command,
+                    datasets=task_context(task.datasets),
+                    outputs=outputs,
+                    provenance=provenance
+                )
             if not module.is_running:
                 # The result is false if the state of the module did not change
                 return False
-            # Adjust the module context
-            datasets = workflow.modules[module_index - 1].datasets if module_index > 0 else dict()
-            context = provenance.get_database_state(datasets)
-            module.set_success(
+            self.results[module.identifier] = TaskResult(
+                task=task,
                 finished_at=finished_at,
-                datasets=context,
                 outputs=outputs,
                 provenance=provenance
             )
-            print("Module {} finished at {} / Context: {}".format(
-                module.external_form, 
-                finished_at,
-                context
-            ))
-            for next_module in workflow.modules[module_index+1:]:
-                if not next_module.is_pending:
-                    # This case can only happen if we allow parallel execution
-                    # of modules in the future. At this point it should not
-                    # occur.
-                    raise RuntimeError('invalid workflow state')
-                elif not next_module.provenance.requires_exec(context):
-                    context = next_module.provenance.get_database_state(context)
-                    next_module.set_success(
-                        finished_at=finished_at,
-                        datasets=context,
-                        outputs=next_module.outputs,
-                        provenance=next_module.provenance
-                    )
+            self.update_workflow(workflow=workflow, project_id=task.project_id)
+            return True
+
+    def start_module(self, project_id, branch_id, module, datasets):
+        """Execute a pending workflow module against the given database state.
+        Updates the external form of the module command and the module state
+        before submitting the module for execution. The result is True if a
+        cached result was used for the module.
+
+        Parameters
+        ----------
+        project_id: string
+            Unique project identifier
+        branch_id: string
+            Unique branch identifier
+        module: vizier.viztrail.module.ModuleHandle
+            handle for executed module
+        datasets: dict(vizier.datastore.dataset.DatasetDescriptor)
+            Index of datasets in the a database state
+
+        Returns
+        -------
+        bool
+        """
+        command = module.command
+        package_id = command.package_id
+        command_id = command.command_id
+        external_form = command.to_external_form(
+            command=self.packages[package_id].get(command_id),
+            datasets=datasets
+        )
+        # If the backend is going to run the task immediately we
+        # need to adjust the module state
+        state = self.backend.next_task_state()
+        if state == mstate.MODULE_RUNNING:
+            module.set_running(
+                external_form=external_form,
+                started_at=get_current_time()
+            )
+        else:
+            module.update_property(external_form=external_form)
+        return self.execute_module(
+            project_id=project_id,
+            branch_id=branch_id,
+            module=module,
+            datasets=datasets
+        )
+
+    def update_workflow(self, workflow, project_id):
+        """Apply the results of finished tasks to the workflow modules and
+        execute pending modules whose inputs are available.
+
+        If an update is already in progress (i.e., the method is called by a
+        task that finished while it was submitted for execution) the
+        workflow is queued and updated once the current update has finished.
+        Callers are expected to hold the backend lock.
+
+        Parameters
+        ----------
+        workflow: vizier.viztrail.workflow.WorkflowHandle
+            Head workflow of the branch
+        project_id: string
+            Unique project identifier
+        """
+        if not any(w is workflow for w, _ in self.updates):
+            self.updates.append((workflow, project_id))
+        self.process_updates()
+
+    def process_updates(self):
+        """Run update passes for all queued workflows unless an update is
+        already in progress.
+        """
+        if self.is_updating:
+            return
+        self.is_updating = True
+        try:
+            while len(self.updates) > 0:
+                workflow, project_id = self.updates.popleft()
+                self.update_workflow_modules(
+                    workflow=workflow,
+                    project_id=project_id
+                )
+        finally:
+            self.is_updating = False
+            self.updates.clear()
+
+    def update_workflow_modules(self, workflow, project_id):
+        """Single update pass over the modules of the given workflow. Use
+        update_workflow to trigger an update.
+
+        Results are applied in workflow order starting from the first active
+        module. Application stops at the first active module that has no
+        result (or that requires execution). The database state after the last
+        finished module is the state against which pending modules are
+        executed. Pending modules that follow active modules are executed if
+        they are independent of all active modules that precede them.
+
+        Parameters
+        ----------
+        workflow: vizier.viztrail.workflow.WorkflowHandle
+            Head workflow of the branch
+        project_id: string
+            Unique project identifier
+        """
+        modules = workflow.modules
+        # Find the first active module in the workflow
+        module_index = 0
+        while module_index < len(modules):
+            if modules[module_index].is_active:
+                break
+            module_index += 1
+        if module_index == len(modules):
+            return
+        if module_index > 0:
+            context = modules[module_index - 1].datasets
+        else:
+            context = dict()
+        # Apply results and skip modules that do not require execution until
+        # the first module that is still active is found. Keep track of
+        # whether results were taken from the cache.
+        finished_at = None
+        is_cached = False
+        while module_index < len(modules):
+            module = modules[module_index]
+            result = self.results.pop(module.identifier, None)
+            if not result is None:
+                # Results of modules that were executed against a database
+                # state that differs from the current state with respect to
+                # the datasets that the module accessed are discarded. The
+                # module is executed again.
+                if not result.is_error:
+                    provenance = result.provenance
                 else:
-                    command = next_module.command
-                    package_id = command.package_id
-                    command_id = command.command_id
-                    external_form = command.to_external_form(
-                        command=self.packages[package_id].get(command_id),
-                        datasets=context
-                    )
-                    # If the backend is going to run the task immediately we
-                    # need to adjust the module state
-                    state = self.backend.next_task_state()
-                    if state == mstate.MODULE_RUNNING:
-                        next_module.set_running(
-                            external_form=external_form,
-                            started_at=get_current_time()
-                        )
-                    else:
-                        next_module.update_property(
-                            external_form=external_form
-                        )
-                    self.execute_module(
-                        project_id=task.project_id,
+                    provenance = module.provenance
+                if not provenance.is_equivalent_state(result.task.datasets, context):
+                    is_cached = self.start_module(
+                        project_id=project_id,
                         branch_id=workflow.branch_id,
-                        module=next_module,
+                        module=module,
                         datasets=context
                     )
                     break
-            return True
+                finished_at = result.finished_at
+                if result.is_error:
+                    module.set_error(
+                        finished_at=result.finished_at,
+                        outputs=result.outputs
+                    )
+                    self.cancel_modules(modules[module_index+1:])
+                    return
+                context = provenance.get_database_state(context)
+                module.set_success(
+                    finished_at=result.finished_at,
+                    datasets=context,
+                    outputs=result.outputs,
+                    provenance=provenance
+                )
+                print("Module {} finished at {} / Context: {}".format(
+                    module.external_form,
+                    result.finished_at,
+                    context
+                ))
+            elif module.is_pending and self.get_module_task(module) is None:
+                if module.provenance.requires_exec(context):
+                    break
+                context = module.provenance.get_database_state(context)
+                module.set_success(
+                    finished_at=finished_at,
+                    datasets=context,
+                    outputs=module.outputs,
+                    provenance=module.provenance
+                )
+            else:
+                break
+            module_index += 1
+        # Execute pending modules. Keep track of the datasets that are read
+        # and modified by the active modules that precede the current module.
+        # The first module is always executed (unless it is running).
+        read = set()
+        modified = set()
+        is_first = True
+        for module in modules[module_index:]:
+            if module.identifier in self.results:
+                dependencies = self.results[module.identifier].provenance
+                if dependencies is None:
+                    dependencies = module.provenance
+                dependencies = dependencies.get_dependencies()
+            else:
+                dependencies = module.provenance.get_dependencies()
+            if module.identifier in self.results or not module.is_pending:
+                # The module has finished but its result has not been applied
+                # yet or the module is running.
+                pass
+            elif not self.get_module_task(module) is None:
+                # The module has been submitted for execution
+                pass
+            elif is_first:
+                is_cached |= self.start_module(
+                    project_id=project_id,
+                    branch_id=workflow.branch_id,
+                    module=module,
+                    datasets=context
+                )
+            elif not dependencies is None:
+                # Execute the module if it does not depend on any of the
+                # preceding active modules and if it requires execution.
+                # Otherwise, the module has to wait.
+                module_read, module_modified = dependencies
+                accessed = module_read.union(module_modified)
+                if accessed.isdisjoint(modified) and module_modified.isdisjoint(read):
+                    if module.provenance.requires_exec(context):
+                        is_cached |= self.start_module(
+                            project_id=project_id,
+                            branch_id=workflow.branch_id,
+                            module=module,
+                            datasets=context
+                        )
+            # Modules with unknown dependencies act as a barrier for all
+            # following modules.
+            if dependencies is None:
+                break
+            read.update(dependencies[0])
+            modified.update(dependencies[1])
+            is_first = False
+        # Apply results that were taken from the cache.
+        if is_cached:
+            self.update_workflow(workflow=workflow, project_id=project_id)
+
+    def cancel_modules(self, modules):
+        """Set the state of the given modules to canceled. Cancels the tasks
+        for modules that are running and removes results for modules that
+        have finished.
+
+        Parameters
+        ----------
+        modules: list(vizier.viztrail.module.base.ModuleHandle)
+            List of workflow modules
+        """
+        for module in modules:
+            task = self.get_module_task(module)
+            if not task is None:
+                self.backend.cancel_task(task.task_id)
+                del self.tasks[task.task_id]
+            self.results.pop(module.identifier, None)
+            module.set_canceled()
+
+    def get_module_task(self, module):
+        """Get the handle for the task that is executing the given module.
+        The result is None if no task for the module exists.
+
+        Parameters
+        ----------
+        module: vizier.viztrail.module.base.ModuleHandle
+            Workflow module
+
+        Returns
+        -------
+        vizier.engine.base.ExtendedTaskHandle
+        """
+        for task in self.tasks.values():
+            if task.module_id == module.identifier:
+                return task
+        return None
 
 
 # ------------------------------------------------------------------------------
@@ -0,0 +1,339 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Cache for the results of workflow module executions.
+
+Many modules are executed repeatedly against the same input, e.g., when a
+branch is re-run or when a module is re-inserted into a workflow. The result
+cache keeps the outputs and provenance information of successful executions
+for each project. A cached result is used for a module if the module command
+is the same as the cached command (same package, command identifier, and
+arguments) and if all datasets that the cached execution accessed (i.e., read,
+wrote, or deleted) have the same identifier in the database state against
+which the module is executed. Written and deleted datasets are included since
+some commands (e.g., rename) do not report all datasets they depend on as
+read.
+
+Commands of packages that are not deterministic (e.g., Python cells) are never
+cached. The same holds for individual commands whose result depends on
+resources outside of the database state (e.g., loading a dataset from a file
+or Url) and for commands that request to reload such resources. For each
+project the cache keeps a limited number of results. The least recently used
+results are evicted first.
+"""
+
+from collections import OrderedDict
+
+import json
+
+from vizier.engine.packages.base import FILE_RELOAD
+from vizier.engine.packages.pycell.base import PACKAGE_PYTHON
+from vizier.engine.packages.r.base import PACKAGE_R
+from vizier.engine.packages.sample.base import PACKAGE_SAMPLE
+from vizier.engine.packages.scala.base import PACKAGE_SCALA
+from vizier.engine.packages.vizual.base import PACKAGE_VIZUAL
+from vizier.engine.packages.vizual.base import VIZUAL_LOAD, VIZUAL_UNLOAD
+from vizier.viztrail.command import ModuleArguments
+
+
+"""Default maximum number of cached results per project."""
+DEFAULT_CACHE_SIZE = 1000
+
+"""Packages whose commands are not cached by default."""
+DEFAULT_EXCLUDED_PACKAGES = [
+    PACKAGE_PYTHON,
+    PACKAGE_R,
+    PACKAGE_SAMPLE,
+    PACKAGE_SCALA
+]
+
+"""Commands that are not cached by default. Commands are identified by the
+package identifier and the command identifier, separated by a dot.
+"""
+DEFAULT_EXCLUDED_COMMANDS = [
+    PACKAGE_VIZUAL + '.' + VIZUAL_LOAD,
+    PACKAGE_VIZUAL + '.' + VIZUAL_UNLOAD
+]
+
+
+class CachedResult(object):
+    """Result of a successful module execution. Contains the identifier of the
+    datasets that were accessed by the module together with the module outputs
+    and provenance information.
+    """
+    def __init__(self, state, outputs, provenance):
+        """Initialize the result components.
+
+        Parameters
+        ----------
+        state: dict(string)
+            Identifier of the accessed datasets at the time of execution, keyed
+            by the dataset name (None for datasets that did not exist)
+        outputs: vizier.viztrail.module.output.ModuleOutputs
+            Output streams of the module
+        provenance: vizier.viztrail.module.provenance.ModuleProvenance
+            Provenance information for the module execution
+        """
+        self.state = state
+        self.outputs = outputs
+        self.provenance = provenance
+
+    def matches(self, datasets):
+        """Test whether all datasets that were accessed by the cached execution
+        have the same identifier in the given database state.
+
+        Parameters
+        ----------
+        datasets: dict(string)
+            Dataset identifier keyed by the dataset name
+
+        Returns
+        -------
+        bool
+        """
+        for name in self.state:
+            if datasets.get(name) != self.state[name]:
+                return False
+        return True
+
+
+class ExecResultCache(object):
+    """Project-level cache for results of module executions. Results are
+    indexed by the command key. There may be multiple results for the same
+    command that were computed against different database states.
+    """
+    def __init__(
+        self, capacity=DEFAULT_CACHE_SIZE, excluded_packages=None,
+        excluded_commands=None
+    ):
+        """Initialize the cache size and the lists of packages and commands
+        that are not cached.
+
+        Parameters
+        ----------
+        capacity: int, optional
+            Maximum number of cached results per project
+        excluded_packages: list(string), optional
+            Identifier of packages whose commands are not cached
+        excluded_commands: list(string), optional
+            Commands that are not cached, identified by package.command
+            strings
+        """
+        self.capacity = capacity
+        if excluded_packages is None:
+            excluded_packages = DEFAULT_EXCLUDED_PACKAGES
+        self.excluded_packages = set(excluded_packages)
+        if excluded_commands is None:
+            excluded_commands = DEFAULT_EXCLUDED_COMMANDS
+        self.excluded_commands = set(excluded_commands)
+        # Cached results for each project. Results are kept in an ordered
+        # dictionary (in order of last access) keyed by the command key and the
+        # identifier of the accessed datasets. The index maps command keys to
+        # the keys of the cached results for each project.
+        self.projects = dict()
+        self.index = dict()
+
+    def clear(self, project_id=None):
+        """Remove all cached results for the given project. If no project is
+        given all cached results are removed.
+
+        Parameters
+        ----------
+        project_id: string, optional
+            Unique project identifier
+        """
+        if project_id is None:
+            self.projects = dict()
+            self.index = dict()
+        else:
+            self.projects.pop(project_id, None)
+            self.index.pop(project_id, None)
+
+    def get(self, project_id, command, datasets):
+        """Get a cached result for executing the given command against the
+        given database state. The result is None if no matching result exists
+        in the cache.
+
+        Parameters
+        ----------
+        project_id: string
+            Unique project identifier
+        command : vizier.viztrail.command.ModuleCommand
+            Specification of the executed command
+        datasets: dict(string)
+            Dataset identifier keyed by the dataset name
+
+        Returns
+        -------
+        vizier.engine.cache.CachedResult
+        """
+        if not self.is_cacheable(command) or not project_id in self.projects:
+            return None
+        results = self.projects[project_id]
+        for key in self.index[project_id].get(command_key(command), list()):
+            if results[key].matches(datasets):
+                results.move_to_end(key)
+                return results[key]
+        return None
+
+    def is_cacheable(self, command):
+        """Test whether results for the given command can be cached. Results
+        are not cached if the package or the command are excluded or if the
+        command requests to reload an external resource.
+
+        Parameters
+        ----------
+        command : vizier.viztrail.command.ModuleCommand
+            Specification of the executed command
+
+        Returns
+        -------
+        bool
+        """
+        if command.package_id in self.excluded_packages:
+            return False
+        if command.package_id + '.' + command.command_id in self.excluded_commands:
+            return False
+        return not has_reload_flag(command.arguments)
+
+    def put(self, project_id, command, datasets, outputs, provenance):
+        """Add the result of a successful command execution to the cache. The
+        result is ignored if the command is not cacheable or if the datasets
+        that were read by the command are unknown.
+
+        Parameters
+        ----------
+        project_id: string
+            Unique project identifier
+        command : vizier.viztrail.command.ModuleCommand
+            Specification of the executed command
+        datasets: dict(string)
+            Dataset identifier keyed by the dataset name for the database state
+            against which the command was executed
+        outputs: vizier.viztrail.module.output.ModuleOutputs
+            Output streams of the module
+        provenance: vizier.viztrail.module.provenance.ModuleProvenance
+            Provenance information for the module execution
+        """
+        if not self.is_cacheable(command) or self.capacity <= 0:
+            return
+        if provenance is None or provenance.read is None:
+            return
+        accessed = set(provenance.read)
+        if not provenance.write is None:
+            accessed.update(provenance.write)
+        if not provenance.delete is None:
+            accessed.update(provenance.delete)
+        state = {name: datasets.get(name) for name in accessed}
+        cmd_key = command_key(command)
+        key = (cmd_key, tuple(sorted(state.items(), key=str)))
+        if not project_id in self.projects:
+            self.projects[project_id] = OrderedDict()
+            self.index[project_id] = dict()
+        results = self.projects[project_id]
+        index = self.index[project_id]
+        if not key in results:
+            index.setdefault(cmd_key, list()).append(key)
+        results[key] = CachedResult(
+            state=state,
+            outputs=outputs,
+            provenance=provenance
+        )
+        results.move_to_end(key)
+        # Evict least recently used results
+        while len(results) > self.capacity:
+            evicted, _ = results.popitem(last=False)
+            index[evicted[0]].remove(evicted)
+            if len(index[evicted[0]]) == 0:
+                del index[evicted[0]]
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def command_key(command):
+    """Get a string that uniquely identifies a command and its arguments. The
+    arguments are normalized such that the key does not depend on the order
+    in which arguments were given.
+
+    Parameters
+    ----------
+    command : vizier.viztrail.command.ModuleCommand
+        Specification of the executed command
+
+    Returns
+    -------
+    string
+    """
+    return json.dumps(
+        [
+            command.package_id,
+            command.command_id,
+            normalize_arguments(command.arguments)
+        ],
+        sort_keys=True,
+        default=str
+    )
+
+
+def has_reload_flag(value):
+    """Test whether a command argument value contains a reload flag that is
+    set to True.
+
+    Parameters
+    ----------
+    value: any
+        Argument value
+
+    Returns
+    -------
+    bool
+    """
+    if isinstance(value, ModuleArguments):
+        return has_reload_flag(value.arguments)
+    elif isinstance(value, dict):
+        if value.get(FILE_RELOAD) is True:
+            return True
+        return any(has_reload_flag(el) for el in value.values())
+    elif isinstance(value, list):
+        return any(has_reload_flag(el) for el in value)
+    return False
+
+
+def normalize_arguments(value):
+    """Convert a command argument value into a list or scalar value where
+    nested argument lists are sorted by the argument identifier.
+
+    Parameters
+    ----------
+    value: any
+        Argument value
+
+    Returns
+    -------
+    any
+    """
+    if isinstance(value, ModuleArguments):
+        return sorted(
+            [[arg_id, normalize_arguments(arg_val)]
+                for arg_id, arg_val in value.arguments.items()],
+            key=lambda arg: arg[0]
+        )
+    elif isinstance(value, list):
+        return [normalize_arguments(el) for el in value]
+    return value
@@ -17,6 +17,7 @@
 """Specification of parameters for plot cells."""
 
 import vizier.engine.packages.base as pckg
+import vizier.view.chart as chart
 
 
 """Global constants."""
@@ -31,6 +32,8 @@ PLOT_SIMPLE_CHART = 'chart'
 PARA_CHART = 'chart'
 PARA_CHART_TYPE = 'chartType'
 PARA_CHART_GROUPED = 'chartGrouped'
+PARA_CHART_MAX_POINTS = 'chartMaxPoints'
+PARA_CHART_REDUCTION = 'chartReduction'
 PARA_RANGE = 'range'
 PARA_SERIES = 'series'
 PARA_SERIES_COLUMN = PARA_SERIES + '_' + pckg.PARA_COLUMN
@@ -134,6 +137,34 @@ PLOT_COMMANDS = pckg.package_declaration(
                     data_type=pckg.DT_BOOL,
                     index=11,
                     parent=PARA_CHART
+                ),
+                pckg.parameter_declaration(
+                    identifier=PARA_CHART_MAX_POINTS,
+                    name='Max. Points',
+                    data_type=pckg.DT_INT,
+                    index=12,
+                    parent=PARA_CHART,
+                    required=False
+                ),
+                pckg.parameter_declaration(
+                    identifier=PARA_CHART_REDUCTION,
+                    name='Reduce by',
+                    data_type=pckg.DT_STRING,
+                    index=13,
+                    values=[
+                        pckg.enum_value(
+                            value=chart.REDUCE_LTTB,
+                            text='Downsample',
+                            is_default=True
+                        ),
+                        pckg.enum_value(value=chart.REDUCE_AVG, text='Average'),
+                        pckg.enum_value(value=chart.REDUCE_COUNT, text='Count'),
+                        pckg.enum_value(value=chart.REDUCE_MAX, text='Maximum'),
+                        pckg.enum_value(value=chart.REDUCE_MIN, text='Minimum'),
+                        pckg.enum_value(value=chart.REDUCE_SUM, text='Sum')
+                    ],
+                    parent=PARA_CHART,
+                    required=False
                 )
             ],
             format=[
@@ -23,7 +23,8 @@ import vizier.viztrail.command as md
 
 def create_plot(
     dataset_name, chart_name, series, chart_type='Bar Chart', chart_grouped=False,
-    xaxis_range=None, xaxis_column=None, validate=False
+    xaxis_range=None, xaxis_column=None, max_points=None, reduction=None,
+    validate=False
 ):
     """Create an instance of a create plot command.
 
@@ -45,6 +46,11 @@ def create_plot(
         Column value range definition
     xaxis_column: int, optional
         Column identifier
+    max_points: int, optional
+        Maximum number of points in the chart
+    reduction: string, optional
+        Method for reducing data series that exceed the maximum number of
+        points
     validate: bool, optional
         If true, the command is validated
 
@@ -68,18 +74,25 @@ def create_plot(
         if 'range' in s:
             items.append(md.ARG(id=plot.PARA_SERIES_RANGE, value=s['range']))
         series_elements.append(items)
+    # Create the chart record. The point limit and reduction are optional.
+    chart_elements = [
+        md.ARG(plot.PARA_CHART_TYPE, value=chart_type),
+        md.ARG(id=plot.PARA_CHART_GROUPED, value=chart_grouped)
+    ]
+    if not max_points is None:
+        chart_elements.append(
+            md.ARG(id=plot.PARA_CHART_MAX_POINTS, value=max_points)
+        )
+    if not reduction is None:
+        chart_elements.append(
+            md.ARG(id=plot.PARA_CHART_REDUCTION, value=reduction)
+        )
     # Create list of arguments
     arguments= [
         md.ARG(id=pckg.PARA_DATASET, value=dataset_name),
         md.ARG(id=pckg.PARA_NAME, value=chart_name),
         md.ARG(id=plot.PARA_SERIES, value=series_elements),
-        md.ARG(
-            id=plot.PARA_CHART,
-            value=[
-                md.ARG(plot.PARA_CHART_TYPE, value=chart_type),
-                md.ARG(id=plot.PARA_CHART_GROUPED, value=chart_grouped)
-            ]
-        )
+        md.ARG(id=plot.PARA_CHART, value=chart_elements)
     ]
     # Only add xaxis record if at least one of the two arguments are given
     if not xaxis_range is None or not xaxis_column is None:
@@ -85,12 +85,23 @@ class PlotProcessor(TaskProcessor):
         chart_args = args.get_value(cmd.PARA_CHART)
         chart_type = chart_args.get_value(cmd.PARA_CHART_TYPE)
         grouped_chart = chart_args.get_value(cmd.PARA_CHART_GROUPED)
+        # The maximum number of points and the reduction method are optional
+        max_points = chart_args.get_value(
+            cmd.PARA_CHART_MAX_POINTS,
+            raise_error=False
+        )
+        reduction = chart_args.get_value(
+            cmd.PARA_CHART_REDUCTION,
+            raise_error=False
+        )
         # Create a new chart view handle and add the series definitions
         view = ChartViewHandle(
             dataset_name=ds_name,
             chart_name=chart_name,
             chart_type=chart_type,
-            grouped_chart=grouped_chart
+            grouped_chart=grouped_chart,
+            max_points=max_points,
+            reduction=reduction
         )
         # The data series index for x-axis values is optional
         if args.has(cmd.PARA_XAXIS):
@@ -113,8 +124,14 @@ class PlotProcessor(TaskProcessor):
                 view=view,
                 dataset=ds
             )
-        # Execute the query and get the result
-        rows = ChartQuery.exec_query(ds, view)
+        # Execute the query and get the result. The result is added to the
+        # chart cache of the datastore so that later requests for the chart
+        # view on the same dataset do not need to execute the query again.
+        rows = ChartQuery.exec_query(
+            ds,
+            view,
+            cache=context.datastore.get_chart_cache()
+        )
         # Add chart view handle as module output
         return ExecResult(
             outputs=ModuleOutputs(stdout=[ChartOutput(view=view, rows=rows)]),
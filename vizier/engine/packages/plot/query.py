@@ -14,11 +14,39 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Classes to support queries over datasets to generate simple plot charts."""
+"""Classes to support queries over datasets to generate simple plot charts.
+
+Chart queries read the values for all data series in a single pass over the
+dataset rows and process the values column-wise. Numeric values are only cast
+if a series contains values that are not numbers already. For datasets in the
+columnar format, numeric columns are loaded directly from the column files as
+masked NumPy arrays (without reading any rows).
+
+Data series that contain more values than the maximum number of points for a
+chart view (or the default limit for views without a limit) are reduced. The values in a series are either
+aggregated (count, sum, avg, min, max) in equal-sized bins of consecutive rows
+or the series is downsampled using the Largest Triangle Three Buckets (LTTB)
+algorithm. Downsampling selects a subset of rows from the query result and
+therefore preserves the values of all series.
+"""
 
 from datetime import date, datetime
+from itertools import zip_longest
 import time
 
+import numpy as np
+
+from vizier.datastore.fs.dataset import DATA_FORMAT_COLUMNAR
+from vizier.datastore.fs.dataset import FileSystemDatasetHandle
+
+import vizier.datastore.fs.columnar as columnar
+import vizier.view.chart as chart
+
+
+"""Types of values that do not need to be cast to numbers."""
+NUMERIC_TYPES = set([int, float, type(None)])
+
+
 class DataStreamConsumer(object):
     """Consumer for data rows. The row consumers are used to filter cell values
     for a given column and a range interval of rows. The result is a list of
@@ -68,33 +96,58 @@ class DataStreamConsumer(object):
         """
         # Check if the row index falls inside the consumed interval
         if row_index >= self.range_start and (self.range_end is None or row_index <= self.range_end):
-            val = row.values[self.column_index]
-            if isinstance(val, date) or isinstance(val, datetime):
-                val = time.mktime(val.timetuple())
-            if self.cast_to_number:
-                # Only convert if not already a numeric value. Assumes a
-                # string if not numeric
-                if not isinstance(val, int) and not isinstance(val, float):
-                    # Try to cast to integer first. Remove commas.
-                    try:
-                        val = int(val.replace(',', ''))
-                    except ValueError:
-                        # Try to convert to float if int failed
-                        try:
-                            val = float(val)
-                        except ValueError:
-                            pass
-            self.values.append(val)
+            self.values.append(
+                cast_value(
+                    row.values[self.column_index],
+                    cast_to_number=self.cast_to_number
+                )
+            )
 
 
 class ChartQuery(object):
     """Query processor for simple chart queries."""
     @staticmethod
-    def exec_query(dataset, view):
+    def exec_query(dataset, view, cache=None):
         """Query a given dataset by selecting the columns in the given list.
         Each row in the result is the result of projecting a tuple in the
         dataset on the given columns.
 
+        If the longest data series exceeds the maximum number of points of
+        the chart view, the result is reduced using the reduction method of
+        the chart view.
+
+        If a chart cache is given the result is read from the cache. Results
+        that are not in the cache are added to the cache after they have been
+        computed.
+
+        Raises ValueError if any of the specified columns do not exist.
+
+        Parameters
+        ----------
+        dataset: vizier.datastore.dataset.DatasetHandle
+            Handle for dataset that is being queried
+        view: vizier.view.chart.ChartViewHandle
+            Chart view definition handle
+        cache: vizier.view.cache.ChartCache, optional
+            Cache for chart query results
+
+        Returns
+        -------
+        list()
+        """
+        if not cache is None:
+            rows = cache.get(dataset.identifier, view)
+            if not rows is None:
+                return rows
+        rows = ChartQuery.query(dataset, view)
+        if not cache is None:
+            cache.put(dataset.identifier, view, rows)
+        return rows
+
+    @staticmethod
+    def query(dataset, view):
+        """Evaluate the chart query for the given dataset and chart view.
+
         Raises ValueError if any of the specified columns do not exist.
 
         Parameters
@@ -114,53 +167,454 @@ class ChartQuery(object):
         x_axis = -1
         if not view.x_axis is None:
             x_axis = view.x_axis
-        # Create a list of data consumers, one for each data series. Keep track
-        # of the maximum range interval
-        consumers = list()
+        # Get the row range for each data series. Keep track of the maximum
+        # range interval
+        ranges = list()
         max_interval = (dataset.row_count + 1, 0)
-        for s_idx in range(len(view.data)):
-            series = view.data[s_idx]
-            column_index = dataset.get_index(series.column)
-            if column_index is None:
+        for series in view.data:
+            if dataset.get_index(series.column) is None:
                 raise ValueError('unknown column identifier \'' + str(series.column) + '\'')
             range_start = series.range_start if not series.range_start is None else 0
             range_end = series.range_end if not series.range_end is None else dataset.row_count
-            consumers.append(
-                DataStreamConsumer(
-                    column_index=column_index,
-                    range_start=range_start,
-                    range_end=range_end,
-                    cast_to_number=(s_idx != x_axis)
-                )
-            )
+            ranges.append((range_start, range_end))
             if range_start < max_interval[0]:
                 max_interval = (range_start, max_interval[1])
             if range_end > max_interval[1]:
                 max_interval = (max_interval[0], range_end)
-        # Consume all dataset rows in the maximum interval
-        rows = dataset.fetch_rows(
+        if len(ranges) == 0:
+            return list()
+        # Read the values for all series columns in the maximum interval
+        column_ids = list()
+        for series in view.data:
+            if not series.column in column_ids:
+                column_ids.append(series.column)
+        columns = read_columns(
+            dataset=dataset,
+            column_ids=column_ids,
             offset=max_interval[0],
             limit=(max_interval[1]-max_interval[0])+1
         )
-        row_index = max_interval[0]
-        for row in rows:
-            for c in consumers:
-                c.consume(row=row, row_index=row_index)
-            row_index += 1
-        # the size of the result set is determined by the longest data series
-        max_values = -1
-        for c in consumers:
-            if len(c.values) > max_values:
-                max_values = len(c.values)
-        # Create result array
-        data = []
-        for idx_row in range(max_values):
-            row = list()
-            for idx_series in range(len(consumers)):
-                consumer = consumers[idx_series]
-                if idx_row < len(consumer.values):
-                    row.append(consumer.values[idx_row])
-                else:
-                    row.append(None)
-            data.append(row)
-        return data
+        values = list()
+        for s_idx in range(len(view.data)):
+            range_start, range_end = ranges[s_idx]
+            column = columns[column_ids.index(view.data[s_idx].column)]
+            values.append(
+                cast_values(
+                    column[range_start-max_interval[0]:range_end-max_interval[0]+1],
+                    cast_to_number=(s_idx != x_axis)
+                )
+            )
+        # The size of the result set is determined by the longest data series.
+        # Reduce the series if the result exceeds the maximum number of points.
+        max_values = max([len(series) for series in values])
+        max_points = view.get_max_points()
+        if not max_points is None and max_values > max_points:
+            return reduce_series(
+                values=values,
+                x_axis=x_axis,
+                max_points=max_points,
+                reduction=view.reduction
+            )
+        return [list(row) for row in zip_longest(*[to_list(s) for s in values])]
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def aggregate_series(values, starts, reduction):
+    """Aggregate the values of a numeric data series in bins of consecutive
+    rows. Bins are defined by their start positions. Null values are ignored.
+    The aggregated value for a bin that only contains null values is None
+    (except for count).
+
+    Parameters
+    ----------
+    values: list or numpy.ma.MaskedArray
+        Values in the data series (numbers or None)
+    starts: numpy.array
+        Start positions of the bins
+    reduction: string
+        Aggregation method
+
+    Returns
+    -------
+    list
+    """
+    data = to_float_array(values)
+    valid = ~np.isnan(data)
+    counts = np.add.reduceat(valid.astype(np.int64), starts)
+    if reduction == chart.REDUCE_COUNT:
+        return counts.tolist()
+    if reduction in [chart.REDUCE_AVG, chart.REDUCE_SUM]:
+        result = np.add.reduceat(np.where(valid, data, 0), starts)
+        if reduction == chart.REDUCE_AVG:
+            result = result / np.maximum(counts, 1)
+    elif reduction == chart.REDUCE_MAX:
+        result = np.fmax.reduceat(data, starts)
+    elif reduction == chart.REDUCE_MIN:
+        result = np.fmin.reduceat(data, starts)
+    else:
+        raise ValueError('unknown reduction \'' + str(reduction) + '\'')
+    # Keep integer values for series that only contain integers.
+    if isinstance(values, np.ndarray):
+        is_int = values.dtype.kind == 'i'
+    else:
+        is_int = all(isinstance(val, int) for val in values if not val is None)
+    aggregates = list()
+    for value, count in zip(result.tolist(), counts.tolist()):
+        if count == 0:
+            aggregates.append(None)
+        elif is_int and reduction != chart.REDUCE_AVG:
+            aggregates.append(int(value))
+        else:
+            aggregates.append(value)
+    return aggregates
+
+
+def cast_value(value, cast_to_number=True):
+    """Cast a cell value for a chart data series. Dates are converted to
+    timestamps. If the cast_to_number flag is True an attempt is made to cast
+    string values to integer first and then to float. Values that cannot be
+    cast are returned as they are.
+
+    Parameters
+    ----------
+    value: scalar
+        Cell value
+    cast_to_number: bool, optional
+        Attempt to cast value to a number if True
+
+    Returns
+    -------
+    scalar
+    """
+    if isinstance(value, date) or isinstance(value, datetime):
+        value = time.mktime(value.timetuple())
+    if cast_to_number and isinstance(value, str):
+        # Try to cast to integer first. Remove commas.
+        try:
+            return int(value.replace(',', ''))
+        except ValueError:
+            # Try to convert to float if int failed
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    return value
+
+
+def cast_values(values, cast_to_number=True):
+    """Cast all values in a data series. Values are only cast individually if
+    the series contains values that need to be converted, i.e., dates or (if
+    cast_to_number is True) values that are not numbers. Numeric arrays are
+    returned as they are.
+
+    Parameters
+    ----------
+    values: list or numpy.ma.MaskedArray
+        Cell values in a data series
+    cast_to_number: bool, optional
+        Attempt to cast values to numbers if True
+
+    Returns
+    -------
+    list or numpy.ma.MaskedArray
+    """
+    if isinstance(values, np.ndarray):
+        return values
+    types = set(map(type, values))
+    if cast_to_number and types.issubset(NUMERIC_TYPES):
+        return values
+    if not cast_to_number and not any(issubclass(t, date) for t in types):
+        return values
+    return [cast_value(val, cast_to_number=cast_to_number) for val in values]
+
+
+def downsample_series(x, y, threshold):
+    """Downsample a data series using the Largest Triangle Three Buckets
+    algorithm. Returns the positions of the selected points. The first and
+    the last point are always selected.
+
+    Parameters
+    ----------
+    x: numpy.array
+        X-coordinates of the data points
+    y: numpy.array
+        Y-coordinates of the data points
+    threshold: int
+        Number of points in the downsampled series
+
+    Returns
+    -------
+    numpy.array
+    """
+    n = len(x)
+    if threshold >= n or n < 3:
+        return np.arange(n)
+    threshold = max(threshold, 3)
+    # Bucket boundaries for all points except the first and the last point.
+    buckets = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.zeros(threshold, dtype=np.int64)
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = buckets[i], buckets[i + 1]
+        # Average point in the next bucket (the last point for the last
+        # bucket).
+        if i + 2 < len(buckets):
+            next_start, next_end = buckets[i + 1], buckets[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # Select the point that forms the largest triangle with the previously
+        # selected point and the average point in the next bucket.
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def is_not_null(values):
+    """Get a boolean array that is True for all values in a data series that
+    are not None.
+
+    Parameters
+    ----------
+    values: list or numpy.ma.MaskedArray
+        Values in a data series
+
+    Returns
+    -------
+    numpy.array
+    """
+    if isinstance(values, np.ndarray):
+        return ~np.ma.getmaskarray(values)
+    return np.array([not val is None for val in values], dtype=bool)
+
+
+def is_numeric(values):
+    """Test if all values in a data series are either numbers or None. Boolean
+    values are not considered numbers. A series that only contains None is
+    not numeric.
+
+    Parameters
+    ----------
+    values: list or numpy.ma.MaskedArray
+        Values in a data series
+
+    Returns
+    -------
+    bool
+    """
+    if isinstance(values, np.ndarray):
+        return np.ma.count(values) > 0
+    types = set(map(type, values))
+    types.discard(type(None))
+    return len(types) > 0 and types.issubset(NUMERIC_TYPES)
+
+
+def pad_series(values, size):
+    """Pad a data series with null values to the given size.
+
+    Parameters
+    ----------
+    values: list or numpy.ma.MaskedArray
+        Values in a data series
+    size: int
+        Size of the padded series
+
+    Returns
+    -------
+    list or numpy.ma.MaskedArray
+    """
+    if len(values) >= size:
+        return values
+    elif isinstance(values, np.ndarray):
+        return np.ma.concatenate([
+            values,
+            np.ma.masked_all(size - len(values), dtype=values.dtype)
+        ])
+    return values + [None] * (size - len(values))
+
+
+def read_columns(dataset, column_ids, offset, limit):
+    """Read the values for the given columns from a range of dataset rows.
+    Returns a list of values, one for each column in the given list of
+    column identifier. Datasets in the file system datastore only read the
+    values for the requested columns. For datasets in the columnar format,
+    the values of numeric columns are returned as masked arrays that are
+    loaded from the column files. Values of all other columns are returned
+    as lists.
+
+    Parameters
+    ----------
+    dataset: vizier.datastore.dataset.DatasetHandle
+        Handle for dataset that is being queried
+    column_ids: list(int)
+        Identifier of the columns that are read
+    offset: int
+        Number of rows at the beginning of the dataset that are skipped
+    limit: int
+        Maximum number of rows that are read
+
+    Returns
+    -------
+    list(list or numpy.ma.MaskedArray)
+    """
+    columns = [None] * len(column_ids)
+    is_fs_dataset = isinstance(dataset, FileSystemDatasetHandle)
+    if is_fs_dataset and dataset.data_format == DATA_FORMAT_COLUMNAR:
+        for i, col_id in enumerate(column_ids):
+            columns[i] = columnar.read_numeric_column(
+                data_dir=dataset.data_file,
+                column_id=col_id,
+                offset=offset,
+                limit=limit
+            )
+    # Read the values of the remaining columns from the dataset rows.
+    pending = [i for i, col in enumerate(columns) if col is None]
+    if len(pending) == 0:
+        return columns
+    if is_fs_dataset:
+        reader = dataset.reader(
+            offset=offset,
+            limit=limit,
+            column_ids=[column_ids[i] for i in pending]
+        )
+        positions = list(range(len(pending)))
+    else:
+        reader = dataset.reader(offset=offset, limit=limit)
+        positions = [dataset.get_index(column_ids[i]) for i in pending]
+    values = [list() for _ in pending]
+    with reader as r:
+        for row in r:
+            row_values = row.values
+            for column, pos in zip(values, positions):
+                column.append(row_values[pos])
+    for i, column in zip(pending, values):
+        columns[i] = column
+    return columns
+
+
+def reduce_series(values, x_axis, max_points, reduction):
+    """Reduce the number of rows in a query result to (approximately) the
+    given maximum number of points.
+
+    For aggregations, the rows are split into equal-sized bins of consecutive
+    rows. Numeric series are aggregated. For the x-axis and for series that
+    are not numeric the value of the first row in each bin is returned (or the
+    number of values for count).
+
+    For downsampling, each numeric series is downsampled independently using
+    an equal share of the maximum number of points. The values of the x-axis
+    series are used as x-coordinates if they are numeric. The result contains
+    the union of all selected rows.
+
+    Parameters
+    ----------
+    values: list(list or numpy.ma.MaskedArray)
+        Values for each data series
+    x_axis: int
+        Index of the x-axis series (negative if there is no x-axis)
+    max_points: int
+        Maximum number of points in the result
+    reduction: string
+        Method for reducing the number of points
+
+    Returns
+    -------
+    list(list)
+    """
+    n = max([len(series) for series in values])
+    series = [pad_series(s, n) for s in values]
+    numeric = [s_idx != x_axis and is_numeric(s) for s_idx, s in enumerate(series)]
+    if reduction == chart.REDUCE_LTTB:
+        x = None
+        if x_axis >= 0 and is_numeric(series[x_axis]):
+            x = to_float_array(series[x_axis])
+        if x is None or np.isnan(x).any():
+            x = np.arange(n, dtype=np.float64)
+        y_series = [s_idx for s_idx in range(len(series)) if numeric[s_idx]]
+        if len(y_series) == 0:
+            rows = np.unique(np.linspace(0, n - 1, max_points).astype(np.int64))
+        else:
+            threshold = max_points // len(y_series)
+            selected = list()
+            for s_idx in y_series:
+                y = to_float_array(series[s_idx])
+                # Ignore null values when downsampling the series
+                valid = np.nonzero(~np.isnan(y))[0]
+                points = downsample_series(x[valid], y[valid], threshold)
+                selected.append(valid[points])
+            rows = np.unique(np.concatenate(selected))
+        return [list(row) for row in zip(*[select_rows(s, rows) for s in series])]
+    starts = np.linspace(0, n, max_points + 1).astype(np.int64)[:-1]
+    columns = list()
+    for s_idx in range(len(series)):
+        if numeric[s_idx]:
+            columns.append(aggregate_series(series[s_idx], starts, reduction))
+        elif s_idx != x_axis and reduction == chart.REDUCE_COUNT:
+            valid = is_not_null(series[s_idx])
+            columns.append(np.add.reduceat(valid.astype(np.int64), starts).tolist())
+        else:
+            columns.append(select_rows(series[s_idx], starts))
+    return [list(row) for row in zip(*columns)]
+
+
+def select_rows(values, positions):
+    """Get the values at the given positions in a data series.
+
+    Parameters
+    ----------
+    values: list or numpy.ma.MaskedArray
+        Values in a data series
+    positions: numpy.array
+        Positions of the selected values
+
+    Returns
+    -------
+    list
+    """
+    if isinstance(values, np.ndarray):
+        return values[positions].tolist()
+    return [values[pos] for pos in positions.tolist()]
+
+
+def to_float_array(values):
+    """Convert a numeric data series into an array of floats. Null values are
+    converted to NaN.
+
+    Parameters
+    ----------
+    values: list or numpy.ma.MaskedArray
+        Values in a data series (numbers or None)
+
+    Returns
+    -------
+    numpy.array
+    """
+    if isinstance(values, np.ndarray):
+        return np.ma.filled(values.astype(np.float64), np.nan)
+    return np.array(values, dtype=np.float64)
+
+
+def to_list(values):
+    """Get the values in a data series as a list.
+
+    Parameters
+    ----------
+    values: list or numpy.ma.MaskedArray
+        Values in a data series
+
+    Returns
+    -------
+    list
+    """
+    if isinstance(values, np.ndarray):
+        return values.tolist()
+    return values
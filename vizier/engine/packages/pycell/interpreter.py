@@ -0,0 +1,255 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Pool of warm interpreter processes for executing Python cells.
+
+Starting a new Python interpreter for each cell is expensive since libraries
+like pandas or bokeh have to be imported every time. The interpreter pool
+imports a configurable list of modules once in the process that owns the pool
+and then forks interpreter processes ahead of time. A forked interpreter
+inherits all preloaded modules and is ready to execute a cell immediately.
+
+Each interpreter executes exactly one cell and terminates afterwards. Changes
+that a cell makes to the interpreter state (e.g., global variables in imported
+modules) are therefore never visible to later cells. A replacement
+interpreter is forked as soon as an idle interpreter is taken from the pool.
+
+Interpreters are forked into the process group of the process that owns the
+pool. Backends that terminate the owning process (e.g., to cancel a task) can
+therefore terminate all of its interpreters by signalling the process group.
+
+The pool requires os.fork. On platforms where fork is not available cells are
+executed in the current process.
+"""
+
+import importlib
+import multiprocessing
+import os
+import signal
+import threading
+
+from vizier.engine.task.processor import ExecResult
+from vizier.viztrail.module.output import ModuleOutputs
+
+
+"""Modules that are imported before interpreters are forked by default."""
+DEFAULT_PRELOAD_MODULES = ['vizier.engine.packages.pycell.plugins']
+
+
+class InterpreterPool(object):
+    """Pool of pre-forked interpreter processes. The pool is started lazily
+    when the first function is executed. Interpreters are only forked from the
+    process that started the pool. If the pool object is copied into another
+    process (e.g., a backend worker) a new pool is started in that process.
+    """
+    def __init__(self, size=1, preload=None):
+        """Initialize the pool size and the list of preloaded modules.
+
+        Parameters
+        ----------
+        size: int, optional
+            Number of idle interpreters that are kept ready for execution
+        preload: list(string), optional
+            Names of modules that are imported before interpreters are forked
+        """
+        self.size = size
+        self.preload = preload if not preload is None else DEFAULT_PRELOAD_MODULES
+        self.lock = threading.Lock()
+        self.interpreters = None
+        self.pid = None
+
+    def __getstate__(self):
+        """Only the pool configuration is pickled. Idle interpreters belong to
+        the process that forked them.
+
+        Returns
+        -------
+        dict
+        """
+        return {'size': self.size, 'preload': self.preload}
+
+    def __setstate__(self, state):
+        """Restore the pool configuration.
+
+        Parameters
+        ----------
+        state: dict
+            Pickled pool configuration
+        """
+        self.__init__(size=state['size'], preload=state['preload'])
+
+    def close(self):
+        """Terminate all idle interpreters."""
+        with self.lock:
+            if not self.interpreters is None and self.pid == os.getpid():
+                for interpreter in self.interpreters:
+                    interpreter.terminate()
+            self.interpreters = None
+            self.pid = None
+
+    def execute(self, func, *args):
+        """Execute the given function in a warm interpreter. The function and
+        its arguments have to be picklable. The function is expected to return
+        an execution result. If the interpreter terminates without returning a
+        result an error result is returned.
+
+        Parameters
+        ----------
+        func: callable
+            Module-level function that is executed
+        args: list
+            Function arguments
+
+        Returns
+        -------
+        vizier.engine.task.processor.ExecResult
+        """
+        if not is_fork_available():
+            return func(*args)
+        with self.lock:
+            if self.interpreters is None or self.pid != os.getpid():
+                # Start the pool in the current process. Import all preloaded
+                # modules so that they are inherited by the forked
+                # interpreters.
+                for module_name in self.preload:
+                    importlib.import_module(module_name)
+                self.interpreters = list()
+                self.pid = os.getpid()
+            while len(self.interpreters) < self.size:
+                self.interpreters.append(Interpreter(self.interpreters))
+            interpreter = self.interpreters.pop(0)
+            # Fork the replacement before the function is executed.
+            self.interpreters.append(
+                Interpreter(self.interpreters + [interpreter])
+            )
+        return interpreter.execute(func, args)
+
+
+class Interpreter(object):
+    """Handle for a single pre-forked interpreter process. Interpreters are
+    forked directly (instead of using multiprocessing.Process) so that they can
+    also be started from daemonic worker processes.
+    """
+    def __init__(self, siblings=None):
+        """Fork the interpreter process. The interpreter closes its copies of
+        the connections to all sibling interpreters. Otherwise, an idle
+        interpreter would not receive the end of file signal when the owning
+        process closes its connection (or terminates) since the connection
+        would still be open in the sibling processes.
+
+        Parameters
+        ----------
+        siblings: list(vizier.engine.packages.pycell.interpreter.Interpreter), optional
+            Interpreters that were forked by the same process and that are
+            still connected to it
+        """
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.pid = os.fork()
+        if self.pid == 0:
+            # Interpreter process
+            self.conn.close()
+            if not siblings is None:
+                for interpreter in siblings:
+                    interpreter.conn.close()
+            exit_code = 0
+            try:
+                interpreter_main(child_conn)
+            except BaseException:
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        child_conn.close()
+
+    def execute(self, func, args):
+        """Execute the given function in the interpreter and return the
+        result. The interpreter terminates after the function is executed.
+
+        Parameters
+        ----------
+        func: callable
+            Module-level function that is executed
+        args: list
+            Function arguments
+
+        Returns
+        -------
+        vizier.engine.task.processor.ExecResult
+        """
+        try:
+            self.conn.send((func, args))
+            result = self.conn.recv()
+        except (EOFError, OSError) as ex:
+            result = ExecResult(
+                is_success=False,
+                outputs=ModuleOutputs().error(
+                    RuntimeError('interpreter terminated unexpectedly')
+                )
+            )
+        finally:
+            self.conn.close()
+            os.waitpid(self.pid, 0)
+        return result
+
+    def terminate(self):
+        """Terminate the idle interpreter."""
+        self.conn.close()
+        try:
+            os.kill(self.pid, signal.SIGTERM)
+        except OSError:
+            pass
+        os.waitpid(self.pid, 0)
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def interpreter_main(conn):
+    """Main function of an interpreter process. Waits for a single function
+    call, sends the result back, and terminates.
+
+    Parameters
+    ----------
+    conn: multiprocessing.connection.Connection
+        Connection to the process that owns the interpreter
+    """
+    try:
+        func, args = conn.recv()
+    except EOFError:
+        return
+    try:
+        result = func(*args)
+    except Exception as ex:
+        result = ExecResult(is_success=False, outputs=ModuleOutputs().error(ex))
+    try:
+        conn.send(result)
+    except Exception as ex:
+        # The result could not be serialized
+        conn.send(
+            ExecResult(is_success=False, outputs=ModuleOutputs().error(ex))
+        )
+    conn.close()
+
+
+def is_fork_available():
+    """Test whether processes can be started using fork.
+
+    Returns
+    -------
+    bool
+    """
+    return hasattr(os, 'fork')
@@ -20,6 +20,7 @@ import sys
 
 from vizier.datastore.dataset import DatasetDescriptor
 from vizier.engine.task.processor import ExecResult, TaskProcessor
+from vizier.engine.packages.pycell.interpreter import InterpreterPool
 from vizier.engine.packages.pycell.client.base import VizierDBClient
 from vizier.engine.packages.pycell.plugins import python_cell_preload
 from vizier.engine.packages.stream import OutputStream
@@ -32,9 +33,42 @@ import vizier.engine.packages.pycell.base as cmd
 """Context variable name for Vizier DB Client."""
 VARS_DBCLIENT = 'vizierdb'
 
+"""Properties for the processor configuration. The number of warm interpreters
+that are kept ready for execution and the list of modules that are imported
+before interpreters are forked. Cells are executed in the current process if
+the number of interpreters is zero (default).
+"""
+PROPERTY_INTERPRETERS = 'interpreters'
+PROPERTY_PRELOAD = 'preload'
+
 
 class PyCellTaskProcessor(TaskProcessor):
     """Implementation of the task processor for the Python cell package."""
+    def __init__(self, properties=None):
+        """Initialize the optional pool of warm interpreters from the given
+        properties dictionary.
+
+        Parameters
+        ----------
+        properties: dict, optional
+            Optional processor configuration properties
+        """
+        self.pool = None
+        if not properties is None:
+            size = properties.get(PROPERTY_INTERPRETERS, 0)
+            if size > 0:
+                self.pool = InterpreterPool(
+                    size=size,
+                    preload=properties.get(PROPERTY_PRELOAD)
+                )
+
+    def close(self):
+        """Terminate the idle interpreters in the pool of warm
+        interpreters.
+        """
+        if not self.pool is None:
+            self.pool.close()
+
     def compute(self, command_id, arguments, context):
         """Execute the Python script that is contained in the given arguments.
 
@@ -60,7 +94,9 @@ class PyCellTaskProcessor(TaskProcessor):
             raise ValueError('unknown pycell command \'' + str(command_id) + '\'')
 
     def execute_script(self, args, context):
-        """Execute a Python script in the given context.
+        """Execute a Python script in the given context. If the processor has
+        a pool of warm interpreters the script is executed in a separate
+        interpreter process.
 
         Parameters
         ----------
@@ -75,81 +111,112 @@ class PyCellTaskProcessor(TaskProcessor):
         """
         # Get Python script from user arguments
         source = args.get_value(cmd.PYTHON_SOURCE)
-        # Initialize the scope variables that are available to the executed
-        # Python script. At this point this includes only the client to access
-        # and manipulate datasets in the undelying datastore
-        client = VizierDBClient(
-            datastore=context.datastore,
-            datasets=context.datasets
-        )
-        variables = {VARS_DBCLIENT: client}
-        # Redirect standard output and standard error streams
-        out = sys.stdout
-        err = sys.stderr
-        stream = list()
-        sys.stdout = OutputStream(tag='out', stream=stream)
-        sys.stderr = OutputStream(tag='err', stream=stream)
-        # Keep track of exception that is thrown by the code
-        exception = None
-        # Run the Python code
-        try:
-            python_cell_preload(variables)
-            exec(source, variables, variables)
-        except Exception as ex:
-            exception = ex
-        finally:
-            # Make sure to reverse redirection of output streams
-            sys.stdout = out
-            sys.stderr = err
-        # Set module outputs
-        outputs = ModuleOutputs()
-        is_success = (exception is None)
-        for tag, text in stream:
-            text = ''.join(text).strip()
-            if tag == 'out':
-                outputs.stdout.append(HtmlOutput(text))
-            else:
-                outputs.stderr.append(TextOutput(text))
-                is_success = False
-        if is_success:
-            # Create provenance information. Ensure that all dictionaries
-            # contain elements of expected types, i.e, ensure that the user did
-            # not attempt anything tricky.
-            read = dict()
-            for name in client.read:
-                if not isinstance(name, str):
-                    raise RuntimeError('invalid key for mapping dictionary')
-                if name in context.datasets:
-                    read[name] = context.datasets[name]
-                    if not isinstance(read[name], str):
-                        raise RuntimeError('invalid element in mapping dictionary')
-                else:
-                    read[name] = None
-            write = dict()
-            for name in client.write:
-                if not isinstance(name, str):
-                    raise RuntimeError('invalid key for mapping dictionary')
-                ds_id = client.datasets[name]
-                if not ds_id is None:
-                    if not isinstance(ds_id, str):
-                        raise RuntimeError('invalid value in mapping dictionary')
-                    elif ds_id in client.descriptors:
-                        write[name] = client.descriptors[ds_id]
-                    else:
-                        write[name] = client.datastore.get_descriptor(ds_id)
-                else:
-                    write[name] = None
-            provenance = ModuleProvenance(
-                read=read,
-                write=write,
-                delete=client.delete
+        if not self.pool is None:
+            return self.pool.execute(
+                run_script,
+                source,
+                context.datastore,
+                context.datasets
             )
+        return run_script(source, context.datastore, context.datasets)
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def run_script(source, datastore, datasets):
+    """Execute a Python script using the given datastore and mapping of
+    dataset names to identifier.
+
+    Parameters
+    ----------
+    source: string
+        Python script
+    datastore: vizier.datastore.base.Datastore
+        Datastore for datasets that are accessed by the script
+    datasets: dict
+        Mapping of dataset names to dataset identifier
+
+    Returns
+    -------
+    vizier.engine.task.processor.ExecResult
+    """
+    # Initialize the scope variables that are available to the executed
+    # Python script. At this point this includes only the client to access
+    # and manipulate datasets in the undelying datastore
+    client = VizierDBClient(
+        datastore=datastore,
+        datasets=datasets
+    )
+    variables = {VARS_DBCLIENT: client}
+    # Redirect standard output and standard error streams
+    out = sys.stdout
+    err = sys.stderr
+    stream = list()
+    sys.stdout = OutputStream(tag='out', stream=stream)
+    sys.stderr = OutputStream(tag='err', stream=stream)
+    # Keep track of exception that is thrown by the code
+    exception = None
+    # Run the Python code
+    try:
+        python_cell_preload(variables)
+        exec(source, variables, variables)
+    except Exception as ex:
+        exception = ex
+    finally:
+        # Make sure to reverse redirection of output streams
+        sys.stdout = out
+        sys.stderr = err
+    # Set module outputs
+    outputs = ModuleOutputs()
+    is_success = (exception is None)
+    for tag, text in stream:
+        text = ''.join(text).strip()
+        if tag == 'out':
+            outputs.stdout.append(HtmlOutput(text))
         else:
-            outputs.error(exception)
-            provenance = ModuleProvenance()
-        # Return execution result
-        return ExecResult(
-            is_success=is_success,
-            outputs=outputs,
-            provenance=provenance
+            outputs.stderr.append(TextOutput(text))
+            is_success = False
+    if is_success:
+        # Create provenance information. Ensure that all dictionaries
+        # contain elements of expected types, i.e, ensure that the user did
+        # not attempt anything tricky.
+        read = dict()
+        for name in client.read:
+            if not isinstance(name, str):
+                raise RuntimeError('invalid key for mapping dictionary')
+            if name in datasets:
+                read[name] = datasets[name]
+                if not isinstance(read[name], str):
+                    raise RuntimeError('invalid element in mapping dictionary')
+            else:
+                read[name] = None
+        write = dict()
+        for name in client.write:
+            if not isinstance(name, str):
+                raise RuntimeError('invalid key for mapping dictionary')
+            ds_id = client.datasets[name]
+            if not ds_id is None:
+                if not isinstance(ds_id, str):
+                    raise RuntimeError('invalid value in mapping dictionary')
+                elif ds_id in client.descriptors:
+                    write[name] = client.descriptors[ds_id]
+                else:
+                    write[name] = client.datastore.get_descriptor(ds_id)
+            else:
+                write[name] = None
+        provenance = ModuleProvenance(
+            read=read,
+            write=write,
+            delete=client.delete
         )
+    else:
+        outputs.error(exception)
+        provenance = ModuleProvenance()
+    # Return execution result
+    return ExecResult(
+        is_success=is_success,
+        outputs=outputs,
+        provenance=provenance
+    )
@@ -31,6 +31,9 @@ SQL_QUERY = 'query'
 PARA_OUTPUT_DATASET = 'output_dataset'
 PARA_SQL_SOURCE = 'source'
 
+# Name of the query result dataset if no output dataset name is given
+DEFAULT_OUTPUT_DATASET = 'TEMPORARY_RESULT'
+
 
 """Define SQL command structure."""
 SQL_COMMANDS = pckg.package_declaration(
@@ -96,8 +96,9 @@ class SQLTaskProcessor(TaskProcessor):
                 mimir_table_names,
                 source
             )
-            sql = 'SELECT * FROM ' + view_name
-            mimirSchema = mimir.getSchema(sql)
+            # Schema and row count are cached by the datastore. They are only
+            # retrieved from the backend if the view is new.
+            mimirSchema, row_count = context.datastore.get_view_info(view_name)
 
             columns = list()
 
@@ -110,11 +111,9 @@ class SQLTaskProcessor(TaskProcessor):
                 )
                 columns.append(col)
 
-            row_count = mimir.countRows(view_name)
-            
             provenance = None
             if ds_name is None or ds_name == '':
-                ds_name = "TEMPORARY_RESULT"
+                ds_name = cmd.DEFAULT_OUTPUT_DATASET
 
             
             ds = context.datastore.register_dataset(
@@ -0,0 +1,288 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Implementation of the task processor for the SQL package that executes
+queries in an embedded SQLite database. The processor does not require a
+Mimir backend. It is intended for the default file system datastore.
+
+Datasets in the task context are loaded into the database as tables on demand,
+i.e., only datasets that are referenced by the query are read. Rows are
+streamed from the dataset reader into the table. The row identifier of each
+dataset row becomes the ROWID of the table row. The query result is written as
+a new dataset to the datastore.
+"""
+
+import sqlite3
+
+from vizier.datastore.dataset import DatasetColumn, DatasetRow
+from vizier.datastore.dataset import DATATYPE_INT, DATATYPE_REAL
+from vizier.datastore.dataset import DATATYPE_VARCHAR
+from vizier.engine.task.processor import ExecResult, TaskProcessor
+from vizier.viztrail.module.output import ModuleOutputs, TextOutput
+from vizier.viztrail.module.provenance import ModuleProvenance
+
+import vizier.engine.packages.sql.base as cmd
+
+
+"""Name of the database table that contains the query result."""
+RESULT_TABLE = 'vizier_query_result'
+
+"""Prefix of the error message for queries that reference unknown tables."""
+NO_SUCH_TABLE = 'no such table: '
+
+"""Declared SQLite column types for dataset column types. Values in columns of
+other types are stored as they are.
+"""
+SQLITE_TYPES = {
+    DATATYPE_INT: 'INTEGER',
+    DATATYPE_REAL: 'REAL',
+    DATATYPE_VARCHAR: 'TEXT'
+}
+
+
+class SQLiteTaskProcessor(TaskProcessor):
+    """Task processor for the SQL package that uses an embedded SQLite
+    database. Expects an instance of the
+    vizier.datastore.fs.base.FileSystemDatastore to read and write datasets.
+    """
+    def compute(self, command_id, arguments, context):
+        """Execute the SQL query that is contained in the given arguments.
+
+        Parameters
+        ----------
+        command_id: string
+            Unique identifier for a command in a package declaration
+        arguments: vizier.viztrail.command.ModuleArguments
+            User-provided command arguments
+        context: vizier.engine.task.base.TaskContext
+            Context in which a task is being executed
+
+        Returns
+        -------
+        vizier.engine.task.processor.ExecResult
+        """
+        if command_id == cmd.SQL_QUERY:
+            return self.execute_query(
+                args=arguments,
+                context=context
+            )
+        else:
+            raise ValueError('unknown sql command \'' + str(command_id) + '\'')
+
+    def execute_query(self, args, context):
+        """Execute a SQL query in the given context.
+
+        Parameters
+        ----------
+        args: vizier.viztrail.command.ModuleArguments
+            User-provided command arguments
+        context: vizier.engine.task.base.TaskContext
+            Context in which a task is being executed
+
+        Returns
+        -------
+        vizier.engine.task.processor.ExecResult
+        """
+        source = args.get_value(cmd.PARA_SQL_SOURCE).strip()
+        while source.endswith(';'):
+            source = source[:-1].strip()
+        ds_name = args.get_value(cmd.PARA_OUTPUT_DATASET, raise_error=False)
+        if ds_name is None or ds_name == '':
+            ds_name = cmd.DEFAULT_OUTPUT_DATASET
+        outputs = ModuleOutputs()
+        # The database is a temporary file that is removed when the
+        # connection is closed. This allows for datasets that do not fit into
+        # main memory.
+        con = sqlite3.connect('')
+        try:
+            # Materialize the query result in a temporary table. Datasets that
+            # are referenced by the query are loaded when SQLite reports them
+            # as unknown tables.
+            read = dict()
+            while True:
+                try:
+                    con.execute(
+                        'CREATE TEMP TABLE ' + RESULT_TABLE + ' AS ' + source
+                    )
+                    break
+                except sqlite3.OperationalError as ex:
+                    table_name = get_missing_table(ex)
+                    if table_name is None:
+                        raise
+                    name = table_name.lower()
+                    if not name in context.datasets or name in read:
+                        raise
+                    dataset = context.datastore.get_dataset(
+                        context.datasets[name]
+                    )
+                    if dataset is None:
+                        raise ValueError('unknown dataset \'' + name + '\'')
+                    load_dataset(con, table_name, dataset)
+                    read[name] = dataset.identifier
+            columns = get_result_columns(con)
+            row_count = con.execute(
+                'SELECT COUNT(*) FROM ' + RESULT_TABLE
+            ).fetchone()[0]
+            rows = con.execute('SELECT * FROM ' + RESULT_TABLE)
+            ds = context.datastore.write_dataset(
+                columns=columns,
+                rows=(
+                    DatasetRow(identifier=row_id, values=list(values))
+                    for row_id, values in enumerate(rows)
+                ),
+                row_count=row_count,
+                max_row_id=row_count - 1
+            )
+            outputs.stdout.append(TextOutput(ds_name + ' ('))
+            for i in range(len(columns)):
+                text = '  ' + str(columns[i])
+                if i != len(columns) - 1:
+                    text += ','
+                outputs.stdout.append(TextOutput(text))
+            outputs.stdout.append(TextOutput(')'))
+            outputs.stdout.append(TextOutput(str(row_count) + ' row(s)'))
+            provenance = ModuleProvenance(read=read, write={ds_name: ds})
+        except Exception as ex:
+            provenance = ModuleProvenance()
+            outputs.error(ex)
+        finally:
+            con.close()
+        # Return execution result
+        return ExecResult(
+            is_success=(len(outputs.stderr) == 0),
+            outputs=outputs,
+            provenance=provenance
+        )
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def get_missing_table(ex):
+    """Get the name of the unknown table from the error that is raised by
+    SQLite for queries that reference a non-existing table. The result is None
+    if the error has a different cause.
+
+    Parameters
+    ----------
+    ex: sqlite3.OperationalError
+        Error raised by SQLite
+
+    Returns
+    -------
+    string
+    """
+    msg = str(ex)
+    if msg.startswith(NO_SUCH_TABLE):
+        return msg[len(NO_SUCH_TABLE):]
+    return None
+
+
+def get_result_columns(con):
+    """Get the list of columns for the query result table. The column type is
+    derived from the declared column type. For columns without a declared
+    type the type is derived from the stored values.
+
+    Parameters
+    ----------
+    con: sqlite3.Connection
+        Connection to the database that contains the query result
+
+    Returns
+    -------
+    list(vizier.datastore.dataset.DatasetColumn)
+    """
+    columns = list()
+    for col in con.execute('PRAGMA table_info(' + RESULT_TABLE + ')'):
+        name, decl_type = col[1], col[2].upper()
+        if decl_type.startswith('INT'):
+            data_type = DATATYPE_INT
+        elif decl_type == 'REAL':
+            data_type = DATATYPE_REAL
+        elif decl_type == 'TEXT':
+            data_type = DATATYPE_VARCHAR
+        else:
+            types = set([
+                row[0] for row in con.execute(
+                    'SELECT DISTINCT typeof(' + quote(name) + ') FROM '
+                    + RESULT_TABLE
+                )
+            ])
+            types.discard('null')
+            if len(types) > 0 and types <= set(['integer']):
+                data_type = DATATYPE_INT
+            elif len(types) > 0 and types <= set(['integer', 'real']):
+                data_type = DATATYPE_REAL
+            else:
+                data_type = DATATYPE_VARCHAR
+        columns.append(
+            DatasetColumn(
+                identifier=len(columns),
+                name=name,
+                data_type=data_type
+            )
+        )
+    return columns
+
+
+def load_dataset(con, table_name, dataset):
+    """Create a table for the given dataset and insert the dataset rows. The
+    rows are streamed from the dataset reader.
+
+    Parameters
+    ----------
+    con: sqlite3.Connection
+        Connection to the query database
+    table_name: string
+        Name of the table as referenced in the query
+    dataset: vizier.datastore.dataset.DatasetHandle
+        Handle for the dataset
+    """
+    col_defs = list()
+    for col in dataset.columns:
+        col_def = quote(col.name)
+        if col.data_type in SQLITE_TYPES:
+            col_def += ' ' + SQLITE_TYPES[col.data_type]
+        col_defs.append(col_def)
+    con.execute(
+        'CREATE TEMP TABLE ' + quote(table_name) + '(' + ','.join(col_defs) + ')'
+    )
+    # The row identifier is inserted into the ROWID column.
+    col_names = ['ROWID'] + [quote(col.name) for col in dataset.columns]
+    sql = 'INSERT INTO ' + quote(table_name) + '(' + ','.join(col_names) + ')'
+    sql += ' VALUES (' + ','.join(['?'] * len(col_names)) + ')'
+    with dataset.reader() as reader:
+        con.executemany(
+            sql,
+            ([row.identifier] + list(row.values) for row in reader)
+        )
+
+
+def quote(name):
+    """Quote a table or column name.
+
+    Parameters
+    ----------
+    name: string
+        Table or column name
+
+    Returns
+    -------
+    string
+    """
+    return '"' + name.replace('"', '""') + '"'
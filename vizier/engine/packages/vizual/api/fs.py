@@ -19,17 +19,47 @@ filestore and datastore to persist files and datasets.
 """
 
 from vizier.core.util import is_valid_name, get_unique_identifier
-from vizier.datastore.dataset import DatasetColumn, DatasetRow
+from vizier.datastore.dataset import DatasetColumn
+from vizier.datastore.sort import DEFAULT_SORT_BUFFER_SIZE, sort_rows
 from vizier.engine.packages.vizual.api.base import VizualApi, VizualApiResult
 
+import vizier.datastore.fs.delta as delta
 import vizier.engine.packages.vizual.api.base as base
 
 
+"""Configuration parameter."""
+PARA_SORT_BUFFER_SIZE = 'sortBufferSize'
+
+
 class DefaultVizualApi(VizualApi):
     """Default implementation of the vizual API. Manipulates datasets in memory.
     Expects an instance of the vizier.datastore.fs.base.FileSystemDatastore to
     persist datasets.
+
+    Operations that modify only a few rows or columns (e.g., update a cell or
+    insert a row) do not copy the dataset rows. They create delta datasets that
+    contain only the change log for the modified dataset.
+
+    Datasets are sorted using an external merge sort. The maximum number of
+    rows that are kept in memory while sorting can be configured.
     """
+    def __init__(self, properties=None, sort_buffer_size=None):
+        """Initialize the size of the sort buffer. The value may also be given
+        as an entry in the dictionary of configuration properties.
+
+        Parameters
+        ----------
+        properties: dict, optional
+            Dictionary of configuration properties
+        sort_buffer_size: int, optional
+            Maximum number of rows that are kept in memory when sorting
+        """
+        self.sort_buffer_size = DEFAULT_SORT_BUFFER_SIZE
+        if not sort_buffer_size is None:
+            self.sort_buffer_size = sort_buffer_size
+        elif not properties is None and PARA_SORT_BUFFER_SIZE in properties:
+            self.sort_buffer_size = int(properties[PARA_SORT_BUFFER_SIZE])
+
     def delete_column(self, identifier, column_id, datastore):
         """Delete a column in a given dataset.
 
@@ -62,14 +92,13 @@ class DefaultVizualApi(VizualApi):
         columns = list(dataset.columns)
         name = columns[col_index].name
         del columns[col_index]
-        # Delete all value for the deleted column
-        rows = dataset.fetch_rows()
-        for row in rows:
-            del row.values[col_index]
-        # Store updated dataset to get new identifier
-        ds = datastore.create_dataset(
+        # Values of the deleted column are no longer read. The column is reset
+        # in case its identifier is re-used for a new column.
+        ds = datastore.create_delta_dataset(
+            dataset=dataset,
             columns=columns,
-            rows=rows,
+            operations=[delta.reset_column_op(column_id)],
+            row_count=dataset.row_count,
             annotations=dataset.annotations.filter(
                 columns=[c.identifier for c in columns]
             )
@@ -102,16 +131,19 @@ class DefaultVizualApi(VizualApi):
         # Make sure that row refers a valid row in the dataset
         if row_index < 0 or row_index >= dataset.row_count:
             raise ValueError('invalid row index \'' + str(row_index) + '\'')
-        # Delete the row at the given index position
-        rows = dataset.fetch_rows()
-        del rows[row_index]
+        # Get the identifier of the row at the given index position
+        row_id = dataset.fetch_rows(offset=row_index, limit=1)[0].identifier
+        # Remove annotations for the deleted row
+        annotations = dataset.annotations
+        ref_rows = set([a.row_id for a in annotations.rows + annotations.cells])
+        ref_rows.discard(row_id)
         # Store updated dataset to get new identifier
-        ds = datastore.create_dataset(
+        ds = datastore.create_delta_dataset(
+            dataset=dataset,
             columns=dataset.columns,
-            rows=rows,
-            annotations=dataset.annotations.filter(
-                rows=[r.identifier for r in rows]
-            )
+            operations=[delta.delete_row_op(row_id)],
+            row_count=dataset.row_count - 1,
+            annotations=annotations.filter(rows=ref_rows)
         )
         return VizualApiResult(ds)
 
@@ -145,9 +177,8 @@ class DefaultVizualApi(VizualApi):
         if dataset is None:
             raise ValueError('unknown dataset \'' + identifier + '\'')
         # The schema of the new dataset only contains the columns in the given
-        # list. Keep track of their index positions to filter values.
+        # list.
         schema = list()
-        val_filter = list()
         for i in range(len(columns)):
             col_idx = dataset.get_index(columns[i])
             if col_idx is None:
@@ -163,18 +194,13 @@ class DefaultVizualApi(VizualApi):
                 )
             else:
                 schema.append(col)
-            val_filter.append(col_idx)
-        # Create a list of projected rows
-        rows = list()
-        for row in dataset.fetch_rows():
-            values = list()
-            for v_idx in val_filter:
-                values.append(row.values[v_idx])
-            rows.append(DatasetRow(identifier=row.identifier, values=values))
-        # Store updated dataset to get new identifier
-        ds = datastore.create_dataset(
+        # Values are mapped to the new schema by their column identifier. The
+        # new dataset therefore shares the rows with the original dataset.
+        ds = datastore.create_delta_dataset(
+            dataset=dataset,
             columns=schema,
-            rows=rows,
+            operations=list(),
+            row_count=dataset.row_count,
             annotations=dataset.annotations.filter(
                 columns=[c.identifier for c in schema]
             )
@@ -215,21 +241,21 @@ class DefaultVizualApi(VizualApi):
             raise ValueError('invalid column index \'' + str(position) + '\'')
         # Insert new column into dataset
         columns = list(dataset.columns)
-        rows = dataset.fetch_rows()
+        column_id = dataset.max_column_id() + 1
         columns.insert(
             position,
             DatasetColumn(
-                identifier=dataset.max_column_id() + 1,
+                identifier=column_id,
                 name=name if not name is None else ''
             )
         )
-         # Add a null value to each row for the new column
-        for row in rows:
-            row.values.insert(position, None)
-        # Store updated dataset to get new identifier
-        ds = datastore.create_dataset(
+        # The new column contains null values. Reset the column in case the
+        # identifier was used by a previously deleted column.
+        ds = datastore.create_delta_dataset(
+            dataset=dataset,
             columns=columns,
-            rows=rows,
+            operations=[delta.reset_column_op(column_id)],
+            row_count=dataset.row_count,
             annotations=dataset.annotations
         )
         return VizualApiResult(ds)
@@ -260,19 +286,14 @@ class DefaultVizualApi(VizualApi):
         # Make sure that position is a valid row index in the new dataset
         if position < 0 or position > dataset.row_count:
             raise ValueError('invalid row index \'' + str(position) + '\'')
-        # Create empty set of values
-        rows = dataset.fetch_rows()
-        rows.insert(
-            position,
-            DatasetRow(
-                identifier=dataset.max_row_id() + 1,
-                values=[None] * len(dataset.columns)
-            )
-        )
-        # Store updated dataset to get new identifier
-        ds = datastore.create_dataset(
+        # Insert an empty row with a new identifier
+        ds = datastore.create_delta_dataset(
+            dataset=dataset,
             columns=dataset.columns,
-            rows=rows,
+            operations=[
+                delta.insert_row_op(dataset.max_row_id() + 1, position)
+            ],
+            row_count=dataset.row_count + 1,
             annotations=dataset.annotations
         )
         return VizualApiResult(ds)
@@ -457,13 +478,13 @@ class DefaultVizualApi(VizualApi):
         if source_idx != position:
             columns = list(dataset.columns)
             columns.insert(position, columns.pop(source_idx))
-            rows = dataset.fetch_rows()
-            for row in rows:
-                row.values.insert(position, row.values.pop(source_idx))
-            # Store updated dataset to get new identifier
-            ds = datastore.create_dataset(
+            # Only the schema changes. The new dataset shares the rows with
+            # the original dataset.
+            ds = datastore.create_delta_dataset(
+                dataset=dataset,
                 columns=columns,
-                rows=rows,
+                operations=list(),
+                row_count=dataset.row_count,
                 annotations=dataset.annotations
             )
             return VizualApiResult(ds)
@@ -503,12 +524,13 @@ class DefaultVizualApi(VizualApi):
             raise ValueError('invalid target position \'' + str(position) + '\'')
         # No need to do anything if source position equals target position
         if row_index != position:
-            rows = dataset.fetch_rows()
-            rows.insert(position, rows.pop(row_index))
+            row_id = dataset.fetch_rows(offset=row_index, limit=1)[0].identifier
             # Store updated dataset to get new identifier
-            ds = datastore.create_dataset(
+            ds = datastore.create_delta_dataset(
+                dataset=dataset,
                 columns=dataset.columns,
-                rows=rows,
+                operations=[delta.move_row_op(row_id, position)],
+                row_count=dataset.row_count,
                 annotations=dataset.annotations
             )
             return VizualApiResult(ds)
@@ -557,10 +579,13 @@ class DefaultVizualApi(VizualApi):
                 name=name,
                 data_type=col.data_type
             )
-            # Store updated dataset to get new identifier
-            ds = datastore.create_dataset(
+            # Only the schema changes. The new dataset shares the rows with
+            # the original dataset.
+            ds = datastore.create_delta_dataset(
+                dataset=dataset,
                 columns=columns,
-                rows=dataset.fetch_rows(),
+                operations=list(),
+                row_count=dataset.row_count,
                 annotations=dataset.annotations
             )
             return VizualApiResult(ds)
@@ -600,24 +625,29 @@ class DefaultVizualApi(VizualApi):
         dataset = datastore.get_dataset(identifier)
         if dataset is None:
             raise ValueError('unknown dataset \'' + identifier + '\'')
-        # Fetch the full set of rows
-        rows = dataset.fetch_rows()
-        # Sort multiple times, ones for each of the sort columns (in reverse
-        # order of appearance in the order by clause)
-        for i in range(len(columns)):
-            l_idx = len(columns) - (i + 1)
-            col_id = columns[l_idx]
+        # Get index positions of the sort columns
+        sort_columns = list()
+        for col_id in columns:
             col_idx = dataset.get_index(col_id)
             if col_idx is None:
                 raise ValueError('unknown column identifier \'' + str(col_id) + '\'')
-            reverse = reversed[l_idx]
-            rows.sort(key=lambda row: row.values[col_idx], reverse=reverse)
-        # Store updated dataset to get new identifier
-        ds = datastore.create_dataset(
-            columns=dataset.columns,
-            rows=rows,
-            annotations=dataset.annotations
-        )
+            sort_columns.append(col_idx)
+        # Sort the stream of dataset rows using a composite key and write the
+        # sorted rows to the new dataset. The sorted dataset contains the same
+        # rows as the original dataset.
+        with dataset.reader() as reader:
+            ds = datastore.write_dataset(
+                columns=dataset.columns,
+                rows=sort_rows(
+                    rows=reader,
+                    sort_columns=sort_columns,
+                    reversed=reversed,
+                    buffer_size=self.sort_buffer_size
+                ),
+                row_count=dataset.row_count,
+                max_row_id=dataset.max_row_id(),
+                annotations=dataset.annotations
+            )
         return VizualApiResult(ds)
 
     def update_cell(self, identifier, column_id, row_id, value, datastore):
@@ -651,24 +681,17 @@ class DefaultVizualApi(VizualApi):
         col_idx = dataset.get_index(column_id)
         if col_idx is None:
             raise ValueError('unknown column identifier \'' + str(column_id) + '\'')
-        # Update the specified cell in the given data array
-        rows = dataset.fetch_rows()
-        row_index = -1
-        for i in range(len(rows)):
-            if rows[i].identifier == row_id:
-                row_index = i
-                break
-        # Make sure that row refers a valid row in the dataset
-        if row_index < 0:
+        # Make sure that row refers a valid row in the dataset. The position
+        # of the row is looked up in the dataset row index.
+        row_index = dataset.get_row_index(row_id)
+        if row_index is None:
             raise ValueError('invalid row identifier \'' + str(row_id) + '\'')
-        r = rows[row_index]
-        values = list(r.values)
-        values[col_idx] = value
-        rows[row_index] = DatasetRow(identifier=r.identifier, values=values)
         # Store updated dataset to get new identifier
-        ds = datastore.create_dataset(
+        ds = datastore.create_delta_dataset(
+            dataset=dataset,
             columns=dataset.columns,
-            rows=rows,
+            operations=[delta.update_cell_op(column_id, row_id, value)],
+            row_count=dataset.row_count,
             annotations=dataset.annotations
         )
         return VizualApiResult(ds)
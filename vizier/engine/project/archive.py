@@ -0,0 +1,677 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Export and import of project data as gzip compressed tar archives.
+
+A project archive contains the datastore, filestore, and viztrail directories
+of a single project. Archives are written as a stream of data blocks, i.e.,
+the archive is never held in memory as a whole. Archives are read in a single
+pass over the archive members.
+
+Each exported archive is recorded as a snapshot. The snapshot manifest lists
+the size and modification time of all exported files. An incremental export
+only contains files that are not part of a given base snapshot or that have
+been modified since. Datasets and workflow modules are immutable, i.e., they
+are never part of an incremental export if they were in the base snapshot.
+The first member of each archive is a snapshot descriptor that identifies the
+project and the base snapshot (if any). For incremental archives the
+descriptor also lists the files and folders of the base snapshot that have
+been deleted since. Only the most recent snapshot manifests of each project
+are kept.
+
+Full archives are extracted into a staging directory that is moved into place
+after the last archive member has been extracted. A failed import therefore
+leaves no partial project behind.
+
+Viztrail resources are read and written through the object store of the
+viztrails repository. For object stores that do not keep resources as files
+(e.g., the SQLite object store) the archive members for the viztrail are
+created from the Json documents in the store.
+"""
+
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import zlib
+
+from vizier.core.io.base import DefaultObjectStore
+from vizier.core.util import get_unique_identifier
+from vizier.datastore.base import CHARTS_DIR
+from vizier.datastore.export import GZIP_WBITS
+from vizier.datastore.fs.chunks import CHUNKS_DIR
+from vizier.viztrail.objectstore.repository import OBJ_VIZTRAILINDEX
+
+import vizier.config.app as app
+
+
+"""Sub-folders of the data directory that contain project data."""
+ARCHIVE_DIRS = [
+    app.DEFAULT_DATASTORES_DIR,
+    app.DEFAULT_FILESTORES_DIR,
+    app.DEFAULT_VIZTRAILS_DIR
+]
+
+"""Folders in the project directories that are not exported. The chunk store
+of a datastore only contains additional links to the dataset data files. The
+chart cache only contains results that can be recomputed.
+"""
+EXCLUDED_DIRS = [CHARTS_DIR, CHUNKS_DIR]
+
+"""Name of the snapshot descriptor in project archives."""
+SNAPSHOT_FILE = 'snapshot.json'
+
+"""Sub-folder of the data directory that contains snapshot manifests."""
+SNAPSHOTS_DIR = 'snapshots'
+
+"""Maximum number of snapshot manifests that are kept for each project."""
+MAX_SNAPSHOTS = 10
+
+"""Prefix for staging directories of imported archives."""
+STAGING_PREFIX = '.import-'
+
+"""Size of blocks when reading files that are added to an archive."""
+READ_BLOCK_SIZE = 65536
+
+"""Element names in the snapshot descriptor."""
+KEY_BASE = 'base'
+KEY_DELETED = 'deleted'
+KEY_PROJECT = 'project'
+KEY_SNAPSHOT = 'snapshot'
+
+
+def export_project(base_dir, project_id, base_snapshot=None, object_store=None):
+    """Export the data of the project with the given identifier. Returns the
+    identifier of the snapshot for the export and a generator for the
+    compressed archive content. The result is None if the project does not
+    exist.
+
+    Raises ValueError if the given base snapshot is unknown. Manifests of
+    older snapshots are removed if the project has more than MAX_SNAPSHOTS
+    snapshots, i.e., incremental exports are only possible for recent
+    snapshots.
+
+    Parameters
+    ----------
+    base_dir: string
+        Base directory for project data
+    project_id: string
+        Unique project identifier
+    base_snapshot: string, optional
+        Identifier of snapshot for an incremental export
+    object_store: vizier.core.io.base.ObjectStore, optional
+        Object store of the viztrails repository. By default, viztrail
+        resources are expected to be files.
+
+    Returns
+    -------
+    string, iterator(bytes)
+    """
+    if object_store is None:
+        object_store = DefaultObjectStore()
+    viztrail_dir = os.path.join(base_dir, app.DEFAULT_VIZTRAILS_DIR, project_id)
+    if not object_store.exists(viztrail_dir):
+        return None
+    base_manifest = dict()
+    if not base_snapshot is None:
+        filename = get_manifest_file(base_dir, project_id, base_snapshot)
+        if not os.path.isfile(filename):
+            raise ValueError('unknown snapshot \'' + str(base_snapshot) + '\'')
+        with open(filename, 'r') as f:
+            base_manifest = json.load(f)
+    # Collect the archive entries and the manifest for the new snapshot. The
+    # manifest contains folders (with a trailing '/') to detect deleted
+    # folders in incremental exports.
+    entries = list()
+    manifest = dict()
+    for dir_name in ARCHIVE_DIRS:
+        project_dir = os.path.join(base_dir, dir_name, project_id)
+        if dir_name == app.DEFAULT_VIZTRAILS_DIR and not is_file_store(object_store):
+            # Objects are identified by a checksum of their content instead
+            # of the file modification time.
+            for arcname, content in list_store_objects(
+                object_store=object_store,
+                folder_path=project_dir,
+                arcname=dir_name + '/' + project_id
+            ):
+                if content is None:
+                    manifest[arcname + '/'] = None
+                    entries.append((None, arcname, True, None))
+                    continue
+                manifest[arcname] = [len(content), zlib.crc32(content)]
+                if base_manifest.get(arcname) != manifest[arcname]:
+                    entries.append((None, arcname, False, content))
+            continue
+        for root, dirs, files in os.walk(project_dir):
+            if root == project_dir:
+                dirs[:] = [d for d in dirs if not d in EXCLUDED_DIRS]
+            dirs.sort()
+            rel_dir = os.path.relpath(root, base_dir).replace(os.sep, '/')
+            manifest[rel_dir + '/'] = None
+            entries.append((root, rel_dir, True, None))
+            for name in sorted(files):
+                filename = os.path.join(root, name)
+                arcname = rel_dir + '/' + name
+                stat = os.stat(filename)
+                manifest[arcname] = [stat.st_size, stat.st_mtime]
+                if base_manifest.get(arcname) != manifest[arcname]:
+                    entries.append((filename, arcname, False, None))
+    snapshot_id = get_unique_identifier()
+    filename = get_manifest_file(base_dir, project_id, snapshot_id)
+    if not os.path.isdir(os.path.dirname(filename)):
+        os.makedirs(os.path.dirname(filename))
+    with open(filename, 'w') as f:
+        json.dump(manifest, f)
+    prune_snapshots(os.path.dirname(filename))
+    snapshot = {
+        KEY_PROJECT: project_id,
+        KEY_SNAPSHOT: snapshot_id,
+        KEY_BASE: base_snapshot,
+        KEY_DELETED: sorted([key for key in base_manifest if not key in manifest])
+    }
+    return snapshot_id, write_archive(entries, snapshot)
+
+
+def import_project(base_dir, fileobj, object_store=None):
+    """Import project data from a compressed archive. The archive is read in
+    a single pass. The project is added to the viztrails index. Returns the
+    identifier of the imported project.
+
+    Full archives are extracted into a staging directory that is moved into
+    the project directories after all members have been extracted. Members
+    of incremental archives are written to the existing project directories.
+    Files and folders that were deleted since the base snapshot are removed.
+
+    Raises ValueError if the archive contains members that do not belong to a
+    single project or that are outside of the project directories. The
+    project of a full archive must not exist. The project of an incremental
+    archive has to exist.
+
+    Parameters
+    ----------
+    base_dir: string
+        Base directory for project data
+    fileobj: FileObject
+        File object for the archive
+    object_store: vizier.core.io.base.ObjectStore, optional
+        Object store of the viztrails repository. By default, viztrail
+        resources are written as files.
+
+    Returns
+    -------
+    string
+    """
+    if object_store is None:
+        object_store = DefaultObjectStore()
+    project_id = None
+    snapshot = None
+    # Directory that archive members are extracted to.
+    target_dir = None
+    staging_dir = None
+    try:
+        with object_store.transaction(), tarfile.open(fileobj=fileobj, mode='r|gz') as tar:
+            for member in tar:
+                if member.name == SNAPSHOT_FILE and project_id is None:
+                    snapshot = json.loads(tar.extractfile(member).read())
+                    project_id = snapshot[KEY_PROJECT]
+                    validate_project(
+                        base_dir,
+                        project_id,
+                        snapshot[KEY_BASE],
+                        object_store
+                    )
+                    continue
+                path = get_member_path(member.name)
+                if project_id is None:
+                    # Archives that were created by previous versions do not
+                    # have a snapshot descriptor.
+                    project_id = path[1]
+                    validate_project(base_dir, project_id, None, object_store)
+                elif path[1] != project_id:
+                    raise ValueError('invalid archive member \'' + member.name + '\'')
+                if target_dir is None:
+                    if snapshot is None or snapshot[KEY_BASE] is None:
+                        staging_dir = tempfile.mkdtemp(
+                            prefix=STAGING_PREFIX,
+                            dir=base_dir
+                        )
+                        target_dir = staging_dir
+                    else:
+                        target_dir = base_dir
+                if path[0] == app.DEFAULT_VIZTRAILS_DIR and not is_file_store(object_store):
+                    import_store_object(
+                        object_store,
+                        tar,
+                        member,
+                        os.path.join(base_dir, *path)
+                    )
+                    continue
+                target = os.path.join(target_dir, *path)
+                if member.isdir():
+                    if not os.path.isdir(target):
+                        os.makedirs(target)
+                elif member.isfile():
+                    if not os.path.isdir(os.path.dirname(target)):
+                        os.makedirs(os.path.dirname(target))
+                    with open(target, 'wb') as f:
+                        shutil.copyfileobj(tar.extractfile(member), f)
+                    os.utime(target, (member.mtime, member.mtime))
+                elif member.islnk():
+                    # Hard links (e.g., to shared data files) are replaced by
+                    # a copy of the previously extracted file.
+                    link_path = get_member_path(member.linkname)
+                    source = os.path.join(target_dir, *link_path)
+                    if link_path[1] != project_id or not os.path.isfile(source):
+                        raise ValueError('invalid archive member \'' + member.name + '\'')
+                    if not os.path.isdir(os.path.dirname(target)):
+                        os.makedirs(os.path.dirname(target))
+                    shutil.copyfile(source, target)
+                    os.utime(target, (member.mtime, member.mtime))
+                else:
+                    raise ValueError('invalid archive member \'' + member.name + '\'')
+            if project_id is None:
+                raise ValueError('empty project archive')
+            if not snapshot is None:
+                delete_members(
+                    base_dir,
+                    project_id,
+                    snapshot.get(KEY_DELETED, list()),
+                    object_store
+                )
+            if not staging_dir is None:
+                move_project(staging_dir, base_dir, project_id)
+            add_to_index(base_dir, project_id, object_store)
+    except (tarfile.TarError, EOFError, zlib.error) as ex:
+        raise ValueError('invalid project archive: ' + str(ex))
+    finally:
+        if not staging_dir is None:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+    return project_id
+
+
+def delete_snapshots(base_dir, project_id):
+    """Remove the snapshot manifests of a deleted project.
+
+    Parameters
+    ----------
+    base_dir: string
+        Base directory for project data
+    project_id: string
+        Unique project identifier
+    """
+    snapshots_dir = os.path.join(base_dir, SNAPSHOTS_DIR, os.path.basename(project_id))
+    if os.path.isdir(snapshots_dir):
+        shutil.rmtree(snapshots_dir)
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def add_to_index(base_dir, project_id, object_store):
+    """Add the project to the viztrails index (unless the project is already
+    contained in the index, e.g., for incremental archives).
+
+    Parameters
+    ----------
+    base_dir: string
+        Base directory for project data
+    project_id: string
+        Unique project identifier
+    object_store: vizier.core.io.base.ObjectStore
+        Object store of the viztrails repository
+    """
+    index_file = object_store.join(
+        os.path.join(base_dir, app.DEFAULT_VIZTRAILS_DIR),
+        OBJ_VIZTRAILINDEX
+    )
+    index = list()
+    if object_store.exists(index_file):
+        index = object_store.read_object(index_file)
+    if not project_id in index:
+        object_store.write_object(index_file, index + [project_id])
+
+
+def delete_members(base_dir, project_id, names, object_store):
+    """Remove the files and folders of an incremental archive import that
+    were deleted since the base snapshot. Folder names end with '/'.
+
+    Parameters
+    ----------
+    base_dir: string
+        Base directory for project data
+    project_id: string
+        Unique project identifier
+    names: list(string)
+        Names of deleted archive members
+    object_store: vizier.core.io.base.ObjectStore
+        Object store of the viztrails repository
+    """
+    # Delete in reverse order to remove files before their folders.
+    for name in sorted(names, reverse=True):
+        path = get_member_path(name)
+        if path[1] != project_id:
+            raise ValueError('invalid archive member \'' + name + '\'')
+        target = os.path.join(base_dir, *path)
+        if path[0] == app.DEFAULT_VIZTRAILS_DIR and not is_file_store(object_store):
+            if name.endswith('/'):
+                object_store.delete_folder(target)
+            else:
+                object_store.delete_object(target)
+        elif name.endswith('/'):
+            if os.path.isdir(target):
+                shutil.rmtree(target)
+        elif os.path.isfile(target):
+            os.remove(target)
+
+
+def get_manifest_file(base_dir, project_id, snapshot_id):
+    """Get path to the manifest file for a project snapshot.
+
+    Parameters
+    ----------
+    base_dir: string
+        Base directory for project data
+    project_id: string
+        Unique project identifier
+    snapshot_id: string
+        Unique snapshot identifier
+
+    Returns
+    -------
+    string
+    """
+    return os.path.join(
+        base_dir,
+        SNAPSHOTS_DIR,
+        project_id,
+        os.path.basename(snapshot_id) + '.json'
+    )
+
+
+def get_member_path(name):
+    """Get the list of path components for the name of an archive member.
+    Raises ValueError if the member is not inside one of the project
+    directories.
+
+    Parameters
+    ----------
+    name: string
+        Name of the archive member
+
+    Returns
+    -------
+    list(string)
+    """
+    path = name.strip('/').split('/')
+    if len(path) < 2 or not path[0] in ARCHIVE_DIRS:
+        raise ValueError('invalid archive member \'' + name + '\'')
+    elif '..' in path or '' in path or '.' in path:
+        raise ValueError('invalid archive member \'' + name + '\'')
+    return path
+
+
+def import_store_object(object_store, tar, member, target):
+    """Write a viztrail archive member to the object store. Directories are
+    created as folders. Files are expected to contain Json documents. Empty
+    files are created as objects without content.
+
+    Parameters
+    ----------
+    object_store: vizier.core.io.base.ObjectStore
+        Object store of the viztrails repository
+    tar: tarfile.TarFile
+        Archive that is being read
+    member: tarfile.TarInfo
+        Archive member
+    target: string
+        Path of the resource in the object store
+    """
+    parent_folder, name = os.path.split(target)
+    if member.isdir():
+        object_store.create_folder(parent_folder, identifier=name)
+    elif member.isfile():
+        content = tar.extractfile(member).read()
+        if len(content) == 0:
+            object_store.create_object(parent_folder, identifier=name)
+        else:
+            try:
+                content = json.loads(content.decode('utf-8'))
+            except ValueError:
+                raise ValueError('invalid archive member \'' + member.name + '\'')
+            object_store.write_object(target, content)
+    else:
+        raise ValueError('invalid archive member \'' + member.name + '\'')
+
+
+def is_file_store(object_store):
+    """Test if the object store keeps resources as files in the file system.
+
+    Parameters
+    ----------
+    object_store: vizier.core.io.base.ObjectStore
+        Object store of the viztrails repository
+
+    Returns
+    -------
+    bool
+    """
+    return isinstance(object_store, DefaultObjectStore)
+
+
+def list_store_objects(object_store, folder_path, arcname):
+    """Generator for the archive names and Json content of all objects in the
+    given object store folder and its subfolders. The content is None for
+    folders. Objects without content have an empty content.
+
+    Parameters
+    ----------
+    object_store: vizier.core.io.base.ObjectStore
+        Object store of the viztrails repository
+    folder_path: string
+        Path to the folder in the object store
+    arcname: string
+        Name of the folder in the archive
+
+    Returns
+    -------
+    iterator((string, bytes))
+    """
+    yield arcname, None
+    names = sorted(object_store.list_objects(folder_path))
+    paths = [object_store.join(folder_path, name) for name in names]
+    documents = object_store.read_objects(paths)
+    for name, path in zip(names, paths):
+        content = b''
+        if path in documents:
+            content = json.dumps(documents[path]).encode('utf-8')
+        yield arcname + '/' + name, content
+    for name in sorted(object_store.list_folders(folder_path, create=False)):
+        for entry in list_store_objects(
+            object_store=object_store,
+            folder_path=object_store.join(folder_path, name),
+            arcname=arcname + '/' + name
+        ):
+            yield entry
+
+
+def move_project(staging_dir, base_dir, project_id):
+    """Move the project directories of an extracted full archive from the
+    staging directory into the data directory. Raises ValueError if any of
+    the project directories exists.
+
+    Parameters
+    ----------
+    staging_dir: string
+        Directory that the archive was extracted to
+    base_dir: string
+        Base directory for project data
+    project_id: string
+        Unique project identifier
+    """
+    moves = list()
+    for dir_name in ARCHIVE_DIRS:
+        source = os.path.join(staging_dir, dir_name, project_id)
+        if not os.path.isdir(source):
+            continue
+        target = os.path.join(base_dir, dir_name, project_id)
+        if os.path.exists(target):
+            raise ValueError('project \'' + project_id + '\' already exists')
+        moves.append((source, target))
+    for source, target in moves:
+        if not os.path.isdir(os.path.dirname(target)):
+            os.makedirs(os.path.dirname(target))
+        os.rename(source, target)
+
+
+def prune_snapshots(snapshots_dir):
+    """Remove the oldest snapshot manifests in the given directory if there
+    are more than MAX_SNAPSHOTS manifests.
+
+    Parameters
+    ----------
+    snapshots_dir: string
+        Directory containing the snapshot manifests of a project
+    """
+    manifests = [
+        os.path.join(snapshots_dir, name)
+        for name in os.listdir(snapshots_dir) if name.endswith('.json')
+    ]
+    manifests.sort(key=lambda filename: os.path.getmtime(filename))
+    for filename in manifests[:-MAX_SNAPSHOTS]:
+        os.remove(filename)
+
+
+def validate_project(base_dir, project_id, base_snapshot, object_store):
+    """Ensure that a project does not exist if a full archive is imported and
+    that it exists for an incremental archive. Raises ValueError otherwise.
+
+    Parameters
+    ----------
+    base_dir: string
+        Base directory for project data
+    project_id: string
+        Unique project identifier
+    base_snapshot: string
+        Identifier of the base snapshot for incremental archives
+    object_store: vizier.core.io.base.ObjectStore
+        Object store of the viztrails repository
+    """
+    if project_id in ['', '.', '..'] or '/' in project_id or os.sep in project_id:
+        raise ValueError('invalid project identifier \'' + project_id + '\'')
+    viztrail_dir = os.path.join(base_dir, app.DEFAULT_VIZTRAILS_DIR, project_id)
+    if base_snapshot is None and object_store.exists(viztrail_dir):
+        raise ValueError('project \'' + project_id + '\' already exists')
+    elif not base_snapshot is None and not object_store.exists(viztrail_dir):
+        raise ValueError('unknown project \'' + project_id + '\'')
+
+
+def write_archive(entries, snapshot):
+    """Generator for the content of a gzip compressed tar archive. The archive
+    contains the snapshot descriptor followed by the given directories and
+    files.
+
+    Parameters
+    ----------
+    entries: list((string, string, bool, bytes))
+        Path, name in the archive, directory flag, and content for archive
+        entries. Entries without a path are written with the given content.
+    snapshot: dict
+        Snapshot descriptor
+
+    Returns
+    -------
+    iterator(bytes)
+    """
+    compressor = zlib.compressobj(wbits=GZIP_WBITS)
+    # Keep track of the number of bytes in the uncompressed archive to pad the
+    # end of the archive to a full record.
+    offset = 0
+    def header(info):
+        return info.tobuf(tarfile.DEFAULT_FORMAT, tarfile.ENCODING, 'surrogateescape')
+    # Snapshot descriptor
+    content = json.dumps(snapshot).encode('utf-8')
+    info = tarfile.TarInfo(SNAPSHOT_FILE)
+    info.size = len(content)
+    info.mtime = time.time()
+    data = header(info) + content + padding_to(len(content), tarfile.BLOCKSIZE)
+    offset += len(data)
+    yield compressor.compress(data)
+    for path, arcname, is_dir, content in entries:
+        info = tarfile.TarInfo(arcname)
+        if not path is None:
+            stat = os.stat(path)
+            info.mode = stat.st_mode & 0o7777
+            info.mtime = stat.st_mtime
+            info.size = stat.st_size
+        else:
+            info.mode = 0o755 if is_dir else 0o644
+            info.mtime = time.time()
+            if not is_dir:
+                info.size = len(content)
+        if is_dir:
+            info.type = tarfile.DIRTYPE
+            info.size = 0
+        data = header(info)
+        offset += len(data)
+        block = compressor.compress(data)
+        if not content is None:
+            data = content + padding_to(info.size, tarfile.BLOCKSIZE)
+            offset += len(data)
+            block += compressor.compress(data)
+        elif not is_dir:
+            remaining = info.size
+            with open(path, 'rb') as f:
+                while remaining > 0:
+                    data = f.read(min(READ_BLOCK_SIZE, remaining))
+                    if len(data) == 0:
+                        raise IOError('unexpected end of file \'' + path + '\'')
+                    remaining -= len(data)
+                    block += compressor.compress(data)
+                    if len(block) > 0:
+                        yield block
+                        block = b''
+            data = padding_to(info.size, tarfile.BLOCKSIZE)
+            offset += info.size + len(data)
+            block += compressor.compress(data)
+        if len(block) > 0:
+            yield block
+    # End of archive marker padded to a full record
+    data = tarfile.NUL * (2 * tarfile.BLOCKSIZE)
+    offset += len(data)
+    data += padding_to(offset, tarfile.RECORDSIZE)
+    yield compressor.compress(data) + compressor.flush()
+
+
+def padding_to(size, block_size):
+    """Get the null bytes that are required to pad data of given size to a
+    multiple of the block size.
+
+    Parameters
+    ----------
+    size: int
+        Data size
+    block_size: int
+        Block size
+
+    Returns
+    -------
+    bytes
+    """
+    remainder = size % block_size
+    return tarfile.NUL * (block_size - remainder) if remainder else b''
@@ -18,15 +18,29 @@
 viztrails repository to manipulate the cached objects.
 """
 
+from collections import OrderedDict
+
+import threading
+
 from vizier.engine.project.base import ProjectHandle
 from vizier.engine.project.cache.base import ProjectCache
 
 
+"""Default maximum number of projects with loaded workflows."""
+DEFAULT_PROJECT_CACHE_SIZE = 64
+
+
 class CommonProjectCache(ProjectCache):
     """The common project cache is a simple wrapper around a viztrail
     repository, a datastore factory, and a filestore factory.
+
+    Handles for all projects are kept in memory. The workflows of a project
+    are loaded by the viztrail on first access. The cache keeps track of the
+    projects that were accessed most recently. If more than cache_size
+    projects have been accessed the workflows of the least recently used
+    projects are unloaded. Projects with active workflows are not unloaded.
     """
-    def __init__(self, datastores, filestores, viztrails):
+    def __init__(self, datastores, filestores, viztrails, cache_size=None):
         """Initialize the cache components and load all projects in the given
         viztrails repository. Maintains all projects in an dictionary keyed by
         their identifier.
@@ -39,10 +53,19 @@ class CommonProjectCache(ProjectCache):
             Factory for project filestores
         viztrails: vizier.vizual.repository.ViztrailRepository
             Repository for viztrails
+        cache_size: int, optional
+            Maximum number of projects with loaded workflows. There is no
+            limit if the value is zero or negative.
         """
         self.datastores = datastores
         self.filestores = filestores
         self.viztrails = viztrails
+        if cache_size is None:
+            cache_size = DEFAULT_PROJECT_CACHE_SIZE
+        self.cache_size = cache_size
+        # Identifier of accessed projects in order of their last access.
+        self.lru = OrderedDict()
+        self.lru_lock = threading.Lock()
         # Create index of project handles from existing viztrails
         self.projects = dict()
         for viztrail in self.viztrails.list_viztrails():
@@ -79,6 +102,7 @@ class CommonProjectCache(ProjectCache):
             filestore=filestore
         )
         self.projects[project.identifier] = project
+        self.touch(project)
         return project
 
     def delete_project(self, project_id):
@@ -100,6 +124,8 @@ class CommonProjectCache(ProjectCache):
             self.datastores.delete_datastore(viztrail.identifier)
             self.filestores.delete_filestore(viztrail.identifier)
             del self.projects[project_id]
+            with self.lru_lock:
+                self.lru.pop(project_id, None)
             return True
         return False
 
@@ -122,7 +148,8 @@ class CommonProjectCache(ProjectCache):
         if not project_id in self.projects:
             return None
         # Return the handle for the specified branch
-        return self.projects[project_id].viztrail.get_branch(branch_id)
+        project = self.touch(self.projects[project_id])
+        return project.viztrail.get_branch(branch_id)
 
     def get_project(self, project_id):
         """Get the handle for project. Returns None if the project does not
@@ -133,7 +160,7 @@ class CommonProjectCache(ProjectCache):
         vizier.engine.project.base.ProjectHandle
         """
         if project_id in self.projects:
-            return self.projects[project_id]
+            return self.touch(self.projects[project_id])
         return None
 
     def list_projects(self):
@@ -144,3 +171,35 @@ class CommonProjectCache(ProjectCache):
         list(vizier.engine.project.base.ProjectHandle)
         """
         return list(self.projects.values())
+
+    def touch(self, project):
+        """Mark the given project as the most recently used project. Unload the
+        workflows of least recently used projects if the number of accessed
+        projects exceeds the cache size. Returns the given project handle for
+        convenience.
+
+        Parameters
+        ----------
+        project: vizier.engine.project.base.ProjectHandle
+            Handle for accessed project
+
+        Returns
+        -------
+        vizier.engine.project.base.ProjectHandle
+        """
+        if self.cache_size <= 0:
+            return project
+        with self.lru_lock:
+            self.lru[project.identifier] = None
+            self.lru.move_to_end(project.identifier)
+            # Unload projects starting with the least recently used one. Keep
+            # projects that cannot be unloaded (i.e., active projects) in the
+            # cache.
+            candidates = list(self.lru.keys())[:-1]
+            for project_id in candidates:
+                if len(self.lru) <= self.cache_size:
+                    break
+                evicted = self.projects.get(project_id)
+                if evicted is None or evicted.viztrail.unload():
+                    del self.lru[project_id]
+        return project
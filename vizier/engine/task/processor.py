@@ -85,6 +85,13 @@ class TaskProcessor(object):
     current database state as input. This method is called by the execution
     backend during workflow execution.
     """
+    def close(self):
+        """Release resources that are held by the processor (e.g., helper
+        processes). Called by execution backends when the process that uses
+        the processor shuts down. The default implementation does nothing.
+        """
+        pass
+
     @abstractmethod
     def compute(self, command_id, arguments, context):
         """Compute results for a given package command using the set of user-
@@ -21,14 +21,133 @@ lenses.
 import requests
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError
+from urllib3.util.retry import Retry
 
 _mimir_url = os.environ.get('MIMIR_URL', 'http://127.0.0.1:8089/api/v2/')
 
+# All requests to the gateway share a pool of keep-alive connections. The
+# timeouts are in seconds. Requests wait for a response indefinitely if no read
+# timeout is given. Only failed connection attempts are retried since Mimir
+# requests are not guaranteed to be idempotent.
+_connect_timeout = float(os.environ.get('MIMIR_CONNECT_TIMEOUT', '10'))
+_read_timeout = float(os.environ['MIMIR_READ_TIMEOUT']) if 'MIMIR_READ_TIMEOUT' in os.environ else None
+_max_retries = int(os.environ.get('MIMIR_MAX_RETRIES', '3'))
+_pool_size = int(os.environ.get('MIMIR_POOL_SIZE', '10'))
+
+# The session and the executor for concurrent requests are created on first
+# use in every process (the multiprocess backend forks worker processes).
+_session = None
+_executor = None
+_pid = None
+_lock = threading.Lock()
+
+# Per-endpoint latency metrics
+_metrics = dict()
+_metrics_lock = threading.Lock()
+
 class MimirError(Exception):
     def __init___(self,dErrorArguments):
         Exception.__init__(self,dErrorArguments)
 
+def getSession():
+    """Get the pooled HTTP session for requests to the Mimir gateway."""
+    global _session, _executor, _pid
+    with _lock:
+        if _session is None or _pid != os.getpid():
+            retries = Retry(
+                total=_max_retries,
+                connect=_max_retries,
+                read=0,
+                status=0,
+                backoff_factor=0.1
+            )
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=_pool_size,
+                max_retries=retries
+            )
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+            _executor = ThreadPoolExecutor(max_workers=_pool_size)
+            _pid = os.getpid()
+        return _session
+
+def getMetrics():
+    """Get latency metrics for requests to the Mimir gateway. Returns a
+    dictionary that contains the number of requests, the number of failed
+    requests, and the total and maximum request time (in seconds) for each
+    endpoint.
+    """
+    with _metrics_lock:
+        return {path: dict(_metrics[path]) for path in _metrics}
+
+def resetMetrics():
+    """Clear all collected latency metrics."""
+    with _metrics_lock:
+        _metrics.clear()
+
+def runConcurrently(*calls):
+    """Run independent gateway calls concurrently. Each call is a function
+    without arguments. Returns the list of results in the order of the given
+    calls. Raises the exception of the first failed call.
+
+    Calls must not call runConcurrently themselves.
+    """
+    futures = [submitCall(call) for call in calls]
+    return [f.result() for f in futures]
+
+def submitCall(call):
+    """Run a gateway call in the background. The call is a function without
+    arguments. Returns a future for the result of the call.
+
+    The call must not call runConcurrently or submitCall itself.
+    """
+    getSession()
+    return _executor.submit(call)
+
+def _request(method, path, req_json=None):
+    """Send a request to the given gateway endpoint using the pooled session.
+    Records the latency of the request.
+    """
+    start = time.perf_counter()
+    failed = True
+    try:
+        resp = getSession().request(
+            method,
+            _mimir_url + path,
+            json=req_json,
+            timeout=(_connect_timeout, _read_timeout)
+        )
+        failed = not resp.ok
+        return resp
+    finally:
+        elapsed = time.perf_counter() - start
+        with _metrics_lock:
+            if not path in _metrics:
+                _metrics[path] = {
+                    'count': 0,
+                    'errors': 0,
+                    'totalTime': 0.0,
+                    'maxTime': 0.0
+                }
+            m = _metrics[path]
+            m['count'] += 1
+            if failed:
+                m['errors'] += 1
+            m['totalTime'] += elapsed
+            if elapsed > m['maxTime']:
+                m['maxTime'] = elapsed
+
+def _post(path, req_json):
+    return _request('POST', path, req_json=req_json)
+
 def readResponse(resp):
     json_object = None
     try:
@@ -57,7 +176,7 @@ def createLens(dataset, params, type, materialize, human_readable_name = None):
       "materialize": materialize,
       "humanReadableName": human_readable_name
     }
-    resp = readResponse(requests.post(_mimir_url + 'lens/create', json=req_json))
+    resp = readResponse(_post('lens/create', req_json))
     return resp
 
 def createView(dataset, query):
@@ -65,7 +184,7 @@ def createView(dataset, query):
       "input": dataset,
       "query": query
     }
-    resp = readResponse(requests.post(_mimir_url + 'view/create', json=req_json))
+    resp = readResponse(_post('view/create', req_json))
     return (resp['viewName'], resp['dependencies'])
 
 def createAdaptiveSchema(dataset, params, type):
@@ -74,7 +193,7 @@ def createAdaptiveSchema(dataset, params, type):
       "params": params,
       "type": type
     } 
-    resp = readResponse(requests.post(_mimir_url + 'adaptive/create', json=req_json))
+    resp = readResponse(_post('adaptive/create', req_json))
     return resp['adaptiveSchemaName']
     
 def vistrailsDeployWorkflowToViztool(x, name, type, users, start, end, fields, latlonfields, housenumberfield, streetfield, cityfield, statefield, orderbyfields):
@@ -91,7 +210,7 @@ def loadDataSource(file, infer_types, detect_headers, format = 'csv', human_read
     }
     if human_readable_name != None:
       req_json["humanReadableName"] = human_readable_name
-    resp = readResponse(requests.post(_mimir_url + 'dataSource/load', json=req_json))
+    resp = readResponse(_post('dataSource/load', req_json))
     return resp['name']
     
 def unloadDataSource(dataset_name, abspath, format='csv', backend_options = []):
@@ -101,7 +220,7 @@ def unloadDataSource(dataset_name, abspath, format='csv', backend_options = []):
       "format": format,
       "backendOption": backend_options
     }
-    resp = readResponse(requests.post(_mimir_url + 'dataSource/unload', json=req_json))
+    resp = readResponse(_post('dataSource/unload', req_json))
     return resp['outputFiles']
     
 def repairReason(reasons, reasonIdx):
@@ -115,7 +234,7 @@ def feedback(reasons, idx, ack, rvalue):
       "ack": ack,
       "repairStr": rvalue
     } 
-    resp = readResponse(requests.post(_mimir_url + 'annotations/feedback', json=req_json))
+    resp = readResponse(_post('annotations/feedback', req_json))
     
 #def feedbackCell(query, col, row, ack): 
     #req_json = 
@@ -128,7 +247,7 @@ def explainRow(query, rowProv):
       "row": rowProv,
       "col": 0
     }
-    resp = readResponse(requests.post(_mimir_url + 'annotations/cell', json=req_json))
+    resp = readResponse(_post('annotations/cell', req_json))
     return resp['reasons']
     
 def explainCell(query, col, rowProv): 
@@ -137,14 +256,14 @@ def explainCell(query, col, rowProv):
       "row": rowProv,
       "col": col
     }
-    resp = readResponse(requests.post(_mimir_url + 'annotations/cell', json=req_json))
+    resp = readResponse(_post('annotations/cell', req_json))
     return resp['reasons']
 
 def explainEverythingJson(query):
     req_json = {
       "query": query
     }
-    resp = readResponse(requests.post(_mimir_url + 'annotations/all', json=req_json))
+    resp = readResponse(_post('annotations/all', req_json))
     return resp['reasons']     
     
 def vistrailsQueryMimirJson(query, include_uncertainty, include_reasons, input = ''): 
@@ -154,7 +273,7 @@ def vistrailsQueryMimirJson(query, include_uncertainty, include_reasons, input =
       "includeUncertainty": include_uncertainty,
       "includeReasons": include_reasons
     } 
-    resp = readResponse(requests.post(_mimir_url + 'query/data', json=req_json))
+    resp = readResponse(_post('query/data', req_json))
     return resp
 
 def countRows(view_name):
@@ -169,7 +288,7 @@ def evalScala(inputs, source):
       "language": "scala",
       "source": source
     }
-    resp = readResponse(requests.post(_mimir_url + 'eval/scala', json=req_json))
+    resp = readResponse(_post('eval/scala', req_json))
     return resp
 
 def evalR(inputs, source):
@@ -178,14 +297,14 @@ def evalR(inputs, source):
       "language": "R",
       "source": source
     }
-    resp = readResponse(requests.post(_mimir_url + 'eval/R', json=req_json))
+    resp = readResponse(_post('eval/R', req_json))
     return resp
 
 def getSchema(query):
     req_json = {
       "query": query
     }
-    resp = readResponse(requests.post(_mimir_url + 'schema', json=req_json))
+    resp = readResponse(_post('schema', req_json))
     return resp['schema']
 
 def createSample(inputds, mode_config, seed = None):
@@ -212,14 +331,14 @@ def createSample(inputds, mode_config, seed = None):
     "samplingMode" : mode_config,
     "seed" : seed
   }
-  resp = readResponse(requests.post(_mimir_url + 'view/sample', json=req_json))
+  resp = readResponse(_post('view/sample', req_json))
   return resp['viewName']
 
   
 def getAvailableLansTypes():
-    return requests.get(_mimir_url + 'lens').json()['lensTypes']
+    return _request('GET', 'lens').json()['lensTypes']
     
 def getAvailableAdaptiveSchemas():
-    return requests.get(_mimir_url + 'adaptive').json()['adaptiveSchemaTypes']
+    return _request('GET', 'adaptive').json()['adaptiveSchemaTypes']
 
        
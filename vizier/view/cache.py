@@ -0,0 +1,211 @@
+# Copyright (C) 2017-2019 New York University,
+#                         University at Buffalo,
+#                         Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Persistent cache for the results of chart queries.
+
+Chart views reference datasets by name. When a chart view is evaluated, the
+name is resolved to the identifier of a dataset. Datasets are never modified
+after they have been created. The query result for a dataset and a chart
+definition therefore never changes.
+
+The chart cache stores query results as Json files in a directory alongside
+the datastore. The file name is derived from the dataset identifier and a hash
+of the parts of the chart definition that determine the query result. The
+total size of all cached files is limited. The least recently used results
+are evicted first. The modification time of a file is updated whenever the
+cached result is read.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+
+"""Default maximum size of all cached chart results (in byte)."""
+DEFAULT_CHART_CACHE_SIZE = 32 * 1024 * 1024
+
+"""Suffix for cache files."""
+CACHE_FILE_SUFFIX = '.json'
+
+
+class ChartCache(object):
+    """Cache for chart query results. Results are keyed by the dataset
+    identifier and the chart definition.
+    """
+    def __init__(self, base_path, capacity=DEFAULT_CHART_CACHE_SIZE):
+        """Initialize the cache directory and the maximum size of the cache.
+        The directory is created when the first result is added to the cache.
+        A capacity that is zero or negative disables the cache.
+
+        Parameters
+        ----------
+        base_path: string
+            Path to the cache directory
+        capacity: int, optional
+            Maximum size of all cached results (in byte)
+        """
+        self.base_path = os.path.abspath(base_path)
+        self.capacity = capacity
+
+    def evict(self):
+        """Remove the least recently used results until the total size of all
+        cached results is within the cache capacity.
+        """
+        entries = list()
+        size = 0
+        for filename in os.listdir(self.base_path):
+            if not filename.endswith(CACHE_FILE_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.base_path, filename))
+            except OSError:
+                # The file may have been removed by another process
+                continue
+            entries.append((stat.st_mtime, filename, stat.st_size))
+            size += stat.st_size
+        entries.sort()
+        for _, filename, file_size in entries:
+            if size <= self.capacity:
+                break
+            try:
+                os.remove(os.path.join(self.base_path, filename))
+            except OSError:
+                pass
+            size -= file_size
+
+    def get(self, dataset_id, view):
+        """Get the cached query result for the given chart view on the dataset
+        with the given identifier. The result is None if the result is not in
+        the cache.
+
+        Parameters
+        ----------
+        dataset_id: string
+            Unique dataset identifier
+        view: vizier.view.chart.ChartViewHandle
+            Chart view definition handle
+
+        Returns
+        -------
+        list
+        """
+        filename = self.get_filename(dataset_id, view)
+        try:
+            with open(filename, 'r') as f:
+                rows = json.load(f)
+            os.utime(filename, None)
+        except (OSError, ValueError):
+            return None
+        return rows
+
+    def get_filename(self, dataset_id, view):
+        """Get the name of the cache file for the given dataset and chart view.
+
+        Parameters
+        ----------
+        dataset_id: string
+            Unique dataset identifier
+        view: vizier.view.chart.ChartViewHandle
+            Chart view definition handle
+
+        Returns
+        -------
+        string
+        """
+        return os.path.join(
+            self.base_path,
+            dataset_id + '.' + chart_key(view) + CACHE_FILE_SUFFIX
+        )
+
+    def put(self, dataset_id, view, rows):
+        """Add the query result for a chart view on the dataset with the given
+        identifier to the cache. The result is ignored if it cannot be
+        serialized as Json or if it exceeds the cache capacity.
+
+        Parameters
+        ----------
+        dataset_id: string
+            Unique dataset identifier
+        view: vizier.view.chart.ChartViewHandle
+            Chart view definition handle
+        rows: list
+            Chart query result
+        """
+        if self.capacity <= 0:
+            return
+        try:
+            content = json.dumps(rows)
+        except (TypeError, ValueError):
+            return
+        if len(content) > self.capacity:
+            return
+        if not os.path.isdir(self.base_path):
+            os.makedirs(self.base_path, exist_ok=True)
+        # Write the result to a temporary file first to ensure that readers
+        # never see a partially written result.
+        fd, tmp_file = tempfile.mkstemp(dir=self.base_path, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.replace(tmp_file, self.get_filename(dataset_id, view))
+        self.evict()
+
+    def remove(self, dataset_id):
+        """Remove all cached results for the dataset with the given identifier.
+
+        Parameters
+        ----------
+        dataset_id: string
+            Unique dataset identifier
+        """
+        if not os.path.isdir(self.base_path):
+            return
+        prefix = dataset_id + '.'
+        for filename in os.listdir(self.base_path):
+            if filename.startswith(prefix):
+                try:
+                    os.remove(os.path.join(self.base_path, filename))
+                except OSError:
+                    pass
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def chart_key(view):
+    """Get a hash for the parts of a chart definition that determine the query
+    result, i.e., the data series columns and ranges, the x-axis, and the
+    point limit and reduction method. Chart names, series labels, and the
+    chart type do not affect the query result.
+
+    Parameters
+    ----------
+    view: vizier.view.chart.ChartViewHandle
+        Chart view definition handle
+
+    Returns
+    -------
+    string
+    """
+    definition = [
+        [[s.column, s.range_start, s.range_end] for s in view.data],
+        view.x_axis,
+        view.get_max_points(),
+        view.reduction if not view.get_max_points() is None else None
+    ]
+    return hashlib.sha1(json.dumps(definition).encode('utf-8')).hexdigest()
@@ -20,9 +20,39 @@ Chart views are definitions of views on datasets that are indented for plotting
 as charts in the Web UI.
 """
 
+import os
+
 from vizier.core.util import get_unique_identifier
 
 
+"""Environment variable for the default maximum number of points in charts
+that do not define a point limit. A value of 0 disables the default limit.
+"""
+VIZIERENGINE_CHART_MAX_POINTS = 'VIZIERENGINE_CHART_MAX_POINTS'
+
+"""Default maximum number of points for chart views."""
+DEFAULT_MAX_POINTS = int(os.environ.get(VIZIERENGINE_CHART_MAX_POINTS, '10000'))
+
+"""Methods for reducing the number of points in a chart. Series are either
+downsampled using the Largest Triangle Three Buckets algorithm or values in
+bins of consecutive rows are aggregated.
+"""
+REDUCE_AVG = 'avg'
+REDUCE_COUNT = 'count'
+REDUCE_LTTB = 'lttb'
+REDUCE_MAX = 'max'
+REDUCE_MIN = 'min'
+REDUCE_SUM = 'sum'
+
+REDUCTIONS = [
+    REDUCE_AVG,
+    REDUCE_COUNT,
+    REDUCE_LTTB,
+    REDUCE_MAX,
+    REDUCE_MIN,
+    REDUCE_SUM
+]
+
 class DataSeriesHandle(object):
     """A data series is a chart is a pair of column identifier and series
     label. In the future we may add additional information, e.g., line color
@@ -104,10 +134,15 @@ class ChartViewHandle(object):
     Information about columns in the data series (and optional x-axis) currently
     reference columns by their name. This may change in future to make the
     view more robust against renaming of columns.
+
+    The optional maximum number of points limits the size of the chart data.
+    Data series that are longer are reduced using the given reduction method.
+    Views without a point limit use the default limit DEFAULT_MAX_POINTS.
     """
     def __init__(
         self, dataset_name, identifier=None, chart_name=None, data=None,
-        x_axis=None, chart_type=None, grouped_chart=True
+        x_axis=None, chart_type=None, grouped_chart=True, max_points=None,
+        reduction=None
     ):
         """Initialize the view handle.
 
@@ -128,7 +163,20 @@ class ChartViewHandle(object):
             Type of chart that is being displayed
         grouped_chart: bool, optional
             Flag indicating whether data series are grouped into single chart
+        max_points: int, optional
+            Maximum number of points in the chart data
+        reduction: string, optional
+            Method for reducing the number of points in data series that
+            exceed the maximum number of points (default: REDUCE_LTTB)
+
+        Raises
+        ------
+        ValueError
         """
+        if not max_points is None and max_points < 1:
+            raise ValueError('invalid maximum number of points \'' + str(max_points) + '\'')
+        if not reduction is None and not reduction in REDUCTIONS:
+            raise ValueError('unknown reduction \'' + str(reduction) + '\'')
         self.dataset_name = dataset_name
         self.identifier = identifier if not identifier is None else get_unique_identifier()
         self.chart_name = chart_name if not chart_name is None else 'Chart'
@@ -136,6 +184,8 @@ class ChartViewHandle(object):
         self.x_axis = x_axis
         self.chart_type = chart_type if not chart_type is None else 'Bar Chart'
         self.grouped_chart = grouped_chart
+        self.max_points = max_points
+        self.reduction = reduction if not reduction is None else REDUCE_LTTB
 
     def add_series(self, column, label=None, range_start=None, range_end=None):
         """Append a data series to the chart view.
@@ -190,9 +240,26 @@ class ChartViewHandle(object):
             data=[DataSeriesHandle.from_dict(s) for s in obj['data']],
             x_axis=x_axis,
             chart_type=obj['chartType'],
-            grouped_chart=obj['groupedChart']
+            grouped_chart=obj['groupedChart'],
+            max_points=obj.get('maxPoints'),
+            reduction=obj.get('reduction')
         )
 
+    def get_max_points(self):
+        """Get the maximum number of points in the chart data. Returns the
+        default limit for views that do not define a limit. The result is None
+        if the number of points is not limited.
+
+        Returns
+        -------
+        int
+        """
+        if not self.max_points is None:
+            return self.max_points
+        elif DEFAULT_MAX_POINTS > 0:
+            return DEFAULT_MAX_POINTS
+        return None
+
     def schema(self):
         """Get a dictionary serialization of the schema information for the
         chart view.
@@ -227,8 +294,11 @@ class ChartViewHandle(object):
             'chartType': self.chart_type,
             'groupedChart': self.grouped_chart
         }
-        # X-Axis information is optional
+        # X-Axis information and the point limit are optional
         if not self.x_axis is None:
             obj['xAxis'] = self.x_axis
+        if not self.max_points is None:
+            obj['maxPoints'] = self.max_points
+            obj['reduction'] = self.reduction
         # Return dictionary
         return obj
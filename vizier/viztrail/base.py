@@ -273,3 +273,14 @@ class ViztrailHandle(NamedObject):
         vizier.viztrail.branch.BranchHandle
         """
         raise NotImplementedError
+
+    def unload(self):
+        """Release in-memory state of the viztrail that can be read again from
+        the underlying store on next access. Returns True if the viztrail was
+        unloaded. The default implementation keeps all state in memory.
+
+        Returns
+        -------
+        bool
+        """
+        return False
@@ -124,6 +124,62 @@ class ModuleProvenance(object):
                     next_state[name] = ds
         return next_state
 
+    def get_dependencies(self):
+        """Get the names of datasets that the module reads and the names of
+        datasets that the module modifies (i.e., writes or deletes). Returns
+        None if the provenance information for the module is unknown.
+
+        The dependencies are used to decide whether modules in a workflow can
+        be executed concurrently. Two modules are independent if neither of
+        them modifies a dataset that the other module reads or modifies.
+
+        Returns
+        -------
+        set(string), set(string)
+        """
+        if self.read is None or self.write is None:
+            return None
+        modified = set(self.write.keys())
+        if not self.delete is None:
+            modified.update(self.delete)
+        return set(self.read.keys()), modified
+
+    def is_equivalent_state(self, datasets, other):
+        """Test if two database states are equivalent with respect to the
+        datasets that the module accessed, i.e., if all datasets that the
+        module read, wrote, or deleted have the same identifier in both states.
+        If the provenance information is unknown all datasets in both states
+        are compared.
+
+        The result is True if executing the module in either of the two states
+        will lead to the same result.
+
+        Parameters
+        ----------
+        datasets: dict(vizier.datastore.dataset.DatasetDescriptor)
+            Dataset descriptors in the first state keyed by the dataset name
+        other: dict(vizier.datastore.dataset.DatasetDescriptor)
+            Dataset descriptors in the second state keyed by the dataset name
+
+        Returns
+        -------
+        bool
+        """
+        dependencies = self.get_dependencies()
+        if dependencies is None:
+            names = set(datasets.keys()).union(other.keys())
+        else:
+            names = dependencies[0].union(dependencies[1])
+        for name in names:
+            ds1 = datasets.get(name)
+            ds2 = other.get(name)
+            if ds1 is None or ds2 is None:
+                if not ds1 is ds2:
+                    return False
+            elif ds1.identifier != ds2.identifier:
+                return False
+        return True
+
     def requires_exec(self, datasets):
         """Test if a module requires execution based on the provenance
         information and a given database state. If True, the module needs to be
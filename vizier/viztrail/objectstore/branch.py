@@ -76,10 +76,11 @@ class OSBranchHandle(BranchHandle):
     - modules: List of module identifier representing the sequence of modules in
                the workflow
 
-    The workflow at the branch head is kept in memory with all modules fully
-    loaded. The branch cache allows to keep an additional number of workflows in
-    memory with all their modules loaded. Access to all other workflow version
-    will require them to be read from the object store.
+    The workflow at the branch head is read from the object store on first
+    access. It is then kept in memory with all modules fully loaded until the
+    branch is unloaded. The branch cache allows to keep an additional number of
+    workflows in memory with all their modules loaded. Access to all other
+    workflow version will require them to be read from the object store.
 
     Folders and Resources
     ---------------------
@@ -115,7 +116,8 @@ class OSBranchHandle(BranchHandle):
         workflows: list(vizier.viztrail.workflow.WorkflowDescriptor), optional
             List of descriptors for workflows in branch history
         head: vizier.viztrail.workflow.WorkflowHandle, optional
-            Current at the head of the branch
+            Current at the head of the branch. The head is read from the object
+            store on first access if not given.
         object_store: vizier.core.io.base.ObjectStore, optional
             Object store implementation to access and maintain resources
         """
@@ -129,7 +131,7 @@ class OSBranchHandle(BranchHandle):
         self.modules_folder = modules_folder
         self.object_store = init_value(object_store, DefaultObjectStore())
         self.workflows = init_value(workflows, list())
-        self.head = head
+        self._head = head
         self.cache_size = cache_size if not cache_size is None else DEFAULT_CACHE_SIZE
         self.cache = list()
 
@@ -185,34 +187,37 @@ class OSBranchHandle(BranchHandle):
         vizier.viztrail.workflow.base.WorkflowHandle
         """
         workflow_modules = list(modules)
-        if not pending_modules is None:
-            for pm in pending_modules:
-                # Make sure the started_at timestamp is set if the module is
-                # running
-                if pm.is_running and pm.timestamp.started_at is None:
-                    pm.timestamp.started_at = pm.timestamp.created_at
-                module = OSModuleHandle.create_module(
-                    command=pm.command,
-                    external_form=pm.external_form,
-                    state=pm.state,
-                    timestamp=pm.timestamp,
-                    datasets=pm.datasets,
-                    outputs=pm.outputs,
-                    provenance=pm.provenance,
-                    module_folder=self.modules_folder,
-                    object_store=self.object_store
-                )
-                workflow_modules.append(module)
-        # Write handle for workflow at branch head
-        descriptor = write_workflow_handle(
-            modules=[m.identifier for m in workflow_modules],
-            workflow_count=len(self.workflows),
-            base_path=self.base_path,
-            object_store=self.object_store,
-            action=action,
-            command=command,
-            created_at=get_current_time()
-        )
+        # Pending modules and the workflow handle are written in a single
+        # transaction.
+        with self.object_store.transaction():
+            if not pending_modules is None:
+                for pm in pending_modules:
+                    # Make sure the started_at timestamp is set if the module is
+                    # running
+                    if pm.is_running and pm.timestamp.started_at is None:
+                        pm.timestamp.started_at = pm.timestamp.created_at
+                    module = OSModuleHandle.create_module(
+                        command=pm.command,
+                        external_form=pm.external_form,
+                        state=pm.state,
+                        timestamp=pm.timestamp,
+                        datasets=pm.datasets,
+                        outputs=pm.outputs,
+                        provenance=pm.provenance,
+                        module_folder=self.modules_folder,
+                        object_store=self.object_store
+                    )
+                    workflow_modules.append(module)
+            # Write handle for workflow at branch head
+            descriptor = write_workflow_handle(
+                modules=[m.identifier for m in workflow_modules],
+                workflow_count=len(self.workflows),
+                base_path=self.base_path,
+                object_store=self.object_store,
+                action=action,
+                command=command,
+                created_at=get_current_time()
+            )
         # Get new workflow and replace the branch head. Move the current head
         # to the cache.
         workflow = WorkflowHandle(
@@ -222,9 +227,9 @@ class OSBranchHandle(BranchHandle):
             descriptor=descriptor
         )
         self.workflows.append(workflow.descriptor)
-        if not self.head is None:
-            self.add_to_cache(self.head)
-        self.head = workflow
+        if not self._head is None:
+            self.add_to_cache(self._head)
+        self._head = workflow
         return workflow
 
     @staticmethod
@@ -366,7 +371,7 @@ class OSBranchHandle(BranchHandle):
         # If identifier is None the head is returned
         if workflow_id is None:
             return self.head
-        elif not self.head is None and self.head.identifier == workflow_id:
+        elif len(self.workflows) > 0 and self.workflows[-1].identifier == workflow_id:
             return self.head
         # Check if the workflow is in the internal cache
         for wf in self.cache:
@@ -391,6 +396,75 @@ class OSBranchHandle(BranchHandle):
         # in the brach history
         return None
 
+    @property
+    def head(self):
+        """Workflow at the head of the branch. The workflow and its modules are
+        read from the object store on first access. The result is None if the
+        branch is empty.
+
+        Returns
+        -------
+        vizier.viztrail.workflow.WorkflowHandle
+        """
+        if self._head is None and len(self.workflows) > 0:
+            # The workflow descriptor is the last element in the workflows list
+            descriptor = self.workflows[-1]
+            self._head = read_workflow(
+                branch_id=self.identifier,
+                workflow_descriptor=descriptor,
+                workflow_path=self.object_store.join(
+                    self.base_path,
+                    descriptor.identifier
+                ),
+                modules_folder=self.modules_folder,
+                object_store=self.object_store
+            )
+        return self._head
+
+    @property
+    def is_active(self):
+        """True if the workflow at the branch head or any of the cached
+        workflows is active. Only loaded workflows are considered. Workflows
+        that have not been read from the object store cannot be active.
+
+        Returns
+        -------
+        bool
+        """
+        if not self._head is None and self._head.is_active:
+            return True
+        for wf in self.cache:
+            if wf.is_active:
+                return True
+        return False
+
+    @property
+    def is_loaded(self):
+        """True if the workflow at the branch head has been read from the
+        object store.
+
+        Returns
+        -------
+        bool
+        """
+        return not self._head is None
+
+    @property
+    def last_modified_at(self):
+        """The timestamp of last modification is either the time when the
+        branch was created or when the branch head was modified. Uses the
+        workflow descriptor to avoid reading the branch head.
+
+        Returns
+        -------
+        datatime.datatime
+        """
+        ts = self.provenance.created_at
+        if len(self.workflows) > 0:
+            if ts < self.workflows[-1].created_at:
+                ts = self.workflows[-1].created_at
+        return ts
+
     @staticmethod
     def load_branch(identifier, is_default, base_path, modules_folder, object_store=None):
         """Load branch from disk. Reads the branch provenance information and
@@ -437,38 +511,31 @@ class OSBranchHandle(BranchHandle):
         # Read descriptors for all branch workflows. Workflow descriptors are
         # objects in the base directory that do no match the name of any of the
         # predefied branch object.
+        workflow_paths = [
+            object_store.join(base_path, resource)
+            for resource in object_store.list_objects(base_path)
+            if not resource in [OBJ_METADATA, OBJ_PROPERTIES]
+        ]
+        objects = object_store.read_objects(workflow_paths)
         workflows = list()
-        for resource in object_store.list_objects(base_path):
-            if not resource in [OBJ_METADATA, OBJ_PROPERTIES]:
-                resource_path = object_store.join(base_path, resource)
+        for resource_path in workflow_paths:
+            obj = objects.get(resource_path)
+            if obj is None:
+                # Raises ValueError for objects that cannot be read
                 obj = object_store.read_object(resource_path)
-                desc = obj[KEY_WORKFLOW_DESCRIPTOR]
-                workflows.append(
-                    WorkflowDescriptor(
-                        identifier=obj[KEY_WORKFLOW_ID],
-                        action=desc[KEY_ACTION],
-                        package_id=desc[KEY_PACKAGE_ID],
-                        command_id=desc[KEY_COMMAND_ID],
-                        created_at=to_datetime(desc[KEY_CREATED_AT])
-                    )
+            desc = obj[KEY_WORKFLOW_DESCRIPTOR]
+            workflows.append(
+                WorkflowDescriptor(
+                    identifier=obj[KEY_WORKFLOW_ID],
+                    action=desc[KEY_ACTION],
+                    package_id=desc[KEY_PACKAGE_ID],
+                    command_id=desc[KEY_COMMAND_ID],
+                    created_at=to_datetime(desc[KEY_CREATED_AT])
                 )
-        # Sort workflows in ascending order of their identifier
-        workflows.sort(key=lambda x: x.identifier)
-        # Read all modules for the workflow at the branch head (if exists)
-        head = None
-        if len(workflows) > 0:
-            # The workflow descriptor is the last element in the workflows list
-            descriptor = workflows[-1]
-            head = read_workflow(
-                branch_id=identifier,
-                workflow_descriptor=descriptor,
-                workflow_path=object_store.join(
-                    base_path,
-                    descriptor.identifier
-                ),
-                modules_folder=modules_folder,
-                object_store=object_store
             )
+        # Sort workflows in ascending order of their identifier. The modules
+        # of the workflow at the branch head are read on first access.
+        workflows.sort(key=lambda x: x.identifier)
         return OSBranchHandle(
             identifier=identifier,
             is_default=is_default,
@@ -480,10 +547,25 @@ class OSBranchHandle(BranchHandle):
                 object_store=object_store
             ),
             workflows=workflows,
-            head=head,
             object_store=object_store
         )
 
+    def unload(self):
+        """Release the workflow at the branch head and all cached workflows.
+        They are read again from the object store on next access. Branches
+        with active workflows are not unloaded. Returns True if the branch was
+        unloaded.
+
+        Returns
+        -------
+        bool
+        """
+        if self.is_active:
+            return False
+        self._head = None
+        self.cache = list()
+        return True
+
 
 # ------------------------------------------------------------------------------
 # Helper Method
@@ -568,19 +650,25 @@ def read_workflow_modules(modules_list, modules_folder, object_store):
     -------
     list(vizier.viztrail.objectstore.module.OSModuleHandle)
     """
-    modules = list()
-    database_state = dict()
-    for module_id in modules_list:
-        module_path=get_module_path(
+    module_paths = [
+        get_module_path(
             modules_folder=modules_folder,
             module_id=module_id,
             object_store=object_store
-        )
+        ) for module_id in modules_list
+    ]
+    # Read all module objects in a single batch. Modules that are missing
+    # in the result are read individually when the module is loaded.
+    objects = object_store.read_objects(module_paths)
+    modules = list()
+    database_state = dict()
+    for module_id, module_path in zip(modules_list, module_paths):
         m = OSModuleHandle.load_module(
             identifier=module_id,
             module_path=module_path,
             prev_state=database_state,
-            object_store=object_store
+            object_store=object_store,
+            obj=objects.get(module_path)
         )
         database_state = m.datasets
         modules.append(m)
@@ -224,7 +224,9 @@ class OSModuleHandle(ModuleHandle):
         )
 
     @staticmethod
-    def load_module(identifier, module_path, prev_state=None, object_store=None):
+    def load_module(
+        identifier, module_path, prev_state=None, object_store=None, obj=None
+    ):
         """Load module from given object store.
 
         Parameters
@@ -239,6 +241,8 @@ class OSModuleHandle(ModuleHandle):
             in the workflow)
         object_store: vizier.core.io.base.ObjectStore, optional
             Object store implementation to access and maintain resources
+        obj: dict, optional
+            Module object if it has been read from the object store already
 
         Returns
         -------
@@ -251,7 +255,8 @@ class OSModuleHandle(ModuleHandle):
         # the module does not exists (in a system error condtion). In this
         # case we return a new module that is in error state.
         try:
-            obj = object_store.read_object(object_path=module_path)
+            if obj is None:
+                obj = object_store.read_object(object_path=module_path)
         except ValueError:
             return OSModuleHandle(
                 identifier=identifier,
@@ -114,22 +114,27 @@ class OSViztrailRepository(ViztrailRepository):
         """
         # Get unique identifier for new viztrail and viztrail directory. Raise
         # runtime error if the returned identifier is not unique.
-        identifier = self.object_store.create_folder(parent_folder=self.base_path)
-        viztrail_path = self.object_store.join(self.base_path, identifier)
-        # Create materialized viztrail resource
-        vt = OSViztrailHandle.create_viztrail(
-            identifier=identifier,
-            properties=properties,
-            base_path=viztrail_path,
-            object_store=self.object_store
-        )
-        # Add the new resource to the viztrails index. Write updated index to
-        # object store before returning the new viztrail handle
+        # All viztrail resources and the updated index are written in a single
+        # transaction.
+        with self.object_store.transaction():
+            identifier = self.object_store.create_folder(
+                parent_folder=self.base_path
+            )
+            viztrail_path = self.object_store.join(self.base_path, identifier)
+            # Create materialized viztrail resource
+            vt = OSViztrailHandle.create_viztrail(
+                identifier=identifier,
+                properties=properties,
+                base_path=viztrail_path,
+                object_store=self.object_store
+            )
+            # Add the new resource to the viztrails index. Write updated index
+            # to object store before returning the new viztrail handle
+            self.object_store.write_object(
+                object_path=self.viztrails_index,
+                content=[vt_id for vt_id in self.viztrails] + [vt.identifier]
+            )
         self.viztrails[vt.identifier] = vt
-        self.object_store.write_object(
-            object_path=self.viztrails_index,
-            content=[vt_id for vt_id in self.viztrails]
-        )
         return vt
 
     def delete_viztrail(self, viztrail_id):
@@ -249,6 +249,33 @@ class OSViztrailHandle(ViztrailHandle):
         else:
             return False
 
+    @property
+    def is_active(self):
+        """True if any of the loaded branch workflows is active.
+
+        Returns
+        -------
+        bool
+        """
+        for branch in list(self.branches.values()):
+            if branch.is_active:
+                return True
+        return False
+
+    @property
+    def is_loaded(self):
+        """True if the head of any of the viztrail branches has been read from
+        the object store.
+
+        Returns
+        -------
+        bool
+        """
+        for branch in list(self.branches.values()):
+            if branch.is_loaded:
+                return True
+        return False
+
     @staticmethod
     def load_viztrail(base_path, object_store=None):
         """Load all viztrail resources from given object store.
@@ -341,6 +368,21 @@ class OSViztrailHandle(ViztrailHandle):
         )
         return branch
 
+    def unload(self):
+        """Release the loaded workflows of all branches. Workflows are read
+        again from the object store on next access. Viztrails with active
+        workflows are not unloaded. Returns True if the viztrail was unloaded.
+
+        Returns
+        -------
+        bool
+        """
+        if self.is_active:
+            return False
+        for branch in list(self.branches.values()):
+            branch.unload()
+        return True
+
 
 # ------------------------------------------------------------------------------
 # Helper Methods